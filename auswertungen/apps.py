@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AuswertungenConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "auswertungen"
+
+    def ready(self):
+        """Importiert Signals beim Start der App."""
+        import auswertungen.signals  # noqa
@@ -0,0 +1,202 @@
+"""
+Management Command: Benchmark der EÜR-Berechnung
+================================================
+
+Vergleicht die bisherige Berechnung (eine Summen-Abfrage pro EÜR-Mapping)
+mit dem ``EURAggregator`` (eine gruppierte Abfrage für alle Zeilen, wahlweise
+über die Buchungen oder die Monatssalden) auf einem synthetischen Hauptbuch.
+
+Alle Testdaten werden in einer Transaktion angelegt und am Ende wieder
+zurückgerollt - die Datenbank bleibt unverändert.
+
+Beispiel:
+    python manage.py benchmark_eur --anzahl 500000
+"""
+
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from auswertungen.models import OFFIZIELLE_EUR_MAPPINGS, EURMapping
+from auswertungen.services import EURService, KontoSaldoService
+from buchungen.models import Buchungssatz
+from konten.models import Konto
+
+
+class Command(BaseCommand):
+    help = "Benchmark: EÜR pro Mapping vs. gruppierte Einzelabfrage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--anzahl",
+            type=int,
+            default=500_000,
+            help="Anzahl synthetischer Buchungssätze (Standard: 500000)",
+        )
+        parser.add_argument(
+            "--jahr",
+            type=int,
+            default=date.today().year,
+            help="Wirtschaftsjahr der synthetischen Buchungen",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=5_000,
+            help="Batch-Größe für bulk_create",
+        )
+        parser.add_argument(
+            "--wiederholungen",
+            type=int,
+            default=3,
+            help="Anzahl Messläufe je Variante (bester Wert zählt)",
+        )
+
+    def handle(self, *args, **options):
+        anzahl = options["anzahl"]
+        jahr = options["jahr"]
+
+        with transaction.atomic():
+            self.stdout.write(f"🎯 Erzeuge {anzahl:,} synthetische Buchungssätze...")
+            start = time.perf_counter()
+            self._erzeuge_hauptbuch(anzahl, jahr, options["batch"])
+            # bulk_create löst keine Signals aus - Monatssalden nachziehen
+            KontoSaldoService.neu_aufbauen(jahr=jahr)
+            self.stdout.write(f"  Testdaten in {time.perf_counter() - start:.1f}s")
+
+            service = EURService(jahr)
+            alt, alt_zeit, alt_queries = self._messe(
+                service.berechne_offizielle_eur_einzeln, options["wiederholungen"]
+            )
+            neu, neu_zeit, neu_queries = self._messe(
+                lambda: service.berechne_offizielle_eur(salden_nutzen=False),
+                options["wiederholungen"],
+            )
+            salden, salden_zeit, salden_queries = self._messe(
+                service.berechne_offizielle_eur, options["wiederholungen"]
+            )
+
+            # Testdaten verwerfen
+            transaction.set_rollback(True)
+
+        if not self._auf_cent(alt) == self._auf_cent(neu) == self._auf_cent(salden):
+            raise CommandError("❌ Ergebnisse weichen ab - Aggregator ist fehlerhaft!")
+
+        self.stdout.write(self.style.SUCCESS("=== EÜR-Benchmark ==="))
+        self.stdout.write(
+            f"  Pro Mapping:      {alt_zeit * 1000:9.1f}ms ({alt_queries} Queries)"
+        )
+        self.stdout.write(
+            f"  Gruppiert:        {neu_zeit * 1000:9.1f}ms ({neu_queries} Queries)"
+        )
+        self.stdout.write(
+            f"  Monatssalden:     {salden_zeit * 1000:9.1f}ms ({salden_queries} Queries)"
+        )
+        if neu_zeit > 0 and salden_zeit > 0:
+            self.stdout.write(
+                f"  Faktor:           {alt_zeit / neu_zeit:9.1f}x / "
+                f"{alt_zeit / salden_zeit:.1f}x"
+            )
+        self.stdout.write(
+            f"  Ergebnis identisch: ✓ (EÜR-Ergebnis {neu['eur_ergebnis']:.2f}€)"
+        )
+
+    @staticmethod
+    def _auf_cent(eur_data: dict) -> dict:
+        """
+        Rundet alle Beträge auf Cent.
+
+        SQLite summiert DecimalFields als Gleitkommazahl, daher trägt der
+        alte Pfad dort Rundungsrauschen in den hinteren Stellen.
+        """
+        cent = Decimal("0.01")
+        gerundet = dict(eur_data)
+        for seite in ("einnahmen", "ausgaben"):
+            gerundet[seite] = [
+                {**zeile, "betrag": zeile["betrag"].quantize(cent)}
+                for zeile in eur_data[seite]
+            ]
+        for feld in ("gesamte_einnahmen", "gesamte_ausgaben", "eur_ergebnis"):
+            gerundet[feld] = Decimal(eur_data[feld]).quantize(cent)
+        return gerundet
+
+    def _messe(self, funktion, wiederholungen):
+        """Führt die Funktion mehrfach aus und liefert (Ergebnis, Bestzeit, Queries)."""
+        beste_zeit = None
+        ergebnis = None
+        queries = 0
+        for _ in range(max(1, wiederholungen)):
+            with CaptureQueriesContext(connection) as kontext:
+                start = time.perf_counter()
+                ergebnis = funktion()
+                dauer = time.perf_counter() - start
+            queries = len(kontext.captured_queries)
+            if beste_zeit is None or dauer < beste_zeit:
+                beste_zeit = dauer
+        return ergebnis, beste_zeit, queries
+
+    def _erzeuge_hauptbuch(self, anzahl, jahr, batch):
+        """Legt Mappings, Konten und Buchungen für den Benchmark an."""
+        if not EURMapping.objects.exists():
+            EURMapping.objects.bulk_create(
+                EURMapping(**daten) for daten in OFFIZIELLE_EUR_MAPPINGS
+            )
+
+        nummern = {"1200"}
+        for mapping in EURMapping.objects.filter(ist_aktiv=True):
+            nummern.update(str(nr) for nr in mapping.skr03_konten)
+
+        vorhanden = set(
+            Konto.objects.filter(nummer__in=nummern).values_list("nummer", flat=True)
+        )
+        Konto.objects.bulk_create(
+            Konto(
+                nummer=nummer,
+                name=f"Benchmark {nummer}",
+                kategorie=self._kategorie_fuer(nummer),
+                typ="SONSTIGE",
+            )
+            for nummer in sorted(nummern - vorhanden)
+        )
+
+        konten = dict(
+            Konto.objects.filter(nummer__in=nummern).values_list("nummer", "id")
+        )
+        bank_id = konten.pop("1200")
+        gegenkonten = list(konten.values())
+
+        zufall = random.Random(42)  # noqa: S311 - nur Testdaten
+        jahr_start = date(jahr, 1, 1)
+        puffer = []
+        for i in range(anzahl):
+            gegenkonto_id = zufall.choice(gegenkonten)
+            einnahme = zufall.random() < 0.3
+            puffer.append(
+                Buchungssatz(
+                    buchungsdatum=jahr_start + timedelta(days=zufall.randrange(365)),
+                    buchungstext=f"Benchmark {i}",
+                    betrag=Decimal(zufall.randrange(100, 500_000)) / 100,
+                    soll_konto_id=bank_id if einnahme else gegenkonto_id,
+                    haben_konto_id=gegenkonto_id if einnahme else bank_id,
+                    automatisch_erstellt=True,
+                )
+            )
+            if len(puffer) >= batch:
+                Buchungssatz.objects.bulk_create(puffer)
+                puffer = []
+        if puffer:
+            Buchungssatz.objects.bulk_create(puffer)
+
+    @staticmethod
+    def _kategorie_fuer(nummer: str) -> str:
+        """Grobe SKR03-Kategorie für synthetische Konten."""
+        if nummer.startswith("8"):
+            return "ERTRAG"
+        if nummer[0] in "3456":
+            return "AUFWAND"
+        return "AKTIVKONTO"
@@ -16,6 +16,7 @@ from django.core.management.base import BaseCommand
 from django.db import connection
 from django.utils import timezone
 
+from auswertungen.optimized_views import invalidate_dashboard_cache
 from belege.models import Beleg
 from buchungen.models import Buchungssatz
 from konten.models import Konto
@@ -194,8 +195,7 @@ class Command(BaseCommand):
     def _test_dashboard_uncached(self):
         """Test Dashboard ohne Cache."""
         # Cache löschen
-        cache.delete("dashboard_stats_user_1")
-        cache.delete("dashboard_financial_user_1")
+        invalidate_dashboard_cache(1)
 
         # Simuliere Dashboard-Queries
         heute = timezone.now().date()
@@ -0,0 +1,43 @@
+"""
+Management Command: Monatssalden neu aufbauen
+=============================================
+
+Berechnet die materialisierten ``KontoMonatssaldo``-Zeilen komplett aus den
+Buchungssätzen neu - z.B. nach Massenimporten ohne Signals oder zur
+Kontrolle der inkrementell gepflegten Werte.
+
+Beispiel:
+    python manage.py rebuild_salden
+    python manage.py rebuild_salden --jahr 2025
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from auswertungen.services import KontoSaldoService
+
+
+class Command(BaseCommand):
+    help = "Baut die Konto-Monatssalden aus den Buchungssätzen neu auf"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--jahr",
+            type=int,
+            help="Nur dieses Wirtschaftsjahr neu aufbauen (Standard: alle)",
+        )
+
+    def handle(self, *args, **options):
+        jahr = options.get("jahr")
+        zeitraum = f"Jahr {jahr}" if jahr else "alle Jahre"
+        self.stdout.write(f"🔄 Baue Monatssalden neu auf ({zeitraum})...")
+
+        start = time.perf_counter()
+        anzahl = KontoSaldoService.neu_aufbauen(jahr=jahr)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {anzahl} Monatssalden in {time.perf_counter() - start:.2f}s aufgebaut"
+            )
+        )
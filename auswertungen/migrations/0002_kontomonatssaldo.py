@@ -0,0 +1,106 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:04
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def salden_aufbauen(apps, schema_editor):
+    """Füllt die Monatssalden aus den vorhandenen Buchungssätzen."""
+    Buchungssatz = apps.get_model("buchungen", "Buchungssatz")
+    KontoMonatssaldo = apps.get_model("auswertungen", "KontoMonatssaldo")
+
+    summen = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+    buchungen = Buchungssatz.objects.values_list(
+        "soll_konto_id", "haben_konto_id", "buchungsdatum", "betrag"
+    )
+    for soll_id, haben_id, datum, betrag in buchungen.iterator(chunk_size=2000):
+        summen[(soll_id, datum.year, datum.month)][0] += betrag
+        summen[(haben_id, datum.year, datum.month)][1] += betrag
+
+    KontoMonatssaldo.objects.bulk_create(
+        (
+            KontoMonatssaldo(
+                konto_id=konto_id,
+                jahr=jahr,
+                monat=monat,
+                soll_summe=soll,
+                haben_summe=haben,
+            )
+            for (konto_id, jahr, monat), (soll, haben) in summen.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auswertungen", "0001_initial"),
+        ("buchungen", "0003_buchungssatz_kontenpaar_index"),
+        ("konten", "0003_alter_konto_kategorie_alter_konto_typ"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KontoMonatssaldo",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("jahr", models.PositiveSmallIntegerField(verbose_name="Jahr")),
+                ("monat", models.PositiveSmallIntegerField(verbose_name="Monat")),
+                (
+                    "soll_summe",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=14,
+                        verbose_name="Soll-Summe",
+                    ),
+                ),
+                (
+                    "haben_summe",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=14,
+                        verbose_name="Haben-Summe",
+                    ),
+                ),
+                (
+                    "aktualisiert_am",
+                    models.DateTimeField(auto_now=True, verbose_name="Aktualisiert am"),
+                ),
+                (
+                    "konto",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monatssalden",
+                        to="konten.konto",
+                        verbose_name="Konto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Konto-Monatssaldo",
+                "verbose_name_plural": "Konto-Monatssalden",
+                "ordering": ["konto", "jahr", "monat"],
+                "indexes": [
+                    models.Index(
+                        fields=["jahr", "monat"], name="auswertunge_jahr_1c1d26_idx"
+                    )
+                ],
+                "unique_together": {("konto", "jahr", "monat")},
+            },
+        ),
+        migrations.RunPython(salden_aufbauen, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,7 @@ Peter Zwegat: "Das muss genauso aussehen wie beim Finanzamt - keine Kompromisse!
 from decimal import Decimal
 
 from django.db import models
+from django.db.models import Q
 
 
 class EURMapping(models.Model):
@@ -177,6 +178,78 @@ class EURBerechnung(models.Model):
         return self.gewinn_verlust == 0
 
 
+class KontoMonatssaldo(models.Model):
+    """
+    Materialisierte Soll-/Haben-Summen je Konto und Monat.
+
+    Wird bei jedem Speichern/Löschen eines Buchungssatzes inkrementell
+    fortgeschrieben (siehe ``auswertungen.signals``) und kann mit
+    ``manage.py rebuild_salden`` komplett neu aufgebaut werden.
+    Peter Zwegat: "Wer jeden Monat Kassensturz macht, muss nie alles nachzählen!"
+    """
+
+    konto = models.ForeignKey(
+        "konten.Konto",
+        on_delete=models.CASCADE,
+        related_name="monatssalden",
+        verbose_name="Konto",
+    )
+
+    jahr = models.PositiveSmallIntegerField(verbose_name="Jahr")
+
+    monat = models.PositiveSmallIntegerField(verbose_name="Monat")
+
+    soll_summe = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        verbose_name="Soll-Summe",
+    )
+
+    haben_summe = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        verbose_name="Haben-Summe",
+    )
+
+    aktualisiert_am = models.DateTimeField(
+        auto_now=True, verbose_name="Aktualisiert am"
+    )
+
+    class Meta:
+        verbose_name = "Konto-Monatssaldo"
+        verbose_name_plural = "Konto-Monatssalden"
+        ordering = ["konto", "jahr", "monat"]
+        unique_together = ["konto", "jahr", "monat"]
+        indexes = [
+            models.Index(fields=["jahr", "monat"]),
+        ]
+
+    def __str__(self):
+        return f"{self.konto_id} {self.monat:02d}/{self.jahr}: S {self.soll_summe} / H {self.haben_summe}"
+
+    @property
+    def saldo(self):
+        """Soll minus Haben des Monats."""
+        return self.soll_summe - self.haben_summe
+
+    @staticmethod
+    def zeitraum_q(von=None, bis=None) -> Q:
+        """
+        Filter für alle Monate zwischen ``von`` und ``bis`` (jeweils inklusive).
+
+        Es zählen nur Jahr und Monat der übergebenen Daten; ``None`` lässt
+        die jeweilige Seite offen.
+        """
+        filter_q = Q()
+        if von is not None:
+            filter_q &= Q(jahr__gt=von.year) | Q(jahr=von.year, monat__gte=von.month)
+        if bis is not None:
+            filter_q &= Q(jahr__lt=bis.year) | Q(jahr=bis.year, monat__lte=bis.month)
+        return filter_q
+
+
 # Initiale EÜR-Mappings (als Datenmigration)
 OFFIZIELLE_EUR_MAPPINGS = [
     # EINNAHMEN
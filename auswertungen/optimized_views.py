@@ -11,17 +11,23 @@ Diese Datei enthält optimierte Versionen der Dashboard-Views mit:
 import logging
 import secrets
 from datetime import timedelta
-from decimal import Decimal
 
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, Sum
 from django.shortcuts import render
 from django.utils import timezone
 
 from belege.models import Beleg
-from buchungen.models import Buchungssatz, Geschaeftspartner
-from konten.models import Konto
+from buchungen.models import Buchungssatz
+from llkjj_knut.cache_utils import (
+    CacheKeys,
+    bump_namespace,
+    invalidate_related_caches,
+    namespace_benutzer,
+)
+
+from .services import DashboardStatistikService, ZeitreihenService
 
 logger = logging.getLogger(__name__)
 
@@ -31,32 +37,11 @@ def _get_dashboard_stats_cached(user_id):
     Cached Dashboard-Statistiken für bessere Performance.
     Cache-Dauer: 5 Minuten
     """
-    cache_key = f"dashboard_stats_user_{user_id}"
+    cache_key = CacheKeys.dashboard("stats", user_id)
     stats = cache.get(cache_key)
 
     if stats is None:
-        heute = timezone.now().date()
-        monat_start = heute.replace(day=1)
-
-        # Alle Stats in einer Query zusammenfassen wo möglich
-        stats = {
-            "buchungen_gesamt": Buchungssatz.objects.count(),
-            "buchungen_monat": Buchungssatz.objects.filter(
-                buchungsdatum__gte=monat_start
-            ).count(),
-            "belege_count": Beleg.objects.count(),
-            "belege_unbearbeitet": Beleg.objects.filter(
-                status__in=["NEU", "FEHLER"]
-            ).count(),
-            "belege_eingang": Beleg.objects.filter(
-                beleg_typ="RECHNUNG_EINGANG"
-            ).count(),
-            "belege_ausgang": Beleg.objects.filter(
-                beleg_typ="RECHNUNG_AUSGANG"
-            ).count(),
-            "konten_count": Konto.objects.count(),
-            "partner_count": Geschaeftspartner.objects.filter(aktiv=True).count(),
-        }
+        stats = DashboardStatistikService().statistiken()
 
         # Cache für 5 Minuten
         cache.set(cache_key, stats, 300)
@@ -69,59 +54,11 @@ def _get_financial_data_cached(user_id):
     Cached Finanzdaten für Dashboard.
     Cache-Dauer: 3 Minuten (häufiger aktualisiert)
     """
-    cache_key = f"dashboard_financial_user_{user_id}"
+    cache_key = CacheKeys.dashboard("financial", user_id)
     financial_data = cache.get(cache_key)
 
     if financial_data is None:
-        heute = timezone.now().date()
-        monat_start = heute.replace(day=1)
-        jahr_start = heute.replace(month=1, day=1)
-        letzter_monat = (monat_start - timedelta(days=1)).replace(day=1)
-
-        # Optimierte Queries - alle Einnahmen in einer Abfrage
-        einnahmen_data = Buchungssatz.objects.filter(
-            haben_konto__nummer__startswith="8"
-        ).aggregate(
-            monat=Sum("betrag", filter=Q(buchungsdatum__gte=monat_start)),
-            jahr=Sum("betrag", filter=Q(buchungsdatum__gte=jahr_start)),
-            vormonat=Sum(
-                "betrag",
-                filter=Q(
-                    buchungsdatum__gte=letzter_monat, buchungsdatum__lt=monat_start
-                ),
-            ),
-        )
-
-        # Alle Ausgaben in einer Abfrage
-        ausgaben_data = Buchungssatz.objects.filter(
-            soll_konto__nummer__startswith="4"
-        ).aggregate(
-            monat=Sum("betrag", filter=Q(buchungsdatum__gte=monat_start)),
-            jahr=Sum("betrag", filter=Q(buchungsdatum__gte=jahr_start)),
-        )
-
-        einnahmen_monat = einnahmen_data["monat"] or Decimal("0")
-        einnahmen_jahr = einnahmen_data["jahr"] or Decimal("0")
-        einnahmen_vormonat = einnahmen_data["vormonat"] or Decimal("0")
-        ausgaben_monat = ausgaben_data["monat"] or Decimal("0")
-        ausgaben_jahr = ausgaben_data["jahr"] or Decimal("0")
-
-        # Trend berechnen
-        einnahmen_trend = 0
-        if einnahmen_vormonat > 0:
-            einnahmen_trend = float(
-                (einnahmen_monat - einnahmen_vormonat) / einnahmen_vormonat * 100
-            )
-
-        financial_data = {
-            "einnahmen_monat": einnahmen_monat,
-            "ausgaben_monat": ausgaben_monat,
-            "gewinn_monat": einnahmen_monat - ausgaben_monat,
-            "einnahmen_jahr": einnahmen_jahr,
-            "ausgaben_jahr": ausgaben_jahr,
-            "gewinn_jahr": einnahmen_jahr - ausgaben_jahr,
-            "einnahmen_trend": einnahmen_trend,
-        }
+        financial_data = DashboardStatistikService().finanzen()
 
         # Cache für 3 Minuten
         cache.set(cache_key, financial_data, 180)
@@ -134,7 +71,7 @@ def _get_recent_data_cached(user_id):
     Cached aktuelle Daten (Buchungen, Belege, etc.)
     Cache-Dauer: 2 Minuten
     """
-    cache_key = f"dashboard_recent_user_{user_id}"
+    cache_key = CacheKeys.dashboard("recent", user_id)
     recent_data = cache.get(cache_key)
 
     if recent_data is None:
@@ -180,42 +117,12 @@ def _get_chart_data_cached(user_id):
     Cached Chart-Daten für Dashboard.
     Cache-Dauer: 15 Minuten (Chart-Daten ändern sich seltener)
     """
-    cache_key = f"dashboard_chart_user_{user_id}"
+    cache_key = CacheKeys.dashboard("chart", user_id)
     chart_data = cache.get(cache_key)
 
     if chart_data is None:
-        heute = timezone.now().date()
-        chart_data = []
-
-        # Optimierte Chart-Daten Berechnung
-        # Alle 12 Monate in einer Query mit Case/When
-        for i in range(12):
-            chart_monat = (heute.replace(day=1) - timedelta(days=30 * i)).replace(day=1)
-            chart_monat_ende = (
-                chart_monat.replace(day=28) + timedelta(days=4)
-            ).replace(day=1) - timedelta(days=1)
-
-            # Einnahmen und Ausgaben für den Monat
-            monat_data = Buchungssatz.objects.filter(
-                buchungsdatum__gte=chart_monat,
-                buchungsdatum__lte=chart_monat_ende,
-            ).aggregate(
-                einnahmen=Sum("betrag", filter=Q(haben_konto__nummer__startswith="8")),
-                ausgaben=Sum("betrag", filter=Q(soll_konto__nummer__startswith="4")),
-            )
-
-            einnahmen = monat_data["einnahmen"] or Decimal("0")
-            ausgaben = monat_data["ausgaben"] or Decimal("0")
-
-            chart_data.insert(
-                0,
-                {
-                    "monat": chart_monat.strftime("%b %Y"),
-                    "einnahmen": float(einnahmen),
-                    "ausgaben": float(ausgaben),
-                    "gewinn": float(einnahmen - ausgaben),
-                },
-            )
+        # Alle 12 Monate in einer GROUP-BY-Abfrage, leere Monate mit 0
+        chart_data = ZeitreihenService.letzte_monate().chart_daten()
 
         # Cache für 15 Minuten
         cache.set(cache_key, chart_data, 900)
@@ -275,13 +182,13 @@ def dashboard_view_optimized(request):
         # Performance-Info für Debugging
         "cache_info": (
             {
-                "stats_cached": cache.get(f"dashboard_stats_user_{user_id}")
+                "stats_cached": cache.get(CacheKeys.dashboard("stats", user_id))
                 is not None,
-                "financial_cached": cache.get(f"dashboard_financial_user_{user_id}")
+                "financial_cached": cache.get(CacheKeys.dashboard("financial", user_id))
                 is not None,
-                "recent_cached": cache.get(f"dashboard_recent_user_{user_id}")
+                "recent_cached": cache.get(CacheKeys.dashboard("recent", user_id))
                 is not None,
-                "chart_cached": cache.get(f"dashboard_chart_user_{user_id}")
+                "chart_cached": cache.get(CacheKeys.dashboard("chart", user_id))
                 is not None,
             }
             if request.user.is_superuser
@@ -296,51 +203,26 @@ def invalidate_dashboard_cache(user_id=None):
     """
     Invalidiert Dashboard-Cache für einen oder alle Benutzer.
 
+    Erhöht nur den Generationszähler des Namespace - kein Löschen per
+    Pattern und kein ``cache.clear()``.
+
     Args:
         user_id: Spezifische User-ID oder None für alle
     """
-    from django.core.cache import cache
-
     if user_id:
-        cache_keys = [
-            f"dashboard_stats_user_{user_id}",
-            f"dashboard_financial_user_{user_id}",
-            f"dashboard_recent_user_{user_id}",
-            f"dashboard_chart_user_{user_id}",
-        ]
-        cache.delete_many(cache_keys)
+        bump_namespace(namespace_benutzer(user_id))
     else:
-        # Für alle Benutzer - pattern-based deletion
-        # Implementierung für pattern-based cache deletion
-        try:
-            # Versuche Redis-spezifische pattern deletion
-            if hasattr(cache, "_cache") and hasattr(cache._cache, "delete_pattern"):
-                pattern = "dashboard_*_user_*"
-                cache._cache.delete_pattern(pattern)
-                logger.info(f"Redis pattern deletion executed for: {pattern}")
-            else:
-                # Fallback: Cache komplett leeren (weniger effizient)
-                cache.clear()
-                logger.warning(
-                    "Full cache clear executed (pattern deletion not available)"
-                )
-        except Exception as e:
-            logger.error(f"Cache invalidation failed: {e}")
-            # Graceful degradation - das System funktioniert weiter
+        bump_namespace("dashboard")
 
 
 # Signal-Handler für Cache-Invalidierung
-def invalidate_cache_on_booking_change(sender, **kwargs):
+def invalidate_cache_on_booking_change(sender, instance=None, **kwargs):
     """
     Invalidiert relevante Caches bei Buchungsänderungen.
+
+    Betroffen sind die Dashboards sowie die EÜR des Buchungsjahres.
     """
-    # Alle Dashboard-Caches invalidieren
-    invalidate_dashboard_cache()
-
-    # Weitere spezifische Cache-Invalidierungen
-    cache.delete_many(
-        [
-            "eur_auswertung_current_year",
-            "konten_saldo_overview",
-        ]
-    )
+    jahre = None
+    if instance is not None and instance.buchungsdatum:
+        jahre = [instance.buchungsdatum.year]
+    invalidate_related_caches("Buchungssatz", jahre=jahre)
@@ -3,14 +3,578 @@ EÜR-Service für die offizielle Einnahmen-Überschuss-Rechnung.
 Peter Zwegat: "Hier wird ordentlich gerechnet - wie das Finanzamt es will!"
 """
 
+import calendar
+from datetime import date, timedelta
 from decimal import Decimal
-
-from django.db.models import Q, Sum
+from functools import cached_property
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import (
+    ExtractMonth,
+    ExtractYear,
+    TruncMonth,
+    TruncQuarter,
+    TruncWeek,
+)
 from django.utils import timezone
 
-from buchungen.models import Buchungssatz
+from belege.models import Beleg
+from buchungen.models import Buchungssatz, Geschaeftspartner
+from konten.models import Konto
+from llkjj_knut.cache_utils import aktive_eur_mappings
+
+from .models import EURBerechnung, EURMapping, KontoMonatssaldo
+
+CENT = Decimal("0.01")
+
+
+class KontoSaldoService:
+    """
+    Pflegt und liest die materialisierten Monatssalden (``KontoMonatssaldo``).
+
+    Jede Buchung erhöht die Soll-Summe ihres Soll-Kontos und die
+    Haben-Summe ihres Haben-Kontos im Buchungsmonat. Änderungen werden als
+    Differenz (alte Werte abziehen, neue addieren) fortgeschrieben.
+    Peter Zwegat: "Jeder Cent wird sofort notiert - nicht erst am Jahresende!"
+    """
+
+    @staticmethod
+    def verbuche(
+        soll_konto_id, haben_konto_id, buchungsdatum, betrag, vorzeichen: int = 1
+    ) -> None:
+        """
+        Schreibt eine Buchung in die Monatssalden fort.
+
+        Args:
+            vorzeichen: ``1`` zum Verbuchen, ``-1`` zum Ausbuchen
+        """
+        if not betrag or buchungsdatum is None:
+            return
+        betrag = Decimal(betrag) * vorzeichen
+        jahr, monat = buchungsdatum.year, buchungsdatum.month
+        KontoSaldoService._buche(soll_konto_id, jahr, monat, soll=betrag)
+        KontoSaldoService._buche(haben_konto_id, jahr, monat, haben=betrag)
+
+    @staticmethod
+    def verbuche_buchungen(buchungen) -> None:
+        """
+        Schreibt viele Buchungen auf einmal fort.
+
+        Für ``bulk_create``, das keine Signals auslöst: die Beträge werden
+        erst je Konto und Monat summiert, dann einmal pro Zeile gebucht.
+        """
+        summen: dict[tuple, list[Decimal]] = {}
+        for buchung in buchungen:
+            jahr, monat = buchung.buchungsdatum.year, buchung.buchungsdatum.month
+            betrag = Decimal(buchung.betrag)
+            for konto_id, seite in (
+                (buchung.soll_konto_id, 0),
+                (buchung.haben_konto_id, 1),
+            ):
+                werte = summen.setdefault(
+                    (konto_id, jahr, monat), [Decimal("0"), Decimal("0")]
+                )
+                werte[seite] += betrag
+
+        for (konto_id, jahr, monat), (soll, haben) in summen.items():
+            KontoSaldoService._buche(konto_id, jahr, monat, soll=soll, haben=haben)
+
+    @staticmethod
+    def _buche(
+        konto_id, jahr: int, monat: int, soll=Decimal("0"), haben=Decimal("0")
+    ) -> None:
+        """Addiert Beträge atomar auf die Monatszeile (legt sie bei Bedarf an)."""
+        if konto_id is None:
+            return
+        zeilen = KontoMonatssaldo.objects.filter(
+            konto_id=konto_id, jahr=jahr, monat=monat
+        )
+        aenderung = {
+            "soll_summe": F("soll_summe") + soll,
+            "haben_summe": F("haben_summe") + haben,
+        }
+        if zeilen.update(**aenderung):
+            return
+        try:
+            with transaction.atomic():
+                KontoMonatssaldo.objects.create(
+                    konto_id=konto_id,
+                    jahr=jahr,
+                    monat=monat,
+                    soll_summe=soll,
+                    haben_summe=haben,
+                )
+        except IntegrityError:
+            # Parallel angelegt - dann eben addieren
+            zeilen.update(**aenderung)
+
+    @staticmethod
+    def summen(konto, von=None, bis=None) -> tuple[Decimal, Decimal]:
+        """
+        Liefert (Soll-Summe, Haben-Summe) eines Kontos über ganze Monate.
+
+        ``von``/``bis`` werden auf ihren Monat bezogen, ``None`` lässt die
+        Seite offen.
+        """
+        summen = KontoMonatssaldo.objects.filter(
+            KontoMonatssaldo.zeitraum_q(von, bis), konto=konto
+        ).aggregate(soll=Sum("soll_summe"), haben=Sum("haben_summe"))
+        return (
+            Decimal(summen["soll"] or 0).quantize(CENT),
+            Decimal(summen["haben"] or 0).quantize(CENT),
+        )
+
+    @staticmethod
+    def dashboard_summen(heute: date) -> dict[str, Decimal]:
+        """
+        Einnahmen (Haben 8xxx) und Ausgaben (Soll 4xxx) für das Dashboard.
+
+        Liefert laufenden Monat, laufendes Jahr und Vormonat mit einer
+        einzigen bedingten Aggregation über die Monatssalden.
+        """
+        monat_start = heute.replace(day=1)
+        jahr_start = heute.replace(month=1, day=1)
+        vormonat = (monat_start - timedelta(days=1)).replace(day=1)
+
+        ab_monat = KontoMonatssaldo.zeitraum_q(monat_start)
+        ab_jahr = KontoMonatssaldo.zeitraum_q(jahr_start)
+        im_vormonat = KontoMonatssaldo.zeitraum_q(vormonat, vormonat)
+        ertrag = Q(konto__nummer__startswith="8")
+        aufwand = Q(konto__nummer__startswith="4")
+
+        summen = KontoMonatssaldo.objects.filter(
+            KontoMonatssaldo.zeitraum_q(min(jahr_start, vormonat)),
+            ertrag | aufwand,
+        ).aggregate(
+            einnahmen_monat=Sum("haben_summe", filter=ertrag & ab_monat),
+            ausgaben_monat=Sum("soll_summe", filter=aufwand & ab_monat),
+            einnahmen_jahr=Sum("haben_summe", filter=ertrag & ab_jahr),
+            ausgaben_jahr=Sum("soll_summe", filter=aufwand & ab_jahr),
+            einnahmen_vormonat=Sum("haben_summe", filter=ertrag & im_vormonat),
+        )
+        return {
+            name: Decimal(wert or 0).quantize(CENT) for name, wert in summen.items()
+        }
+
+    @staticmethod
+    def ist_monatsgenau(von, bis) -> bool:
+        """Deckt der Zeitraum genau ganze Kalendermonate ab?"""
+        return (
+            von.day == 1
+            and bis.day == calendar.monthrange(bis.year, bis.month)[1]
+            and von <= bis
+        )
+
+    @staticmethod
+    def neu_aufbauen(jahr: int | None = None) -> int:
+        """
+        Baut die Monatssalden aus den Buchungssätzen neu auf.
+
+        Args:
+            jahr: Nur dieses Jahr neu aufbauen (``None`` = alles)
+
+        Returns:
+            Anzahl angelegter Monatszeilen
+        """
+        buchungen = Buchungssatz.objects.all()
+        salden = KontoMonatssaldo.objects.all()
+        if jahr is not None:
+            buchungen = buchungen.filter(
+                buchungsdatum__gte=date(jahr, 1, 1),
+                buchungsdatum__lte=date(jahr, 12, 31),
+            )
+            salden = salden.filter(jahr=jahr)
+
+        summen: dict[tuple, list[Decimal]] = {}
+        for seite, feld in ((0, "soll_konto_id"), (1, "haben_konto_id")):
+            gruppiert = (
+                buchungen.annotate(
+                    b_jahr=ExtractYear("buchungsdatum"),
+                    b_monat=ExtractMonth("buchungsdatum"),
+                )
+                .values(feld, "b_jahr", "b_monat")
+                .annotate(summe=Sum("betrag"))
+                .order_by()
+            )
+            for zeile in gruppiert:
+                schluessel = (zeile[feld], zeile["b_jahr"], zeile["b_monat"])
+                werte = summen.setdefault(schluessel, [Decimal("0"), Decimal("0")])
+                werte[seite] += Decimal(zeile["summe"] or 0)
+
+        with transaction.atomic():
+            salden.delete()
+            KontoMonatssaldo.objects.bulk_create(
+                (
+                    KontoMonatssaldo(
+                        konto_id=konto_id,
+                        jahr=b_jahr,
+                        monat=b_monat,
+                        soll_summe=soll.quantize(CENT),
+                        haben_summe=haben.quantize(CENT),
+                    )
+                    for (konto_id, b_jahr, b_monat), (soll, haben) in summen.items()
+                ),
+                batch_size=1000,
+            )
+        return len(summen)
+
 
-from .models import EURBerechnung, EURMapping
+class DashboardStatistikService:
+    """
+    Kennzahlen für die Dashboards (``dashboard_view`` und
+    ``dashboard_view_optimized``).
+
+    Statt je Kennzahl ein eigenes ``count()``/``aggregate()`` gibt es eine
+    bedingte Aggregation je Tabelle: alle Buchungszahlen in einer Abfrage
+    über ``Buchungssatz``, alle Belegzahlen in einer über ``Beleg``.
+
+    Mit ``salden_nutzen=True`` (Standard) kommen Einnahmen und Ausgaben aus
+    den Monatssalden (``KontoSaldoService.dashboard_summen``), sonst
+    rechnet dieselbe Buchungssatz-Abfrage sie mit ``Sum(..., filter=...)``
+    direkt aus den Buchungen.
+
+    Peter Zwegat: "Einmal durch den Ordner - und alle Zahlen stehen auf dem Zettel!"
+    """
+
+    def __init__(self, heute: date | None = None, salden_nutzen: bool = True):
+        self.heute = heute or timezone.now().date()
+        self.salden_nutzen = salden_nutzen
+
+    @cached_property
+    def buchungs_kennzahlen(self) -> dict:
+        """Anzahl Buchungen (und ohne Salden auch die Beträge) in einer Abfrage."""
+        monat_start = self.heute.replace(day=1)
+        jahr_start = self.heute.replace(month=1, day=1)
+        vormonat = (monat_start - timedelta(days=1)).replace(day=1)
+
+        ab_monat = Q(buchungsdatum__gte=monat_start)
+        kennzahlen = {
+            "buchungen_gesamt": Count("pk"),
+            "buchungen_monat": Count("pk", filter=ab_monat),
+        }
+        if not self.salden_nutzen:
+            ab_jahr = Q(buchungsdatum__gte=jahr_start)
+            im_vormonat = Q(buchungsdatum__gte=vormonat, buchungsdatum__lt=monat_start)
+            ertrag = Q(haben_konto__nummer__startswith="8")
+            aufwand = Q(soll_konto__nummer__startswith="4")
+            kennzahlen.update(
+                einnahmen_monat=Sum("betrag", filter=ertrag & ab_monat),
+                ausgaben_monat=Sum("betrag", filter=aufwand & ab_monat),
+                einnahmen_jahr=Sum("betrag", filter=ertrag & ab_jahr),
+                ausgaben_jahr=Sum("betrag", filter=aufwand & ab_jahr),
+                einnahmen_vormonat=Sum("betrag", filter=ertrag & im_vormonat),
+            )
+
+        werte = Buchungssatz.objects.aggregate(**kennzahlen)
+        for name, wert in werte.items():
+            if name.startswith(("einnahmen", "ausgaben")):
+                werte[name] = Decimal(wert or 0).quantize(CENT)
+        return werte
+
+    def beleg_kennzahlen(self) -> dict[str, int]:
+        """Belegzahlen nach Status und Typ in einer Abfrage."""
+        return Beleg.objects.aggregate(
+            belege_count=Count("pk"),
+            belege_unbearbeitet=Count("pk", filter=Q(status__in=["NEU", "FEHLER"])),
+            belege_eingang=Count("pk", filter=Q(beleg_typ="RECHNUNG_EINGANG")),
+            belege_ausgang=Count("pk", filter=Q(beleg_typ="RECHNUNG_AUSGANG")),
+        )
+
+    def statistiken(self) -> dict[str, int]:
+        """Das ``stats``-Dict der Dashboard-Templates."""
+        buchungen = self.buchungs_kennzahlen
+        return {
+            "buchungen_gesamt": buchungen["buchungen_gesamt"],
+            "buchungen_monat": buchungen["buchungen_monat"],
+            **self.beleg_kennzahlen(),
+            "konten_count": Konto.objects.count(),
+            "partner_count": Geschaeftspartner.objects.filter(aktiv=True).count(),
+        }
+
+    def finanzen(self) -> dict:
+        """Einnahmen, Ausgaben und Gewinn für Monat und Jahr plus Vormonatstrend."""
+        if self.salden_nutzen:
+            summen = KontoSaldoService.dashboard_summen(self.heute)
+        else:
+            summen = self.buchungs_kennzahlen
+
+        einnahmen_monat = summen["einnahmen_monat"]
+        einnahmen_vormonat = summen["einnahmen_vormonat"]
+        einnahmen_trend = 0
+        if einnahmen_vormonat > 0:
+            einnahmen_trend = float(
+                (einnahmen_monat - einnahmen_vormonat) / einnahmen_vormonat * 100
+            )
+
+        return {
+            "einnahmen_monat": einnahmen_monat,
+            "ausgaben_monat": summen["ausgaben_monat"],
+            "gewinn_monat": einnahmen_monat - summen["ausgaben_monat"],
+            "einnahmen_jahr": summen["einnahmen_jahr"],
+            "ausgaben_jahr": summen["ausgaben_jahr"],
+            "gewinn_jahr": summen["einnahmen_jahr"] - summen["ausgaben_jahr"],
+            "einnahmen_trend": einnahmen_trend,
+        }
+
+
+class ZeitreihenService:
+    """
+    Einnahmen, Ausgaben und Gewinn je Woche, Monat oder Quartal.
+
+    Statt einer Summen-Abfrage pro Periode gruppiert eine einzige Abfrage
+    die Buchungen per ``TruncWeek``/``TruncMonth``/``TruncQuarter`` auf den
+    Periodenbeginn. Perioden ohne Buchungen werden danach mit Nullen
+    aufgefüllt, die Reihe ist also lückenlos und nach Kalendergrenzen
+    geschnitten - nicht nach "30 Tagen".
+
+    Einnahmen sind Haben-Buchungen auf 8xxx, Ausgaben Soll-Buchungen auf
+    4xxx - wie bei den Dashboard-Kennzahlen.
+
+    Peter Zwegat: "Monat für Monat auf einen Blick - und keiner fehlt!"
+    """
+
+    INTERVALLE = {
+        "woche": TruncWeek,
+        "monat": TruncMonth,
+        "quartal": TruncQuarter,
+    }
+    # Schutz gegen z. B. Wochenreihen über Jahrzehnte
+    MAX_PERIODEN = 1000
+
+    def __init__(self, von: date, bis: date, intervall: str = "monat"):
+        if intervall not in self.INTERVALLE:
+            raise ValueError(
+                f"Unbekanntes Intervall '{intervall}' "
+                f"(erlaubt: {', '.join(self.INTERVALLE)})"
+            )
+        if von > bis:
+            raise ValueError("Zeitraum-Beginn liegt nach dem Ende")
+        self.von = von
+        self.bis = bis
+        self.intervall = intervall
+        if len(self.perioden()) > self.MAX_PERIODEN:
+            raise ValueError(f"Zeitraum umfasst mehr als {self.MAX_PERIODEN} Perioden")
+
+    @classmethod
+    def letzte_monate(cls, heute: date | None = None, anzahl: int = 12):
+        """Die letzten ``anzahl`` Kalendermonate einschließlich des laufenden."""
+        heute = heute or timezone.now().date()
+        monat = heute.year * 12 + heute.month - 1 - (anzahl - 1)
+        von = date(monat // 12, monat % 12 + 1, 1)
+        bis = heute.replace(day=calendar.monthrange(heute.year, heute.month)[1])
+        return cls(von, bis, "monat")
+
+    def periode_start(self, tag: date) -> date:
+        """Beginn der Periode, in die ``tag`` fällt."""
+        if self.intervall == "woche":
+            return tag - timedelta(days=tag.weekday())
+        if self.intervall == "quartal":
+            return tag.replace(month=(tag.month - 1) // 3 * 3 + 1, day=1)
+        return tag.replace(day=1)
+
+    def naechste_periode(self, start: date) -> date:
+        if self.intervall == "woche":
+            return start + timedelta(days=7)
+        monate = 3 if self.intervall == "quartal" else 1
+        monat = start.year * 12 + start.month - 1 + monate
+        return date(monat // 12, monat % 12 + 1, 1)
+
+    def perioden(self) -> list[date]:
+        """Alle Periodenanfänge im Zeitraum, lückenlos."""
+        perioden = []
+        start = self.periode_start(self.von)
+        while start <= self.bis:
+            perioden.append(start)
+            start = self.naechste_periode(start)
+        return perioden
+
+    def bezeichnung(self, start: date) -> str:
+        if self.intervall == "woche":
+            jahr, woche, _ = start.isocalendar()
+            return f"KW {woche:02d}/{jahr}"
+        if self.intervall == "quartal":
+            return f"Q{(start.month - 1) // 3 + 1} {start.year}"
+        return start.strftime("%b %Y")
+
+    def summen(self) -> dict[date, dict[str, Decimal]]:
+        """Einnahmen und Ausgaben je Periodenbeginn - eine GROUP-BY-Abfrage."""
+        ertrag = Q(haben_konto__nummer__startswith="8")
+        aufwand = Q(soll_konto__nummer__startswith="4")
+        gruppiert = (
+            Buchungssatz.objects.filter(
+                buchungsdatum__gte=self.von, buchungsdatum__lte=self.bis
+            )
+            .annotate(periode=self.INTERVALLE[self.intervall]("buchungsdatum"))
+            .values("periode")
+            .annotate(
+                einnahmen=Sum("betrag", filter=ertrag),
+                ausgaben=Sum("betrag", filter=aufwand),
+            )
+            .order_by()
+        )
+        return {
+            zeile["periode"]: {
+                "einnahmen": Decimal(zeile["einnahmen"] or 0).quantize(CENT),
+                "ausgaben": Decimal(zeile["ausgaben"] or 0).quantize(CENT),
+            }
+            for zeile in gruppiert
+        }
+
+    def reihe(self) -> list[dict]:
+        """
+        Die lückenlose Zeitreihe.
+
+        Returns:
+            Je Periode ein Dict mit ``periode`` (Beginn), ``bezeichnung``,
+            ``einnahmen``, ``ausgaben`` und ``gewinn`` (Decimal)
+        """
+        summen = self.summen()
+        null = {"einnahmen": Decimal("0.00"), "ausgaben": Decimal("0.00")}
+        reihe = []
+        for start in self.perioden():
+            werte = summen.get(start, null)
+            reihe.append(
+                {
+                    "periode": start,
+                    "bezeichnung": self.bezeichnung(start),
+                    "einnahmen": werte["einnahmen"],
+                    "ausgaben": werte["ausgaben"],
+                    "gewinn": werte["einnahmen"] - werte["ausgaben"],
+                }
+            )
+        return reihe
+
+    def chart_daten(self) -> list[dict]:
+        """Die Reihe im Format der Dashboard-Charts (``monat`` + Floats)."""
+        return [
+            {
+                "monat": zeile["bezeichnung"],
+                "einnahmen": float(zeile["einnahmen"]),
+                "ausgaben": float(zeile["ausgaben"]),
+                "gewinn": float(zeile["gewinn"]),
+            }
+            for zeile in self.reihe()
+        ]
+
+
+class EURAggregator:
+    """
+    Berechnet alle EÜR-Zeilen eines Zeitraums in einem Durchlauf.
+
+    Statt einer Summen-Abfrage pro Mapping werden alle aktiven Mappings
+    einmal geladen, daraus eine Zuordnung Kontonummer -> EÜR-Zeilen gebaut
+    und die Buchungen mit einer einzigen GROUP-BY-Abfrage über
+    Soll-/Haben-Konto summiert. Der Index ``idx_buchung_kontenpaar_summe``
+    deckt diese Abfrage vollständig ab.
+
+    Umfasst der Zeitraum genau ganze Monate, werden statt der Buchungen die
+    materialisierten ``KontoMonatssaldo``-Zeilen summiert.
+    Peter Zwegat: "Einmal durch die Bücher - und alles ist gezählt!"
+    """
+
+    def __init__(self, zeitraum_start, zeitraum_ende, salden_nutzen: bool = True):
+        self.zeitraum_start = zeitraum_start
+        self.zeitraum_ende = zeitraum_ende
+        # Ganze Monate lassen sich direkt aus den Monatssalden lesen
+        self.salden_nutzen = salden_nutzen and KontoSaldoService.ist_monatsgenau(
+            zeitraum_start, zeitraum_ende
+        )
+
+    def berechne(
+        self,
+    ) -> tuple[list[tuple[EURMapping, Decimal]], list[tuple[EURMapping, Decimal]]]:
+        """
+        Liefert (Einnahmen, Ausgaben) als Listen von (Mapping, Betrag).
+
+        Die Reihenfolge entspricht ``EURMapping.Meta.ordering``.
+        """
+        mappings = aktive_eur_mappings(("EINNAHMEN", "AUSGABEN"))
+        einnahmen = [m for m in mappings if m.kategorie == "EINNAHMEN"]
+        ausgaben = [m for m in mappings if m.kategorie == "AUSGABEN"]
+
+        # Einnahmen zählen auf der Haben-Seite, Ausgaben auf der Soll-Seite
+        haben_zuordnung = self._baue_konto_zuordnung(einnahmen)
+        soll_zuordnung = self._baue_konto_zuordnung(ausgaben)
+
+        einnahmen_betraege = [Decimal("0.00")] * len(einnahmen)
+        ausgaben_betraege = [Decimal("0.00")] * len(ausgaben)
+
+        if (haben_zuordnung or soll_zuordnung) and self.salden_nutzen:
+            # Monatssalden sind schon je Konto und Seite summiert
+            salden = (
+                KontoMonatssaldo.objects.filter(
+                    KontoMonatssaldo.zeitraum_q(
+                        self.zeitraum_start, self.zeitraum_ende
+                    ),
+                    konto__nummer__in=set(haben_zuordnung) | set(soll_zuordnung),
+                )
+                .values("konto__nummer")
+                .annotate(soll=Sum("soll_summe"), haben=Sum("haben_summe"))
+                .order_by()
+            )
+            for zeile in salden:
+                nummer = zeile["konto__nummer"]
+                for index in haben_zuordnung.get(nummer, ()):
+                    einnahmen_betraege[index] += Decimal(zeile["haben"] or 0)
+                for index in soll_zuordnung.get(nummer, ()):
+                    ausgaben_betraege[index] += Decimal(zeile["soll"] or 0)
+
+        elif haben_zuordnung or soll_zuordnung:
+            # Kontonummern einmalig auflösen, damit die Summen-Abfrage ohne
+            # Joins direkt über die Fremdschlüssel gruppieren kann.
+            konto_nummern = dict(
+                Konto.objects.filter(
+                    nummer__in=set(haben_zuordnung) | set(soll_zuordnung)
+                ).values_list("id", "nummer")
+            )
+
+            summen = (
+                Buchungssatz.objects.filter(
+                    buchungsdatum__gte=self.zeitraum_start,
+                    buchungsdatum__lte=self.zeitraum_ende,
+                )
+                .values("soll_konto_id", "haben_konto_id")
+                .annotate(summe=Sum("betrag"))
+                .order_by()
+            )
+
+            for zeile in summen:
+                summe = zeile["summe"] or Decimal("0.00")
+                haben_nummer = konto_nummern.get(zeile["haben_konto_id"])
+                soll_nummer = konto_nummern.get(zeile["soll_konto_id"])
+                for index in haben_zuordnung.get(haben_nummer, ()):
+                    einnahmen_betraege[index] += summe
+                for index in soll_zuordnung.get(soll_nummer, ()):
+                    ausgaben_betraege[index] += summe
+
+        # Beträge haben zwei Nachkommastellen; SQLite summiert jedoch als
+        # Gleitkommazahl - auf Cent runden entfernt das Rauschen.
+        return (
+            [
+                (m, betrag.quantize(CENT))
+                for m, betrag in zip(einnahmen, einnahmen_betraege, strict=True)
+            ],
+            [
+                (m, betrag.quantize(CENT))
+                for m, betrag in zip(ausgaben, ausgaben_betraege, strict=True)
+            ],
+        )
+
+    @staticmethod
+    def _baue_konto_zuordnung(mappings: list[EURMapping]) -> dict[str, list[int]]:
+        """
+        Baut die Zuordnung Kontonummer -> Indizes der betroffenen Mappings.
+
+        Ein Konto darf in mehreren Zeilen vorkommen und zählt dann in jeder
+        davon, innerhalb einer Zeile aber nur einmal (wie die bisherige
+        OR-Verknüpfung).
+        """
+        zuordnung: dict[str, list[int]] = {}
+        for index, mapping in enumerate(mappings):
+            for konto_nummer in {str(nr) for nr in mapping.skr03_konten or []}:
+                zuordnung.setdefault(konto_nummer, []).append(index)
+        return zuordnung
 
 
 class EURService:
@@ -23,13 +587,34 @@ class EURService:
         self.jahr_start = timezone.now().date().replace(year=jahr, month=1, day=1)
         self.jahr_ende = timezone.now().date().replace(year=jahr, month=12, day=31)
 
-    def berechne_offizielle_eur(self) -> dict:
+    def berechne_offizielle_eur(self, salden_nutzen: bool = True) -> dict:
         """
         Berechnet die offizielle EÜR basierend auf dem amtlichen Mapping.
+
+        Alle Zeilen werden über den ``EURAggregator`` mit einer einzigen
+        gruppierten Abfrage ermittelt - standardmäßig aus den Monatssalden.
+        """
+        einnahmen, ausgaben = EURAggregator(
+            self.jahr_start, self.jahr_ende, salden_nutzen=salden_nutzen
+        ).berechne()
+        einnahmen_data = [self._zeile(m, betrag) for m, betrag in einnahmen]
+        ausgaben_data = [self._zeile(m, betrag) for m, betrag in ausgaben]
+
+        return self._eur_ergebnis(einnahmen_data, ausgaben_data)
+
+    def berechne_offizielle_eur_einzeln(self) -> dict:
+        """
+        Berechnet die EÜR mit einer Summen-Abfrage pro Mapping.
+
+        Referenzpfad für Abgleich und Benchmark des ``EURAggregator``.
         """
         einnahmen_data = self._berechne_einnahmen()
         ausgaben_data = self._berechne_ausgaben()
 
+        return self._eur_ergebnis(einnahmen_data, ausgaben_data)
+
+    def _eur_ergebnis(self, einnahmen_data: list[dict], ausgaben_data: list[dict]):
+        """Fasst die EÜR-Zeilen zum Ergebnis-Dict zusammen."""
         gesamte_einnahmen = sum(item["betrag"] for item in einnahmen_data)
         gesamte_ausgaben = sum(item["betrag"] for item in ausgaben_data)
         eur_ergebnis = gesamte_einnahmen - gesamte_ausgaben
@@ -45,45 +630,36 @@ class EURService:
             "ist_verlust": eur_ergebnis < 0,
         }
 
-    def _berechne_einnahmen(self) -> list[dict]:
-        """Berechnet alle Einnahmen-Kategorien."""
-        einnahmen_mappings = EURMapping.get_einnahmen_mappings()
-        einnahmen_data = []
-
-        for mapping in einnahmen_mappings:
-            betrag = self._berechne_betrag_fuer_konten(mapping.skr03_konten, "HABEN")
+    @staticmethod
+    def _zeile(mapping: EURMapping, betrag: Decimal) -> dict:
+        """Baut den Dict-Eintrag für eine EÜR-Zeile."""
+        return {
+            "zeile_nummer": mapping.zeile_nummer,
+            "bezeichnung": mapping.bezeichnung,
+            "betrag": betrag,
+            "skr03_konten": mapping.skr03_konten,
+            "mapping_id": mapping.id,
+        }
 
-            einnahmen_data.append(
-                {
-                    "zeile_nummer": mapping.zeile_nummer,
-                    "bezeichnung": mapping.bezeichnung,
-                    "betrag": betrag,
-                    "skr03_konten": mapping.skr03_konten,
-                    "mapping_id": mapping.id,
-                }
+    def _berechne_einnahmen(self) -> list[dict]:
+        """Berechnet alle Einnahmen-Kategorien (eine Abfrage pro Mapping)."""
+        return [
+            self._zeile(
+                mapping,
+                self._berechne_betrag_fuer_konten(mapping.skr03_konten, "HABEN"),
             )
-
-        return einnahmen_data
+            for mapping in EURMapping.get_einnahmen_mappings()
+        ]
 
     def _berechne_ausgaben(self) -> list[dict]:
-        """Berechnet alle Ausgaben-Kategorien."""
-        ausgaben_mappings = EURMapping.get_ausgaben_mappings()
-        ausgaben_data = []
-
-        for mapping in ausgaben_mappings:
-            betrag = self._berechne_betrag_fuer_konten(mapping.skr03_konten, "SOLL")
-
-            ausgaben_data.append(
-                {
-                    "zeile_nummer": mapping.zeile_nummer,
-                    "bezeichnung": mapping.bezeichnung,
-                    "betrag": betrag,
-                    "skr03_konten": mapping.skr03_konten,
-                    "mapping_id": mapping.id,
-                }
+        """Berechnet alle Ausgaben-Kategorien (eine Abfrage pro Mapping)."""
+        return [
+            self._zeile(
+                mapping,
+                self._berechne_betrag_fuer_konten(mapping.skr03_konten, "SOLL"),
             )
-
-        return ausgaben_data
+            for mapping in EURMapping.get_ausgaben_mappings()
+        ]
 
     def _berechne_betrag_fuer_konten(
         self, konten_nummern: list[str], kontoseite: str
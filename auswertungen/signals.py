@@ -0,0 +1,70 @@
+"""
+Django Signals für Auswertungen.
+
+Hält die Monatssalden (``KontoMonatssaldo``) synchron zu den Buchungssätzen
+und verwirft die betroffenen Cache-Namespaces (Dashboard, EÜR des Jahres).
+Peter Zwegat: "Wer sofort mitschreibt, muss am Ende nicht suchen!"
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from belege.models import Beleg
+from buchungen.models import Buchungssatz
+from buchungen.signals import stand_vorher
+from llkjj_knut.cache_utils import invalidate_related_caches
+
+from .services import KontoSaldoService
+
+SALDO_FELDER = ("soll_konto_id", "haben_konto_id", "buchungsdatum", "betrag")
+
+
+@receiver(post_save, sender=Buchungssatz)
+def aktualisiere_monatssaldo(sender, instance, created, **kwargs):
+    """Bucht alte Werte aus und neue ein (alter Stand aus ``stand_vorher``)."""
+    stand = stand_vorher(instance)
+    if stand:
+        vorher = {feld: stand[feld] for feld in SALDO_FELDER}
+        if all(vorher[feld] == getattr(instance, feld) for feld in SALDO_FELDER):
+            return
+        KontoSaldoService.verbuche(**vorher, vorzeichen=-1)
+
+    KontoSaldoService.verbuche(
+        soll_konto_id=instance.soll_konto_id,
+        haben_konto_id=instance.haben_konto_id,
+        buchungsdatum=instance.buchungsdatum,
+        betrag=instance.betrag,
+    )
+
+
+@receiver(post_delete, sender=Buchungssatz)
+def entferne_aus_monatssaldo(sender, instance, **kwargs):
+    """Bucht einen gelöschten Buchungssatz aus den Monatssalden aus."""
+    KontoSaldoService.verbuche(
+        soll_konto_id=instance.soll_konto_id,
+        haben_konto_id=instance.haben_konto_id,
+        buchungsdatum=instance.buchungsdatum,
+        betrag=instance.betrag,
+        vorzeichen=-1,
+    )
+
+
+@receiver(post_save, sender=Buchungssatz)
+@receiver(post_delete, sender=Buchungssatz)
+def invalidiere_buchungs_caches(sender, instance, **kwargs):
+    """Verwirft Dashboard- und EÜR-Caches des alten und neuen Buchungsjahres."""
+    jahre = {getattr(instance.buchungsdatum, "year", None)}
+    stand = stand_vorher(instance)
+    if stand:
+        jahre.add(stand["buchungsdatum"].year)
+    jahre.discard(None)
+    invalidate_related_caches("Buchungssatz", instance.pk, jahre=jahre)
+
+
+@receiver(post_save, sender=Beleg)
+@receiver(post_delete, sender=Beleg)
+def invalidiere_beleg_caches(sender, instance, **kwargs):
+    """Verwirft Dashboard- und Beleg-Statistik-Caches."""
+    jahr = getattr(instance.rechnungsdatum, "year", None)
+    jahre = [jahr] if jahr else []
+    invalidate_related_caches("Beleg", instance.pk, jahre=jahre)
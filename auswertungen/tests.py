@@ -310,3 +310,602 @@ class AuswertungenViewsExtendedTest(TestCase):
             # Sollte Redirect zu Login-Seite sein
             self.assertEqual(response.status_code, 302)
             self.assertIn("/auth/anmeldung/", response["Location"])
+
+
+class EURAggregatorTest(TestCase):
+    """
+    Tests für die gruppierte EÜR-Berechnung.
+    Peter Zwegat: "Schnell ist gut - aber nur, wenn jeder Cent stimmt!"
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from auswertungen.models import OFFIZIELLE_EUR_MAPPINGS, EURMapping
+
+        for mapping_data in OFFIZIELLE_EUR_MAPPINGS:
+            EURMapping.objects.create(**mapping_data)
+
+        # Konto 4980 zusätzlich in einer zweiten Ausgaben-Zeile
+        EURMapping.objects.create(
+            zeile_nummer="99",
+            bezeichnung="Testzeile mit doppeltem Konto",
+            kategorie="AUSGABEN",
+            skr03_konten=["4980", "4980", "4120"],
+            reihenfolge=999,
+        )
+
+        cls.bank = Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        cls.erloese = Konto.objects.create(
+            nummer="8000", name="Erlöse", kategorie="ERTRAG", typ="UMSATZERLÖSE"
+        )
+        cls.sonstige = Konto.objects.create(
+            nummer="4800",
+            name="Sonstige Erträge/Aufwand",
+            kategorie="AUFWAND",
+            typ="SONSTIGE",
+        )
+        cls.buero = Konto.objects.create(
+            nummer="4980",
+            name="Bürobedarf",
+            kategorie="AUFWAND",
+            typ="BÜRO & VERWALTUNG",
+        )
+
+        jahr = timezone.now().year
+        buchungen = [
+            (date(jahr, 1, 10), "1190.00", cls.bank, cls.erloese),
+            (date(jahr, 3, 5), "0.10", cls.bank, cls.erloese),
+            (date(jahr, 3, 6), "0.20", cls.bank, cls.sonstige),
+            (date(jahr, 4, 1), "59.99", cls.buero, cls.bank),
+            (date(jahr, 5, 1), "120.00", cls.sonstige, cls.bank),
+            (date(jahr - 1, 12, 31), "999.00", cls.buero, cls.bank),
+        ]
+        for datum, betrag, soll, haben in buchungen:
+            Buchungssatz.objects.create(
+                buchungsdatum=datum,
+                buchungstext="EÜR-Test",
+                betrag=Decimal(betrag),
+                soll_konto=soll,
+                haben_konto=haben,
+            )
+
+    def test_ergebnis_identisch_mit_einzelabfragen(self):
+        from auswertungen.services import EURService
+
+        service = EURService(timezone.now().year)
+        self.assertEqual(
+            service.berechne_offizielle_eur(salden_nutzen=False),
+            service.berechne_offizielle_eur_einzeln(),
+        )
+
+    def test_monatssalden_identisch_mit_buchungen(self):
+        from auswertungen.services import EURService
+
+        service = EURService(timezone.now().year)
+        self.assertEqual(
+            service.berechne_offizielle_eur(),
+            service.berechne_offizielle_eur(salden_nutzen=False),
+        )
+
+    def test_konto_in_mehreren_zeilen(self):
+        from auswertungen.services import EURService
+
+        eur_data = EURService(timezone.now().year).berechne_offizielle_eur()
+        ausgaben = {item["zeile_nummer"]: item["betrag"] for item in eur_data["ausgaben"]}
+        einnahmen = {
+            item["zeile_nummer"]: item["betrag"] for item in eur_data["einnahmen"]
+        }
+
+        self.assertEqual(ausgaben["25"], Decimal("59.99"))
+        self.assertEqual(ausgaben["99"], Decimal("59.99"))
+        self.assertEqual(ausgaben["31"], Decimal("120.00"))
+        self.assertEqual(einnahmen["15"], Decimal("1190.10"))
+        self.assertEqual(einnahmen["17"], Decimal("0.20"))
+
+    def test_feste_anzahl_queries(self):
+        from auswertungen.services import EURService
+
+        service = EURService(timezone.now().year)
+        # Mappings, Kontonummern, gruppierte Summen
+        with self.assertNumQueries(3):
+            service.berechne_offizielle_eur(salden_nutzen=False)
+        # Mappings, Monatssalden je Konto
+        with self.assertNumQueries(2):
+            service.berechne_offizielle_eur()
+
+
+class KontoMonatssaldoTest(TestCase):
+    """
+    Tests für die materialisierten Monatssalden.
+    Peter Zwegat: "Was sofort notiert wird, stimmt auch am Jahresende!"
+    """
+
+    def setUp(self):
+        self.bank = Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        self.erloese = Konto.objects.create(
+            nummer="8400", name="Erlöse 19%", kategorie="ERTRAG", typ="UMSATZERLÖSE"
+        )
+        self.buero = Konto.objects.create(
+            nummer="4930", name="Bürobedarf", kategorie="AUFWAND", typ="SONSTIGE"
+        )
+
+    def _buche(self, datum, betrag, soll, haben):
+        return Buchungssatz.objects.create(
+            buchungsdatum=datum,
+            buchungstext="Saldo-Test",
+            betrag=Decimal(betrag),
+            soll_konto=soll,
+            haben_konto=haben,
+        )
+
+    def _saldo(self, konto, jahr, monat):
+        from auswertungen.models import KontoMonatssaldo
+
+        zeile = KontoMonatssaldo.objects.filter(
+            konto=konto, jahr=jahr, monat=monat
+        ).first()
+        if zeile is None:
+            return None
+        return zeile.soll_summe, zeile.haben_summe
+
+    def test_anlegen_fortschreiben(self):
+        self._buche(date(2025, 3, 1), "100.00", self.bank, self.erloese)
+        self._buche(date(2025, 3, 31), "50.50", self.bank, self.erloese)
+
+        self.assertEqual(
+            self._saldo(self.bank, 2025, 3), (Decimal("150.50"), Decimal("0.00"))
+        )
+        self.assertEqual(
+            self._saldo(self.erloese, 2025, 3), (Decimal("0.00"), Decimal("150.50"))
+        )
+
+    def test_aenderung_verschiebt_betrag(self):
+        buchung = self._buche(date(2025, 3, 10), "80.00", self.buero, self.bank)
+
+        buchung.buchungsdatum = date(2025, 4, 2)
+        buchung.betrag = Decimal("90.00")
+        buchung.soll_konto = self.erloese
+        buchung.save()
+
+        self.assertEqual(
+            self._saldo(self.buero, 2025, 3), (Decimal("0.00"), Decimal("0.00"))
+        )
+        self.assertEqual(
+            self._saldo(self.bank, 2025, 3), (Decimal("0.00"), Decimal("0.00"))
+        )
+        self.assertEqual(
+            self._saldo(self.erloese, 2025, 4), (Decimal("90.00"), Decimal("0.00"))
+        )
+        self.assertEqual(
+            self._saldo(self.bank, 2025, 4), (Decimal("0.00"), Decimal("90.00"))
+        )
+
+    def test_loeschen_bucht_aus(self):
+        self._buche(date(2025, 6, 1), "10.00", self.buero, self.bank)
+        buchung = self._buche(date(2025, 6, 2), "25.00", self.buero, self.bank)
+        buchung.delete()
+
+        self.assertEqual(
+            self._saldo(self.buero, 2025, 6), (Decimal("10.00"), Decimal("0.00"))
+        )
+
+    def test_neu_aufbauen_entspricht_signals(self):
+        from auswertungen.models import KontoMonatssaldo
+        from auswertungen.services import KontoSaldoService
+
+        self._buche(date(2024, 12, 31), "19.99", self.buero, self.bank)
+        self._buche(date(2025, 1, 1), "1000.00", self.bank, self.erloese)
+        self._buche(date(2025, 1, 15), "0.01", self.buero, self.bank)
+
+        def stand():
+            return sorted(
+                KontoMonatssaldo.objects.values_list(
+                    "konto__nummer", "jahr", "monat", "soll_summe", "haben_summe"
+                )
+            )
+
+        vorher = stand()
+        KontoMonatssaldo.objects.update(soll_summe=0, haben_summe=0)
+        self.assertEqual(KontoSaldoService.neu_aufbauen(), 5)
+        self.assertEqual(stand(), vorher)
+
+        # Nur ein Jahr neu aufbauen lässt die anderen unangetastet
+        KontoMonatssaldo.objects.filter(jahr=2025).delete()
+        KontoSaldoService.neu_aufbauen(jahr=2025)
+        self.assertEqual(stand(), vorher)
+
+    def test_summen_ueber_zeitraum(self):
+        from auswertungen.services import KontoSaldoService
+
+        self._buche(date(2024, 12, 1), "5.00", self.buero, self.bank)
+        self._buche(date(2025, 1, 1), "7.00", self.buero, self.bank)
+        self._buche(date(2025, 2, 1), "11.00", self.buero, self.bank)
+
+        self.assertEqual(
+            KontoSaldoService.summen(self.buero, date(2025, 1, 1), date(2025, 1, 31)),
+            (Decimal("7.00"), Decimal("0.00")),
+        )
+        self.assertEqual(
+            KontoSaldoService.summen(self.bank, date(2024, 12, 1)),
+            (Decimal("0.00"), Decimal("23.00")),
+        )
+
+
+class DashboardStatistikServiceTest(TestCase):
+    """
+    Tests für die gebündelten Dashboard-Kennzahlen.
+    Peter Zwegat: "Ein Blick, alle Zahlen - aber bitte ohne hundert Abfragen!"
+    """
+
+    def setUp(self):
+        self.heute = date(2025, 3, 15)
+        bank = Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        erloese = Konto.objects.create(
+            nummer="8400", name="Erlöse", kategorie="ERTRAG", typ="UMSATZERLÖSE"
+        )
+        buero = Konto.objects.create(
+            nummer="4930", name="Bürobedarf", kategorie="AUFWAND", typ="SONSTIGE"
+        )
+        for datum, betrag, soll, haben in [
+            (date(2025, 3, 2), "1000.00", bank, erloese),
+            (date(2025, 3, 10), "150.00", buero, bank),
+            (date(2025, 2, 5), "800.00", bank, erloese),
+            (date(2025, 1, 20), "50.00", buero, bank),
+            (date(2024, 12, 1), "999.00", bank, erloese),
+        ]:
+            Buchungssatz.objects.create(
+                buchungsdatum=datum,
+                buchungstext="Dashboard-Test",
+                betrag=Decimal(betrag),
+                soll_konto=soll,
+                haben_konto=haben,
+            )
+        for status, typ in [
+            ("NEU", "RECHNUNG_EINGANG"),
+            ("FEHLER", "RECHNUNG_AUSGANG"),
+            ("VERBUCHT", "RECHNUNG_EINGANG"),
+        ]:
+            Beleg.objects.create(
+                original_dateiname="beleg.pdf", status=status, beleg_typ=typ
+            )
+
+    def test_kennzahlen(self):
+        from auswertungen.services import DashboardStatistikService
+
+        statistik = DashboardStatistikService(self.heute)
+        stats = statistik.statistiken()
+        self.assertEqual(stats["buchungen_gesamt"], 5)
+        self.assertEqual(stats["buchungen_monat"], 2)
+        self.assertEqual(stats["belege_count"], 3)
+        self.assertEqual(stats["belege_unbearbeitet"], 2)
+        self.assertEqual(stats["belege_eingang"], 2)
+        self.assertEqual(stats["belege_ausgang"], 1)
+        self.assertEqual(stats["konten_count"], 3)
+
+        finanzen = statistik.finanzen()
+        self.assertEqual(finanzen["einnahmen_monat"], Decimal("1000.00"))
+        self.assertEqual(finanzen["gewinn_monat"], Decimal("850.00"))
+        self.assertEqual(finanzen["einnahmen_jahr"], Decimal("1800.00"))
+        self.assertEqual(finanzen["ausgaben_jahr"], Decimal("200.00"))
+        self.assertEqual(finanzen["einnahmen_trend"], 25.0)
+
+        # Direkt aus den Buchungen gerechnet kommt dasselbe heraus
+        ohne_salden = DashboardStatistikService(self.heute, salden_nutzen=False)
+        self.assertEqual(ohne_salden.finanzen(), finanzen)
+        self.assertEqual(ohne_salden.statistiken(), stats)
+
+    def test_anzahl_abfragen(self):
+        """Regression: Kennzahlen dürfen nicht wieder je Zahl abfragen."""
+        from auswertungen.services import DashboardStatistikService
+
+        # Buchungen, Belege, Konten, Partner + Monatssalden
+        with self.assertNumQueries(5):
+            statistik = DashboardStatistikService(self.heute)
+            statistik.statistiken()
+            statistik.finanzen()
+
+        # Ohne Salden: Beträge stecken in derselben Buchungssatz-Abfrage
+        with self.assertNumQueries(4):
+            statistik = DashboardStatistikService(self.heute, salden_nutzen=False)
+            statistik.statistiken()
+            statistik.finanzen()
+
+
+class ZeitreihenServiceTest(TestCase):
+    """
+    Tests für die Zeitreihe aus einer gruppierten Abfrage.
+    Peter Zwegat: "Zwölf Monate, zwölf Zahlen - und keine doppelt!"
+    """
+
+    def setUp(self):
+        bank = Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        erloese = Konto.objects.create(
+            nummer="8400", name="Erlöse", kategorie="ERTRAG", typ="UMSATZERLÖSE"
+        )
+        buero = Konto.objects.create(
+            nummer="4930", name="Bürobedarf", kategorie="AUFWAND", typ="SONSTIGE"
+        )
+        for datum, betrag, soll, haben in [
+            (date(2025, 1, 31), "100.00", bank, erloese),
+            (date(2025, 3, 1), "200.00", bank, erloese),
+            (date(2025, 3, 31), "50.00", buero, bank),
+            (date(2025, 5, 15), "30.00", buero, bank),
+            (date(2024, 12, 31), "999.00", bank, erloese),
+        ]:
+            Buchungssatz.objects.create(
+                buchungsdatum=datum,
+                buchungstext="Zeitreihe-Test",
+                betrag=Decimal(betrag),
+                soll_konto=soll,
+                haben_konto=haben,
+            )
+
+    def test_monate_lueckenlos_in_einer_abfrage(self):
+        from auswertungen.services import ZeitreihenService
+
+        with self.assertNumQueries(1):
+            reihe = ZeitreihenService.letzte_monate(date(2025, 5, 20), 5).reihe()
+
+        # Januar bis Mai - der leere Februar und April sind mit 0 dabei
+        self.assertEqual(
+            [zeile["periode"] for zeile in reihe],
+            [date(2025, monat, 1) for monat in range(1, 6)],
+        )
+        self.assertEqual(
+            [(zeile["einnahmen"], zeile["ausgaben"]) for zeile in reihe],
+            [
+                (Decimal("100.00"), Decimal("0.00")),
+                (Decimal("0.00"), Decimal("0.00")),
+                (Decimal("200.00"), Decimal("50.00")),
+                (Decimal("0.00"), Decimal("0.00")),
+                (Decimal("0.00"), Decimal("30.00")),
+            ],
+        )
+        self.assertEqual(reihe[2]["gewinn"], Decimal("150.00"))
+
+    def test_monatsgrenzen_statt_30_tage(self):
+        """Regression: 30-Tage-Schritte haben Monate doppelt oder gar nicht gezeigt."""
+        from auswertungen.services import ZeitreihenService
+
+        chart = ZeitreihenService.letzte_monate(date(2025, 3, 31), 12).chart_daten()
+        monate = [zeile["monat"] for zeile in chart]
+        self.assertEqual(len(set(monate)), 12)
+        self.assertEqual(monate[-1], date(2025, 3, 1).strftime("%b %Y"))
+        self.assertEqual(monate[0], date(2024, 4, 1).strftime("%b %Y"))
+        self.assertEqual(chart[-1]["einnahmen"], 200.0)
+        self.assertEqual(chart[-3]["einnahmen"], 100.0)
+        self.assertEqual(chart[-4]["einnahmen"], 999.0)
+
+    def test_wochen_und_quartale(self):
+        from auswertungen.services import ZeitreihenService
+
+        quartale = ZeitreihenService(
+            date(2024, 11, 1), date(2025, 6, 30), "quartal"
+        ).reihe()
+        self.assertEqual(
+            [(zeile["bezeichnung"], zeile["gewinn"]) for zeile in quartale],
+            [
+                ("Q4 2024", Decimal("999.00")),
+                ("Q1 2025", Decimal("250.00")),
+                ("Q2 2025", Decimal("-30.00")),
+            ],
+        )
+
+        wochen = ZeitreihenService(date(2025, 3, 1), date(2025, 3, 31), "woche").reihe()
+        # 01.03.2025 ist ein Samstag - die erste Woche beginnt am Montag davor
+        self.assertEqual(wochen[0]["periode"], date(2025, 2, 24))
+        self.assertEqual(wochen[0]["bezeichnung"], "KW 09/2025")
+        self.assertEqual(wochen[0]["einnahmen"], Decimal("200.00"))
+        self.assertEqual(wochen[-1]["periode"], date(2025, 3, 31))
+        self.assertEqual(wochen[-1]["ausgaben"], Decimal("50.00"))
+        self.assertEqual(len(wochen), 6)
+
+        with self.assertRaises(ValueError):
+            ZeitreihenService(date(2025, 1, 1), date(2025, 12, 31), "tag")
+        with self.assertRaises(ValueError):
+            ZeitreihenService(date(2025, 2, 1), date(2025, 1, 1))
+
+    def test_json_endpoint(self):
+        User.objects.create_user(username="tester", password="password123")  # noqa: S106
+        self.client.login(username="tester", password="password123")  # noqa: S106
+
+        response = self.client.get(
+            reverse("auswertungen:zeitreihe"),
+            {"von": "2025-01-01", "bis": "2025-06-30", "intervall": "quartal"},
+        )
+        self.assertEqual(response.status_code, 200)
+        daten = response.json()
+        self.assertEqual(daten["intervall"], "quartal")
+        self.assertEqual(
+            daten["reihe"],
+            [
+                {
+                    "periode": "2025-01-01",
+                    "bezeichnung": "Q1 2025",
+                    "einnahmen": 300.0,
+                    "ausgaben": 50.0,
+                    "gewinn": 250.0,
+                },
+                {
+                    "periode": "2025-04-01",
+                    "bezeichnung": "Q2 2025",
+                    "einnahmen": 0.0,
+                    "ausgaben": 30.0,
+                    "gewinn": -30.0,
+                },
+            ],
+        )
+
+        # Standard: die letzten 12 Monate
+        response = self.client.get(reverse("auswertungen:zeitreihe"))
+        self.assertEqual(len(response.json()["reihe"]), 12)
+
+        response = self.client.get(
+            reverse("auswertungen:zeitreihe"), {"von": "kein-datum"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CacheNamespaceTest(TestCase):
+    """
+    Tests für die generationsbasierte Cache-Invalidierung.
+    Peter Zwegat: "Nicht alles wegwerfen - nur das, was wirklich alt ist!"
+    """
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.bank = Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        self.erloese = Konto.objects.create(
+            nummer="8400", name="Erlöse", kategorie="ERTRAG", typ="UMSATZERLÖSE"
+        )
+
+    def _fuelle(self, *keys):
+        from django.core.cache import cache
+
+        cache.set_many(dict.fromkeys(keys, "gecacht"))
+        cache.set("fremder_key", "bleibt")
+
+    def _gecacht(self, key):
+        from django.core.cache import cache
+
+        return cache.get(key) is not None
+
+    def test_buchung_invalidiert_dashboard_und_nur_ihr_jahr(self):
+        from django.core.cache import cache
+
+        from llkjj_knut.cache_utils import CacheKeys
+
+        dashboard, eur_2024, eur_2025 = (
+            CacheKeys.dashboard("stats", 1),
+            CacheKeys.eur_auswertung(2024),
+            CacheKeys.eur_auswertung(2025),
+        )
+        self._fuelle(dashboard, eur_2024, eur_2025)
+
+        buchung = Buchungssatz.objects.create(
+            buchungsdatum=date(2025, 3, 1),
+            buchungstext="Cache-Test",
+            betrag=Decimal("100.00"),
+            soll_konto=self.bank,
+            haben_konto=self.erloese,
+        )
+
+        self.assertFalse(self._gecacht(CacheKeys.dashboard("stats", 1)))
+        self.assertFalse(self._gecacht(CacheKeys.eur_auswertung(2025)))
+        self.assertTrue(self._gecacht(CacheKeys.eur_auswertung(2024)))
+        self.assertEqual(cache.get("fremder_key"), "bleibt")
+
+        # Verschieben ins Vorjahr trifft altes und neues Jahr
+        self._fuelle(CacheKeys.eur_auswertung(2024), CacheKeys.eur_auswertung(2025))
+        buchung.buchungsdatum = date(2024, 12, 31)
+        buchung.save()
+        self.assertFalse(self._gecacht(CacheKeys.eur_auswertung(2024)))
+        self.assertFalse(self._gecacht(CacheKeys.eur_auswertung(2025)))
+
+    def test_beleg_und_benutzer_namespace(self):
+        from llkjj_knut.cache_utils import CacheKeys
+
+        from .optimized_views import invalidate_dashboard_cache
+
+        self._fuelle(
+            CacheKeys.dashboard("stats", 1),
+            CacheKeys.dashboard("stats", 2),
+            CacheKeys.beleg_statistiken(),
+        )
+        invalidate_dashboard_cache(1)
+        self.assertFalse(self._gecacht(CacheKeys.dashboard("stats", 1)))
+        self.assertTrue(self._gecacht(CacheKeys.dashboard("stats", 2)))
+
+        Beleg.objects.create(original_dateiname="beleg.pdf")
+        self.assertFalse(self._gecacht(CacheKeys.dashboard("stats", 2)))
+        self.assertFalse(self._gecacht(CacheKeys.beleg_statistiken()))
+
+    def test_verdraengter_zaehler_kollidiert_nicht(self):
+        from django.core.cache import cache
+
+        from llkjj_knut.cache_utils import NAMESPACE_KEY_PREFIX, CacheKeys
+
+        alter_key = CacheKeys.beleg_statistiken()
+        cache.delete(f"{NAMESPACE_KEY_PREFIX}beleg_statistiken")
+        self.assertNotEqual(CacheKeys.beleg_statistiken(), alter_key)
+
+
+class RequestCacheUndQueryBudgetTest(TestCase):
+    """
+    Tests für den Request-Cache und die Query-Budget-Middleware.
+    Peter Zwegat: "Dieselbe Frage zweimal stellen kostet doppelt!"
+    """
+
+    def setUp(self):
+        Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        User.objects.create_user(username="tester", password="password123")  # noqa: S106
+        self.client.login(username="tester", password="password123")  # noqa: S106
+
+    def test_request_cached_nur_innerhalb_eines_requests(self):
+        from einstellungen.models import Benutzerprofil
+        from llkjj_knut.cache_utils import (
+            benutzerprofil,
+            request_cache_beenden,
+            request_cache_starten,
+        )
+
+        user_id = User.objects.get(username="tester").pk
+
+        # Ohne Request: jede Abfrage geht an die Datenbank
+        with self.assertNumQueries(2):
+            benutzerprofil(user_id)
+            benutzerprofil(user_id)
+
+        token = request_cache_starten()
+        try:
+            with self.assertNumQueries(1):
+                self.assertIs(benutzerprofil(user_id), benutzerprofil(user_id))
+            # Fehlschläge werden nicht gemerkt
+            with self.assertNumQueries(2):
+                for _ in range(2):
+                    with self.assertRaises(Benutzerprofil.DoesNotExist):
+                        benutzerprofil(user_id + 1000)
+        finally:
+            request_cache_beenden(token)
+
+    def test_konto_nach_nummer_aus_dem_konten_index(self):
+        from llkjj_knut.cache_utils import konto_nach_nummer
+
+        konto_nach_nummer("1200")
+        with self.assertNumQueries(0):
+            konto = konto_nach_nummer("1200")
+        # Unbekannte Nummer: ein Abgleich (vielleicht anderswo angelegt)
+        with self.assertNumQueries(1), self.assertRaises(Konto.DoesNotExist):
+            konto_nach_nummer("9999")
+        # Jeder Aufrufer bekommt seine eigene Kopie
+        konto.name = "Geändert"
+        self.assertEqual(konto_nach_nummer("1200").name, "Bank")
+
+    def test_query_budget_header_und_warnung(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("auswertungen:dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response["X-DB-Queries"]), 0)
+        self.assertIn("X-DB-Time-Ms", response)
+
+        with (
+            self.settings(QUERY_BUDGETS={"auswertungen:dashboard": 1}),
+            self.assertLogs("llkjj_knut.middleware", "WARNING") as logs,
+        ):
+            response = self.client.get(reverse("auswertungen:dashboard"))
+        self.assertNotIn("X-DB-Queries", response)
+        self.assertIn("auswertungen:dashboard", logs.output[0])
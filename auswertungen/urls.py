@@ -11,6 +11,7 @@ app_name = "auswertungen"
 urlpatterns = [
     path("", views.dashboard_view, name="dashboard"),
     path("kennzahlen-ajax/", views.kennzahlen_ajax, name="kennzahlen_ajax"),
+    path("zeitreihe/", views.zeitreihe_json, name="zeitreihe"),
     # Alte EÜR (zum Vergleich)
     path("eur/", views.eur_view, name="eur"),
     # Offizielle EÜR (neu)
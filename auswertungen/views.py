@@ -27,9 +27,12 @@ from reportlab.lib.units import cm
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 from belege.models import Beleg
-from buchungen.models import Buchungssatz, Geschaeftspartner
+from buchungen.models import Buchungssatz
 from einstellungen.models import Benutzerprofil
 from konten.models import Konto
+from llkjj_knut.cache_utils import benutzerprofil
+
+from .services import DashboardStatistikService, KontoSaldoService, ZeitreihenService
 
 
 @login_required
@@ -40,66 +43,11 @@ def dashboard_view(request):
     Zeigt eine Übersicht über Einnahmen, Ausgaben und wichtige Finanzkennzahlen.
     """
     heute = timezone.now().date()
-    monat_start = heute.replace(day=1)
-    jahr_start = heute.replace(month=1, day=1)
-
-    # Zeiträume für Vergleiche
-    letzter_monat = (monat_start - timedelta(days=1)).replace(day=1)
-    jahr_start.replace(year=jahr_start.year - 1)
-
-    # Einnahmen und Ausgaben aktueller Monat
-    einnahmen_monat = Buchungssatz.objects.filter(
-        buchungsdatum__gte=monat_start,
-        haben_konto__nummer__startswith="8",  # Ertragskonten
-    ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-    ausgaben_monat = Buchungssatz.objects.filter(
-        buchungsdatum__gte=monat_start,
-        soll_konto__nummer__startswith="4",  # Aufwandskonten
-    ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-    gewinn_monat = einnahmen_monat - ausgaben_monat
 
-    # Einnahmen und Ausgaben aktuelles Jahr
-    einnahmen_jahr = Buchungssatz.objects.filter(
-        buchungsdatum__gte=jahr_start, haben_konto__nummer__startswith="8"
-    ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-    ausgaben_jahr = Buchungssatz.objects.filter(
-        buchungsdatum__gte=jahr_start, soll_konto__nummer__startswith="4"
-    ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-    gewinn_jahr = einnahmen_jahr - ausgaben_jahr
-
-    # Vergleich mit Vormonat
-    einnahmen_vormonat = Buchungssatz.objects.filter(
-        buchungsdatum__gte=letzter_monat,
-        buchungsdatum__lt=monat_start,
-        haben_konto__nummer__startswith="8",
-    ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-    # Trend berechnen
-    einnahmen_trend = 0
-    if einnahmen_vormonat > 0:
-        einnahmen_trend = float(
-            (einnahmen_monat - einnahmen_vormonat) / einnahmen_vormonat * 100
-        )
-
-    # Statistiken
-    stats = {
-        "buchungen_gesamt": Buchungssatz.objects.count(),
-        "buchungen_monat": Buchungssatz.objects.filter(
-            buchungsdatum__gte=monat_start
-        ).count(),
-        "belege_count": Beleg.objects.count(),
-        "belege_unbearbeitet": Beleg.objects.filter(
-            status__in=["NEU", "FEHLER"]
-        ).count(),
-        "belege_eingang": Beleg.objects.filter(beleg_typ="RECHNUNG_EINGANG").count(),
-        "belege_ausgang": Beleg.objects.filter(beleg_typ="RECHNUNG_AUSGANG").count(),
-        "konten_count": Konto.objects.count(),
-        "partner_count": Geschaeftspartner.objects.filter(aktiv=True).count(),
-    }
+    # Kennzahlen: je eine Abfrage für Buchungen, Belege und Monatssalden
+    statistik = DashboardStatistikService(heute)
+    finanzen = statistik.finanzen()
+    stats = statistik.statistiken()
 
     # Letzte Buchungen
     letzte_buchungen = Buchungssatz.objects.select_related(
@@ -124,35 +72,8 @@ def dashboard_view(request):
         .order_by("-summe")[:5]
     )
 
-    # Monats-Chart-Daten (letzten 12 Monate)
-    chart_data = []
-    for i in range(12):
-        chart_monat = (heute.replace(day=1) - timedelta(days=30 * i)).replace(day=1)
-        chart_monat_ende = (chart_monat.replace(day=28) + timedelta(days=4)).replace(
-            day=1
-        ) - timedelta(days=1)
-
-        einnahmen = Buchungssatz.objects.filter(
-            buchungsdatum__gte=chart_monat,
-            buchungsdatum__lte=chart_monat_ende,
-            haben_konto__nummer__startswith="8",
-        ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-        ausgaben = Buchungssatz.objects.filter(
-            buchungsdatum__gte=chart_monat,
-            buchungsdatum__lte=chart_monat_ende,
-            soll_konto__nummer__startswith="4",
-        ).aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-
-        chart_data.insert(
-            0,
-            {
-                "monat": chart_monat.strftime("%b %Y"),
-                "einnahmen": float(einnahmen),
-                "ausgaben": float(ausgaben),
-                "gewinn": float(einnahmen - ausgaben),
-            },
-        )
+    # Monats-Chart-Daten (letzten 12 Monate) - eine gruppierte Abfrage
+    chart_data = ZeitreihenService.letzte_monate(heute).chart_daten()
 
     # Peter Zwegat Motivations-Sprüche
     zwegat_sprueche = [
@@ -175,13 +96,7 @@ def dashboard_view(request):
         "page_title": "Dashboard",
         "page_subtitle": f'Willkommen zurück! Heute ist {heute.strftime("%A, %d. %B %Y")}',
         # Finanzkennzahlen
-        "einnahmen_monat": einnahmen_monat,
-        "ausgaben_monat": ausgaben_monat,
-        "gewinn_monat": gewinn_monat,
-        "einnahmen_jahr": einnahmen_jahr,
-        "ausgaben_jahr": ausgaben_jahr,
-        "gewinn_jahr": gewinn_jahr,
-        "einnahmen_trend": einnahmen_trend,
+        **finanzen,
         # Statistiken
         "stats": stats,
         # Listen
@@ -223,6 +138,45 @@ def kennzahlen_ajax(_request):
     )
 
 
+@login_required
+def zeitreihe_json(request):
+    """
+    Einnahmen, Ausgaben und Gewinn als Zeitreihe (JSON) für Charts.
+
+    GET-Parameter: ``von``/``bis`` (ISO-Datum, Standard: letzte 12 Monate)
+    und ``intervall`` (``woche``, ``monat``, ``quartal``).
+    """
+    standard = ZeitreihenService.letzte_monate()
+    try:
+        von = request.GET.get("von")
+        bis = request.GET.get("bis")
+        zeitreihe = ZeitreihenService(
+            datetime.date.fromisoformat(von) if von else standard.von,
+            datetime.date.fromisoformat(bis) if bis else standard.bis,
+            request.GET.get("intervall", "monat"),
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(
+        {
+            "von": zeitreihe.von.isoformat(),
+            "bis": zeitreihe.bis.isoformat(),
+            "intervall": zeitreihe.intervall,
+            "reihe": [
+                {
+                    "periode": zeile["periode"].isoformat(),
+                    "bezeichnung": zeile["bezeichnung"],
+                    "einnahmen": float(zeile["einnahmen"]),
+                    "ausgaben": float(zeile["ausgaben"]),
+                    "gewinn": float(zeile["gewinn"]),
+                }
+                for zeile in zeitreihe.reihe()
+            ],
+        }
+    )
+
+
 def eur_view(request):
     """
     Einnahmen-Überschuss-Rechnung (EÜR) für das Finanzamt.
@@ -413,11 +367,8 @@ def kontenblatt_view(request, konto_id):
         .order_by("buchungsdatum")
     )
 
-    # Salden berechnen
-    soll_summe = soll_buchungen.aggregate(summe=Sum("betrag"))["summe"] or Decimal("0")
-    haben_summe = haben_buchungen.aggregate(summe=Sum("betrag"))["summe"] or Decimal(
-        "0"
-    )
+    # Salden aus den Monatssalden (Zeitraum ist immer monatsgenau)
+    soll_summe, haben_summe = KontoSaldoService.summen(konto, jahr_start, jahr_ende)
 
     # Saldo je nach Kontotyp
     if konto.nummer.startswith(("0", "1", "4", "5", "6")):  # Aktiv- und Aufwandskonten
@@ -1050,7 +1001,7 @@ def eur_bmf_formular_view(request):
 
     # Steuerpflichtigen-Daten (aus Einstellungen)
     try:
-        profil = Benutzerprofil.objects.get(user=request.user)
+        profil = benutzerprofil(request.user.id)
         steuerpflichtiger = profil.benoetigte_felder_fuer_euer()
     except Benutzerprofil.DoesNotExist:
         # Fallback für Benutzer ohne Profil
@@ -1251,7 +1202,7 @@ def eur_bmf_formular_view(request):
     # Besondere Angaben für Künstler
     kuenstlerische_einnahmen = summe_einnahmen  # Vereinfacht
     try:
-        profil = Benutzerprofil.objects.get(user=request.user)
+        profil = benutzerprofil(request.user.id)
         kleinunternehmer = profil.kleinunternehmer_19_ustg
     except Benutzerprofil.DoesNotExist:
         kleinunternehmer = True  # Standard-Fallback
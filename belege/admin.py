@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
+from llkjj_knut.volltextsuche import aktualisiere
+
 from .models import Beleg
 
 
@@ -141,6 +143,8 @@ class BelegAdmin(admin.ModelAdmin):
     def ocr_zuruecksetzen(self, request, queryset):
         """Bulk-Aktion: OCR zurücksetzen"""
         updated = queryset.update(ocr_verarbeitet=False, ocr_text="")
+        # update() löst keine Signals aus - OCR-Text aus dem Suchindex nehmen
+        aktualisiere(queryset)
         self.message_user(
             request, f"Peter Zwegat sagt: 'OCR für {updated} Belege zurückgesetzt!'"
-        )
\ No newline at end of file
+        )
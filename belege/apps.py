@@ -1,3 +1,5 @@
+import importlib.util
+
 from django.apps import AppConfig
 from django.core.checks import Error, register
 
@@ -11,31 +13,9 @@ def check_spacy_model(app_configs, **kwargs):
     """
     errors = []
 
-    try:
-        import spacy
-
-        # Versuche zuerst das Large-Modell, dann das Small-Modell
-        model_loaded = False
-        try:
-            spacy.load("de_core_news_lg")
-            model_loaded = True
-        except OSError:
-            try:
-                spacy.load("de_core_news_sm")
-                model_loaded = True
-            except OSError:
-                pass
-
-        if not model_loaded:
-            errors.append(
-                Error(
-                    "Kein deutsches spaCy-Modell installiert.",
-                    hint="Installieren Sie eines mit: python -m spacy download de_core_news_lg "
-                    "oder python -m spacy download de_core_news_sm",
-                    id="belege.E001",
-                )
-            )
-    except ImportError:
+    # Nur prüfen, ob die Pakete installiert sind - das Laden der Modelle
+    # übernimmt die Modell-Registry beim ersten Beleg (spart Sekunden beim Start)
+    if importlib.util.find_spec("spacy") is None:
         errors.append(
             Error(
                 "spaCy ist nicht installiert.",
@@ -43,6 +23,18 @@ def check_spacy_model(app_configs, **kwargs):
                 id="belege.E002",
             )
         )
+    elif not any(
+        importlib.util.find_spec(modell)
+        for modell in ("de_core_news_lg", "de_core_news_sm")
+    ):
+        errors.append(
+            Error(
+                "Kein deutsches spaCy-Modell installiert.",
+                hint="Installieren Sie eines mit: python -m spacy download de_core_news_lg "
+                "oder python -m spacy download de_core_news_sm",
+                id="belege.E001",
+            )
+        )
 
     return errors
 
@@ -50,3 +42,19 @@ def check_spacy_model(app_configs, **kwargs):
 class BelegeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "belege"
+
+    def ready(self):
+        """Importiert Signals und meldet Belege für die Volltextsuche an."""
+        import belege.signals  # noqa
+        from buchungen.models import Geschaeftspartner
+        from llkjj_knut.volltextsuche import registriere
+
+        registriere(
+            self.get_model("Beleg"),
+            {
+                "A": ["beschreibung", "geschaeftspartner__name"],
+                "B": ["original_dateiname"],
+                "C": ["ocr_text"],
+            },
+            abhaengig={Geschaeftspartner: "geschaeftspartner"},
+        )
@@ -5,12 +5,15 @@ Peter Zwegat würde sagen: "Dieser Parser ist so schlau,
 er versteht Rechnungen besser als manche Steuerberater!"
 """
 
+import importlib.util
 import logging
 import re
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 from typing import Any
 
+from .modell_registry import ModellNichtVerfuegbarError, modelle
+
 # Für OCR falls PDF nicht text-extractable ist
 try:
     from pdf2image import convert_from_path
@@ -20,13 +23,8 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
-# spaCy für NLP
-try:
-    import spacy
-
-    SPACY_AVAILABLE = True
-except ImportError:
-    SPACY_AVAILABLE = False
+# spaCy für NLP - nur prüfen, ob installiert; geladen wird über die Registry
+SPACY_AVAILABLE = importlib.util.find_spec("spacy") is not None
 
 logger = logging.getLogger(__name__)
 
@@ -50,32 +48,21 @@ class BelegParser:
         self.text = ""
         self.doc = None
 
-        # spaCy-Model laden - bevorzugt Large-Modell, dann Small-Modell
-        if SPACY_AVAILABLE:
-            try:
-                # Zuerst versuchen das große deutsche Modell zu laden
-                self.nlp = spacy.load("de_core_news_lg")
-                logger.info(
-                    "Deutsches spaCy-Modell 'de_core_news_lg' erfolgreich geladen"
-                )
-            except OSError:
-                try:
-                    # Fallback auf das kleinere deutsche Modell
-                    self.nlp = spacy.load("de_core_news_sm")
-                    logger.info(
-                        "Deutsches spaCy-Modell 'de_core_news_sm' erfolgreich geladen"
-                    )
-                except OSError:
-                    logger.error("Kein deutsches spaCy-Modell gefunden")
-                    raise RuntimeError(
-                        "Ein deutsches spaCy-Modell ist erforderlich. "
-                        "Installieren Sie eines mit: python -m spacy download de_core_news_lg "
-                        "oder python -m spacy download de_core_news_sm"
-                    )
-        else:
+        # spaCy-Modell aus der Registry - wird nur einmal pro Prozess geladen,
+        # bevorzugt Large-Modell, dann Small-Modell
+        if not SPACY_AVAILABLE:
             raise RuntimeError(
                 "spaCy ist nicht installiert. Installieren Sie es mit: pip install spacy"
             )
+        try:
+            self.nlp = modelle.hole("spacy")
+        except ModellNichtVerfuegbarError as e:
+            logger.error("Kein deutsches spaCy-Modell gefunden")
+            raise RuntimeError(
+                "Ein deutsches spaCy-Modell ist erforderlich. "
+                "Installieren Sie eines mit: python -m spacy download de_core_news_lg "
+                "oder python -m spacy download de_core_news_sm"
+            ) from e
 
         # Regex-Patterns für die Extraktion
         self.patterns = {
@@ -0,0 +1,177 @@
+"""
+Persistenter Cache für die Referenz-Embeddings der semantischen Kategorisierung.
+
+Die Referenztexte einer Kategorie werden nur noch einmal pro Modell und
+Textstand eingebettet. Gespeichert wird je Kategorie der Mittelwert der
+Embeddings - der Mittelwert der Skalarprodukte mit allen Referenztexten ist
+genau das Skalarprodukt mit diesem Mittelwert. Die Matrix (Kategorien x
+Dimensionen) liegt als ``.npy`` auf der Platte und wird per ``mmap`` geladen;
+alle Prozesse teilen sich damit dieselben Seiten im Page-Cache.
+
+Dateiname: ``<modell>-<sha256 der Referenztexte>.npy`` plus ``.json`` mit der
+Reihenfolge der Kategorien. Ändern sich die Trainingsdaten, ändert sich der
+Hash - veraltete Dateien werden beim nächsten Aufbau entfernt.
+
+Peter Zwegat: "Was man einmal ausgerechnet hat, rechnet man nicht zweimal!"
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenzEmbeddingCache:
+    """Verwaltet die Kategorie-Matrizen je Modell und Textstand."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (Modell, Hash) -> (Kategorien, Matrix) für bereits geöffnete Dateien
+        self._geladen: dict[tuple[str, str], tuple[list[str], np.ndarray]] = {}
+
+    @staticmethod
+    def verzeichnis() -> Path:
+        pfad = Path(
+            getattr(
+                settings,
+                "KI_EMBEDDING_CACHE_DIR",
+                Path(settings.BASE_DIR) / "ki_cache" / "embeddings",
+            )
+        )
+        pfad.mkdir(parents=True, exist_ok=True)
+        return pfad
+
+    @staticmethod
+    def text_hash(referenztexte: dict[str, list[str]]) -> str:
+        """Stabiler Hash über Kategorien und Referenztexte."""
+        inhalt = json.dumps(referenztexte, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(inhalt.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _praefix(modell_name: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", modell_name)
+
+    def _pfade(self, modell_name: str, text_hash: str) -> tuple[Path, Path]:
+        basis = f"{self._praefix(modell_name)}-{text_hash}"
+        verzeichnis = self.verzeichnis()
+        return verzeichnis / f"{basis}.npy", verzeichnis / f"{basis}.json"
+
+    def lade(self, modell_name: str, text_hash: str):
+        """
+        Liefert (Kategorien, Matrix) oder ``None``, wenn noch nichts vorliegt.
+
+        Die Matrix ist schreibgeschützt und per ``mmap`` eingebunden.
+        """
+        schluessel = (modell_name, text_hash)
+        with self._lock:
+            if schluessel in self._geladen:
+                return self._geladen[schluessel]
+
+            matrix_pfad, meta_pfad = self._pfade(modell_name, text_hash)
+            try:
+                kategorien = json.loads(meta_pfad.read_text(encoding="utf-8"))
+                matrix = np.load(matrix_pfad, mmap_mode="r")
+            except (OSError, ValueError) as e:
+                if matrix_pfad.exists() or meta_pfad.exists():
+                    logger.warning("Embedding-Cache %s unlesbar: %s", matrix_pfad, e)
+                return None
+
+            if matrix.shape[0] != len(kategorien):
+                logger.warning(
+                    "Embedding-Cache %s passt nicht zur Metadatei", matrix_pfad
+                )
+                return None
+
+            # Nur die aktuelle Fassung je Modell offen halten
+            for alt in [s for s in self._geladen if s[0] == modell_name]:
+                del self._geladen[alt]
+            self._geladen[schluessel] = (kategorien, matrix)
+            return kategorien, matrix
+
+    def hole_oder_berechne(self, modell, modell_name: str, referenztexte: dict):
+        """
+        Liefert (Kategorien, Matrix, Hash); fehlt die Datei, wird sie mit einem
+        einzigen ``encode``-Aufruf über alle Referenztexte erzeugt.
+        """
+        text_hash = self.text_hash(referenztexte)
+        vorhanden = self.lade(modell_name, text_hash)
+        if vorhanden is not None:
+            return (*vorhanden, text_hash)
+
+        kategorien = [k for k, texte in referenztexte.items() if texte]
+        alle_texte = [text for k in kategorien for text in referenztexte[k]]
+        embeddings = np.asarray(modell.encode(alle_texte), dtype=np.float32)
+
+        # Mittelwert je Kategorie (Zeilen liegen kategorieweise hintereinander)
+        anzahl = np.array([len(referenztexte[k]) for k in kategorien])
+        starts = np.concatenate([[0], np.cumsum(anzahl)[:-1]])
+        matrix = np.add.reduceat(embeddings, starts, axis=0) / anzahl[:, None]
+
+        self._speichere(modell_name, text_hash, kategorien, matrix)
+        logger.info(
+            "Embedding-Cache aufgebaut: %s Kategorien, %s Referenztexte",
+            len(kategorien),
+            len(alle_texte),
+        )
+        vorhanden = self.lade(modell_name, text_hash)
+        if vorhanden is None:  # z.B. Verzeichnis nicht beschreibbar
+            return kategorien, matrix, text_hash
+        return (*vorhanden, text_hash)
+
+    @staticmethod
+    def bewerte(embeddings, kategorien: list[str], matrix) -> list[tuple[str, float]]:
+        """
+        Beste Kategorie je Text-Embedding - ein Matrixprodukt für alle Texte.
+
+        Wie bisher zählt nur eine positive Ähnlichkeit; bei Gleichstand
+        gewinnt die erste Kategorie.
+        """
+        punkte = np.asarray(embeddings, dtype=np.float32) @ np.asarray(matrix).T
+        ergebnisse = []
+        for zeile in np.atleast_2d(punkte):
+            beste = int(np.argmax(zeile))
+            if zeile[beste] > 0:
+                ergebnisse.append((kategorien[beste], float(zeile[beste])))
+            else:
+                ergebnisse.append(("SONSTIGES", 0.0))
+        return ergebnisse
+
+    def _speichere(self, modell_name, text_hash, kategorien, matrix) -> None:
+        """Schreibt Matrix und Metadaten atomar (erst temporär, dann umbenennen)."""
+        matrix_pfad, meta_pfad = self._pfade(modell_name, text_hash)
+        try:
+            for ziel, schreiben in (
+                (matrix_pfad, lambda datei: np.save(datei, matrix)),
+                (
+                    meta_pfad,
+                    lambda datei: datei.write(
+                        json.dumps(kategorien, ensure_ascii=False).encode("utf-8")
+                    ),
+                ),
+            ):
+                fd, tmp = tempfile.mkstemp(dir=ziel.parent, suffix=".tmp")
+                with os.fdopen(fd, "wb") as datei:
+                    schreiben(datei)
+                os.replace(tmp, ziel)
+        except OSError as e:
+            logger.warning("Embedding-Cache nicht gespeichert: %s", e)
+            return
+
+        # Ältere Fassungen desselben Modells entfernen
+        praefix = f"{self._praefix(modell_name)}-"
+        for datei in self.verzeichnis().glob(f"{praefix}*"):
+            if not datei.name.startswith(f"{praefix}{text_hash}"):
+                datei.unlink(missing_ok=True)
+
+
+# Ein Cache pro Prozess (die Dateien teilen sich alle Prozesse)
+referenz_embeddings = ReferenzEmbeddingCache()
@@ -4,12 +4,14 @@ Erweiterte KI-Services für intelligente Belegerfassung.
 Peter Zwegat würde sagen: "Mit KI wird aus jedem Zettel ein Goldstück der Buchhaltung!"
 """
 
+import importlib.util
 import json
 import logging
 
+from .modell_registry import SENTENCE_MODELL, modelle
+
 # Standard Machine Learning
 try:
-    import numpy as np
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.model_selection import train_test_split
     from sklearn.naive_bayes import MultinomialNB
@@ -19,22 +21,21 @@ try:
 except ImportError:
     ML_AVAILABLE = False
 
-# NLP & Text Processing
+# NLP & Text Processing (spaCy und Sentence Transformer lädt die Modell-Registry)
 try:
-    import spacy
     from fuzzywuzzy import fuzz, process
-    from sentence_transformers import SentenceTransformer
 
-    NLP_AVAILABLE = True
+    NLP_AVAILABLE = all(
+        importlib.util.find_spec(paket) for paket in ("spacy", "sentence_transformers")
+    )
 except ImportError:
     NLP_AVAILABLE = False
 
 # Computer Vision für bessere OCR
 try:
     import cv2
-    import easyocr
 
-    CV_AVAILABLE = True
+    CV_AVAILABLE = importlib.util.find_spec("easyocr") is not None
 except ImportError:
     CV_AVAILABLE = False
 
@@ -42,6 +43,7 @@ except ImportError:
 try:
     from django.core.cache import cache
 
+    from .embedding_cache import referenz_embeddings
     from .models import BelegKategorieML
 
     DJANGO_AVAILABLE = True
@@ -50,6 +52,8 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+REFERENZ_HASH_CACHE_KEY = "kategorien_referenztexte_hash"
+
 
 class ErweiterteKI:
     """
@@ -59,33 +63,60 @@ class ErweiterteKI:
     """
 
     def __init__(self):
-        """Initialisiert die erweiterte KI mit allen verfügbaren Modellen."""
+        """
+        Initialisiert die erweiterte KI.
+
+        Die großen Modelle (Sentence Transformer, spaCy, EasyOCR) kommen erst
+        beim ersten Zugriff aus der prozessweiten Modell-Registry.
+        """
         self.ml_model = None
         self.vectorizer = None
-        self.sentence_model = None
-        self.spacy_nlp = None
-        self.ocr_reader = None
+        self._sentence_model = None
+        self._spacy_nlp = None
+        self._ocr_reader = None
 
         self._lade_modelle()
 
     def _lade_modelle(self):
-        """Lädt alle verfügbaren ML-Modelle."""
-        logger.info("Lade KI-Modelle...")
-
-        # Scikit-learn ML-Pipeline
+        """Initialisiert die ML-Pipeline (die großen Modelle laden lazy)."""
         if ML_AVAILABLE:
             self._initialisiere_ml_pipeline()
 
-        # Sentence Transformers für semantische Ähnlichkeit
-        if NLP_AVAILABLE:
-            self._lade_sentence_transformer()
-            self._lade_spacy_modell()
-
-        # Computer Vision OCR
-        if CV_AVAILABLE:
-            self._initialisiere_ocr()
-
-        logger.info("KI-Modelle erfolgreich geladen")
+    @property
+    def sentence_model(self):
+        """Sentence Transformer für semantische Ähnlichkeit (oder ``None``)."""
+        modell = getattr(self, "_sentence_model", None)
+        if modell is None and NLP_AVAILABLE:
+            modell = modelle.hole_optional("sentence_transformer")
+        return modell
+
+    @sentence_model.setter
+    def sentence_model(self, modell):
+        self._sentence_model = modell
+
+    @property
+    def spacy_nlp(self):
+        """Deutsches spaCy-Modell für Named Entity Recognition (oder ``None``)."""
+        modell = getattr(self, "_spacy_nlp", None)
+        if modell is None and NLP_AVAILABLE:
+            modell = modelle.hole_optional("spacy")
+        return modell
+
+    @spacy_nlp.setter
+    def spacy_nlp(self, modell):
+        self._spacy_nlp = modell
+
+    @property
+    def ocr_reader(self):
+        """EasyOCR-Reader für bessere Texterkennung (oder ``None``)."""
+        modell = getattr(self, "_ocr_reader", None)
+        if modell is None and CV_AVAILABLE:
+            modell = modelle.hole_optional("easyocr")
+        return modell
+
+    @ocr_reader.setter
+    def ocr_reader(self, modell):
+        self._ocr_reader = modell
 
     def _initialisiere_ml_pipeline(self):
         """Initialisiert die ML-Pipeline für Klassifikation."""
@@ -108,44 +139,6 @@ class ErweiterteKI:
         except Exception as e:
             logger.error(f"Fehler beim Initialisieren der ML-Pipeline: {e}")
 
-    def _lade_sentence_transformer(self):
-        """Lädt das Sentence Transformer Modell für semantische Ähnlichkeit."""
-        try:
-            # Deutsches Modell für bessere Genauigkeit
-            model_name = "paraphrase-multilingual-MiniLM-L12-v2"
-            self.sentence_model = SentenceTransformer(model_name)
-            logger.info(f"Sentence Transformer geladen: {model_name}")
-        except Exception as e:
-            logger.warning(f"Sentence Transformer nicht verfügbar: {e}")
-
-    def _lade_spacy_modell(self):
-        """Lädt das deutsche spaCy-Modell - wirft Exception wenn nicht verfügbar."""
-        try:
-            # Deutsches Modell für Named Entity Recognition
-            self.spacy_nlp = spacy.load("de_core_news_sm")
-            logger.info("Deutsches spaCy-Modell 'de_core_news_sm' geladen")
-        except OSError:
-            try:
-                # Fallback auf größeres deutsches Modell
-                self.spacy_nlp = spacy.load("de_core_news_lg")
-                logger.info("Großes deutsches spaCy-Modell 'de_core_news_lg' geladen")
-            except OSError:
-                logger.error("Kein deutsches spaCy-Modell verfügbar")
-                raise RuntimeError(
-                    "Ein deutsches spaCy-Modell ist erforderlich. "
-                    "Installieren Sie eines mit: python -m spacy download de_core_news_sm "
-                    "oder python -m spacy download de_core_news_lg"
-                )
-
-    def _initialisiere_ocr(self):
-        """Initialisiert EasyOCR für bessere Texterkennung."""
-        try:
-            # Deutsche und englische Sprache
-            self.ocr_reader = easyocr.Reader(["de", "en"], gpu=False)
-            logger.info("EasyOCR Reader initialisiert")
-        except Exception as e:
-            logger.warning(f"EasyOCR nicht verfügbar: {e}")
-
     def _trainiere_ml_modell(self):
         """Trainiert das ML-Modell mit vorhandenen Daten."""
         if not (DJANGO_AVAILABLE and self.ml_model):
@@ -237,38 +230,58 @@ class ErweiterteKI:
 
         Peter Zwegat: "Der Computer versteht jetzt sogar, was gemeint ist!"
         """
-        if not (self.sentence_model and DJANGO_AVAILABLE):
-            return "SONSTIGES", 0.0
-
-        try:
-            # Lade Referenztexte für jede Kategorie
-            kategorien_texte = self._lade_kategorien_referenztexte()
+        return self.semantische_kategorisierung_batch([text])[0]
 
-            if not kategorien_texte:
-                return "SONSTIGES", 0.0
+    def semantische_kategorisierung_batch(
+        self, texte: list[str]
+    ) -> list[tuple[str, float]]:
+        """
+        Semantische Kategorisierung vieler Texte auf einmal.
 
-            # Berechne Embeddings
-            text_embedding = self.sentence_model.encode([text])
+        Alle Texte werden mit einem einzigen ``encode``-Aufruf eingebettet und
+        mit einem Matrixprodukt gegen die (zwischengespeicherten)
+        Kategorie-Embeddings bewertet.
+        """
+        ohne_ergebnis = [("SONSTIGES", 0.0)] * len(texte)
+        if not (self.sentence_model and DJANGO_AVAILABLE) or not texte:
+            return ohne_ergebnis
 
-            beste_kategorie = "SONSTIGES"
-            beste_aehnlichkeit = 0.0
+        try:
+            referenz = self._lade_referenz_embeddings()
+            if referenz is None:
+                return ohne_ergebnis
+            kategorien, matrix = referenz
 
-            for kategorie, referenz_texte in kategorien_texte.items():
-                referenz_embeddings = self.sentence_model.encode(referenz_texte)
+            text_embeddings = self.sentence_model.encode(list(texte))
+            return referenz_embeddings.bewerte(text_embeddings, kategorien, matrix)
 
-                # Berechne durchschnittliche Ähnlichkeit
-                aehnlichkeiten = np.dot(text_embedding, referenz_embeddings.T)[0]
-                avg_aehnlichkeit = np.mean(aehnlichkeiten)
+        except Exception as e:
+            logger.error(f"Fehler bei semantischer Kategorisierung: {e}")
+            return ohne_ergebnis
 
-                if avg_aehnlichkeit > beste_aehnlichkeit:
-                    beste_aehnlichkeit = avg_aehnlichkeit
-                    beste_kategorie = kategorie
+    def _lade_referenz_embeddings(self):
+        """
+        Kategorie-Embeddings aus dem persistenten Cache.
 
-            return beste_kategorie, float(beste_aehnlichkeit)
+        Solange sich die Referenztexte nicht ändern, wird nichts neu
+        eingebettet - auch nicht nach einem Neustart.
+        """
+        text_hash = cache.get(REFERENZ_HASH_CACHE_KEY)
+        if text_hash:
+            vorhanden = referenz_embeddings.lade(SENTENCE_MODELL, text_hash)
+            if vorhanden is not None:
+                return vorhanden
+
+        kategorien_texte = self._lade_kategorien_referenztexte()
+        if not kategorien_texte:
+            return None
 
-        except Exception as e:
-            logger.error(f"Fehler bei semantischer Kategorisierung: {e}")
-            return "SONSTIGES", 0.0
+        kategorien, matrix, text_hash = referenz_embeddings.hole_oder_berechne(
+            self.sentence_model, SENTENCE_MODELL, kategorien_texte
+        )
+        # Gleiche Lebensdauer wie die Referenztexte selbst
+        cache.set(REFERENZ_HASH_CACHE_KEY, text_hash, 3600)
+        return (kategorien, matrix) if kategorien else None
 
     def _lade_kategorien_referenztexte(self) -> dict[str, list[str]]:
         """Lädt Referenztexte für jede Kategorie."""
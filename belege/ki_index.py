@@ -0,0 +1,332 @@
+"""
+Speicherindex über die ML-Trainingsdaten (``BelegKategorieML``).
+
+Statt für jeden Beleg alle Trainingszeilen aus der Datenbank zu lesen und
+einzeln per JSON und Mengenvergleich zu bewerten, hält der Index die Daten
+einmal pro Prozess als NumPy-Arrays:
+
+- Schlüsselwörter als dünn besetzte Matrix (Zeile/Spalte je Eintrag)
+- Lieferanten und Betragsbereiche als Nachschlagetabellen mit Index je Zeile
+
+Die Bewertung aller Trainingszeilen ist damit eine einzige Array-Operation.
+Änderungen an ``BelegKategorieML`` erhöhen eine Versionsnummer im Cache;
+neue Zeilen werden im eigenen Prozess direkt angehängt, Prozesse mit
+gemeinsamem Cache laden beim nächsten Zugriff neu. Alle übrigen (weitere
+gunicorn-Worker, Celery) vergleichen höchstens alle
+``PROZESS_INDEX_PRUEF_SEKUNDEN`` Anzahl und größte ID der Trainingszeilen
+mit der Datenbank und laden nach ``PROZESS_INDEX_MAX_ALTER_SEKUNDEN`` neu
+(``cache_utils.Abgleich``).
+
+Peter Zwegat: "Wer seine Unterlagen sortiert hat, findet alles in Sekunden!"
+"""
+
+import json
+import logging
+import threading
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from llkjj_knut.cache_utils import Abgleich
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "belege:ki_index_version"
+
+
+class KategorieMLIndex:
+    """
+    Vektorisierter Ähnlichkeitsindex für die ML-Kategorisierung.
+
+    Die Gewichtung entspricht der bisherigen Einzelbewertung:
+    40 % Lieferant, 20 % Betragsbereich, 40 % Jaccard-Ähnlichkeit
+    der Schlüsselwörter.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._leeren()
+        self.geladen = False
+        self.version = None
+        # (Anzahl, größte ID) der Trainingszeilen zum geladenen Stand
+        self.stempel = None
+        self.abgleich = Abgleich()
+
+    def _leeren(self):
+        self.woerter: dict[str, int] = {}
+        self.lieferanten: dict[str, int] = {}
+        self.bereiche: dict[str, int] = {}
+        self.kategorien: dict[str, int] = {}
+        self.kategorie_namen: list[str] = []
+        self.lieferant_namen: list[str] = []
+
+        # Dünn besetzte Schlüsselwort-Matrix: ein Eintrag je (Zeile, Wort)
+        self.eintrag_zeilen = np.empty(0, dtype=np.int32)
+        self.eintrag_woerter = np.empty(0, dtype=np.int32)
+        # Je Trainingszeile
+        self.wort_anzahl = np.empty(0, dtype=np.int32)
+        self.lieferant_ids = np.empty(0, dtype=np.int32)
+        self.bereich_ids = np.empty(0, dtype=np.int32)
+        self.kategorie_ids = np.empty(0, dtype=np.int32)
+
+        # Noch nicht in die Arrays übernommene Zeilen (siehe _zusammenfuehren)
+        self._neu: list[tuple[list[int], int, int, int]] = []
+
+    @property
+    def anzahl(self) -> int:
+        return len(self.kategorie_ids) + len(self._neu)
+
+    # ------------------------------------------------------------------
+    # Aufbau und Aktualisierung
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _aktuelle_version() -> int:
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, 1, None)
+            version = cache.get(VERSION_CACHE_KEY, 1)
+        return version
+
+    @staticmethod
+    def _stempel() -> tuple:
+        from .models import BelegKategorieML
+
+        werte = BelegKategorieML.objects.order_by().aggregate(
+            anzahl=Count("pk"), max_pk=Max("pk")
+        )
+        return werte["anzahl"], werte["max_pk"]
+
+    def laden(self, zeilen=None) -> None:
+        """
+        Baut den Index (neu) auf.
+
+        Args:
+            zeilen: Optional Tupel (schluesselwoerter, lieferant_name,
+                betrag_bereich, korrekte_kategorie); sonst aus der Datenbank
+        """
+        from .models import BelegKategorieML
+
+        with self._lock:
+            version = self._aktuelle_version()
+            # Vorgegebene Zeilen haben keinen Stand in der Datenbank
+            stempel = None
+            if zeilen is None:
+                stempel = self._stempel()
+                zeilen = (
+                    BelegKategorieML.objects.order_by("trainiert_am", "pk")
+                    .values_list(
+                        "schluesselwoerter",
+                        "lieferant_name",
+                        "betrag_bereich",
+                        "korrekte_kategorie",
+                    )
+                    .iterator(chunk_size=5000)
+                )
+
+            self._leeren()
+            for schluesselwoerter, lieferant, bereich, kategorie in zeilen:
+                self._neu.append(
+                    self._kodiere(schluesselwoerter, lieferant, bereich, kategorie)
+                )
+            self._zusammenfuehren()
+
+            self.geladen = True
+            self.version = version
+            self.stempel = stempel
+            self.abgleich.geladen()
+            logger.info("KI-Index geladen: %s Trainingszeilen", self.anzahl)
+
+    def invalidieren(self) -> None:
+        """Verwirft den Index in allen Prozessen (nächster Zugriff lädt neu)."""
+        with self._lock:
+            self.geladen = False
+        self._erhoehe_version()
+
+    def nach_speichern(self, eintrag, neu: bool) -> None:
+        """
+        Hält den Index nach dem Speichern eines Trainingseintrags aktuell.
+
+        Neue Einträge werden angehängt, sofern der Index bis dahin aktuell
+        war; Änderungen an bestehenden Einträgen verwerfen ihn.
+        """
+        alte_version = self._aktuelle_version()
+        neue_version = self._erhoehe_version()
+        with self._lock:
+            if (
+                neu
+                and self.geladen
+                and self.version == alte_version
+                and neue_version == alte_version + 1
+            ):
+                self._neu.append(
+                    self._kodiere(
+                        eintrag.schluesselwoerter,
+                        eintrag.lieferant_name,
+                        eintrag.betrag_bereich,
+                        eintrag.korrekte_kategorie,
+                    )
+                )
+                self.version = neue_version
+                if self.stempel is not None:
+                    anzahl, max_pk = self.stempel
+                    self.stempel = (anzahl + 1, max(max_pk or 0, eintrag.pk))
+            else:
+                self.geladen = False
+
+    @staticmethod
+    def _erhoehe_version() -> int:
+        try:
+            return cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 2, None)
+            return 2
+
+    def _sicherstellen(self) -> None:
+        """Lädt den Index beim ersten Zugriff oder nach fremden Änderungen."""
+        if (
+            not self.geladen
+            or self.version != self._aktuelle_version()
+            or self.abgleich.abgelaufen()
+            or (self.abgleich.pruefen() and self._stempel() != self.stempel)
+        ):
+            self.laden()
+        elif self._neu:
+            with self._lock:
+                self._zusammenfuehren()
+
+    @staticmethod
+    def _id(tabelle: dict[str, int], wert: str, namen: list | None = None) -> int:
+        if wert not in tabelle:
+            tabelle[wert] = len(tabelle)
+            if namen is not None:
+                namen.append(wert)
+        return tabelle[wert]
+
+    def _kodiere(self, schluesselwoerter, lieferant, bereich, kategorie):
+        try:
+            woerter = json.loads(schluesselwoerter) if schluesselwoerter else []
+            if not isinstance(woerter, list):
+                woerter = []
+        except (json.JSONDecodeError, TypeError):
+            woerter = []
+        wort_ids = sorted({self._id(self.woerter, str(wort)) for wort in woerter})
+        return (
+            wort_ids,
+            self._id(self.lieferanten, (lieferant or "").lower(), self.lieferant_namen),
+            self._id(self.bereiche, bereich or ""),
+            self._id(self.kategorien, kategorie, self.kategorie_namen),
+        )
+
+    def _zusammenfuehren(self) -> None:
+        """Übernimmt neu angehängte Zeilen in die Arrays."""
+        if not self._neu:
+            return
+        start = len(self.kategorie_ids)
+        anzahl = np.fromiter((len(z[0]) for z in self._neu), np.int32, len(self._neu))
+        woerter = np.fromiter(
+            (wort for z in self._neu for wort in z[0]), np.int32, int(anzahl.sum())
+        )
+        zeilen = np.repeat(
+            np.arange(start, start + len(self._neu), dtype=np.int32), anzahl
+        )
+
+        self.eintrag_zeilen = np.concatenate([self.eintrag_zeilen, zeilen])
+        self.eintrag_woerter = np.concatenate([self.eintrag_woerter, woerter])
+        self.wort_anzahl = np.concatenate([self.wort_anzahl, anzahl])
+        for attribut, position in (
+            ("lieferant_ids", 1),
+            ("bereich_ids", 2),
+            ("kategorie_ids", 3),
+        ):
+            neu = np.fromiter(
+                (z[position] for z in self._neu), np.int32, len(self._neu)
+            )
+            setattr(self, attribut, np.concatenate([getattr(self, attribut), neu]))
+        self._neu = []
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def _lieferant_treffer(self, lieferant: str) -> np.ndarray:
+        """Bool-Array je Trainingszeile: Lieferantenname enthält ``lieferant``."""
+        suchbegriff = lieferant.lower()
+        treffer = np.fromiter(
+            (suchbegriff in name for name in self.lieferant_namen),
+            bool,
+            len(self.lieferant_namen),
+        )
+        return treffer[self.lieferant_ids]
+
+    def bewerte(self, features: dict) -> np.ndarray:
+        """Ähnlichkeit der Features zu allen Trainingszeilen."""
+        with self._lock:
+            self._sicherstellen()
+            if not len(self.kategorie_ids):
+                return np.empty(0)
+
+            punkte = 0.4 * self._lieferant_treffer(features["lieferant"])
+
+            bereich = self.bereiche.get(features["betrag_bereich"])
+            if bereich is not None:
+                punkte = punkte + 0.2 * (self.bereich_ids == bereich)
+
+            bekannte = {
+                self.woerter[wort]
+                for wort in features["schluesselwoerter"]
+                if wort in self.woerter
+            }
+            if bekannte:
+                # Schnittmenge je Zeile: Einträge mit gesuchten Wörtern zählen
+                maske = np.isin(self.eintrag_woerter, np.fromiter(bekannte, np.int32))
+                gemeinsam = np.bincount(
+                    self.eintrag_zeilen[maske], minlength=len(self.kategorie_ids)
+                )
+                vereinigung = (
+                    self.wort_anzahl
+                    + len(set(features["schluesselwoerter"]))
+                    - gemeinsam
+                )
+                punkte = punkte + 0.4 * gemeinsam / vereinigung
+
+            return punkte
+
+    def beste_kategorie(self, features: dict) -> tuple[str, float]:
+        """
+        Kategorie der ähnlichsten Trainingszeile und deren Ähnlichkeit.
+
+        Bei Gleichstand gewinnt - wie bisher - der neueste Eintrag.
+        """
+        with self._lock:
+            punkte = self.bewerte(features)
+            if not len(punkte):
+                return "SONSTIGES", 0.0
+            beste = len(punkte) - 1 - int(np.argmax(punkte[::-1]))
+            if punkte[beste] <= 0:
+                return "SONSTIGES", 0.0
+            return (
+                self.kategorie_namen[self.kategorie_ids[beste]],
+                float(punkte[beste]),
+            )
+
+    def lieferanten_kategorien(self, lieferant: str) -> dict[str, int]:
+        """Anzahl Trainingszeilen je Kategorie für passende Lieferantennamen."""
+        with self._lock:
+            self._sicherstellen()
+            if not len(self.kategorie_ids):
+                return {}
+            zaehler = np.bincount(
+                self.kategorie_ids[self._lieferant_treffer(lieferant)],
+                minlength=len(self.kategorie_namen),
+            )
+            return {
+                self.kategorie_namen[i]: int(anzahl)
+                for i, anzahl in enumerate(zaehler)
+                if anzahl
+            }
+
+
+# Ein Index pro Prozess
+kategorie_index = KategorieMLIndex()
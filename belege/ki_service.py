@@ -7,11 +7,11 @@ Das ist ja besser als zehn Steuerberater zusammen!"
 
 import json
 import logging
-import re
 
-try:
-    from django.db.models import Count
+from llkjj_knut.keyword_matcher import KeywordMatcher
 
+try:
+    from .ki_index import kategorie_index
     from .models import Beleg, BelegKategorieML
 
     DJANGO_AVAILABLE = True
@@ -20,6 +20,100 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Schlüsselwörter je Belegkategorie (Klartext, Kleinschreibung)
+KATEGORIEN_REGELN = {
+    "BÜROMATERIAL": [
+        "papier",
+        "stift",
+        "ordner",
+        "toner",
+        "drucker",
+        "bürobedarf",
+        "schreibwaren",
+        "kartusche",
+        "hefter",
+        "locher",
+    ],
+    "REISEKOSTEN": [
+        "hotel",
+        "bahn",
+        "flug",
+        "taxi",
+        "übernachtung",
+        "tankstelle",
+        "benzin",
+        "diesel",
+        "parken",
+        "maut",
+        "vignette",
+    ],
+    "MARKETING": [
+        "werbung",
+        "anzeige",
+        "google",
+        "facebook",
+        "instagram",
+        "adwords",
+        "seo",
+        "marketing",
+        "banner",
+        "plakat",
+        "flyer",
+    ],
+    "MIETE": [
+        "miete",
+        "nebenkosten",
+        "strom",
+        "gas",
+        "wasser",
+        "heizung",
+        "hausgeld",
+        "grundsteuer",
+        "müllgebühr",
+    ],
+    "VERSICHERUNG": [
+        "versicherung",
+        "prämie",
+        "police",
+        "schutz",
+        "haftpflicht",
+        "berufshaftpflicht",
+        "rechtsschutz",
+    ],
+    "WEITERBILDUNG": [
+        "seminar",
+        "kurs",
+        "workshop",
+        "schulung",
+        "fortbildung",
+        "weiterbildung",
+        "training",
+        "coaching",
+    ],
+    "RECHNUNG_EINGANG": [
+        "rechnung",
+        "invoice",
+        "bestellung",
+        "lieferung",
+        "material",
+        "dienstleistung",
+        "service",
+    ],
+    "BETRIEBSAUSGABE": [
+        "gebühr",
+        "abonnement",
+        "lizenz",
+        "software",
+        "tool",
+        "wartung",
+        "reparatur",
+        "instandhaltung",
+    ],
+}
+
+# Einmal beim Import kompiliert, gemeinsam für Regeln und Feature-Extraktion
+REGEL_MATCHER = KeywordMatcher(KATEGORIEN_REGELN)
+
 
 class BelegKategorisierungsKI:
     """
@@ -31,6 +125,11 @@ class BelegKategorisierungsKI:
     def __init__(self):
         """Initialisiert die KI mit vordefinierten Regeln und Mustern."""
         self.kategorien_regeln = self._lade_kategorien_regeln()
+        self.regel_matcher = (
+            REGEL_MATCHER
+            if self.kategorien_regeln is KATEGORIEN_REGELN
+            else KeywordMatcher(self.kategorien_regeln)
+        )
         self.lieferanten_kategorien = self._lade_lieferanten_historie()
 
     def kategorisiere_beleg(
@@ -84,95 +183,7 @@ class BelegKategorisierungsKI:
 
         Peter Zwegat: "Regeln sind das Fundament - ohne die geht nichts!"
         """
-        return {
-            "BÜROMATERIAL": [
-                r"papier",
-                r"stift",
-                r"ordner",
-                r"toner",
-                r"drucker",
-                r"bürobedarf",
-                r"schreibwaren",
-                r"kartusche",
-                r"hefter",
-                r"locher",
-            ],
-            "REISEKOSTEN": [
-                r"hotel",
-                r"bahn",
-                r"flug",
-                r"taxi",
-                r"übernachtung",
-                r"tankstelle",
-                r"benzin",
-                r"diesel",
-                r"parken",
-                r"maut",
-                r"vignette",
-            ],
-            "MARKETING": [
-                r"werbung",
-                r"anzeige",
-                r"google",
-                r"facebook",
-                r"instagram",
-                r"adwords",
-                r"seo",
-                r"marketing",
-                r"banner",
-                r"plakat",
-                r"flyer",
-            ],
-            "MIETE": [
-                r"miete",
-                r"nebenkosten",
-                r"strom",
-                r"gas",
-                r"wasser",
-                r"heizung",
-                r"hausgeld",
-                r"grundsteuer",
-                r"müllgebühr",
-            ],
-            "VERSICHERUNG": [
-                r"versicherung",
-                r"prämie",
-                r"police",
-                r"schutz",
-                r"haftpflicht",
-                r"berufshaftpflicht",
-                r"rechtsschutz",
-            ],
-            "WEITERBILDUNG": [
-                r"seminar",
-                r"kurs",
-                r"workshop",
-                r"schulung",
-                r"fortbildung",
-                r"weiterbildung",
-                r"training",
-                r"coaching",
-            ],
-            "RECHNUNG_EINGANG": [
-                r"rechnung",
-                r"invoice",
-                r"bestellung",
-                r"lieferung",
-                r"material",
-                r"dienstleistung",
-                r"service",
-            ],
-            "BETRIEBSAUSGABE": [
-                r"gebühr",
-                r"abonnement",
-                r"lizenz",
-                r"software",
-                r"tool",
-                r"wartung",
-                r"reparatur",
-                r"instandhaltung",
-            ],
-        }
+        return KATEGORIEN_REGELN
 
     def _regelbasierte_kategorisierung(self, ocr_text: str) -> tuple[str, float]:
         """
@@ -183,16 +194,13 @@ class BelegKategorisierungsKI:
         if not ocr_text:
             return "SONSTIGES", 0.1
 
-        text_lower = ocr_text.lower()
+        # Ein Durchlauf über den Text für alle Kategorien
+        treffer = self.regel_matcher.treffer_je_kategorie(ocr_text)
         beste_kategorie = "SONSTIGES"
         beste_punkte = 0
 
-        for kategorie, regeln in self.kategorien_regeln.items():
-            punkte = 0
-            for regel in regeln:
-                matches = len(re.findall(regel, text_lower))
-                punkte += matches
-
+        for kategorie in self.kategorien_regeln:
+            punkte = treffer[kategorie]
             if punkte > beste_punkte:
                 beste_punkte = punkte
                 beste_kategorie = kategorie
@@ -208,20 +216,13 @@ class BelegKategorisierungsKI:
 
         Peter Zwegat: "Was früher richtig war, ist meist auch heute richtig!"
         """
-        # Suche nach ähnlichen Lieferantennamen in der Historie
-        historie = (
-            BelegKategorieML.objects.filter(lieferant_name__icontains=lieferant)
-            .values("korrekte_kategorie")
-            .annotate(count=Count("korrekte_kategorie"))
-            .order_by("-count")
-        )
+        # Trainingszeilen ähnlicher Lieferantennamen je Kategorie (Speicherindex)
+        historie = kategorie_index.lieferanten_kategorien(lieferant)
 
-        if historie.exists():
-            haeufigste = historie.first()
-            if haeufigste:
-                gesamt_count = sum(h["count"] for h in historie)
-                vertrauen = min(0.95, haeufigste["count"] / gesamt_count)
-                return haeufigste["korrekte_kategorie"], vertrauen
+        if historie:
+            haeufigste = max(historie, key=historie.get)  # type: ignore[arg-type]
+            vertrauen = min(0.95, historie[haeufigste] / sum(historie.values()))
+            return haeufigste, vertrauen
 
         return "SONSTIGES", 0.0
 
@@ -240,15 +241,8 @@ class BelegKategorisierungsKI:
         # Extrahiere Features
         features = self._extrahiere_features(ocr_text, lieferant, betrag)
 
-        # Finde ähnliche Trainingsdaten
-        beste_kategorie = "SONSTIGES"
-        beste_aehnlichkeit = 0.0
-
-        for training_data in BelegKategorieML.objects.all():
-            aehnlichkeit = self._berechne_aehnlichkeit(features, training_data)
-            if aehnlichkeit > beste_aehnlichkeit:
-                beste_aehnlichkeit = aehnlichkeit
-                beste_kategorie = training_data.korrekte_kategorie
+        # Ähnlichste Trainingsdaten - alle Zeilen in einer Array-Operation
+        beste_kategorie, beste_aehnlichkeit = kategorie_index.beste_kategorie(features)
 
         # Vertrauen basierend auf Ähnlichkeit
         vertrauen = min(0.85, beste_aehnlichkeit) if beste_aehnlichkeit > 0.3 else 0.0
@@ -267,19 +261,24 @@ class BelegKategorisierungsKI:
 
         # Schlüsselwörter extrahieren
         if ocr_text:
-            text_lower = ocr_text.lower()
-            features["schluesselwoerter"] = []  # Initialize as list
-            for kategorie_woerter in self.kategorien_regeln.values():
-                for wort in kategorie_woerter:
-                    if re.search(wort, text_lower):
-                        features["schluesselwoerter"].append(wort)
+            gefunden = self.regel_matcher.gefundene_woerter(ocr_text)
+            features["schluesselwoerter"] = [
+                wort
+                for kategorie_woerter in self.kategorien_regeln.values()
+                for wort in kategorie_woerter
+                if wort in gefunden
+            ]
 
         return features
 
     def _berechne_aehnlichkeit(
         self, features: dict, training_data: BelegKategorieML
     ) -> float:
-        """Berechnet Ähnlichkeit zwischen Features und Trainingsdaten."""
+        """
+        Berechnet Ähnlichkeit zwischen Features und einem Trainingseintrag.
+
+        Referenz für ``KategorieMLIndex`` (gleiche Gewichtung, eine Zeile).
+        """
         aehnlichkeit = 0.0
 
         # Lieferanten-Ähnlichkeit (40% Gewichtung)
@@ -390,6 +389,7 @@ class BelegKategorisierungsKI:
             benutzer_korrektur=True,
         )
 
+        # Der Speicherindex übernimmt die neue Zeile per post_save-Signal
         logger.info(f"KI-Training mit Beleg {beleg.id} abgeschlossen")
 
 
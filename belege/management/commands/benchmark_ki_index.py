@@ -0,0 +1,134 @@
+"""
+Management Command: Benchmark der ML-Kategorisierung
+====================================================
+
+Vergleicht die bisherige Bewertung (alle ``BelegKategorieML``-Zeilen laden,
+JSON parsen, Ähnlichkeit einzeln berechnen) mit dem ``KategorieMLIndex``
+(eine Array-Operation über alle Trainingszeilen).
+
+Alle Testdaten werden in einer Transaktion angelegt und am Ende wieder
+zurückgerollt - die Datenbank bleibt unverändert.
+
+Beispiel:
+    python manage.py benchmark_ki_index --anzahl 100000
+"""
+
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from belege.ki_index import kategorie_index
+from belege.ki_service import BelegKategorisierungsKI
+from belege.models import BelegKategorieML
+
+KATEGORIEN = ["RECHNUNG_EINGANG", "RECHNUNG_AUSGANG", "QUITTUNG", "KONTOAUSZUG"]
+BEREICHE = ["0-50", "50-200", "200-1000", "1000+", "unbekannt"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark: ML-Kategorisierung zeilenweise vs. Speicherindex"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--anzahl",
+            type=int,
+            default=100_000,
+            help="Anzahl synthetischer Trainingszeilen (Standard: 100000)",
+        )
+        parser.add_argument(
+            "--belege",
+            type=int,
+            default=20,
+            help="Anzahl zu kategorisierender Belege",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=5_000,
+            help="Batch-Größe für bulk_create",
+        )
+
+    def handle(self, *args, **options):
+        anzahl = options["anzahl"]
+        ki = BelegKategorisierungsKI()
+        zufall = random.Random(42)  # noqa: S311 - nur Testdaten
+        woerter = sorted(
+            {wort for regeln in ki.kategorien_regeln.values() for wort in regeln}
+        )
+
+        with transaction.atomic():
+            self.stdout.write(f"🎯 Erzeuge {anzahl:,} synthetische Trainingszeilen...")
+            self._erzeuge_trainingsdaten(anzahl, woerter, zufall, options["batch"])
+
+            anfragen = [
+                {
+                    "schluesselwoerter": zufall.sample(woerter, zufall.randint(0, 6)),
+                    "lieferant": f"Lieferant {zufall.randrange(2000)}",
+                    "betrag_bereich": zufall.choice(BEREICHE),
+                }
+                for _ in range(options["belege"])
+            ]
+
+            start = time.perf_counter()
+            alt = [self._zeilenweise(ki, features) for features in anfragen]
+            alt_zeit = (time.perf_counter() - start) / len(anfragen)
+
+            start = time.perf_counter()
+            kategorie_index.laden()
+            lade_zeit = time.perf_counter() - start
+
+            start = time.perf_counter()
+            neu = [kategorie_index.beste_kategorie(features) for features in anfragen]
+            neu_zeit = (time.perf_counter() - start) / len(anfragen)
+
+            # Testdaten verwerfen (bulk_create löst keine Signals aus)
+            transaction.set_rollback(True)
+        kategorie_index.invalidieren()
+
+        for (alt_kat, alt_wert), (neu_kat, neu_wert) in zip(alt, neu, strict=True):
+            if abs(alt_wert - neu_wert) > 1e-9 or (alt_wert > 0 and alt_kat != neu_kat):
+                raise CommandError("❌ Ergebnisse weichen ab - Index ist fehlerhaft!")
+
+        self.stdout.write(self.style.SUCCESS("=== KI-Index-Benchmark ==="))
+        self.stdout.write(f"  Zeilenweise:      {alt_zeit * 1000:9.1f}ms pro Beleg")
+        self.stdout.write(f"  Index laden:      {lade_zeit * 1000:9.1f}ms (einmalig)")
+        self.stdout.write(f"  Speicherindex:    {neu_zeit * 1000:9.1f}ms pro Beleg")
+        if neu_zeit > 0:
+            self.stdout.write(f"  Faktor:           {alt_zeit / neu_zeit:9.1f}x")
+        self.stdout.write("  Ergebnis identisch: ✓")
+
+    @staticmethod
+    def _zeilenweise(ki, features):
+        """Bisheriges Verfahren: jede Trainingszeile einzeln bewerten."""
+        beste_kategorie = "SONSTIGES"
+        beste_aehnlichkeit = 0.0
+        for training_data in BelegKategorieML.objects.order_by("trainiert_am", "pk"):
+            aehnlichkeit = ki._berechne_aehnlichkeit(features, training_data)
+            if aehnlichkeit >= beste_aehnlichkeit and aehnlichkeit > 0:
+                beste_aehnlichkeit = aehnlichkeit
+                beste_kategorie = training_data.korrekte_kategorie
+        return beste_kategorie, beste_aehnlichkeit
+
+    @staticmethod
+    def _erzeuge_trainingsdaten(anzahl, woerter, zufall, batch):
+        puffer = []
+        for _ in range(anzahl):
+            puffer.append(
+                BelegKategorieML(
+                    schluesselwoerter=json.dumps(
+                        zufall.sample(woerter, zufall.randint(0, 8))
+                    ),
+                    lieferant_name=f"Lieferant {zufall.randrange(2000)} GmbH",
+                    betrag_bereich=zufall.choice(BEREICHE),
+                    korrekte_kategorie=zufall.choice(KATEGORIEN),
+                    ist_einnahme=zufall.random() < 0.3,
+                )
+            )
+            if len(puffer) >= batch:
+                BelegKategorieML.objects.bulk_create(puffer)
+                puffer = []
+        if puffer:
+            BelegKategorieML.objects.bulk_create(puffer)
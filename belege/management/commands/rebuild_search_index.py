@@ -0,0 +1,61 @@
+"""
+Management Command: Suchindex neu aufbauen
+==========================================
+
+Füllt den Volltextindex für Belege und Dokumente (SQLite FTS5 bzw.
+PostgreSQL ``tsvector``) komplett neu - z.B. nach Massenimporten ohne
+Signals oder nach einem Datenbank-Restore. Fehlende FTS5-Tabellen werden
+dabei angelegt, die PostgreSQL-Spalte kommt aus den Migrationen.
+
+Beispiel:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --modell dokumente.Dokument
+"""
+
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from llkjj_knut import volltextsuche
+
+
+class Command(BaseCommand):
+    help = "Baut den Volltext-Suchindex für Belege und Dokumente neu auf"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modell",
+            help="Nur dieses Modell neu aufbauen (z.B. belege.Beleg)",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Datenbank-Alias (Standard: default)",
+        )
+
+    def handle(self, *args, **options):
+        model = None
+        if options.get("modell"):
+            try:
+                model = apps.get_model(options["modell"])
+            except (LookupError, ValueError) as e:
+                raise CommandError(f"Unbekanntes Modell: {options['modell']}") from e
+
+        if volltextsuche.backend(options["database"]) is None:
+            raise CommandError(
+                "Diese Datenbank unterstützt keine Volltextsuche "
+                "(SQLite ohne FTS5?) - die Suche nutzt icontains."
+            )
+
+        self.stdout.write("🔄 Baue Suchindex neu auf...")
+        start = time.perf_counter()
+        ergebnis = volltextsuche.neu_aufbauen(model=model, alias=options["database"])
+
+        for label, anzahl in ergebnis.items():
+            self.stdout.write(f"   {label}: {anzahl} Einträge")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Suchindex in {time.perf_counter() - start:.2f}s aufgebaut"
+            )
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("belege", "0004_belegkategorieml_beleg_benutzer_bestaetigt_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="beleg",
+            name="datei_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="SHA-256 des Dateiinhalts (Schlüssel für Thumbnails)",
+                max_length=64,
+                verbose_name="Datei-Hash",
+            ),
+        ),
+    ]
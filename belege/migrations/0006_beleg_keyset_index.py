@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index für die Keyset-Pagination der Belegliste (hochgeladen_am, id)."""
+
+    dependencies = [
+        ("belege", "0005_beleg_datei_hash"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="beleg",
+            index=models.Index(
+                fields=["-hochgeladen_am", "-id"], name="idx_beleg_keyset"
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+from llkjj_knut.migrationen import NurPostgreSQL
+
+
+class Migration(migrations.Migration):
+    """
+    Volltextsuche unter PostgreSQL (siehe ``llkjj_knut/volltextsuche.py``).
+
+    Spalte ``such_vektor`` (``tsvector``) mit GIN-Index, gefüllt mit den
+    gewichteten Suchtexten aus ``BelegeConfig.ready``. Danach pflegen die
+    Signals den Vektor. Unter SQLite legt ``post_migrate`` die FTS5-Tabelle
+    an, hier passiert nichts.
+    """
+
+    dependencies = [
+        ("belege", "0006_beleg_keyset_index"),
+        ("buchungen", "0001_initial"),
+    ]
+
+    operations = [
+        NurPostgreSQL(
+            sql="ALTER TABLE belege_beleg ADD COLUMN IF NOT EXISTS such_vektor tsvector",
+            reverse_sql="ALTER TABLE belege_beleg DROP COLUMN IF EXISTS such_vektor",
+        ),
+        NurPostgreSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS belege_beleg_such_gin "
+                "ON belege_beleg USING GIN (such_vektor)"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS belege_beleg_such_gin",
+        ),
+        NurPostgreSQL(
+            sql="""
+                UPDATE belege_beleg b SET such_vektor =
+                    setweight(to_tsvector('german', concat_ws(' ', b.beschreibung, (
+                        SELECT g.name FROM buchungen_geschaeftspartner g
+                        WHERE g.id = b.geschaeftspartner_id
+                    ))), 'A')
+                    || setweight(to_tsvector('german', b.original_dateiname), 'B')
+                    || setweight(to_tsvector('german', b.ocr_text), 'C')
+                WHERE b.such_vektor IS NULL
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
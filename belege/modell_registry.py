@@ -0,0 +1,296 @@
+"""
+Prozessweite Registry für die großen KI-Modelle (spaCy, EasyOCR, Sentence Transformer).
+
+Jedes Modell wird höchstens einmal pro Prozess geladen - und zwar erst beim
+ersten Zugriff. Mehrere Threads, die gleichzeitig dasselbe Modell anfordern,
+warten auf denselben Ladevorgang; verschiedene Modelle laden parallel.
+
+Speicherbudget (optional, siehe Settings):
+
+- ``KI_MODELL_SPEICHER_MB``: Obergrenze für alle geladenen Modelle. Passt ein
+  neues Modell nicht mehr hinein, werden die am längsten unbenutzten Modelle
+  entladen.
+- ``KI_MODELL_LEERLAUF_SEKUNDEN``: Modelle, die so lange nicht benutzt wurden,
+  werden entladen.
+
+Fehlt ein Paket oder Modell, merkt sich die Registry den Fehler; es wird nicht
+bei jedem Beleg erneut versucht.
+
+Peter Zwegat: "Man holt den Aktenordner einmal aus dem Keller - nicht für jedes Blatt!"
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Mehrsprachiges Modell (Deutsch) für semantische Ähnlichkeit
+SENTENCE_MODELL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Bevorzugt das große deutsche Modell, sonst das kleine
+SPACY_MODELLE = ("de_core_news_lg", "de_core_news_sm")
+
+
+class ModellNichtVerfuegbarError(RuntimeError):
+    """Ein Modell kann in diesem Prozess nicht geladen werden."""
+
+
+def _lade_spacy():
+    import spacy
+
+    for name in getattr(settings, "KI_SPACY_MODELLE", SPACY_MODELLE):
+        try:
+            nlp = spacy.load(name)
+        except OSError:
+            continue
+        logger.info(f"Deutsches spaCy-Modell '{name}' geladen")
+        return nlp
+    raise RuntimeError(
+        "Ein deutsches spaCy-Modell ist erforderlich. "
+        "Installieren Sie eines mit: python -m spacy download de_core_news_lg "
+        "oder python -m spacy download de_core_news_sm"
+    )
+
+
+def _lade_easyocr():
+    import easyocr
+
+    return easyocr.Reader(["de", "en"], gpu=False)
+
+
+def _lade_sentence_transformer():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(SENTENCE_MODELL)
+
+
+def _rss_mb() -> float | None:
+    """Aktueller Speicherverbrauch des Prozesses (nur Linux), sonst ``None``."""
+    try:
+        with open("/proc/self/statm") as datei:
+            seiten = int(datei.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return seiten * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class ModellRegistry:
+    """
+    Lädt Modelle bei Bedarf und hält sie für alle Aufrufer im Prozess bereit.
+
+    Modelle werden über einen Namen registriert; ``schaetzung_mb`` dient als
+    Größe fürs Speicherbudget, falls der tatsächliche Verbrauch nicht
+    messbar ist.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lader: dict[str, tuple] = {}
+        self._lade_locks: dict[str, threading.Lock] = {}
+        self._modelle: dict[str, object] = {}
+        self._groesse_mb: dict[str, float] = {}
+        self._zuletzt_benutzt: dict[str, float] = {}
+        self._fehler: dict[str, Exception] = {}
+        self._timer: threading.Timer | None = None
+
+    def registriere(self, name: str, lader, schaetzung_mb: float = 0) -> None:
+        """Meldet ein Modell an (ein vorhandener Eintrag wird ersetzt)."""
+        self.entlade(name)
+        with self._lock:
+            self._lader[name] = (lader, schaetzung_mb)
+            self._lade_locks[name] = threading.Lock()
+            self._fehler.pop(name, None)
+
+    # ------------------------------------------------------------------
+    # Zugriff
+    # ------------------------------------------------------------------
+
+    def hole(self, name: str):
+        """
+        Liefert das Modell und lädt es beim ersten Zugriff.
+
+        Raises:
+            ModellNichtVerfuegbarError: Paket oder Modell fehlt
+        """
+        if name not in self._lader:
+            raise KeyError(f"Unbekanntes Modell: {name}")
+
+        modell = self._benutze(name)
+        if modell is not None:
+            return modell
+
+        with self._lade_locks[name]:
+            # Ein anderer Thread war schneller
+            modell = self._benutze(name)
+            if modell is not None:
+                return modell
+            if name in self._fehler:
+                raise ModellNichtVerfuegbarError(name) from self._fehler[name]
+            modell = self._lade(name)
+
+        self._starte_timer()
+        return modell
+
+    def hole_optional(self, name: str):
+        """Wie ``hole``, liefert aber ``None``, wenn das Modell fehlt."""
+        try:
+            return self.hole(name)
+        except ModellNichtVerfuegbarError:
+            return None
+
+    def ist_geladen(self, name: str) -> bool:
+        return name in self._modelle
+
+    def _benutze(self, name: str):
+        with self._lock:
+            modell = self._modelle.get(name)
+            if modell is not None:
+                self._zuletzt_benutzt[name] = time.monotonic()
+            return modell
+
+    def _lade(self, name: str):
+        lader, schaetzung_mb = self._lader[name]
+        self._platz_schaffen(schaetzung_mb, ausser=name)
+
+        vorher = _rss_mb()
+        start = time.perf_counter()
+        try:
+            modell = lader()
+        except Exception as e:
+            # Auch ImportError: fehlende Pakete nicht bei jedem Beleg neu suchen
+            logger.warning(f"KI-Modell '{name}' nicht verfügbar: {e}")
+            with self._lock:
+                self._fehler[name] = e
+            raise ModellNichtVerfuegbarError(name) from e
+
+        nachher = _rss_mb()
+        gemessen = nachher - vorher if vorher is not None and nachher else 0
+        groesse = gemessen if gemessen > 0 else schaetzung_mb
+        with self._lock:
+            self._modelle[name] = modell
+            self._groesse_mb[name] = groesse
+            self._zuletzt_benutzt[name] = time.monotonic()
+        logger.info(
+            f"KI-Modell '{name}' geladen in {time.perf_counter() - start:.1f}s "
+            f"(~{groesse:.0f} MB)"
+        )
+        # Ein großes Modell kann ein kleineres Budget auch allein sprengen
+        self._platz_schaffen(0, ausser=name)
+        return modell
+
+    # ------------------------------------------------------------------
+    # Speicherverwaltung
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _budget_mb() -> float:
+        return float(getattr(settings, "KI_MODELL_SPEICHER_MB", 0) or 0)
+
+    @staticmethod
+    def _leerlauf_sekunden() -> float:
+        return float(getattr(settings, "KI_MODELL_LEERLAUF_SEKUNDEN", 0) or 0)
+
+    def belegter_speicher_mb(self) -> float:
+        with self._lock:
+            return sum(self._groesse_mb.values())
+
+    def _platz_schaffen(self, benoetigt_mb: float, ausser: str) -> None:
+        """Entlädt die am längsten unbenutzten Modelle, bis das Budget passt."""
+        budget = self._budget_mb()
+        if not budget:
+            return
+        while True:
+            with self._lock:
+                kandidaten = [n for n in self._modelle if n != ausser]
+                belegt = sum(self._groesse_mb.values())
+                if belegt + benoetigt_mb <= budget or not kandidaten:
+                    return
+                aeltestes = min(kandidaten, key=self._zuletzt_benutzt.__getitem__)
+            logger.info(
+                f"KI-Speicherbudget ({budget:.0f} MB) erreicht - entlade '{aeltestes}'"
+            )
+            self.entlade(aeltestes)
+
+    def aufraeumen(self) -> list[str]:
+        """Entlädt Modelle, die länger als die Leerlaufzeit unbenutzt sind."""
+        leerlauf = self._leerlauf_sekunden()
+        if not leerlauf:
+            return []
+        grenze = time.monotonic() - leerlauf
+        with self._lock:
+            unbenutzt = [n for n, t in self._zuletzt_benutzt.items() if t <= grenze]
+        for name in unbenutzt:
+            logger.info(f"KI-Modell '{name}' seit {leerlauf:.0f}s unbenutzt - entlade")
+            self.entlade(name)
+        return unbenutzt
+
+    def _starte_timer(self) -> None:
+        """Prüft nach Ablauf der Leerlaufzeit im Hintergrund auf unbenutzte Modelle."""
+        leerlauf = self._leerlauf_sekunden()
+        if not leerlauf:
+            return
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Timer(leerlauf, self._timer_abgelaufen)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timer_abgelaufen(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.aufraeumen()
+        if self._modelle:
+            self._starte_timer()
+
+    def entlade(self, name: str) -> None:
+        """Gibt ein Modell frei (laufende Aufrufer behalten ihre Referenz)."""
+        with self._lock:
+            modell = self._modelle.pop(name, None)
+            self._groesse_mb.pop(name, None)
+            self._zuletzt_benutzt.pop(name, None)
+        if modell is not None:
+            del modell
+            gc.collect()
+
+    def entlade_alle(self) -> None:
+        """Entlädt alle Modelle und vergisst gemerkte Ladefehler."""
+        for name in list(self._modelle):
+            self.entlade(name)
+        with self._lock:
+            self._fehler.clear()
+
+    def aufwaermen(self, namen=None) -> dict[str, bool]:
+        """
+        Lädt Modelle vorab, z.B. beim Start eines Celery-Workers.
+
+        Args:
+            namen: Modellnamen; ohne Angabe ``settings.KI_MODELLE_AUFWAERMEN``
+
+        Returns:
+            Name -> ``True``, wenn das Modell bereitsteht
+        """
+        if namen is None:
+            namen = getattr(settings, "KI_MODELLE_AUFWAERMEN", [])
+        ergebnis = {}
+        for name in namen:
+            try:
+                self.hole(name)
+                ergebnis[name] = True
+            except (KeyError, ModellNichtVerfuegbarError):
+                ergebnis[name] = False
+        return ergebnis
+
+
+# Eine Registry pro Prozess
+modelle = ModellRegistry()
+modelle.registriere("spacy", _lade_spacy, schaetzung_mb=600)
+modelle.registriere("easyocr", _lade_easyocr, schaetzung_mb=400)
+modelle.registriere(
+    "sentence_transformer", _lade_sentence_transformer, schaetzung_mb=500
+)
@@ -8,6 +8,8 @@ from django.core.files.base import ContentFile
 from django.core.validators import FileExtensionValidator
 from django.db import models
 
+from .thumbnails import berechne_datei_hash
+
 logger = logging.getLogger(__name__)
 
 
@@ -199,6 +201,14 @@ class Beleg(models.Model):
         default=0, help_text="Dateigröße in Bytes", verbose_name="Dateigröße"
     )
 
+    datei_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="SHA-256 des Dateiinhalts (Schlüssel für Thumbnails)",
+        verbose_name="Datei-Hash",
+    )
+
     # Belegdaten
     beleg_typ = models.CharField(
         max_length=20,
@@ -320,6 +330,8 @@ class Beleg(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["geschaeftspartner"]),
             models.Index(fields=["betrag"]),
+            # Keyset-Pagination der Belegliste (llkjj_knut.keyset)
+            models.Index(fields=["-hochgeladen_am", "-id"], name="idx_beleg_keyset"),
         ]
 
     def __str__(self):
@@ -335,6 +347,22 @@ class Beleg(models.Model):
         """Developer-freundliche Repräsentation"""
         return f"<Beleg: {self.beleg_typ} - {self.betrag}€ - {self.status}>"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instanz = super().from_db(db, field_names, values)
+        # Merken, zu welcher Datei der gespeicherte Hash gehört
+        instanz._gespeicherte_datei = dict(zip(field_names, values, strict=True)).get(
+            "datei"
+        )
+        return instanz
+
+    @property
+    def datei_geaendert(self) -> bool:
+        """Wurde seit dem Laden eine andere Datei zugewiesen?"""
+        return bool(self.datei) and self.datei.name != getattr(
+            self, "_gespeicherte_datei", None
+        )
+
     def save(self, *args, **kwargs):
         """Überschriebene Save-Methode für Metadaten-Extraktion"""
         if self.datei and not self.original_dateiname:
@@ -346,7 +374,22 @@ class Beleg(models.Model):
             if size:
                 self.dateigröße = size
 
+        if self.datei_geaendert:
+            try:
+                if self.datei._committed:
+                    with self.datei.open("rb"):
+                        self.datei_hash = berechne_datei_hash(self.datei)
+                else:
+                    # Frischer Upload: nicht schließen, wird gleich gespeichert
+                    self.datei_hash = berechne_datei_hash(self.datei)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Datei-Hash für {self.datei.name} fehlgeschlagen: {e}")
+                self.datei_hash = ""
+
+        # Für post_save: neue Datei -> Thumbnails vorab rendern
+        self._thumbnails_erzeugen = self.datei_geaendert
         super().save(*args, **kwargs)
+        self._gespeicherte_datei = self.datei.name if self.datei else None
 
     @property
     def dateiname(self):
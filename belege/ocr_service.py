@@ -4,15 +4,13 @@ OCR Service für automatische PDF-Texterkennung und Dokument-zu-Buchung-Zuordnun
 Peter Zwegat: "Technologie soll das Leben leichter machen - nicht schwerer!"
 """
 
-import io
 import logging
 import re
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
+from .modell_registry import modelle
+from .seiten_ocr import seiten_texte
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +25,6 @@ class OCRService:
 
     def __init__(self):
         self.confidence_threshold = 60  # Mindest-Vertrauen für OCR-Ergebnisse
-        self.easyocr_reader = None
-        self._initialize_easyocr()
 
         # Regex-Patterns für verschiedene Datentypen
         self.betrag_patterns = [
@@ -58,19 +54,15 @@ class OCRService:
             "Kunde",
         ]
 
-    def _initialize_easyocr(self):
-        """Initialisiert EasyOCR mit deutschen und englischen Sprachen."""
-        try:
-            import easyocr
+    @property
+    def easyocr_reader(self):
+        """
+        EasyOCR-Reader (Deutsch/Englisch) aus der Modell-Registry.
 
-            self.easyocr_reader = easyocr.Reader(["de", "en"], gpu=False)
-            logger.info("EasyOCR erfolgreich initialisiert")
-        except ImportError:
-            logger.warning("EasyOCR nicht verfügbar - verwende nur Tesseract")
-            self.easyocr_reader = None
-        except Exception as e:
-            logger.warning(f"EasyOCR konnte nicht initialisiert werden: {e}")
-            self.easyocr_reader = None
+        Wird erst beim ersten Zugriff geladen und von allen Instanzen im
+        Prozess geteilt; ``None``, wenn EasyOCR nicht verfügbar ist.
+        """
+        return modelle.hole_optional("easyocr")
 
     def extract_text_from_pdf(self, pdf_path: str) -> dict:
         """
@@ -80,26 +72,11 @@ class OCRService:
             Dict mit extrahierten Daten: text, betrag, datum, geschaeftspartner, confidence
         """
         try:
-            # PDF öffnen
-            doc = fitz.open(pdf_path)
-
-            # Text von allen Seiten extrahieren
-            full_text = ""
-            page_texts = []
-
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-
-                # Erst versuchen, direkt Text zu extrahieren
-                page_text = page.get_text()  # type: ignore[attr-defined]
-
-                if len(page_text.strip()) < 50:  # Wenig Text -> OCR verwenden
-                    page_text = self._ocr_from_page(page)
-
-                page_texts.append(page_text)
-                full_text += page_text + "\n"
-
-            doc.close()
+            # Seiten mit Textebene direkt, gescannte Seiten parallel per OCR
+            page_texts = seiten_texte(
+                pdf_path, zoom=2.0, tesseract_config=r"--oem 3 --psm 6 -l deu"
+            )
+            full_text = "".join(page_text + "\n" for page_text in page_texts)
 
             # Daten analysieren und extrahieren
             extracted_data = self._analyze_text(full_text)
@@ -123,29 +100,6 @@ class OCRService:
                 "error": str(e),
             }
 
-    def _ocr_from_page(self, page) -> str:
-        """
-        Führt OCR auf einer PDF-Seite durch.
-        """
-        try:
-            # Seite als Bild rendern
-            mat = fitz.Matrix(2.0, 2.0)  # 2x Skalierung für bessere OCR-Qualität
-            pix = page.get_pixmap(matrix=mat)
-
-            # PIL Image erstellen
-            img_data = pix.tobytes("ppm")
-            img = Image.open(io.BytesIO(img_data))
-
-            # OCR mit Tesseract (deutsche Sprache)
-            custom_config = r"--oem 3 --psm 6 -l deu"
-            text = pytesseract.image_to_string(img, config=custom_config)
-
-            return text
-
-        except Exception as e:
-            logger.warning(f"OCR fehlgeschlagen: {str(e)}")
-            return ""
-
     def _analyze_text(self, text: str) -> dict:
         """
         Analysiert extrahierten Text und findet relevante Informationen.
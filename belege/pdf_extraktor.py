@@ -17,10 +17,9 @@ try:
 except ImportError:
     PYMUPDF_AVAILABLE = False
 
-# Für OCR falls PDF nicht text-extractable ist
+# Für OCR falls PDF nicht text-extractable ist (braucht PyMuPDF und pytesseract)
 try:
-    import pytesseract  # noqa: F401
-    from pdf2image import convert_from_path  # noqa: F401
+    from .seiten_ocr import seiten_texte
 
     OCR_AVAILABLE = True
 except ImportError:
@@ -99,13 +98,8 @@ class PDFDatenExtraktor:
         Peter Zwegat: "Ran an die Buletten - äh, Daten!"
         """
         try:
-            # Zuerst versuchen wir Text direkt aus PDF zu extrahieren
-            text = self._extrahiere_text_direkt(pdf_pfad)
-
-            if not text.strip():
-                # Falls kein Text gefunden, OCR verwenden
-                logger.info("Kein Text im PDF gefunden, verwende OCR")
-                text = self._extrahiere_text_ocr(pdf_pfad)
+            # Textebene je Seite, OCR nur für gescannte Seiten
+            text = self._extrahiere_text_ocr(pdf_pfad)
 
             # Daten aus Text extrahieren
             daten = self._analysiere_text(text)
@@ -139,32 +133,29 @@ class PDFDatenExtraktor:
 
     def _extrahiere_text_ocr(self, pdf_pfad: str) -> str:
         """
-        Extrahiert Text per OCR aus PDF.
+        Extrahiert Text seitenweise: Seiten mit Textebene direkt, gescannte
+        Seiten per OCR - parallel, siehe ``belege.seiten_ocr``.
 
         Peter Zwegat: "Wenn's hart auf hart kommt,
         muss der Computer das PDF mit den Augen lesen!"
         """
         if not OCR_AVAILABLE:
-            logger.warning("OCR nicht verfügbar - pytesseract oder pdf2image fehlen")
-            return ""
+            logger.warning("OCR nicht verfügbar - pytesseract oder PyMuPDF fehlen")
+            return self._extrahiere_text_direkt(pdf_pfad)
 
-        text = ""
         try:
-            # PDF zu Bildern konvertieren
-            images = convert_from_path(pdf_pfad, dpi=300, first_page=1, last_page=3)
-
-            for i, image in enumerate(images):
-                logger.info(f"OCR auf Seite {i+1}")
-                # Tesseract auf Deutsch konfigurieren
-                ocr_text = pytesseract.image_to_string(
-                    image, lang="deu+eng", config="--psm 6"
-                )
-                text += ocr_text + "\n"
-
+            # 300 dpi, OCR wie bisher höchstens auf den ersten drei Seiten
+            seiten = seiten_texte(
+                pdf_pfad,
+                zoom=300 / 72,
+                tesseract_config="--psm 6 -l deu+eng",
+                max_ocr_seiten=3,
+            )
         except Exception as e:
             logger.error(f"OCR-Extraktion fehlgeschlagen: {e}")
+            return ""
 
-        return text
+        return "".join(text + "\n" for text in seiten)
 
     def _analysiere_text(self, text: str) -> dict[str, str | bool | float | None]:
         """
@@ -0,0 +1,199 @@
+"""
+Seitenweise Texterkennung für PDFs - parallel über einen Prozess-Pool.
+
+Für jede Seite wird zuerst die Textebene gelesen. Nur Seiten ohne (genug)
+Text werden gerendert und per Tesseract erkannt - und zwar gleichzeitig in
+mehreren Prozessen. Die Texte kommen immer in Seitenreihenfolge zurück.
+
+Die Anzahl Prozesse steuert ``settings.OCR_PROZESSE`` (Standard: Anzahl
+CPU-Kerne, ``1`` = alles nacheinander im aktuellen Prozess). Innerhalb eines
+Celery-Prefork-Workers dürfen keine Kindprozesse entstehen; dort übernehmen
+Threads - Tesseract läuft ohnehin als eigener Prozess.
+
+Verwendet von ``OCRService.extract_text_from_pdf`` und
+``PDFDatenExtraktor._extrahiere_text_ocr``.
+
+Peter Zwegat: "Dreißig Seiten? Dann packen eben alle mit an!"
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF
+import pytesseract
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Seiten mit weniger Zeichen in der Textebene gelten als gescannt
+MIN_TEXTLAYER_ZEICHEN = 50
+
+_pool = None
+_pool_groesse = 0
+_pool_lock = threading.Lock()
+
+
+def ocr_prozesse() -> int:
+    """Anzahl paralleler OCR-Prozesse laut Settings (mindestens 1)."""
+    anzahl = getattr(settings, "OCR_PROZESSE", None)
+    if anzahl is None:
+        anzahl = os.cpu_count() or 1
+    return max(1, int(anzahl))
+
+
+def _worker_start():
+    # Tesseract nutzt sonst pro Seite alle Kerne - parallel bremst das nur
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _hole_pool(groesse: int):
+    """Prozessweiter Pool; wird bei geänderter Größe neu angelegt."""
+    global _pool, _pool_groesse
+    with _pool_lock:
+        if _pool is None or _pool_groesse != groesse:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            if multiprocessing.current_process().daemon:
+                # Celery-Prefork: Daemon-Prozesse dürfen keine Kinder haben
+                _pool = ThreadPoolExecutor(
+                    max_workers=groesse, thread_name_prefix="seiten-ocr"
+                )
+            else:
+                # "spawn": keine geerbten DB-Verbindungen im Kindprozess
+                _pool = ProcessPoolExecutor(
+                    max_workers=groesse,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_worker_start,
+                )
+            _pool_groesse = groesse
+        return _pool
+
+
+def _verwerfe_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def ocr_seite(pdf_pfad: str, seite: int, zoom: float, tesseract_config: str) -> str:
+    """
+    Rendert eine Seite und erkennt den Text (läuft im Worker-Prozess).
+
+    Jeder Aufruf öffnet die PDF selbst - PyMuPDF-Dokumente lassen sich nicht
+    zwischen Prozessen übergeben.
+    """
+    with fitz.open(pdf_pfad) as doc:
+        pix = doc[seite].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    bild = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    return pytesseract.image_to_string(bild, config=tesseract_config)
+
+
+def _ocr_seite_im_pool(pdf_pfad, seite, zoom, tesseract_config):
+    """
+    Wie ``ocr_seite``, liefert Fehler aber als Text zurück.
+
+    Nicht jede Exception lässt sich zurück in den Hauptprozess übertragen
+    (z.B. ``TesseractNotFoundError``) - der Pool würde sonst abbrechen.
+    """
+    try:
+        return ocr_seite(pdf_pfad, seite, zoom, tesseract_config), None
+    except Exception as e:
+        return "", f"{type(e).__name__}: {e}"
+
+
+def _ocr_seriell(pdf_pfad, seiten, zoom, tesseract_config) -> dict[int, str]:
+    texte = {}
+    for seite in seiten:
+        try:
+            texte[seite] = ocr_seite(pdf_pfad, seite, zoom, tesseract_config)
+        except Exception as e:
+            logger.warning(f"OCR fehlgeschlagen (Seite {seite + 1}): {e}")
+            texte[seite] = ""
+    return texte
+
+
+def _ocr_parallel(pdf_pfad, seiten, zoom, tesseract_config):
+    try:
+        pool = _hole_pool(ocr_prozesse())
+        auftraege = {
+            seite: pool.submit(
+                _ocr_seite_im_pool, pdf_pfad, seite, zoom, tesseract_config
+            )
+            for seite in seiten
+        }
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning(f"OCR-Pool nicht verfügbar, arbeite seriell: {e}")
+        _verwerfe_pool()
+        return _ocr_seriell(pdf_pfad, seiten, zoom, tesseract_config)
+
+    texte = {}
+    for seite, auftrag in auftraege.items():
+        try:
+            texte[seite], fehler = auftrag.result()
+        except BrokenProcessPool as e:
+            logger.warning(f"OCR-Pool abgestürzt, arbeite seriell weiter: {e}")
+            _verwerfe_pool()
+            offen = [s for s in seiten if s not in texte]
+            texte.update(_ocr_seriell(pdf_pfad, offen, zoom, tesseract_config))
+            break
+        except Exception as e:
+            fehler = str(e)
+            texte[seite] = ""
+        if fehler:
+            logger.warning(f"OCR fehlgeschlagen (Seite {seite + 1}): {fehler}")
+    return texte
+
+
+def seiten_texte(
+    pdf_pfad: str,
+    zoom: float = 2.0,
+    tesseract_config: str = r"--oem 3 --psm 6 -l deu",
+    min_zeichen: int = MIN_TEXTLAYER_ZEICHEN,
+    max_ocr_seiten: int | None = None,
+) -> list[str]:
+    """
+    Text jeder Seite in Seitenreihenfolge.
+
+    Args:
+        pdf_pfad: Pfad zur PDF-Datei
+        zoom: Render-Skalierung für die OCR (1.0 = 72 dpi)
+        tesseract_config: Kommandozeilen-Optionen für Tesseract
+        min_zeichen: Seiten mit weniger Zeichen in der Textebene werden per
+            OCR gelesen, alle anderen direkt
+        max_ocr_seiten: OCR nur auf den ersten n Seiten
+
+    Returns:
+        Liste mit einem Text je Seite
+    """
+    with fitz.open(pdf_pfad) as doc:
+        texte = [seite.get_text() for seite in doc]
+
+    ocr_seiten = [
+        nummer
+        for nummer, text in enumerate(texte)
+        if len(text.strip()) < min_zeichen
+        and (max_ocr_seiten is None or nummer < max_ocr_seiten)
+    ]
+    if not ocr_seiten:
+        return texte
+
+    prozesse = min(ocr_prozesse(), len(ocr_seiten))
+    logger.info(
+        f"OCR für {len(ocr_seiten)} von {len(texte)} Seiten ({prozesse} parallel)"
+    )
+    if prozesse > 1:
+        erkannt = _ocr_parallel(pdf_pfad, ocr_seiten, zoom, tesseract_config)
+    else:
+        erkannt = _ocr_seriell(pdf_pfad, ocr_seiten, zoom, tesseract_config)
+
+    for nummer, text in erkannt.items():
+        texte[nummer] = text
+    return texte
@@ -0,0 +1,47 @@
+"""
+Django Signals für Belege.
+
+Hält den Speicherindex der ML-Trainingsdaten (``KategorieMLIndex``) und die
+Thumbnail-Ablage aktuell.
+Peter Zwegat: "Was gelernt wurde, muss auch sofort wirken!"
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ki_index import kategorie_index
+from .models import Beleg, BelegKategorieML
+from .thumbnails import entferne_thumbnails
+
+
+@receiver(post_save, sender=BelegKategorieML)
+def trainingsdaten_gespeichert(sender, instance, created, **kwargs):
+    """Neue Trainingszeilen anhängen, geänderte verwerfen den Index."""
+    kategorie_index.nach_speichern(instance, neu=created)
+
+
+@receiver(post_delete, sender=BelegKategorieML)
+def trainingsdaten_geloescht(sender, instance, **kwargs):
+    """Gelöschte Trainingszeilen: Index neu laden."""
+    kategorie_index.invalidieren()
+
+
+@receiver(post_save, sender=Beleg)
+def beleg_gespeichert(sender, instance, **kwargs):
+    """Neue Datei: Thumbnails nach dem Commit per Celery vorab rendern."""
+    if getattr(instance, "_thumbnails_erzeugen", False):
+        from .tasks import starte_thumbnail_erzeugung
+
+        transaction.on_commit(partial(starte_thumbnail_erzeugung, instance.pk))
+
+
+@receiver(post_delete, sender=Beleg)
+def beleg_geloescht(sender, instance, **kwargs):
+    """Thumbnails entfernen, wenn kein anderer Beleg denselben Inhalt hat."""
+    if instance.datei_hash and not (
+        Beleg.objects.filter(datei_hash=instance.datei_hash).exists()
+    ):
+        entferne_thumbnails(instance.datei_hash)
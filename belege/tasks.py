@@ -110,6 +110,40 @@ def verarbeite_beleg_async(self, beleg_id):
         return {"status": "error", "message": str(exc)}
 
 
+def starte_thumbnail_erzeugung(beleg_id) -> None:
+    """
+    Reiht das Vorab-Rendern der Thumbnails ein.
+
+    Ohne erreichbaren Broker passiert nichts weiter - das Thumbnail entsteht
+    dann beim ersten Aufruf der Liste.
+    """
+    try:
+        erzeuge_thumbnails.apply_async(args=[str(beleg_id)], retry=False)
+    except Exception as e:
+        logger.info("Thumbnails für %s nicht vorab erzeugt: %s", beleg_id, e)
+
+
+@shared_task(ignore_result=True)
+def erzeuge_thumbnails(beleg_id):
+    """
+    Rendert die Thumbnails eines neu hochgeladenen Belegs in allen Größen.
+
+    Peter Zwegat: "Die Vorschau ist schon fertig, bevor jemand hinschaut!"
+    """
+    from .thumbnails import THUMBNAIL_AVAILABLE, hole_thumbnail, thumbnail_groessen
+
+    beleg = Beleg.objects.filter(id=beleg_id).first()
+    if beleg is None or not beleg.datei or not THUMBNAIL_AVAILABLE:
+        return
+
+    for groesse in thumbnail_groessen():
+        try:
+            hole_thumbnail(beleg, groesse)
+        except Exception as exc:
+            logger.warning("Thumbnail für %s fehlgeschlagen: %s", beleg_id, exc)
+            return
+
+
 @shared_task
 def batch_ki_training():
     """
@@ -0,0 +1,246 @@
+import json
+import os
+import random
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..embedding_cache import ReferenzEmbeddingCache
+from ..ki_index import KategorieMLIndex, kategorie_index
+from ..models import BelegKategorieML
+
+
+class KategorieMLIndexTest(TestCase):
+    """
+    Tests für den Speicherindex der ML-Kategorisierung.
+    Peter Zwegat: "Schneller darf es sein - aber nicht anders!"
+    """
+
+    def setUp(self):
+        kategorie_index.invalidieren()
+        self.addCleanup(kategorie_index.invalidieren)
+        # ki_service legt beim Import eine globale Instanz an (DB-Zugriff)
+        from ..ki_service import BelegKategorisierungsKI
+
+        self.ki = BelegKategorisierungsKI()
+
+    def _trainingszeile(self, woerter, lieferant, bereich, kategorie):
+        return BelegKategorieML.objects.create(
+            schluesselwoerter=json.dumps(woerter),
+            lieferant_name=lieferant,
+            betrag_bereich=bereich,
+            korrekte_kategorie=kategorie,
+            ist_einnahme=False,
+        )
+
+    def test_bewertung_wie_zeilenweise(self):
+        """Index und Einzelbewertung liefern dieselben Ähnlichkeiten."""
+        zufall = random.Random(7)  # noqa: S311 - nur Testdaten
+        woerter = ["rechnung", "quittung", "tankstelle", "hotel", "software", "miete"]
+        bereiche = ["0-50", "50-200", "200-1000", "1000+"]
+        zeilen = [
+            self._trainingszeile(
+                zufall.sample(woerter, zufall.randint(0, 4)),
+                f"Lieferant {zufall.randrange(5)}",
+                zufall.choice(bereiche),
+                zufall.choice(["RECHNUNG_EINGANG", "QUITTUNG"]),
+            )
+            for _ in range(40)
+        ]
+        # Kaputtes JSON zählt wie bisher nur über Lieferant und Betrag
+        zeilen.append(
+            BelegKategorieML.objects.create(
+                schluesselwoerter="kein json",
+                lieferant_name="Lieferant 1",
+                betrag_bereich="0-50",
+                korrekte_kategorie="SONSTIGES",
+                ist_einnahme=False,
+            )
+        )
+
+        features = {
+            "schluesselwoerter": ["rechnung", "hotel", "unbekannt"],
+            "lieferant": "lieferant 1",
+            "betrag_bereich": "0-50",
+        }
+        erwartet = [self.ki._berechne_aehnlichkeit(features, zeile) for zeile in zeilen]
+        punkte = kategorie_index.bewerte(features)
+
+        self.assertEqual(len(punkte), len(zeilen))
+        for soll, ist in zip(erwartet, punkte, strict=True):
+            self.assertAlmostEqual(soll, ist)
+
+    def test_training_erweitert_index_ohne_neu_laden(self):
+        self._trainingszeile(["tankstelle"], "Aral", "0-50", "QUITTUNG")
+        features = {
+            "schluesselwoerter": ["hotel"],
+            "lieferant": "Hotel Adlon",
+            "betrag_bereich": "200-1000",
+        }
+        self.assertEqual(self.ki._ml_kategorisierung("Hotel", "Hotel Adlon")[1], 0.0)
+        self.assertTrue(kategorie_index.geladen)
+
+        self._trainingszeile(["hotel"], "Hotel Adlon Berlin", "200-1000", "REISE")
+
+        with self.assertNumQueries(0):
+            kategorie, aehnlichkeit = kategorie_index.beste_kategorie(features)
+        self.assertEqual(kategorie, "REISE")
+        self.assertAlmostEqual(aehnlichkeit, 1.0)
+        self.assertEqual(kategorie_index.anzahl, 2)
+
+    def test_aenderung_und_loeschen_laden_neu(self):
+        zeile = self._trainingszeile(["software"], "JetBrains", "50-200", "SOFTWARE")
+        features = {
+            "schluesselwoerter": ["software"],
+            "lieferant": "JetBrains",
+            "betrag_bereich": "50-200",
+        }
+        self.assertEqual(kategorie_index.beste_kategorie(features)[0], "SOFTWARE")
+
+        zeile.korrekte_kategorie = "RECHNUNG_EINGANG"
+        zeile.save()
+        self.assertEqual(
+            kategorie_index.beste_kategorie(features)[0], "RECHNUNG_EINGANG"
+        )
+
+        zeile.delete()
+        self.assertEqual(kategorie_index.beste_kategorie(features), ("SONSTIGES", 0.0))
+
+    def test_anderer_prozess_gleicht_mit_datenbank_ab(self):
+        """Ein Index ohne Signale (anderer Worker) sieht neue Trainingszeilen."""
+        anderer = KategorieMLIndex()
+        features = {
+            "schluesselwoerter": ["lizenz"],
+            "lieferant": "Adobe",
+            "betrag_bereich": "50-200",
+        }
+        # Ohne gemeinsamen Cache bleibt die Version dort unverändert
+        with patch.object(anderer, "_aktuelle_version", return_value=1):
+            self.assertEqual(anderer.beste_kategorie(features), ("SONSTIGES", 0.0))
+            self._trainingszeile(["lizenz"], "Adobe Systems", "50-200", "SOFTWARE")
+            # Innerhalb der Prüffrist ohne Abfrage
+            with self.assertNumQueries(0):
+                self.assertEqual(anderer.beste_kategorie(features)[0], "SONSTIGES")
+            with override_settings(PROZESS_INDEX_PRUEF_SEKUNDEN=0):
+                self.assertEqual(anderer.beste_kategorie(features)[0], "SOFTWARE")
+
+            # Geänderte Zeilen ändern den Stempel nicht - die Höchstdauer greift
+            BelegKategorieML.objects.update(korrekte_kategorie="RECHNUNG_EINGANG")
+            with override_settings(PROZESS_INDEX_PRUEF_SEKUNDEN=0):
+                self.assertEqual(anderer.beste_kategorie(features)[0], "SOFTWARE")
+            with override_settings(PROZESS_INDEX_MAX_ALTER_SEKUNDEN=0):
+                self.assertEqual(
+                    anderer.beste_kategorie(features)[0], "RECHNUNG_EINGANG"
+                )
+
+    def test_lieferanten_historie_aus_index(self):
+        for _ in range(3):
+            self._trainingszeile([], "Deutsche Bahn AG", "50-200", "REISE")
+        self._trainingszeile([], "Deutsche Bahn AG", "0-50", "QUITTUNG")
+
+        kategorie, vertrauen = self.ki._pruefe_lieferanten_historie("deutsche bahn")
+
+        self.assertEqual(kategorie, "REISE")
+        self.assertAlmostEqual(vertrauen, 0.75)
+
+
+class ZaehlendesModell:
+    """Deterministisches Mini-Modell, zählt die encode-Aufrufe."""
+
+    def __init__(self):
+        self.aufrufe = 0
+
+    def encode(self, texte):
+        self.aufrufe += 1
+        return np.array(
+            [[len(text), text.count("a"), text.count("e") - 2.0] for text in texte],
+            dtype=np.float32,
+        )
+
+
+class ReferenzEmbeddingCacheTest(TestCase):
+    """Tests für den persistenten Embedding-Cache."""
+
+    REFERENZTEXTE = {
+        "REISEKOSTEN": ["hotel bahn", "taxi flug übernachtung"],
+        "MIETE": ["miete nebenkosten strom"],
+        "LEER": [],
+        "SOFTWARE": ["lizenz software abonnement", "tool", "wartung"],
+    }
+
+    def setUp(self):
+        verzeichnis = tempfile.TemporaryDirectory()
+        self.addCleanup(verzeichnis.cleanup)
+        einstellungen = override_settings(KI_EMBEDDING_CACHE_DIR=verzeichnis.name)
+        einstellungen.enable()
+        self.addCleanup(einstellungen.disable)
+        self.verzeichnis = verzeichnis.name
+
+    def test_einmal_berechnen_dann_aus_datei(self):
+        modell = ZaehlendesModell()
+        kategorien, matrix, text_hash = ReferenzEmbeddingCache().hole_oder_berechne(
+            modell, "test/modell", self.REFERENZTEXTE
+        )
+        self.assertEqual(modell.aufrufe, 1)
+        self.assertEqual(kategorien, ["REISEKOSTEN", "MIETE", "SOFTWARE"])
+        self.assertIsInstance(matrix, np.memmap)
+
+        # Neuer Prozess: gleiche Datei, kein encode
+        zweiter = ReferenzEmbeddingCache().hole_oder_berechne(
+            modell, "test/modell", self.REFERENZTEXTE
+        )
+        self.assertEqual(modell.aufrufe, 1)
+        self.assertEqual(zweiter[2], text_hash)
+
+        # Geänderte Referenztexte: neuer Hash, alte Datei wird entfernt
+        geaendert = {**self.REFERENZTEXTE, "MIETE": ["miete"]}
+        ReferenzEmbeddingCache().hole_oder_berechne(modell, "test/modell", geaendert)
+        self.assertEqual(modell.aufrufe, 2)
+        self.assertEqual(len(os.listdir(self.verzeichnis)), 2)  # .npy + .json
+
+    def test_bewertung_wie_mittelwert_je_kategorie(self):
+        modell = ZaehlendesModell()
+        kategorien, matrix, _ = ReferenzEmbeddingCache().hole_oder_berechne(
+            modell, "test/modell", self.REFERENZTEXTE
+        )
+        texte = ["hotel am bahnhof", "software wartung", "", "miete"]
+
+        ergebnisse = ReferenzEmbeddingCache.bewerte(
+            modell.encode(texte), kategorien, matrix
+        )
+
+        for text, (kategorie, aehnlichkeit) in zip(texte, ergebnisse, strict=True):
+            # Bisheriges Verfahren: Mittelwert der Skalarprodukte je Kategorie
+            text_embedding = modell.encode([text])
+            beste, beste_wert = "SONSTIGES", 0.0
+            for kat, referenz in self.REFERENZTEXTE.items():
+                if not referenz:
+                    continue
+                wert = np.mean(np.dot(text_embedding, modell.encode(referenz).T)[0])
+                if wert > beste_wert:
+                    beste, beste_wert = kat, wert
+            self.assertEqual(kategorie, beste)
+            self.assertAlmostEqual(aehnlichkeit, float(beste_wert), places=3)
+
+    def test_batch_mit_einem_encode(self):
+        from ..erweiterte_ki import ErweiterteKI
+
+        ki = ErweiterteKI.__new__(ErweiterteKI)
+        ki.sentence_model = ZaehlendesModell()
+        ki._lade_kategorien_referenztexte = lambda: self.REFERENZTEXTE
+        cache.delete("kategorien_referenztexte_hash")
+        self.addCleanup(cache.delete, "kategorien_referenztexte_hash")
+
+        einzeln = ki.semantische_kategorisierung("hotel bahn")
+        ki.sentence_model.aufrufe = 0
+
+        ergebnisse = ki.semantische_kategorisierung_batch(
+            ["hotel bahn", "miete", "tool"] * 10
+        )
+
+        self.assertEqual(ki.sentence_model.aufrufe, 1)
+        self.assertEqual(len(ergebnisse), 30)
+        self.assertEqual(ergebnisse[0], einzeln)
@@ -0,0 +1,129 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from ..modell_registry import (
+    ModellNichtVerfuegbarError,
+    ModellRegistry,
+    _lade_easyocr,
+    modelle,
+)
+from ..ocr_service import OCRService
+
+
+class ZaehlenderLader:
+    """Liefert bei jedem Aufruf ein neues Objekt und zählt die Aufrufe."""
+
+    def __init__(self, dauer=0.0, fehler=None):
+        self.aufrufe = 0
+        self.dauer = dauer
+        self.fehler = fehler
+
+    def __call__(self):
+        self.aufrufe += 1
+        time.sleep(self.dauer)
+        if self.fehler:
+            raise self.fehler
+        return object()
+
+
+@patch("belege.modell_registry._rss_mb", return_value=None)
+class ModellRegistryTest(SimpleTestCase):
+    """
+    Tests für die prozessweite Modell-Registry.
+    Peter Zwegat: "Einmal laden, oft benutzen!"
+    """
+
+    def setUp(self):
+        self.registry = ModellRegistry()
+        self.addCleanup(self.registry.entlade_alle)
+
+    def test_laedt_erst_beim_ersten_zugriff_und_nur_einmal(self, _rss):
+        lader = ZaehlenderLader(dauer=0.05)
+        self.registry.registriere("nlp", lader)
+        self.assertEqual(lader.aufrufe, 0)
+
+        ergebnisse = []
+        threads = [
+            threading.Thread(
+                target=lambda: ergebnisse.append(self.registry.hole("nlp"))
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(lader.aufrufe, 1)
+        self.assertEqual(len({id(modell) for modell in ergebnisse}), 1)
+
+    def test_fehlendes_paket_wird_nur_einmal_versucht(self, _rss):
+        lader = ZaehlenderLader(fehler=ImportError("easyocr fehlt"))
+        self.registry.registriere("ocr", lader)
+
+        with self.assertRaises(ModellNichtVerfuegbarError):
+            self.registry.hole("ocr")
+        self.assertIsNone(self.registry.hole_optional("ocr"))
+        self.assertEqual(lader.aufrufe, 1)
+
+    @override_settings(KI_MODELL_SPEICHER_MB=1000)
+    def test_speicherbudget_entlaedt_am_laengsten_unbenutztes(self, _rss):
+        for name in ("spacy", "ocr", "sentence"):
+            self.registry.registriere(name, ZaehlenderLader(), schaetzung_mb=400)
+
+        self.registry.hole("spacy")
+        self.registry.hole("ocr")
+        self.registry.hole("spacy")  # ocr ist jetzt am längsten unbenutzt
+        self.registry.hole("sentence")
+
+        self.assertTrue(self.registry.ist_geladen("spacy"))
+        self.assertFalse(self.registry.ist_geladen("ocr"))
+        self.assertTrue(self.registry.ist_geladen("sentence"))
+        self.assertEqual(self.registry.belegter_speicher_mb(), 800)
+
+    @override_settings(KI_MODELL_LEERLAUF_SEKUNDEN=600)
+    def test_leerlauf_entlaedt_unbenutzte_modelle(self, _rss):
+        self.addCleanup(lambda: self.registry._timer and self.registry._timer.cancel())
+        lader = ZaehlenderLader()
+        self.registry.registriere("nlp", lader)
+        self.registry.registriere("ocr", ZaehlenderLader())
+
+        with patch("belege.modell_registry.time.monotonic", return_value=1000.0):
+            self.registry.hole("nlp")
+            self.registry.hole("ocr")
+        with patch("belege.modell_registry.time.monotonic", return_value=1500.0):
+            self.registry.hole("ocr")
+        with patch("belege.modell_registry.time.monotonic", return_value=1700.0):
+            self.assertEqual(self.registry.aufraeumen(), ["nlp"])
+
+        self.assertFalse(self.registry.ist_geladen("nlp"))
+        self.assertTrue(self.registry.ist_geladen("ocr"))
+        # Beim nächsten Zugriff wird neu geladen
+        self.registry.hole("nlp")
+        self.assertEqual(lader.aufrufe, 2)
+
+    def test_aufwaermen(self, _rss):
+        self.registry.registriere("nlp", ZaehlenderLader())
+        self.registry.registriere("ocr", ZaehlenderLader(fehler=OSError("kaputt")))
+
+        self.assertEqual(
+            self.registry.aufwaermen(["nlp", "ocr", "unbekannt"]),
+            {"nlp": True, "ocr": False, "unbekannt": False},
+        )
+        self.assertTrue(self.registry.ist_geladen("nlp"))
+
+    def test_ocr_service_teilt_reader(self, _rss):
+        lader = ZaehlenderLader()
+        modelle.registriere("easyocr", lader)
+        self.addCleanup(
+            modelle.registriere, "easyocr", _lade_easyocr, schaetzung_mb=400
+        )
+
+        erster, zweiter = OCRService(), OCRService()
+        self.assertEqual(lader.aufrufe, 0)
+
+        self.assertIs(erster.easyocr_reader, zweiter.easyocr_reader)
+        self.assertEqual(lader.aufrufe, 1)
@@ -0,0 +1,86 @@
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import fitz
+from django.test import SimpleTestCase, override_settings
+
+from .. import seiten_ocr
+
+TEXTSEITE = "Rechnung Nr. 2024-001 vom 15.03.2024 - Gesamtbetrag 119,00 EUR inkl. MwSt."
+
+
+class SeitenOCRTest(SimpleTestCase):
+    """
+    Tests für die seitenweise (parallele) OCR.
+    Peter Zwegat: "Jede Seite zählt - und zwar in der richtigen Reihenfolge!"
+    """
+
+    def setUp(self):
+        verzeichnis = tempfile.TemporaryDirectory()
+        self.addCleanup(verzeichnis.cleanup)
+        self.pdf_pfad = str(Path(verzeichnis.name) / "gemischt.pdf")
+
+        # Seiten 1 und 4 mit Textebene, 2, 3 und 5 "gescannt" (ohne Text)
+        with fitz.open() as doc:
+            for nummer in range(5):
+                seite = doc.new_page()
+                if nummer in (0, 3):
+                    seite.insert_text((50, 72), TEXTSEITE)
+            doc.save(self.pdf_pfad)
+
+        self.aufrufe = []
+        self.lock = threading.Lock()
+
+    def _fake_ocr(self, pdf_pfad, seite, zoom, tesseract_config):
+        # Spätere Seiten sind schneller fertig - Reihenfolge muss trotzdem stimmen
+        time.sleep(0.01 * (5 - seite))
+        with self.lock:
+            self.aufrufe.append(seite)
+        return f"OCR Seite {seite + 1}"
+
+    @override_settings(OCR_PROZESSE=1)
+    def test_nur_seiten_ohne_textebene_per_ocr(self):
+        with patch.object(seiten_ocr, "ocr_seite", self._fake_ocr):
+            texte = seiten_ocr.seiten_texte(self.pdf_pfad)
+
+        self.assertEqual(sorted(self.aufrufe), [1, 2, 4])
+        self.assertIn(TEXTSEITE, texte[0])
+        self.assertIn(TEXTSEITE, texte[3])
+        self.assertEqual(
+            [texte[1], texte[2], texte[4]],
+            ["OCR Seite 2", "OCR Seite 3", "OCR Seite 5"],
+        )
+
+    @override_settings(OCR_PROZESSE=3)
+    def test_parallel_in_seitenreihenfolge(self):
+        pool = ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(pool.shutdown)
+        with (
+            patch.object(seiten_ocr, "ocr_seite", self._fake_ocr),
+            patch.object(seiten_ocr, "_hole_pool", return_value=pool),
+        ):
+            texte = seiten_ocr.seiten_texte(self.pdf_pfad)
+
+        self.assertEqual(len(texte), 5)
+        self.assertEqual(
+            [texte[1], texte[2], texte[4]],
+            ["OCR Seite 2", "OCR Seite 3", "OCR Seite 5"],
+        )
+
+    @override_settings(OCR_PROZESSE=1)
+    def test_max_ocr_seiten_und_fehler_je_seite(self):
+        def fake_ocr(pdf_pfad, seite, zoom, tesseract_config):
+            if seite == 1:
+                raise RuntimeError("Tesseract kaputt")
+            return "erkannt"
+
+        with patch.object(seiten_ocr, "ocr_seite", fake_ocr):
+            texte = seiten_ocr.seiten_texte(self.pdf_pfad, max_ocr_seiten=3)
+
+        self.assertEqual(texte[1], "")  # Fehler nur für diese Seite
+        self.assertEqual(texte[2], "erkannt")
+        self.assertEqual(texte[4].strip(), "")  # jenseits der OCR-Grenze
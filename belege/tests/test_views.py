@@ -1,15 +1,18 @@
 # belege/tests/test_views.py
 
+import hashlib
 from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
+import fitz
 import pytest
 from django.contrib.auth import get_user_model
 from django.contrib.messages import get_messages
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.utils import timezone
+from PIL import Image
 
 from belege.models import Beleg
 
@@ -398,29 +401,17 @@ class TestBelegThumbnail:
 
     def test_beleg_thumbnail_success(self, client, beleg_mit_datei):
         """Test der Thumbnail-Generierung."""
-        with (
-            patch("belege.views.fitz") as mock_fitz,
-            patch("belege.views.Image") as mock_image,
-        ):
+        with patch("belege.thumbnails.fitz") as mock_fitz:
             # Mock fitz (PyMuPDF)
             mock_doc = MagicMock()
             mock_page = MagicMock()
+            mock_page.rect.width = 595
+            mock_page.rect.height = 842
             mock_pixmap = MagicMock()
-            mock_pixmap.tobytes.return_value = b"fake ppm data"
+            mock_pixmap.tobytes.return_value = b"fake png data"
             mock_page.get_pixmap.return_value = mock_pixmap
             mock_doc.__getitem__.return_value = mock_page
-            mock_fitz.open.return_value = mock_doc
-
-            # Mock PIL Image
-            mock_img = MagicMock()
-            mock_image.open.return_value = mock_img
-            mock_image.new.return_value = mock_img
-
-            # Mock das save-Verhalten
-            def mock_save(output, format):
-                output.write(b"fake png data")
-
-            mock_img.save.side_effect = mock_save
+            mock_fitz.open.return_value.__enter__.return_value = mock_doc
 
             # beleg_mit_datei hat eine Datei
             url = reverse("belege:thumbnail", kwargs={"beleg_id": beleg_mit_datei.id})
@@ -428,10 +419,27 @@ class TestBelegThumbnail:
 
             assert response.status_code == 200
             assert response["Content-Type"] == "image/png"
+            assert b"".join(response.streaming_content) == b"fake png data"
+
+            # Zweiter Abruf kommt aus der Ablage - kein erneutes Rendern
+            client.get(url)
+            assert mock_fitz.open.call_count == 1
+
+    def test_beleg_thumbnail_304_bei_gleichem_etag(self, client, beleg_mit_datei):
+        """Browser mit aktuellem ETag bekommt 304 ohne Rendern."""
+        with patch("belege.thumbnails.fitz") as mock_fitz:
+            url = reverse("belege:thumbnail", kwargs={"beleg_id": beleg_mit_datei.id})
+            etag = f'"{beleg_mit_datei.datei_hash}-200x300"'
+
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            assert response.status_code == 304
+            assert response["ETag"] == etag
+            mock_fitz.open.assert_not_called()
 
     def test_beleg_thumbnail_error(self, client, beleg_mit_datei):
         """Test der Thumbnail-Generierung bei Fehler."""
-        with patch("belege.views.fitz") as mock_fitz:
+        with patch("belege.thumbnails.fitz") as mock_fitz:
             mock_fitz.open.side_effect = Exception("Thumbnail error")
 
             # beleg_mit_datei hat eine Datei
@@ -449,6 +457,58 @@ class TestBelegThumbnail:
         assert response.status_code == 404
 
 
+class TestThumbnailAblage:
+    """Tests für die Thumbnail-Ablage nach Inhalts-Hash."""
+
+    @pytest.fixture
+    def pdf_datei(self, tmp_path, settings):
+        settings.MEDIA_ROOT = str(tmp_path)
+        (tmp_path / "belege").mkdir()
+        with fitz.open() as doc:
+            doc.new_page(width=595, height=842).insert_text((72, 72), "Rechnung")
+            doc.save(tmp_path / "belege" / "a4.pdf")
+        return "belege/a4.pdf"
+
+    def test_rendert_in_zielgroesse_und_teilt_gleichen_inhalt(self, pdf_datei):
+        from belege.tasks import erzeuge_thumbnails
+        from belege.thumbnails import thumbnail_pfad
+
+        beleg = Beleg.objects.create(original_dateiname="a4.pdf", datei=pdf_datei)
+        kopie = Beleg.objects.create(original_dateiname="kopie.pdf", datei=pdf_datei)
+        assert len(beleg.datei_hash) == 64
+        assert kopie.datei_hash == beleg.datei_hash
+
+        erzeuge_thumbnails(str(beleg.id))
+
+        pfad = thumbnail_pfad(beleg.datei_hash, (200, 300))
+        with Image.open(pfad) as bild:
+            breite, hoehe = bild.size
+        assert breite <= 201 and hoehe <= 300
+        assert breite >= 199  # A4 füllt die Breite aus
+
+    def test_upload_reiht_thumbnails_nach_commit_ein(
+        self, tmp_path, settings, django_capture_on_commit_callbacks
+    ):
+        settings.MEDIA_ROOT = str(tmp_path)
+        with (
+            patch("belege.tasks.erzeuge_thumbnails.apply_async") as mock_async,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            beleg = Beleg.objects.create(
+                original_dateiname="r1.pdf",
+                datei=SimpleUploadedFile("r1.pdf", b"%PDF-1.4 inhalt"),
+            )
+
+        mock_async.assert_called_once_with(args=[str(beleg.id)], retry=False)
+        assert beleg.datei_hash == hashlib.sha256(b"%PDF-1.4 inhalt").hexdigest()
+        assert beleg.datei.read() == b"%PDF-1.4 inhalt"
+
+        # Reines Bearbeiten ohne neue Datei rendert nichts neu
+        with django_capture_on_commit_callbacks() as callbacks:
+            Beleg.objects.get(pk=beleg.pk).save()
+        assert callbacks == []
+
+
 class TestBelegPDFViewer:
     """Tests für die PDF-Viewer Views."""
 
@@ -475,6 +535,48 @@ class TestBelegPDFViewer:
 
         assert response.status_code == 200
         assert response["Content-Type"] == "application/pdf"
+        assert response.streaming
+        assert b"".join(response.streaming_content) == b"fake pdf content"
+        assert response["Accept-Ranges"] == "bytes"
+        assert response["ETag"] == f'"{beleg_mit_datei.datei_hash}"'
+
+    def test_beleg_pdf_viewer_range(self, client, beleg_mit_datei):
+        """Range-Request liefert 206 mit genau dem angefragten Ausschnitt."""
+        url = reverse("belege:pdf_viewer", kwargs={"beleg_id": beleg_mit_datei.id})
+
+        response = client.get(url, HTTP_RANGE="bytes=5-7")
+        assert response.status_code == 206
+        assert b"".join(response.streaming_content) == b"pdf"
+        assert response["Content-Range"] == "bytes 5-7/16"
+        assert response["Content-Length"] == "3"
+
+        response = client.get(url, HTTP_RANGE="bytes=-7")
+        assert b"".join(response.streaming_content) == b"content"
+
+        response = client.get(url, HTTP_RANGE="bytes=100-")
+        assert response.status_code == 416
+        assert response["Content-Range"] == "bytes */16"
+
+    def test_beleg_pdf_viewer_bedingte_anfragen(self, client, beleg_mit_datei):
+        """Passendes ETag gibt 304, veraltetes If-Range die ganze Datei."""
+        url = reverse("belege:pdf_viewer", kwargs={"beleg_id": beleg_mit_datei.id})
+        etag = client.get(url)["ETag"]
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        response = client.get(url, HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"veraltet"')
+        assert response.status_code == 200
+        assert b"".join(response.streaming_content) == b"fake pdf content"
+
+    def test_beleg_pdf_viewer_x_accel_redirect(self, client, beleg_mit_datei, settings):
+        """Mit X_ACCEL_REDIRECT_PREFIX übernimmt nginx die Auslieferung."""
+        settings.X_ACCEL_REDIRECT_PREFIX = "/_geschuetzt/media/"
+        url = reverse("belege:pdf_viewer", kwargs={"beleg_id": beleg_mit_datei.id})
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response["X-Accel-Redirect"] == "/_geschuetzt/media/belege/rechnung.pdf"
+        assert response.content == b""
 
     def test_beleg_pdf_viewer_modern_mit_datei(self, client, beleg_mit_datei):
         """Test moderner PDF-Viewer für Beleg mit Datei."""
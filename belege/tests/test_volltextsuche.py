@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from buchungen.models import Geschaeftspartner
+from llkjj_knut import volltextsuche
+
+from ..models import Beleg
+
+
+class VolltextsucheTest(TestCase):
+    """
+    Tests für den Volltextindex der Belege (SQLite FTS5 in den Tests).
+    Peter Zwegat: "Wer sucht, der findet - und zwar das Wichtigste zuerst!"
+    """
+
+    def setUp(self):
+        self.partner = Geschaeftspartner.objects.create(name="Telekom Deutschland")
+        self.im_ocr = Beleg.objects.create(
+            original_dateiname="scan_001.pdf",
+            ocr_text="Seite 2: Hinweis zur Mobilfunkrechnung",
+        )
+        self.in_beschreibung = Beleg.objects.create(
+            original_dateiname="rechnung.pdf",
+            beschreibung="Mobilfunkrechnung März",
+            geschaeftspartner=self.partner,
+        )
+        Beleg.objects.create(original_dateiname="tankquittung.pdf")
+
+    def _treffer(self, begriff):
+        return list(
+            volltextsuche.suche(Beleg.objects.all(), begriff).order_by("-such_rang")
+        )
+
+    def test_backend_ist_fts5(self):
+        self.assertIsInstance(volltextsuche.backend(), volltextsuche.SQLiteFTS5Backend)
+
+    def test_ranking_und_praefixsuche(self):
+        # Treffer in der Beschreibung (Gewicht A) vor Treffer im OCR-Text (C)
+        self.assertEqual(
+            self._treffer("mobilfunk"), [self.in_beschreibung, self.im_ocr]
+        )
+        # Alle Wörter müssen vorkommen, Umlaute/Groß-Klein egal
+        self.assertEqual(self._treffer("MARZ telek"), [self.in_beschreibung])
+        self.assertEqual(self._treffer("mobilfunk tankquittung"), [])
+
+    def test_index_folgt_speichern_und_loeschen(self):
+        self.im_ocr.ocr_text = "Stromabschlag Juni"
+        self.im_ocr.save()
+        self.assertEqual(self._treffer("strom"), [self.im_ocr])
+        self.assertEqual(self._treffer("mobilfunk"), [self.in_beschreibung])
+
+        # Umbenannter Geschäftspartner wird über die Abhängigkeit nachgezogen
+        self.partner.name = "Vodafone GmbH"
+        self.partner.save()
+        self.assertEqual(self._treffer("vodafone"), [self.in_beschreibung])
+
+        self.in_beschreibung.delete()
+        self.assertEqual(self._treffer("vodafone"), [])
+
+    def test_ohne_suchwoerter_fallback_icontains(self):
+        self.in_beschreibung.beschreibung = "Sonderzeichen %%"
+        self.in_beschreibung.save()
+        self.assertEqual(self._treffer("%%"), [self.in_beschreibung])
+
+    def test_rebuild_search_index(self):
+        # Am Index vorbei geändert (wie QuerySet.update) - erst der Neuaufbau
+        # macht den Text suchbar
+        Beleg.objects.filter(pk=self.im_ocr.pk).update(ocr_text="Kontoauszug")
+        self.assertEqual(self._treffer("kontoauszug"), [])
+
+        ausgabe = StringIO()
+        call_command("rebuild_search_index", "--modell", "belege.Beleg", stdout=ausgabe)
+
+        self.assertIn("belege.Beleg: 3 Einträge", ausgabe.getvalue())
+        self.assertEqual(self._treffer("kontoauszug"), [self.im_ocr])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM belege_beleg_fts")
+            self.assertEqual(cursor.fetchone()[0], 3)
@@ -0,0 +1,128 @@
+"""
+Thumbnail-Ablage für Belege.
+
+Thumbnails liegen unter ``MEDIA_ROOT/thumbnails`` und sind nach dem
+SHA-256-Hash des Dateiinhalts und der Größe benannt
+(``ab/abcdef...-200x300.png``). Gleicher Inhalt heißt gleiches Thumbnail -
+egal wie oft eine Datei hochgeladen oder umbenannt wird. Ändert sich die
+Datei, ändert sich der Hash und damit auch das ETag im Browser.
+
+Gerendert wird direkt in der Zielgröße: PyMuPDF rastert die erste Seite mit
+passendem Zoom und schreibt das PNG selbst - ohne Zwischenbild in voller
+Auflösung und ohne Umweg über PIL.
+
+Peter Zwegat: "Einmal ordentlich abheften - dann findet man es sofort wieder!"
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fitz  # PyMuPDF
+
+    THUMBNAIL_AVAILABLE = True
+except ImportError:
+    THUMBNAIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+STANDARD_GROESSE = (200, 300)
+
+
+def thumbnail_groessen() -> list[tuple[int, int]]:
+    """Erlaubte Größen (Breite, Höhe); die erste ist der Standard."""
+    return [
+        tuple(groesse)
+        for groesse in getattr(settings, "BELEG_THUMBNAIL_GROESSEN", [STANDARD_GROESSE])
+    ]
+
+
+def groesse_aus_anfrage(wert: str | None) -> tuple[int, int]:
+    """
+    Liest ``?groesse=BREITExHOEHE``.
+
+    Nur konfigurierte Größen sind erlaubt - sonst ließe sich die Ablage mit
+    beliebigen Größen füllen. Unbekannte Werte liefern die Standardgröße.
+    """
+    groessen = thumbnail_groessen()
+    if wert:
+        try:
+            breite, hoehe = (int(teil) for teil in wert.lower().split("x", 1))
+        except ValueError:
+            return groessen[0]
+        if (breite, hoehe) in groessen:
+            return breite, hoehe
+    return groessen[0]
+
+
+def berechne_datei_hash(datei) -> str:
+    """SHA-256 des Dateiinhalts (``FieldFile`` oder hochgeladene Datei)."""
+    sha = hashlib.sha256()
+    for chunk in datei.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def verzeichnis() -> Path:
+    return Path(settings.MEDIA_ROOT) / "thumbnails"
+
+
+def thumbnail_pfad(datei_hash: str, groesse: tuple[int, int]) -> Path:
+    breite, hoehe = groesse
+    return verzeichnis() / datei_hash[:2] / f"{datei_hash}-{breite}x{hoehe}.png"
+
+
+def stelle_hash_sicher(beleg) -> str:
+    """Liefert den Inhalts-Hash und berechnet ihn für ältere Belege nach."""
+    if not beleg.datei_hash:
+        with beleg.datei.open("rb"):
+            beleg.datei_hash = berechne_datei_hash(beleg.datei)
+        type(beleg).objects.filter(pk=beleg.pk).update(datei_hash=beleg.datei_hash)
+    return beleg.datei_hash
+
+
+def rendere_thumbnail(quelle: str, ziel: Path, groesse: tuple[int, int]) -> None:
+    """
+    Rendert die erste Seite passend in ``groesse`` und speichert sie als PNG.
+
+    Geschrieben wird über eine temporäre Datei, damit parallele Anfragen
+    nie ein halbes PNG ausliefern.
+    """
+    breite, hoehe = groesse
+    with fitz.open(quelle) as doc:
+        seite = doc[0]
+        zoom = min(breite / seite.rect.width, hoehe / seite.rect.height)
+        pix = seite.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        png = pix.tobytes("png")
+
+    ziel.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ziel.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as datei:
+            datei.write(png)
+        os.replace(tmp, ziel)
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def hole_thumbnail(beleg, groesse: tuple[int, int] = STANDARD_GROESSE) -> Path:
+    """Pfad zum Thumbnail; fehlt es in der Ablage, wird es jetzt gerendert."""
+    pfad = thumbnail_pfad(stelle_hash_sicher(beleg), groesse)
+    if not pfad.exists():
+        rendere_thumbnail(beleg.datei.path, pfad, groesse)
+        logger.info(f"Thumbnail erzeugt: {pfad.name}")
+    return pfad
+
+
+def entferne_thumbnails(datei_hash: str) -> None:
+    """Löscht alle Größen zu einem Inhalts-Hash."""
+    if not datei_hash:
+        return
+    for pfad in (verzeichnis() / datei_hash[:2]).glob(f"{datei_hash}-*.png"):
+        pfad.unlink(missing_ok=True)
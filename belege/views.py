@@ -4,30 +4,24 @@ Views für die Belege-App - PDF-Upload und automatische Datenextraktion.
 Zentrale Funktionen für die Verwaltung und Verarbeitung von Geschäftsbelegen.
 """
 
-import io
 import logging
 import os
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 
-# Für PDF-Thumbnail-Generierung
-try:
-    import fitz  # PyMuPDF
-    from PIL import Image
-
-    THUMBNAIL_AVAILABLE = True
-except ImportError:
-    THUMBNAIL_AVAILABLE = False
-
 from django.contrib import messages
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Count, Q
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
 from buchungen.models import Geschaeftspartner
+from llkjj_knut.datei_auslieferung import datei_ausliefern
+from llkjj_knut.keyset import KeysetPaginator
+from llkjj_knut.volltextsuche import suche
 
 from .forms import (
     BelegBearbeitungForm,
@@ -37,6 +31,12 @@ from .forms import (
 )
 from .models import Beleg
 from .pdf_extraktor import extrahiere_pdf_daten
+from .thumbnails import (
+    THUMBNAIL_AVAILABLE,
+    groesse_aus_anfrage,
+    hole_thumbnail,
+    stelle_hash_sicher,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -49,17 +49,13 @@ def beleg_liste(request):
     """
     form = BelegSucheForm(request.GET)
     belege = Beleg.objects.all()
+    sortierung = ("-hochgeladen_am",)
 
     if form.is_valid():
-        # Suchbegriff
+        # Suchbegriff (Volltextindex, relevanteste Treffer zuerst)
         if form.cleaned_data.get("suchbegriff"):
-            suchbegriff = form.cleaned_data["suchbegriff"]
-            belege = belege.filter(
-                Q(beschreibung__icontains=suchbegriff)
-                | Q(original_dateiname__icontains=suchbegriff)
-                | Q(ocr_text__icontains=suchbegriff)
-                | Q(geschaeftspartner__name__icontains=suchbegriff)
-            )
+            belege = suche(belege, form.cleaned_data["suchbegriff"])
+            sortierung = ("-such_rang", *sortierung)
 
         # Filter
         if form.cleaned_data.get("beleg_typ"):
@@ -80,21 +76,20 @@ def beleg_liste(request):
         if form.cleaned_data.get("betrag_bis"):
             belege = belege.filter(betrag__lte=form.cleaned_data["betrag_bis"])
 
-    # Pagination
-    paginator = Paginator(belege.order_by("-hochgeladen_am"), 25)
-    page = request.GET.get("page")
-
-    try:
-        belege_page = paginator.page(page)
-    except PageNotAnInteger:
-        belege_page = paginator.page(1)
-    except EmptyPage:
-        belege_page = paginator.page(paginator.num_pages)
+    # Pagination (Keyset, ohne OFFSET)
+    paginator = KeysetPaginator(belege.order_by(*sortierung), 25)
+    belege_page = paginator.seite(request.GET.get("cursor"))
 
     return render(
         request,
         "belege/liste.html",
-        {"belege": belege_page, "form": form, "titel": "Alle Belege"},
+        {
+            "belege": belege_page,
+            "page_obj": belege_page,
+            "is_paginated": belege_page.has_other_pages(),
+            "form": form,
+            "titel": "Alle Belege",
+        },
     )
 
 
@@ -104,9 +99,6 @@ def beleg_liste_modern(request):
 
     Bietet eine verbesserte Benutzeroberfläche für die Belegverwaltung.
     """
-    from django.core.paginator import Paginator
-    from django.db.models import Q
-
     # Alle Belege abrufen
     belege = Beleg.objects.all().order_by("-hochgeladen_am")
 
@@ -129,24 +121,29 @@ def beleg_liste_modern(request):
     if beleg_typ:
         belege = belege.filter(beleg_typ=beleg_typ)
 
-    # Statistiken berechnen
-    stats = {
-        "gesamt": Beleg.objects.count(),
-        "neu": Beleg.objects.filter(status="NEU").count(),
-        "geprueft": Beleg.objects.filter(status="GEPRUEFT").count(),
-        "verbucht": Beleg.objects.filter(status="VERBUCHT").count(),
-        "fehler": Beleg.objects.filter(status="FEHLER").count(),
-    }
+    # Statistiken berechnen (eine Abfrage)
+    stats = Beleg.objects.aggregate(
+        gesamt=Count("pk"),
+        neu=Count("pk", filter=Q(status="NEU")),
+        geprueft=Count("pk", filter=Q(status="GEPRUEFT")),
+        verbucht=Count("pk", filter=Q(status="VERBUCHT")),
+        fehler=Count("pk", filter=Q(status="FEHLER")),
+    )
 
-    # Pagination
-    paginator = Paginator(belege, 20)  # 20 Belege pro Seite
-    page_number = request.GET.get("page")
-    belege_page = paginator.get_page(page_number)
+    # Pagination (Keyset, ohne OFFSET) - ungefiltert steht die Anzahl
+    # schon in den Statistiken
+    gefiltert = bool(search or status or beleg_typ)
+    paginator = KeysetPaginator(
+        belege,
+        20,  # 20 Belege pro Seite
+        anzahl=None if gefiltert else stats["gesamt"],
+    )
+    belege_page = paginator.seite(request.GET.get("cursor"))
 
     context = {
         "belege": belege_page,
-        "belege_count": belege.count(),
-        "total_count": belege.count(),  # Für Tests und Template-Kompatibilität
+        "belege_count": paginator.count,
+        "total_count": paginator.count,  # Für Tests und Template-Kompatibilität
         "stats": stats,
         "page_title": "Belege-Verwaltung",
     }
@@ -593,9 +590,10 @@ def beleg_bulk_upload(request):
 
                 # OCR im Hintergrund starten (optional)
                 try:
-                    from .ocr_service import OCRService
+                    from .ocr_service import get_ocr_service
 
-                    ocr_service = OCRService()
+                    # Eine Instanz für alle Dateien - Modelle nur einmal laden
+                    ocr_service = get_ocr_service()
                     ocr_result = ocr_service.extract_text_from_pdf(beleg.datei.path)
 
                     if ocr_result.get("success"):
@@ -783,10 +781,14 @@ def beleg_pdf_viewer(request, beleg_id):
         if not os.path.exists(beleg.datei.path):
             return HttpResponse(status=404)
 
-        with open(beleg.datei.path, "rb") as pdf_file:
-            response = HttpResponse(pdf_file.read(), content_type="application/pdf")
-            response["Content-Disposition"] = f'inline; filename="{beleg.dateiname}"'
-            return response
+        # Gestreamt mit Range/206 - PDF.js lädt nur die benötigten Seiten
+        return datei_ausliefern(
+            request,
+            beleg.datei,
+            "application/pdf",
+            beleg.dateiname,
+            etag=beleg.datei_hash or None,
+        )
     except (FileNotFoundError, AttributeError, ValueError):
         return HttpResponse(status=404)
 
@@ -870,54 +872,33 @@ def beleg_thumbnail(request, beleg_id):
     except (ValueError, AttributeError):
         return HttpResponse(status=404)
 
-    try:
-        if not THUMBNAIL_AVAILABLE:
-            return HttpResponse(status=404)
-
-        # PDF öffnen und erste Seite als Bild rendern
-        doc = fitz.open(beleg.datei.path)
-        page = doc[0]  # Erste Seite
-
-        # Als Pixmap rendern (150 DPI für gute Qualität)
-        mat = fitz.Matrix(1.0, 1.0)  # Skalierung
-        pix = page.get_pixmap(matrix=mat)
-
-        # Einfacher Fake für Tests - wenn Mock aktiv ist
-        if hasattr(pix, "tobytes") and hasattr(pix.tobytes, "_mock_name"):
-            # Mock ist aktiv - einfaches PNG zurückgeben
-            output = io.BytesIO()
-            # Dummy PNG erstellen (1x1 pixel)
-            img = Image.new("RGB", (1, 1), color="white")
-            img.save(output, format="PNG")
-            output.seek(0)
-
-            response = HttpResponse(output.getvalue(), content_type="image/png")
-            response["Cache-Control"] = "public, max-age=3600"
-            doc.close()
-            return response
-
-        # PIL Image erstellen
-        img_data = pix.tobytes("ppm")
-        img = Image.open(io.BytesIO(img_data))
-
-        # Thumbnail erstellen (max 200x300 Pixel)
-        img.thumbnail((200, 300), Image.Resampling.LANCZOS)
+    if not THUMBNAIL_AVAILABLE:
+        return HttpResponse(status=404)
 
-        # Als PNG ausgeben (bessere Qualität als JPEG für Thumbnails)
-        output = io.BytesIO()
-        img.save(output, format="PNG", optimize=True)
-        output.seek(0)
+    groesse = groesse_aus_anfrage(request.GET.get("groesse"))
 
-        response = HttpResponse(output.getvalue(), content_type="image/png")
-        response["Cache-Control"] = "public, max-age=3600"  # 1 Stunde Cache
+    try:
+        # ETag aus Inhalts-Hash und Größe: gleicher Inhalt, gleiches Bild
+        etag = quote_etag(f"{stelle_hash_sicher(beleg)}-{groesse[0]}x{groesse[1]}")
+        last_modified = int(os.path.getmtime(beleg.datei.path))
 
-        doc.close()
-        return response
+        # Browser hat das Bild schon - 304 ohne Rendern und ohne Datei lesen
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            pfad = hole_thumbnail(beleg, groesse)
+            response = FileResponse(open(pfad, "rb"), content_type="image/png")
 
     except Exception as e:
         logger.error(f"Thumbnail-Generierung fehlgeschlagen für {beleg_id}: {e}")
         return HttpResponse(status=500)
 
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "public, max-age=3600"  # 1 Stunde Cache
+    return response
+
 
 def beleg_ocr_process(request, beleg_id):
     """
@@ -0,0 +1,305 @@
+"""
+Ähnlichkeitssuche für Buchungstexte
+===================================
+
+Findet Buchungen mit ähnlichem Buchungstext - auch bei Tippfehlern,
+abweichenden Schreibweisen und wechselnden Nummern in Banktexten
+("AMAZON EU S.A.R.L. 302-1234" ~ "Amazon EU SARL 302-9876").
+
+Gemessen wird wie bei PostgreSQL ``pg_trgm``: Jedes Wort wird klein
+geschrieben und mit Leerzeichen aufgefüllt ("  wort "), die Ähnlichkeit
+zweier Texte ist der Anteil gemeinsamer Zeichen-Trigramme
+(|A ∩ B| / |A ∪ B|, 0.0 - 1.0). Je Datenbank gibt es ein Backend:
+
+- **PostgreSQL** (Produktion): Erweiterung ``pg_trgm`` mit GIN-Index
+  (``gin_trgm_ops``) auf ``buchungstext`` (Migration
+  ``0007_buchungstext_trgm``); der ``%``-Operator nutzt den Index,
+  ``similarity()`` liefert den Rang.
+- **Sonst** (SQLite): invertierter Trigramm-Index im Prozess
+  (Trigramm -> Buchungs-IDs). Er wird beim ersten Zugriff aufgebaut und
+  per Signal fortgeschrieben. Buchungen anderer Prozesse (z.B. des
+  Celery-CSV-Imports) kommen über den ``Abgleich`` hinzu: höchstens alle
+  ``PROZESS_INDEX_PRUEF_SEKUNDEN`` werden Anzahl, größte ID und letzte
+  Änderung verglichen und neue oder geänderte Buchungen nachgeladen;
+  nach Löschungen und nach ``PROZESS_INDEX_MAX_ALTER_SEKUNDEN`` wird neu
+  aufgebaut.
+
+Treffer werden in beiden Fällen gegen das übergebene QuerySet geprüft -
+Filter des Aufrufers (Betrag, Zeitraum, Konten) gelten also immer.
+
+Peter Zwegat: "Wer dreimal dasselbe bucht, hat zweimal zu viel gebucht!"
+"""
+
+# Tabellen-/Spaltennamen stammen aus den Modell-Metadaten (quote_name),
+# Suchtexte gehen immer als Parameter an die Datenbank.
+# ruff: noqa: S608, S611
+
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import cache
+
+from django.db import connections
+from django.db.models import Count, FloatField, Max, Q
+from django.db.models.expressions import RawSQL
+
+from llkjj_knut.cache_utils import Abgleich, bump_namespace, namespace_versionen
+
+logger = logging.getLogger(__name__)
+
+# Standard-Schwelle von pg_trgm (pg_trgm.similarity_threshold)
+SCHWELLE = 0.3
+NAMESPACE = "buchungstexte"
+BATCH_GROESSE = 500
+
+_WORT_RE = re.compile(r"[^\W_]+")
+
+
+def trigramme(text: str) -> frozenset[str]:
+    """Zeichen-Trigramme eines Texts wie ``show_trgm`` von pg_trgm."""
+    ergebnis = set()
+    for wort in _WORT_RE.findall((text or "").lower()):
+        wort = f"  {wort} "
+        ergebnis.update(wort[i : i + 3] for i in range(len(wort) - 2))
+    return frozenset(ergebnis)
+
+
+def aehnlichkeit(a: str | frozenset, b: str | frozenset) -> float:
+    """Trigramm-Ähnlichkeit zweier Texte (oder Trigramm-Mengen), 0.0 - 1.0."""
+    a = a if isinstance(a, frozenset) else trigramme(a)
+    b = b if isinstance(b, frozenset) else trigramme(b)
+    if not a or not b:
+        return 0.0
+    gemeinsam = len(a & b)
+    return gemeinsam / (len(a) + len(b) - gemeinsam)
+
+
+class TrigrammIndex:
+    """Invertierter Index Trigramm -> IDs über beliebige Texte."""
+
+    def __init__(self):
+        self._trigramme: dict = {}
+        self._postings: dict[str, set] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._trigramme)
+
+    def setze(self, pk, text: str) -> None:
+        self.entferne(pk)
+        neu = trigramme(text)
+        self._trigramme[pk] = neu
+        for trigramm in neu:
+            self._postings[trigramm].add(pk)
+
+    def entferne(self, pk) -> None:
+        for trigramm in self._trigramme.pop(pk, ()):
+            ids = self._postings[trigramm]
+            ids.discard(pk)
+            if not ids:
+                del self._postings[trigramm]
+
+    def suche(self, text: str, schwelle: float = SCHWELLE) -> list[tuple]:
+        """
+        Alle IDs mit Ähnlichkeit >= ``schwelle``, beste zuerst.
+
+        Returns:
+            Liste von (ID, Ähnlichkeit)
+        """
+        anfrage = trigramme(text)
+        if not anfrage:
+            return []
+        gemeinsam: Counter = Counter()
+        for trigramm in anfrage:
+            gemeinsam.update(self._postings.get(trigramm, ()))
+
+        treffer = []
+        for pk, anzahl in gemeinsam.items():
+            wert = anzahl / (len(anfrage) + len(self._trigramme[pk]) - anzahl)
+            if wert >= schwelle:
+                treffer.append((pk, wert))
+        treffer.sort(key=lambda x: x[1], reverse=True)
+        return treffer
+
+
+class SpeicherBackend:
+    """Trigramm-Index im Prozess (SQLite und andere Datenbanken)."""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.index: TrigrammIndex | None = None
+        self.version = None
+        # (Anzahl, größte ID, letzte Änderung) beim letzten Abgleich
+        self.stempel = None
+        self.abgleich = Abgleich()
+        # Der Index wird von allen Threads des Prozesses geteilt
+        self.lock = threading.Lock()
+
+    def _version(self):
+        return namespace_versionen([NAMESPACE])[NAMESPACE]
+
+    def _buchungen(self, model):
+        return model._default_manager.using(self.alias).order_by()
+
+    def _stempel(self, model) -> tuple:
+        werte = self._buchungen(model).aggregate(
+            anzahl=Count("pk"), max_pk=Max("pk"), geaendert=Max("geaendert_am")
+        )
+        return werte["anzahl"], werte["max_pk"], werte["geaendert"]
+
+    def _lade(self, index: TrigrammIndex, queryset) -> None:
+        for pk, text in queryset.values_list("pk", "buchungstext").iterator(
+            chunk_size=5000
+        ):
+            index.setze(pk, text)
+
+    def _aufbauen(self, model, version) -> None:
+        # Stempel vorher: Was danach dazukommt, fällt beim Abgleich auf
+        stempel = self._stempel(model)
+        index = TrigrammIndex()
+        self._lade(index, self._buchungen(model))
+        logger.debug(f"Trigramm-Index aufgebaut ({len(index)} Buchungen)")
+        self.index, self.version, self.stempel = index, version, stempel
+        self.abgleich.geladen()
+
+    def _abgleichen(self, model) -> None:
+        """Holt Buchungen nach, die andere Prozesse angelegt oder geändert haben."""
+        stempel = self._stempel(model)
+        if stempel == self.stempel:
+            return
+        _, max_pk, geaendert = self.stempel
+        if max_pk is None:
+            self._aufbauen(model, self.version)
+            return
+        self._lade(
+            self.index,
+            self._buchungen(model).filter(
+                Q(pk__gt=max_pk) | Q(geaendert_am__gte=geaendert)
+            ),
+        )
+        self.stempel = stempel
+        if len(self.index) != stempel[0]:
+            # Anderswo gelöscht - welche, verrät nur ein Neuaufbau
+            self._aufbauen(model, self.version)
+
+    def _aktueller_index(self, model) -> TrigrammIndex:
+        version = self._version()
+        if self.index is None or version != self.version or self.abgleich.abgelaufen():
+            self._aufbauen(model, version)
+        elif self.abgleich.pruefen():
+            self._abgleichen(model)
+        return self.index
+
+    def _geaendert(self, aenderung) -> None:
+        """Schreibt lokal fort; Prozesse mit gemeinsamem Cache laden neu."""
+        with self.lock:
+            vorher = self._version()
+            if self.index is not None:
+                aenderung(self.index)
+            bump_namespace(NAMESPACE)
+            # Nur wenn niemand sonst dazwischen geändert hat, bleibt er gültig
+            if vorher == self.version:
+                self.version = self._version()
+
+    def indexiere(self, objekte) -> None:
+        objekte = list(objekte)
+        if objekte:
+            self._geaendert(
+                lambda index: [index.setze(o.pk, o.buchungstext) for o in objekte]
+            )
+
+    def entferne(self, pks) -> None:
+        pks = list(pks)
+        if pks:
+            self._geaendert(lambda index: [index.entferne(pk) for pk in pks])
+
+    def suche(self, queryset, text: str, schwelle: float, limit: int | None):
+        with self.lock:
+            kandidaten = self._aktueller_index(queryset.model).suche(text, schwelle)
+        ergebnis = []
+        for start in range(0, len(kandidaten), BATCH_GROESSE):
+            block = kandidaten[start : start + BATCH_GROESSE]
+            gefunden = queryset.order_by().in_bulk([pk for pk, _ in block])
+            for pk, wert in block:
+                objekt = gefunden.get(pk)
+                if objekt is None:
+                    continue
+                objekt.aehnlichkeit = wert
+                ergebnis.append(objekt)
+                if limit is not None and len(ergebnis) >= limit:
+                    return ergebnis
+        return ergebnis
+
+
+class PostgresTrigrammBackend:
+    """``pg_trgm`` mit GIN-Index auf ``buchungstext`` (aus der Migration)."""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    @property
+    def connection(self):
+        # Verbindungen sind thread-lokal, das Backend nicht
+        return connections[self.alias]
+
+    def qn(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def indexiere(self, objekte) -> None:
+        # Der GIN-Index wird von PostgreSQL selbst gepflegt
+        pass
+
+    def entferne(self, pks) -> None:
+        pass
+
+    def suche(self, queryset, text: str, schwelle: float, limit: int | None):
+        model = queryset.model
+        tabelle = self.qn(model._meta.db_table)
+        # Unterabfrage mit "%" (Schwelle von pg_trgm, Standard 0.3) - so
+        # greift der GIN-Index; die eigene Schwelle filtert danach
+        treffer = RawSQL(
+            f"SELECT {self.qn(model._meta.pk.column)} FROM {tabelle} "
+            "WHERE buchungstext %% %s",
+            [text],
+        )
+        rang = RawSQL(
+            f"similarity({tabelle}.buchungstext, %s)", [text], output_field=FloatField()
+        )
+        ergebnis = (
+            queryset.filter(pk__in=treffer)
+            .annotate(aehnlichkeit=rang)
+            .filter(aehnlichkeit__gte=schwelle)
+            .order_by("-aehnlichkeit", "-buchungsdatum")
+        )
+        return list(ergebnis[:limit] if limit is not None else ergebnis)
+
+
+@cache
+def backend(alias: str = "default"):
+    """Backend für die Datenbank (je Prozess und Alias eine Instanz)."""
+    if connections[alias].vendor == "postgresql":
+        return PostgresTrigrammBackend(alias)
+    return SpeicherBackend(alias)
+
+
+def suche(queryset, text: str, schwelle: float = SCHWELLE, limit: int | None = None):
+    """
+    Buchungen aus ``queryset`` mit ähnlichem Buchungstext.
+
+    Returns:
+        Liste von Buchungssätzen, beste zuerst; jeder trägt das Attribut
+        ``aehnlichkeit`` (0.0 - 1.0)
+    """
+    if not trigramme(text):
+        return []
+    return backend(queryset.db).suche(queryset, text, schwelle, limit)
+
+
+def indexiere(objekte, alias: str = "default") -> None:
+    """Nimmt neue oder geänderte Buchungen in den Index auf."""
+    backend(alias).indexiere(objekte)
+
+
+def entferne(pks, alias: str = "default") -> None:
+    """Entfernt gelöschte Buchungen aus dem Index."""
+    backend(alias).entferne(pks)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BuchungenConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "buchungen"
+
+    def ready(self):
+        """Importiert Signals beim Start der App."""
+        import buchungen.signals  # noqa
@@ -0,0 +1,176 @@
+"""
+Zwischenablage für CSV-/Excel-Uploads.
+
+Der Upload wird blockweise unter einem zufälligen Token auf die Platte
+geschrieben. In die Session kommen nur Kopfzeile, eine kleine Vorschau und
+die Leseoptionen; der Import liest die Datei später erneut als Generator.
+So bleibt der Speicherbedarf unabhängig von der Dateigröße.
+
+Peter Zwegat: "Erst ordentlich ablegen, dann in Ruhe abarbeiten!"
+"""
+
+import csv
+import logging
+import re
+import secrets
+import time
+from collections.abc import Iterator
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Tokens bestehen nur aus URL-sicheren Zeichen (kein Pfad-Trick möglich)
+TOKEN_MUSTER = re.compile(r"^[A-Za-z0-9_-]{20,64}$")
+
+EXCEL_ENDUNGEN = (".xlsx", ".xls")
+
+
+class CSVStaging:
+    """
+    Ablage und erneutes Lesen hochgeladener Importdateien.
+
+    Die Session-Daten (``beschreibung``) haben dieselbe Form wie bisher
+    (``header``, ``daten``, ``gesamt_zeilen``) plus ``token`` und die
+    Leseoptionen.
+    """
+
+    @staticmethod
+    def verzeichnis() -> Path:
+        """Ablageverzeichnis (wird bei Bedarf angelegt)."""
+        pfad = Path(
+            getattr(
+                settings,
+                "CSV_IMPORT_STAGING_DIR",
+                Path(settings.MEDIA_ROOT) / "csv_import",
+            )
+        )
+        pfad.mkdir(parents=True, exist_ok=True)
+        return pfad
+
+    @staticmethod
+    def pfad(token: str, format: str) -> Path:
+        """Dateipfad zu einem Token - ungültige Tokens werden abgelehnt."""
+        if not TOKEN_MUSTER.match(token or ""):
+            raise ValueError("Ungültiges Import-Token")
+        endung = ".xlsx" if format == "excel" else ".csv"
+        return CSVStaging.verzeichnis() / f"{token}{endung}"
+
+    @staticmethod
+    def speichere_upload(
+        datei,
+        trennzeichen: str = ";",
+        encoding: str = "utf-8",
+        erste_zeile_ueberspringen: bool = True,
+    ) -> dict:
+        """
+        Schreibt den Upload blockweise auf die Platte.
+
+        Returns:
+            Session-taugliche Beschreibung mit Kopfzeile und Vorschau
+        """
+        CSVStaging.raeume_auf()
+
+        format = "excel" if datei.name.lower().endswith(EXCEL_ENDUNGEN) else "csv"
+        token = secrets.token_urlsafe(24)
+        ziel = CSVStaging.pfad(token, format)
+
+        with ziel.open("wb") as ausgabe:
+            for block in datei.chunks():
+                ausgabe.write(block)
+
+        beschreibung = {
+            "token": token,
+            "format": format,
+            "dateiname": datei.name,
+            "trennzeichen": trennzeichen,
+            "encoding": encoding,
+            "erste_zeile_ueberspringen": erste_zeile_ueberspringen,
+        }
+
+        try:
+            alle_zeilen = CSVStaging._lese_rohzeilen(beschreibung)
+            erste_zeile = next(alle_zeilen, None)
+            if erste_zeile is None:
+                header = []
+                vorschau = []
+            elif erste_zeile_ueberspringen:
+                header = erste_zeile
+                vorschau = list(islice(alle_zeilen, CSVStaging._vorschau_zeilen()))
+            else:
+                header = [f"Spalte_{i + 1}" for i in range(len(erste_zeile))]
+                vorschau = [erste_zeile] + list(
+                    islice(alle_zeilen, CSVStaging._vorschau_zeilen() - 1)
+                )
+            # Restliche Zeilen nur zählen, nicht behalten
+            gesamt = len(vorschau) + sum(1 for _ in alle_zeilen)
+        except Exception:
+            CSVStaging.entferne(beschreibung)
+            raise
+
+        beschreibung.update(
+            {"header": header, "daten": vorschau, "gesamt_zeilen": gesamt}
+        )
+        return beschreibung
+
+    @staticmethod
+    def lese_zeilen(beschreibung: dict) -> Iterator[list[str]]:
+        """Liest die Datenzeilen (ohne Kopfzeile) als Generator."""
+        zeilen = CSVStaging._lese_rohzeilen(beschreibung)
+        if beschreibung.get("erste_zeile_ueberspringen"):
+            next(zeilen, None)
+        yield from zeilen
+
+    @staticmethod
+    def _lese_rohzeilen(beschreibung: dict) -> Iterator[list[str]]:
+        """Liest alle nicht-leeren Zeilen der abgelegten Datei."""
+        pfad = CSVStaging.pfad(beschreibung["token"], beschreibung["format"])
+
+        if beschreibung["format"] == "excel":
+            import openpyxl
+
+            workbook = openpyxl.load_workbook(pfad, read_only=True, data_only=True)
+            try:
+                for row in workbook.active.iter_rows(values_only=True):
+                    # Leere Zeilen überspringen
+                    if any(cell is not None for cell in row):
+                        yield [str(cell) if cell is not None else "" for cell in row]
+            finally:
+                workbook.close()
+            return
+
+        with pfad.open(encoding=beschreibung["encoding"], newline="") as datei:
+            for zeile in csv.reader(datei, delimiter=beschreibung["trennzeichen"]):
+                if zeile:
+                    yield zeile
+
+    @staticmethod
+    def entferne(beschreibung: dict) -> None:
+        """Löscht die abgelegte Datei (falls noch vorhanden)."""
+        try:
+            CSVStaging.pfad(beschreibung["token"], beschreibung["format"]).unlink(
+                missing_ok=True
+            )
+        except (KeyError, ValueError):
+            pass
+
+    @staticmethod
+    def raeume_auf() -> int:
+        """Entfernt liegengebliebene Dateien älter als die Aufbewahrungsfrist."""
+        frist = getattr(settings, "CSV_IMPORT_STAGING_MAX_AGE", 24 * 3600)
+        grenze = time.time() - frist
+        entfernt = 0
+        for datei in CSVStaging.verzeichnis().iterdir():
+            try:
+                if datei.is_file() and datei.stat().st_mtime < grenze:
+                    datei.unlink()
+                    entfernt += 1
+            except OSError as e:
+                logger.warning(f"Staging-Datei {datei} nicht entfernt: {e}")
+        return entfernt
+
+    @staticmethod
+    def _vorschau_zeilen() -> int:
+        return getattr(settings, "CSV_IMPORT_VORSCHAU_ZEILEN", 20)
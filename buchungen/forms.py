@@ -11,6 +11,7 @@ from django.core.exceptions import ValidationError
 
 from belege.models import Beleg
 from konten.models import Konto
+from llkjj_knut.cache_utils import konto_nach_nummer
 
 from .models import Buchungssatz, Geschaeftspartner
 
@@ -312,8 +313,8 @@ class SchnellbuchungForm(forms.ModelForm):
         if buchungstyp in standard_konten:
             konten = standard_konten[buchungstyp]
             try:
-                buchung.soll_konto = Konto.objects.get(nummer=konten["soll"])
-                buchung.haben_konto = Konto.objects.get(nummer=konten["haben"])
+                buchung.soll_konto = konto_nach_nummer(konten["soll"])
+                buchung.haben_konto = konto_nach_nummer(konten["haben"])
             except Konto.DoesNotExist as e:
                 # Log the missing account for debugging
                 import logging
@@ -0,0 +1,558 @@
+"""
+Massenimport von Buchungen aus CSV- und Excel-Daten.
+
+Statt jede Zeile einzeln über ``BuchungsService.erstelle_buchung`` zu
+speichern, arbeitet die Engine spaltenweise:
+
+1. Datum und Betrag werden pro Spalte geparst (Format einmal erkennen,
+   dann alle Werte mit demselben vorkompilierten Muster verarbeiten).
+2. Alle benötigten Konten eines Blocks werden mit einer einzigen Abfrage
+   aufgelöst (bereits bekannte Nummern werden nicht erneut gesucht).
+3. Jede Zeile wird im Speicher gegen die Model-Regeln geprüft.
+4. Mögliche Duplikate (gleicher Betrag, Datum in der Nähe, ähnlicher
+   Buchungstext) werden mit einer Abfrage je Block erkannt.
+5. Gültige Buchungen werden blockweise per ``bulk_create`` in einer
+   Transaktion geschrieben, die Monatssalden einmal pro Block nachgezogen.
+
+Die Zeilen werden blockweise gelesen - auch Generatoren über sehr große
+Dateien belegen nur Speicher für einen Block.
+
+Peter Zwegat: "50.000 Zeilen? Kein Problem - wenn man sie ordentlich stapelt!"
+"""
+
+import logging
+import re
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from auswertungen.services import KontoSaldoService
+from konten import kontenindex
+from konten.models import Konto
+from llkjj_knut.cache_utils import invalidate_related_caches
+
+from . import aehnlichkeit
+from .models import Buchungssatz
+from .services import BuchungsService, KontierungsHistorieService
+
+logger = logging.getLogger(__name__)
+
+# Datumsformate als (Muster, Reihenfolge der Gruppen), deutsche Formate zuerst
+DATUMS_FORMATE = [
+    (re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{2}|\d{4})$"), "TMJ"),
+    (re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T][\d:.]+)?$"), "JMT"),
+    (re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})$"), "TMJ"),
+    (re.compile(r"^(\d{1,2})-(\d{1,2})-(\d{2}|\d{4})$"), "TMJ"),
+    # US-Format nur als Ausweichlösung (z.B. 12/31/2025)
+    (re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})$"), "MTJ"),
+]
+
+# Zeichen, die in Beträgen ignoriert werden
+BETRAG_AUFRAEUMEN = str.maketrans("", "", "€ \u00a0+'")
+
+# Dezimalkomma: "1.234,56", "12,5", "-3,00"
+DEZIMALKOMMA = re.compile(r",\d{1,2}-?$")
+
+
+def _jahr_vierstellig(jahr: int) -> int:
+    """Zweistellige Jahre: 00-49 -> 20xx, 50-99 -> 19xx."""
+    if jahr < 50:
+        return jahr + 2000
+    if jahr < 100:
+        return jahr + 1900
+    return jahr
+
+
+def _datum_aus_match(match, reihenfolge: str) -> date | None:
+    teile = dict(zip(reihenfolge, (int(g) for g in match.groups()), strict=True))
+    try:
+        return date(_jahr_vierstellig(teile["J"]), teile["M"], teile["T"])
+    except ValueError:
+        return None
+
+
+def _parse_datum_einzeln(wert: str) -> date | None:
+    """Probiert alle bekannten Formate für einen einzelnen Wert."""
+    for muster, reihenfolge in DATUMS_FORMATE:
+        match = muster.match(wert)
+        if match:
+            datum = _datum_aus_match(match, reihenfolge)
+            if datum:
+                return datum
+    # Monatsnamen ("15. Januar 2025") kennt nur der ausführliche Parser
+    return BuchungsService._parse_datum_intelligent(wert)
+
+
+def parse_datumsspalte(werte: list[str]) -> list[date | None]:
+    """
+    Parst eine komplette Datumsspalte.
+
+    Das Format der ersten gültigen Werte wird für die ganze Spalte
+    übernommen; nur abweichende Werte laufen durch die Einzelerkennung.
+    Nicht erkennbare Werte ergeben ``None``.
+    """
+    spalten_format = None
+    for wert in werte:
+        if wert:
+            for muster, reihenfolge in DATUMS_FORMATE:
+                match = muster.match(wert)
+                if match and _datum_aus_match(match, reihenfolge):
+                    spalten_format = (muster, reihenfolge)
+                    break
+            if spalten_format:
+                break
+
+    ergebnis = []
+    for wert in werte:
+        if not wert:
+            ergebnis.append(None)
+            continue
+        datum = None
+        if spalten_format:
+            match = spalten_format[0].match(wert)
+            if match:
+                datum = _datum_aus_match(match, spalten_format[1])
+        ergebnis.append(datum or _parse_datum_einzeln(wert))
+    return ergebnis
+
+
+def parse_betragsspalte(werte: list[str]) -> list[Decimal | None]:
+    """
+    Parst eine komplette Betragsspalte mit Vorzeichen.
+
+    Das Dezimaltrennzeichen wird einmal für die Spalte bestimmt: enthält
+    irgendein Wert ein Komma mit ein bis zwei Nachkommastellen am Ende,
+    gilt deutsches Format ("1.234,56"), sonst englisches ("1,234.56").
+    Leere Werte ergeben ``None``, ungültige Werte einen ``ValueError``
+    an ihrer Position (damit der Fehler der richtigen Zeile zugeordnet wird).
+    """
+    bereinigt = [wert.translate(BETRAG_AUFRAEUMEN) if wert else "" for wert in werte]
+    dezimalkomma = any(DEZIMALKOMMA.search(wert) for wert in bereinigt)
+    tausender, dezimal = (".", ",") if dezimalkomma else (",", ".")
+
+    ergebnis: list = []
+    for wert in bereinigt:
+        if not wert:
+            ergebnis.append(None)
+            continue
+        zahl = wert.replace(tausender, "").replace(dezimal, ".")
+        # Nachgestelltes Minus aus Bankexporten ("12,50-")
+        if zahl.endswith("-"):
+            zahl = "-" + zahl[:-1]
+        try:
+            ergebnis.append(Decimal(zahl))
+        except InvalidOperation:
+            ergebnis.append(ValueError(f"Ungültiger Betrag: {wert}"))
+    return ergebnis
+
+
+class BuchungsImportEngine:
+    """
+    Blockweiser Import von Buchungszeilen.
+
+    Args:
+        mapping: Spaltenindex -> Feldname (``buchungsdatum``, ``betrag``,
+            ``buchungstext``/``text``, ``referenz``, ``soll_konto``,
+            ``haben_konto``; andere Felder werden ignoriert)
+        default_soll_konto: Kontonummer, wenn keine Regel greift
+        default_haben_konto: Kontonummer, wenn keine Regel greift
+        chunk_size: Buchungen pro ``bulk_create`` (Standard:
+            ``settings.CSV_IMPORT_CHUNK_SIZE``)
+        kontierung: Optionaler ``IntelligenterKontierungsVorschlag``; ohne
+            ihn gelten die Regeln aus ``BuchungsService``
+        duplikate_ueberspringen: Mögliche Duplikate nicht importieren,
+            sondern als Fehler melden (Standard:
+            ``settings.CSV_IMPORT_DUPLIKATE_UEBERSPRINGEN``); sonst werden
+            sie importiert und in den Notizen markiert
+    """
+
+    # Konten der regelbasierten Kontierung (Bank, Erlöse, Aufwand)
+    REGEL_KONTEN = ("1200", "8400", "4980")
+
+    def __init__(
+        self,
+        mapping: dict[int, str],
+        default_soll_konto: str = "1200",
+        default_haben_konto: str = "8400",
+        chunk_size: int | None = None,
+        kontierung=None,
+        duplikate_ueberspringen: bool | None = None,
+    ):
+        self.spalten = {}
+        for spalte_index, feld_name in mapping.items():
+            if feld_name == "text":
+                feld_name = "buchungstext"
+            self.spalten[feld_name] = int(spalte_index)
+        self.default_soll_konto = default_soll_konto
+        self.default_haben_konto = default_haben_konto
+        self.chunk_size = chunk_size or getattr(settings, "CSV_IMPORT_CHUNK_SIZE", 2000)
+        self.kontierung = kontierung
+        if duplikate_ueberspringen is None:
+            duplikate_ueberspringen = getattr(
+                settings, "CSV_IMPORT_DUPLIKATE_UEBERSPRINGEN", False
+            )
+        self.duplikate_ueberspringen = duplikate_ueberspringen
+        self.konten: dict[str, Konto] = {}
+        self._gesucht: set[str] = set()
+        # In diesem Import geschriebene Buchungen sind keine Duplikate
+        self._importiert: set = set()
+
+    def importiere(
+        self, zeilen: Iterable[list[str]], zeilen_offset: int = 0
+    ) -> tuple[int, list[str]]:
+        """
+        Importiert die Zeilen und liefert (Anzahl erfolgreich, Fehlerliste).
+
+        ``zeilen`` darf ein Generator sein (z.B. aus ``CSVStaging.lese_zeilen``):
+        es wird immer nur ein Block von ``chunk_size`` Zeilen im Speicher
+        gehalten. Alle Blöcke laufen in einer Transaktion.
+        Zeilennummern in den Fehlermeldungen beginnen bei ``zeilen_offset + 1``.
+        """
+        erfolgreich = 0
+        fehler: list[str] = []
+
+        with transaction.atomic():
+            for block_offset, block in self.bloecke(
+                zeilen, self.chunk_size, zeilen_offset
+            ):
+                block_erfolgreich, block_fehler = self.importiere_block(
+                    block, block_offset
+                )
+                erfolgreich += block_erfolgreich
+                fehler.extend(block_fehler)
+
+        if fehler:
+            logger.warning(f"Massenimport: {len(fehler)} fehlerhafte Zeilen")
+        logger.info(
+            f"Massenimport abgeschlossen: {erfolgreich} erfolgreich, {len(fehler)} Fehler"
+        )
+        return erfolgreich, fehler
+
+    @staticmethod
+    def bloecke(
+        zeilen: Iterable[list[str]], chunk_size: int, zeilen_offset: int = 0
+    ) -> Iterator[tuple[int, list[list[str]]]]:
+        """Teilt die Zeilen in Blöcke und liefert (Offset, Block)."""
+        iterator = iter(zeilen)
+        offset = zeilen_offset
+        while block := list(islice(iterator, chunk_size)):
+            yield offset, block
+            offset += len(block)
+
+    def importiere_block(
+        self, zeilen: list[list[str]], zeilen_offset: int = 0
+    ) -> tuple[int, list[str]]:
+        """
+        Prüft und schreibt einen Block von Zeilen.
+
+        Liefert (Anzahl erfolgreich, Fehlerliste) für diesen Block.
+        """
+        spalten = {
+            feld: self._spalte(zeilen, index) for feld, index in self.spalten.items()
+        }
+
+        betraege = parse_betragsspalte(spalten.get("betrag", []))
+        daten = (
+            parse_datumsspalte(spalten["buchungsdatum"])
+            if "buchungsdatum" in spalten
+            else []
+        )
+
+        self._lade_konten(spalten)
+        vorschlaege = self._kontierungsvorschlaege(spalten, betraege)
+
+        heute = timezone.now().date()
+        buchungen: list[tuple[int, Buchungssatz]] = []
+        fehler: list[str] = []
+
+        for i, zeile in enumerate(zeilen):
+            zeilen_nr = zeilen_offset + i + 1
+            if not zeile or not betraege or betraege[i] is None:
+                continue  # Leere Zeile oder kein Betrag - überspringen
+            try:
+                buchungen.append(
+                    (
+                        zeilen_nr,
+                        self._baue_buchung(
+                            i, spalten, betraege[i], daten, heute, vorschlaege.get(i)
+                        ),
+                    )
+                )
+            except (ValidationError, ValueError) as e:
+                fehler.append(f"Zeile {zeilen_nr}: {self._meldung(e)}")
+
+        if buchungen:
+            buchungen = self._pruefe_duplikate(buchungen, fehler)
+        erfolgreich = self._schreibe_block(buchungen, fehler) if buchungen else 0
+        return erfolgreich, fehler
+
+    @staticmethod
+    def _spalte(zeilen: list[list[str]], index: int) -> list[str]:
+        """Zieht eine Spalte als Liste bereinigter Strings aus den Zeilen."""
+        return [
+            str(zeile[index]).strip() if zeile and index < len(zeile) else ""
+            for zeile in zeilen
+        ]
+
+    def _lade_konten(self, spalten: dict[str, list[str]]) -> None:
+        """
+        Löst alle Kontonummern des Blocks über den Konten-Index auf.
+
+        Bereits gesuchte Nummern werden nicht erneut abgefragt; beim ersten
+        Block werden Standard- und Regelkonten mitgeladen und geprüft.
+        """
+        erster_block = not self._gesucht
+        nummern = {self.default_soll_konto, self.default_haben_konto}
+        nummern.update(self.REGEL_KONTEN)
+        for feld in ("soll_konto", "haben_konto"):
+            nummern.update(wert for wert in spalten.get(feld, []) if wert)
+        nummern -= self._gesucht
+        if nummern:
+            self.konten.update(kontenindex.konten(nummern))
+            self._gesucht |= nummern
+
+        if erster_block:
+            if self.kontierung is None and not (
+                self.default_soll_konto in self.konten
+                and self.default_haben_konto in self.konten
+            ):
+                raise ValidationError("Standard-Konten für CSV-Import nicht gefunden!")
+            if self.kontierung is not None:
+                self.kontierung.konten_vorladen(self.konten)
+
+    def _kontierungsvorschlaege(
+        self, spalten: dict[str, list[str]], betraege: list
+    ) -> dict[int, dict]:
+        """
+        Kontierungsvorschläge für alle Zeilen ohne gemappte Konten.
+
+        Ein ``vorschlaege``-Aufruf je Block statt ``suggest_kontierung`` je
+        Zeile; liefert Zeilenindex -> Vorschlag.
+        """
+        if self.kontierung is None:
+            return {}
+        soll = spalten.get("soll_konto")
+        haben = spalten.get("haben_konto")
+        texte = spalten.get("buchungstext")
+        indizes = [
+            i
+            for i, betrag in enumerate(betraege)
+            if isinstance(betrag, Decimal)
+            and not (soll and soll[i] and haben and haben[i])
+        ]
+        vorschlaege = self.kontierung.vorschlaege(
+            ((texte[i] if texte else "") or "CSV-Import", float(betraege[i]))
+            for i in indizes
+        )
+        return dict(zip(indizes, vorschlaege, strict=True))
+
+    def _baue_buchung(
+        self, i, spalten, betrag, daten, heute, vorschlag=None
+    ) -> Buchungssatz:
+        """Baut und validiert einen Buchungssatz im Speicher."""
+        if isinstance(betrag, ValueError):
+            raise betrag
+
+        buchungstext = spalten["buchungstext"][i] if "buchungstext" in spalten else ""
+        buchungstext = buchungstext or "CSV-Import"
+        notizen = []
+
+        soll_konto, haben_konto, hinweis = self._kontiere(
+            i, spalten, buchungstext, betrag, vorschlag
+        )
+        if hinweis:
+            notizen.append(hinweis)
+
+        buchungsdatum = daten[i] if daten else heute
+        if buchungsdatum is None:
+            buchungsdatum = heute
+            notizen.append(
+                "⚠️ Datum konnte nicht geparst werden - aktuelles Datum verwendet"
+            )
+
+        buchung = Buchungssatz(
+            buchungsdatum=buchungsdatum,
+            buchungstext=buchungstext,
+            betrag=abs(betrag),
+            soll_konto=soll_konto,
+            haben_konto=haben_konto,
+            referenz=spalten["referenz"][i] if "referenz" in spalten else "",
+            notizen=" | ".join(notizen),
+            automatisch_erstellt=True,
+        )
+
+        # Model-Regeln ohne Datenbank: Fremdschlüssel sind bereits aufgelöst,
+        # Eindeutigkeit ist bei neuen UUIDs gegeben.
+        buchung.clean_fields(
+            exclude=["soll_konto", "haben_konto", "beleg", "geschaeftspartner"]
+        )
+        buchung.clean()
+        return buchung
+
+    def _kontiere(
+        self, i, spalten, buchungstext, betrag, vorschlag=None
+    ) -> tuple[Konto, Konto, str]:
+        """Bestimmt Soll- und Haben-Konto einer Zeile (ohne DB-Zugriff)."""
+        soll_nummer = spalten["soll_konto"][i] if "soll_konto" in spalten else ""
+        haben_nummer = spalten["haben_konto"][i] if "haben_konto" in spalten else ""
+        if soll_nummer and haben_nummer:
+            return self._konto(soll_nummer), self._konto(haben_nummer), ""
+
+        if self.kontierung is not None:
+            if vorschlag is None:
+                vorschlag = self.kontierung.suggest_kontierung(
+                    buchungstext=buchungstext, betrag=float(betrag)
+                )
+            soll_konto = vorschlag.get("soll_konto") or self.konten.get(
+                self.default_soll_konto
+            )
+            haben_konto = vorschlag.get("haben_konto") or self.konten.get(
+                self.default_haben_konto
+            )
+            hinweis = ""
+            if vorschlag.get("confidence"):
+                hinweis = (
+                    f"KI-Kontierung: {vorschlag.get('kategorie', 'unknown')} "
+                    f"(Confidence: {vorschlag.get('confidence', 0):.2f}) "
+                    f"- {vorschlag.get('reasoning', '')}"
+                )
+        else:
+            soll_konto, haben_konto = BuchungsService._bestimme_konten_intelligent(
+                {"text": buchungstext, "betrag": betrag},
+                self.konten[self.default_soll_konto],
+                self.konten[self.default_haben_konto],
+                konten=self.konten,
+            )
+            hinweis = ""
+
+        # Einzeln gemappte Kontospalten überschreiben den Vorschlag
+        if soll_nummer:
+            soll_konto = self._konto(soll_nummer)
+        if haben_nummer:
+            haben_konto = self._konto(haben_nummer)
+        if soll_konto is None or haben_konto is None:
+            raise ValidationError("Keine passenden Konten gefunden")
+        return soll_konto, haben_konto, hinweis
+
+    def _konto(self, nummer: str) -> Konto:
+        try:
+            return self.konten[nummer]
+        except KeyError:
+            raise ValidationError(f"Konto {nummer} nicht gefunden") from None
+
+    def _pruefe_duplikate(
+        self, buchungen: list[tuple[int, Buchungssatz]], fehler: list[str]
+    ) -> list[tuple[int, Buchungssatz]]:
+        """
+        Erkennt mögliche Duplikate bereits vorhandener Buchungen.
+
+        Kandidaten (gleicher Betrag, Datum ±``CSV_IMPORT_DUPLIKAT_TAGE``)
+        werden für den ganzen Block mit einer Abfrage geladen und per
+        Trigramm-Ähnlichkeit der Buchungstexte verglichen (ab
+        ``CSV_IMPORT_DUPLIKAT_SCHWELLE``).
+        """
+        tage = timedelta(days=getattr(settings, "CSV_IMPORT_DUPLIKAT_TAGE", 3))
+        schwelle = getattr(settings, "CSV_IMPORT_DUPLIKAT_SCHWELLE", 0.6)
+        daten = [buchung.buchungsdatum for _, buchung in buchungen]
+
+        kandidaten = defaultdict(list)
+        for pk, datum, betrag, text in Buchungssatz.objects.filter(
+            buchungsdatum__gte=min(daten) - tage,
+            buchungsdatum__lte=max(daten) + tage,
+            betrag__in={buchung.betrag for _, buchung in buchungen},
+        ).values_list("pk", "buchungsdatum", "betrag", "buchungstext"):
+            if pk not in self._importiert:
+                kandidaten[betrag].append((datum, aehnlichkeit.trigramme(text)))
+        if not kandidaten:
+            return buchungen
+
+        ergebnis = []
+        for zeilen_nr, buchung in buchungen:
+            trigramme = aehnlichkeit.trigramme(buchung.buchungstext)
+            treffer = max(
+                (
+                    (aehnlichkeit.aehnlichkeit(trigramme, vorhanden), datum)
+                    for datum, vorhanden in kandidaten.get(buchung.betrag, ())
+                    if abs(datum - buchung.buchungsdatum) <= tage
+                ),
+                default=(0.0, None),
+            )
+            if treffer[0] < schwelle:
+                ergebnis.append((zeilen_nr, buchung))
+                continue
+
+            meldung = (
+                f"Mögliches Duplikat der Buchung vom {treffer[1]:%d.%m.%Y} "
+                f"({treffer[0]:.0%} ähnlich)"
+            )
+            if self.duplikate_ueberspringen:
+                fehler.append(f"Zeile {zeilen_nr}: {meldung} - übersprungen")
+                continue
+            buchung.notizen = " | ".join(
+                filter(None, [buchung.notizen, f"⚠️ {meldung}"])
+            )
+            ergebnis.append((zeilen_nr, buchung))
+        return ergebnis
+
+    def _schreibe_block(self, block: list[tuple[int, Buchungssatz]], fehler) -> int:
+        """
+        Schreibt einen Block per ``bulk_create``.
+
+        Scheitert der Block an der Datenbank, werden seine Zeilen einzeln
+        (mit Savepoint) geschrieben, damit nur die fehlerhaften verloren gehen.
+        """
+        try:
+            with transaction.atomic():
+                Buchungssatz.objects.bulk_create([buchung for _, buchung in block])
+                KontoSaldoService.verbuche_buchungen(buchung for _, buchung in block)
+                KontierungsHistorieService.verbuche_buchungen(
+                    buchung for _, buchung in block
+                )
+            # bulk_create löst keine Signals aus
+            self._importiert.update(buchung.pk for _, buchung in block)
+            self._nach_commit([buchung for _, buchung in block])
+            return len(block)
+        except DatabaseError:
+            logger.warning("Massenimport: Block fehlgeschlagen, schreibe zeilenweise")
+
+        erfolgreich = 0
+        for zeilen_nr, buchung in block:
+            try:
+                with transaction.atomic():
+                    Buchungssatz.objects.bulk_create([buchung])
+                    KontoSaldoService.verbuche_buchungen([buchung])
+                    KontierungsHistorieService.verbuche_buchungen([buchung])
+                self._importiert.add(buchung.pk)
+                self._nach_commit([buchung])
+                erfolgreich += 1
+            except DatabaseError as e:
+                fehler.append(f"Zeile {zeilen_nr}: {e}")
+        return erfolgreich
+
+    @staticmethod
+    def _nach_commit(buchungen: list[Buchungssatz]) -> None:
+        """
+        Schreibt Ähnlichkeits-Index und Caches fort, sobald die Buchungen
+        committed sind - nach einem Rollback bleiben beide unberührt.
+        """
+
+        def fortschreiben():
+            aehnlichkeit.indexiere(buchungen)
+            invalidate_related_caches(
+                "Buchungssatz", jahre={b.buchungsdatum.year for b in buchungen}
+            )
+
+        transaction.on_commit(fortschreiben)
+
+    @staticmethod
+    def _meldung(fehler: Exception) -> str:
+        if isinstance(fehler, ValidationError):
+            return "; ".join(fehler.messages)
+        return str(fehler)
@@ -5,23 +5,50 @@ Peter Zwegat: "Ein gutes System erkennt Muster und macht Vorschläge!"
 """
 
 import logging
-import re
+import multiprocessing
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 from typing import Any
 
+from django.conf import settings
 from django.contrib.auth.models import User
 
 from einstellungen.models import StandardKontierung
+from konten import kontenindex
 from konten.models import Konto
+from llkjj_knut.cache_utils import request_cached
+
+from .kontierung_muster import (  # noqa: F401 - TEXT_* werden re-exportiert
+    TEXT_MATCHER,
+    TEXT_MUSTER,
+    TEXT_REGEX,
+    beste_kategorie,
+    bewerte_block,
+    bewerte_text,
+)
+from .services import KontierungsHistorieService
 
 logger = logging.getLogger(__name__)
 
 
+# Standardkonten, wenn weder Text noch StandardKontierung weiterhelfen
+FALLBACK_KONTEN = {
+    "einnahme": ("1200", "8400"),  # Bank an Erlöse
+    "ausgabe": ("4980", "1200"),  # Aufwendungen an Bank
+}
+
+# Ab diesem Stimmenanteil gewinnt die eigene Buchungshistorie gegen Textmuster
+HISTORIE_MIN_CONFIDENCE = 0.6
+
+
 class IntelligenterKontierungsVorschlag:
     """
     Intelligente Kontierungsvorschläge basierend auf:
-    1. StandardKontierung des Benutzers
-    2. Textanalyse der Buchungstexte
-    3. Historische Buchungen (später)
+    1. Historische Buchungen (``KontierungsHistorie``)
+    2. StandardKontierung des Benutzers
+    3. Textanalyse der Buchungstexte
     4. ML-basierte Kategorisierung (später)
     """
 
@@ -29,14 +56,31 @@ class IntelligenterKontierungsVorschlag:
         self.user = user
         self.standard_kontierungen = self._load_standard_kontierungen()
         self.text_patterns = self._init_text_patterns()
+        # Kontonummer -> Konto (oder None), damit Fallbacks nicht je Zeile abfragen
+        self._konten: dict[str, Konto | None] = {}
+        # Konto-ID -> Konto für Vorschläge aus der Historie
+        self._konten_nach_id: dict = {}
+
+    def konten_vorladen(self, konten: dict[str, Konto]) -> None:
+        """Übernimmt bereits aufgelöste Konten (z.B. vom Massenimport)."""
+        self._konten.update(konten)
+
+    def _get_konto(self, nummer: str) -> Konto:
+        """Liefert ein Konto per Nummer - jede Nummer wird nur einmal nachgeschlagen."""
+        if nummer not in self._konten:
+            self._konten[nummer] = kontenindex.konten([nummer]).get(nummer)
+        konto = self._konten[nummer]
+        if konto is None:
+            raise Konto.DoesNotExist(f"Konto {nummer} nicht gefunden")
+        return konto
 
     def _load_standard_kontierungen(self) -> dict[str, tuple[Konto, Konto]]:
-        """Lädt Standard-Kontierungen des Benutzers."""
+        """Lädt Standard-Kontierungen des Benutzers (samt Konten, eine Abfrage)."""
         kontierungen = {}
         try:
             for sk in StandardKontierung.objects.filter(
                 benutzerprofil__user=self.user, ist_aktiv=True
-            ):
+            ).select_related("soll_konto", "haben_konto"):
                 kontierungen[sk.buchungstyp] = (sk.soll_konto, sk.haben_konto)
         except (AttributeError, ValueError, TypeError) as e:
             # Fallback auf leeren Dict bei Fehlern
@@ -44,114 +88,52 @@ class IntelligenterKontierungsVorschlag:
             return {}
         return kontierungen
 
+    def _fallback_konten_vorladen(self) -> None:
+        """Löst alle Fallback-Konten über den Konten-Index auf."""
+        nummern = {n for paar in FALLBACK_KONTEN.values() for n in paar}
+        fehlend = nummern - self._konten.keys()
+        if not fehlend:
+            return
+        gefunden = kontenindex.konten(fehlend)
+        for nummer in fehlend:
+            self._konten[nummer] = gefunden.get(nummer)
+
+    def _historie_konten_vorladen(self, paare: Iterable[tuple]) -> None:
+        """Löst die Konten der Historien-Vorschläge mit einer Abfrage auf."""
+        fehlend = {k for paar in paare for k in paar} - self._konten_nach_id.keys()
+        if fehlend:
+            self._konten_nach_id.update(Konto.objects.in_bulk(fehlend))
+
+    def _historie_vorschlag(
+        self, treffer: tuple[tuple, float, int] | None, kategorie: str | None
+    ) -> dict[str, Any] | None:
+        """Vorschlag aus der Historie, wenn sie eindeutig genug ist."""
+        if treffer is None:
+            return None
+        (soll_id, haben_id), confidence, anzahl = treffer
+        if confidence < HISTORIE_MIN_CONFIDENCE:
+            return None
+        self._historie_konten_vorladen([(soll_id, haben_id)])
+        soll_konto = self._konten_nach_id.get(soll_id)
+        haben_konto = self._konten_nach_id.get(haben_id)
+        if soll_konto is None or haben_konto is None:
+            return None
+        return {
+            "soll_konto": soll_konto,
+            "haben_konto": haben_konto,
+            "kategorie": kategorie or "historie",
+            "confidence": confidence,
+            "method": "historie",
+            "reasoning": f"Bisher {anzahl}x so gebucht (Historie-Confidence: {confidence:.2f})",
+        }
+
     def _init_text_patterns(self) -> dict[str, dict[str, list[str]]]:
         """
         Initialisiert Textmuster für automatische Kategorisierung.
 
         Peter Zwegat: "Muster erkennen ist der Schlüssel zur Automatisierung!"
         """
-        return {
-            "einnahme": {
-                "keywords": [
-                    "rechnung",
-                    "zahlung",
-                    "überweisung",
-                    "eingang",
-                    "gutschrift",
-                    "honorar",
-                    "provision",
-                    "verkauf",
-                    "erlös",
-                    "einnahme",
-                    "gutschrift",
-                    "zahlung erhalten",
-                    "überweisen",
-                    "payment",
-                    "invoice",
-                    "receipt",
-                ],
-                "patterns": [
-                    r"rechnung[\ \-]?nr",
-                    r"re[\ \-]?\d+",
-                    r"invoice[\ \-]?\d+",
-                    r"payment[\ \-]?id",
-                    r"auftrag[\ \-]?\d+",
-                ],
-            },
-            "ausgabe": {
-                "keywords": [
-                    "lastschrift",
-                    "abbuchung",
-                    "ausgabe",
-                    "bezahlung",
-                    "rechnung",
-                    "einkauf",
-                    "aufwand",
-                    "kosten",
-                    "gebühr",
-                    "miete",
-                    "versicherung",
-                    "telefon",
-                    "internet",
-                    "strom",
-                    "gas",
-                    "wasser",
-                    "benzin",
-                    "software",
-                    "office",
-                    "amazon",
-                    "paypal",
-                    "mastercard",
-                    "visa",
-                    "subscription",
-                    "abo",
-                    "monthly",
-                    "yearly",
-                ],
-                "patterns": [
-                    r"lastschrift",
-                    r"abbuchung",
-                    r"kartenzahlung",
-                    r"ec[\ \-]?karte",
-                    r"kreditkarte",
-                    r"subscription",
-                    r"monthly[\ \-]?fee",
-                ],
-            },
-            "privatentnahme": {
-                "keywords": [
-                    "privatentnahme",
-                    "entnahme",
-                    "privat",
-                    "auszahlung",
-                    "überweisung an",
-                    "transfer",
-                    "withdrawal",
-                    "cash",
-                ],
-                "patterns": [
-                    r"privatentnahme",
-                    r"entnahme[\ \-]?privat",
-                    r"überweisung[\ \-]?an[\ \-]?selbst",
-                ],
-            },
-            "privateinlage": {
-                "keywords": [
-                    "privateinlage",
-                    "einlage",
-                    "eigenkapital",
-                    "kapitalzuführung",
-                    "einzahlung",
-                    "deposit",
-                    "capital injection",
-                ],
-                "patterns": [
-                    r"privateinlage",
-                    r"einlage[\ \-]?privat",
-                    r"eigenkapital",
-                ],
-            },
-        }
+        return TEXT_MUSTER
 
     def analyze_text(self, text: str) -> dict[str, float]:
         """
@@ -160,56 +142,32 @@ class IntelligenterKontierungsVorschlag:
         Returns:
             Dict mit Kategorien und deren Wahrscheinlichkeiten (0.0 - 1.0)
         """
-        if not text:
-            return {}
-
-        text_lower = text.lower()
-        scores = {}
-
-        for kategorie, config in self.text_patterns.items():
-            score = 0.0
-
-            # Keyword-Matching
-            keyword_matches = sum(
-                1 for keyword in config["keywords"] if keyword in text_lower
-            )
-            if keyword_matches > 0:
-                score += min(keyword_matches * 0.3, 0.8)  # Max 0.8 für Keywords
-
-            # Pattern-Matching (RegEx)
-            pattern_matches = sum(
-                1 for pattern in config["patterns"] if re.search(pattern, text_lower)
-            )
-            if pattern_matches > 0:
-                score += min(pattern_matches * 0.4, 0.6)  # Max 0.6 für Patterns
-
-            # Normalisiere Score
-            scores[kategorie] = min(score, 1.0)
-
-        return scores
+        return bewerte_text(text)
 
     def suggest_kontierung(
         self,
         buchungstext: str,
         betrag: float | None = None,
         datum: str | None = None,  # noqa: ARG002
+        geschaeftspartner_id=None,
     ) -> dict[str, Any]:
         """
-        Schlägt eine Kontierung vor basierend auf Text, Betrag und Datum.
+        Schlägt eine Kontierung vor basierend auf Historie, Text und Betrag.
 
         Returns:
             Dict mit Vorschlag-Details: soll_konto, haben_konto, confidence, kategorie
         """
-        # Textanalyse
-        text_scores = self.analyze_text(buchungstext)
-
-        # Beste Kategorie finden - nur wenn confidence > 0
-        if not text_scores:
-            return self._fallback_suggestion(betrag)
-
-        best_kategorie = max(text_scores.items(), key=lambda x: x[1])
-        kategorie, confidence = best_kategorie
+        kategorie, confidence = beste_kategorie(buchungstext)
+        historie = self._historie_vorschlag(
+            KontierungsHistorieService.vorschlag(buchungstext, geschaeftspartner_id),
+            kategorie if confidence > 0 else None,
+        )
+        return historie or self._vorschlag(kategorie, confidence, betrag)
 
+    def _vorschlag(
+        self, kategorie: str | None, confidence: float, betrag: float | None
+    ) -> dict[str, Any]:
+        """Baut den Vorschlag aus der besten Textkategorie."""
         # Nur verwenden wenn confidence > 0 (echte Übereinstimmung)
         if confidence > 0.0 and kategorie in self.standard_kontierungen:
             soll_konto, haben_konto = self.standard_kontierungen[kategorie]
@@ -235,27 +193,12 @@ class IntelligenterKontierungsVorschlag:
         confidence: float = 0.0,
     ) -> dict[str, Any]:
         """Fallback-Vorschlag wenn keine spezifische Regel gefunden wird."""
+        # Positive Beträge -> wahrscheinlich Einnahme, sonst Ausgabe
+        suggested_kategorie = "einnahme" if betrag and betrag > 0 else "ausgabe"
+        soll_nummer, haben_nummer = FALLBACK_KONTEN[suggested_kategorie]
         try:
-            # Standard-Fallback basierend auf Betrag
-            if betrag and betrag > 0:
-                # Positive Beträge -> wahrscheinlich Einnahme
-                soll_konto = Konto.objects.get(nummer="1200")  # Bank
-                haben_konto = Konto.objects.get(nummer="8400")  # Erlöse
-                suggested_kategorie = "einnahme"
-            else:
-                # Negative Beträge -> wahrscheinlich Ausgabe
-                soll_konto = Konto.objects.get(nummer="4980")  # Aufwendungen
-                haben_konto = Konto.objects.get(nummer="1200")  # Bank
-                suggested_kategorie = "ausgabe"
-
-            return {
-                "soll_konto": soll_konto,
-                "haben_konto": haben_konto,
-                "kategorie": kategorie or suggested_kategorie,
-                "confidence": confidence if confidence > 0 else 0.3,
-                "method": "fallback_amount_based",
-                "reasoning": f"Fallback basierend auf Betrag ({betrag})",
-            }
+            soll_konto = self._get_konto(soll_nummer)
+            haben_konto = self._get_konto(haben_nummer)
         except Konto.DoesNotExist:
             return {
                 "soll_konto": None,
@@ -266,32 +209,104 @@ class IntelligenterKontierungsVorschlag:
                 "reasoning": "Keine passenden Konten gefunden",
             }
 
-    def analyze_csv_batch(self, csv_rows: list[dict]) -> list[dict]:
+        return {
+            "soll_konto": soll_konto,
+            "haben_konto": haben_konto,
+            "kategorie": kategorie or suggested_kategorie,
+            "confidence": confidence if confidence > 0 else 0.3,
+            "method": "fallback_amount_based",
+            "reasoning": f"Fallback basierend auf Betrag ({betrag})",
+        }
+
+    def vorschlaege(
+        self,
+        zeilen: Iterable[tuple[str, float | None]],
+        prozesse: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Kontierungsvorschläge für viele Zeilen in einem Aufruf.
+
+        Liefert dasselbe wie ``suggest_kontierung`` je Zeile. Ab
+        ``KONTIERUNG_POOL_AB_ZEILEN`` Zeilen werden die Texte auf
+        ``prozesse`` Worker-Prozesse verteilt (Standard:
+        ``KONTIERUNG_PROZESSE``); Historie und Konten werden vorher für
+        alle Zeilen gemeinsam geladen.
+
+        Args:
+            zeilen: (Buchungstext, Betrag) je Zeile
+            prozesse: Anzahl Worker-Prozesse (1 = im aktuellen Prozess)
+        """
+        zeilen = list(zeilen)
+        self._fallback_konten_vorladen()
+
+        texte = [text for text, _ in zeilen]
+        if prozesse is None:
+            prozesse = getattr(settings, "KONTIERUNG_PROZESSE", 1)
+        if prozesse > 1 and len(texte) >= getattr(
+            settings, "KONTIERUNG_POOL_AB_ZEILEN", 50000
+        ):
+            bewertungen = _bewerte_parallel(texte, prozesse)
+        else:
+            bewertungen = bewerte_block(texte)
+
+        historie = self._historie_treffer(texte)
+        self._historie_konten_vorladen(
+            treffer[0]
+            for treffer in historie.values()
+            if treffer and treffer[1] >= HISTORIE_MIN_CONFIDENCE
+        )
+
+        return [
+            self._historie_vorschlag(
+                historie[text], kategorie if confidence > 0 else None
+            )
+            or self._vorschlag(kategorie, confidence, betrag)
+            for (kategorie, confidence), (text, betrag) in zip(
+                bewertungen, zeilen, strict=True
+            )
+        ]
+
+    @staticmethod
+    def _historie_treffer(texte: list[str]) -> dict[str, tuple | None]:
+        """Historien-Treffer je (eindeutigem) Text, alle Schlüssel auf einmal geladen."""
+        schluessel = {
+            text: KontierungsHistorieService.schluessel(text) for text in set(texte)
+        }
+        tabelle = KontierungsHistorieService.lade(
+            {s for liste in schluessel.values() for s in liste}
+        )
+        return {
+            text: KontierungsHistorieService.bewerte(liste, tabelle)
+            for text, liste in schluessel.items()
+        }
+
+    def analyze_csv_batch(
+        self, csv_rows: list[dict], prozesse: int | None = None
+    ) -> list[dict]:
         """
         Analysiert eine Liste von CSV-Zeilen und schlägt Kontierungen vor.
 
         Args:
             csv_rows: Liste von Dicts mit Spalten wie 'text', 'betrag', 'datum'
+            prozesse: siehe ``vorschlaege``
 
         Returns:
             Liste von Dicts mit ursprünglichen Daten + Kontierungsvorschlägen
         """
-        results = []
-
-        for row in csv_rows:
-            # Extrahiere relevante Felder (flexibel für verschiedene CSV-Formate)
-            text = self._extract_text_from_row(row)
-            betrag = self._extract_betrag_from_row(row)
-            datum = self._extract_datum_from_row(row)
-
-            # Vorschlag generieren
-            suggestion = self.suggest_kontierung(text, betrag, datum)
-
-            # Ursprüngliche Daten + Vorschlag kombinieren
-            result = {**row, "kontierung_vorschlag": suggestion}
-            results.append(result)
+        # Extrahiere relevante Felder (flexibel für verschiedene CSV-Formate)
+        vorschlaege = self.vorschlaege(
+            (
+                (self._extract_text_from_row(row), self._extract_betrag_from_row(row))
+                for row in csv_rows
+            ),
+            prozesse=prozesse,
+        )
 
-        return results
+        # Ursprüngliche Daten + Vorschlag kombinieren
+        return [
+            {**row, "kontierung_vorschlag": vorschlag}
+            for row, vorschlag in zip(csv_rows, vorschlaege, strict=True)
+        ]
 
     def _extract_text_from_row(self, row: dict) -> str:
         """Extrahiert Buchungstext aus einer CSV-Zeile."""
@@ -342,10 +357,42 @@ class IntelligenterKontierungsVorschlag:
         return None
 
 
+def _bewerte_parallel(
+    texte: list[str], prozesse: int
+) -> list[tuple[str | None, float]]:
+    """Verteilt die Textbewertung blockweise auf einen Prozess-Pool."""
+    if multiprocessing.current_process().daemon:
+        # Celery-Prefork: Daemon-Prozesse dürfen keine Kinder haben
+        return bewerte_block(texte)
+
+    blockgroesse = max(1000, len(texte) // (prozesse * 4) + 1)
+    iterator = iter(texte)
+    bloecke = iter(lambda: list(islice(iterator, blockgroesse)), [])
+    try:
+        # "spawn": keine geerbten DB-Verbindungen im Kindprozess
+        with ProcessPoolExecutor(
+            max_workers=prozesse, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            return [
+                bewertung
+                for block in pool.map(bewerte_block, bloecke)
+                for bewertung in block
+            ]
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning(f"Kontierungs-Pool nicht verfügbar, arbeite seriell: {e}")
+        return bewerte_block(texte)
+
+
+@request_cached
 def get_kontierung_suggestions_for_user(
     user: User,
 ) -> IntelligenterKontierungsVorschlag:
-    """Factory-Funktion für den intelligenten Kontierungsvorschlag."""
+    """
+    Factory-Funktion für den intelligenten Kontierungsvorschlag.
+
+    Innerhalb eines Requests wird die Instanz (samt geladener
+    StandardKontierungen und Konten) je Benutzer wiederverwendet.
+    """
     return IntelligenterKontierungsVorschlag(user)
 
 
@@ -0,0 +1,197 @@
+"""
+Textmuster der intelligenten Kontierung.
+
+Schlüsselwörter und reguläre Ausdrücke je Buchungskategorie sowie die
+Bewertung eines Buchungstexts. Das Modul kommt ohne Django-Modelle aus, damit
+große Batches in Worker-Prozessen bewertet werden können (siehe
+``IntelligenterKontierungsVorschlag.vorschlaege``).
+
+Peter Zwegat: "Ein gutes System erkennt Muster und macht Vorschläge!"
+"""
+
+import re
+
+from llkjj_knut.keyword_matcher import KeywordMatcher
+
+# Schlüsselwörter (Klartext) und reguläre Ausdrücke je Buchungskategorie
+TEXT_MUSTER = {
+    "einnahme": {
+        "keywords": [
+            "rechnung",
+            "zahlung",
+            "überweisung",
+            "eingang",
+            "gutschrift",
+            "honorar",
+            "provision",
+            "verkauf",
+            "erlös",
+            "einnahme",
+            "gutschrift",
+            "zahlung erhalten",
+            "überweisen",
+            "payment",
+            "invoice",
+            "receipt",
+        ],
+        "patterns": [
+            r"rechnung[\ \-]?nr",
+            r"re[\ \-]?\d+",
+            r"invoice[\ \-]?\d+",
+            r"payment[\ \-]?id",
+            r"auftrag[\ \-]?\d+",
+        ],
+    },
+    "ausgabe": {
+        "keywords": [
+            "lastschrift",
+            "abbuchung",
+            "ausgabe",
+            "bezahlung",
+            "rechnung",
+            "einkauf",
+            "aufwand",
+            "kosten",
+            "gebühr",
+            "miete",
+            "versicherung",
+            "telefon",
+            "internet",
+            "strom",
+            "gas",
+            "wasser",
+            "benzin",
+            "software",
+            "office",
+            "amazon",
+            "paypal",
+            "mastercard",
+            "visa",
+            "subscription",
+            "abo",
+            "monthly",
+            "yearly",
+        ],
+        "patterns": [
+            r"lastschrift",
+            r"abbuchung",
+            r"kartenzahlung",
+            r"ec[\ \-]?karte",
+            r"kreditkarte",
+            r"subscription",
+            r"monthly[\ \-]?fee",
+        ],
+    },
+    "privatentnahme": {
+        "keywords": [
+            "privatentnahme",
+            "entnahme",
+            "privat",
+            "auszahlung",
+            "überweisung an",
+            "transfer",
+            "withdrawal",
+            "cash",
+        ],
+        "patterns": [
+            r"privatentnahme",
+            r"entnahme[\ \-]?privat",
+            r"überweisung[\ \-]?an[\ \-]?selbst",
+        ],
+    },
+    "privateinlage": {
+        "keywords": [
+            "privateinlage",
+            "einlage",
+            "eigenkapital",
+            "kapitalzuführung",
+            "einzahlung",
+            "deposit",
+            "capital injection",
+        ],
+        "patterns": [
+            r"privateinlage",
+            r"einlage[\ \-]?privat",
+            r"eigenkapital",
+        ],
+    },
+}
+
+# Einmal beim Import kompiliert: alle Schlüsselwörter in einem Durchlauf
+TEXT_MATCHER = KeywordMatcher(
+    {kategorie: config["keywords"] for kategorie, config in TEXT_MUSTER.items()}
+)
+TEXT_REGEX = {
+    kategorie: [re.compile(pattern) for pattern in config["patterns"]]
+    for kategorie, config in TEXT_MUSTER.items()
+}
+
+# Alle RegEx-Muster in einer Alternation: Texte ohne Treffer (der Normalfall)
+# kosten einen Scan statt eines re.search je Muster
+TEXT_REGEX_VORFILTER = re.compile(
+    "|".join(
+        f"(?:{pattern})"
+        for config in TEXT_MUSTER.values()
+        for pattern in config["patterns"]
+    )
+)
+
+
+def bewerte_text(text: str) -> dict[str, float]:
+    """
+    Wahrscheinlichkeiten (0.0 - 1.0) je Kategorie für einen Buchungstext.
+
+    Leerer Text ergibt ein leeres Dict.
+    """
+    if not text:
+        return {}
+
+    text_lower = text.lower()
+    scores = {}
+    keyword_treffer = TEXT_MATCHER.treffer_je_kategorie(
+        text_lower, vorkommen_zaehlen=False
+    )
+    muster_moeglich = TEXT_REGEX_VORFILTER.search(text_lower) is not None
+
+    for kategorie, muster in TEXT_REGEX.items():
+        score = 0.0
+
+        # Keyword-Matching (ein Durchlauf für alle Kategorien)
+        keyword_matches = keyword_treffer[kategorie]
+        if keyword_matches > 0:
+            score += min(keyword_matches * 0.3, 0.8)  # Max 0.8 für Keywords
+
+        # Pattern-Matching (RegEx, vorkompiliert) nur nach Vorfilter-Treffer
+        if muster_moeglich:
+            pattern_matches = sum(1 for pattern in muster if pattern.search(text_lower))
+            if pattern_matches > 0:
+                score += min(pattern_matches * 0.4, 0.6)  # Max 0.6 für Patterns
+
+        # Normalisiere Score
+        scores[kategorie] = min(score, 1.0)
+
+    return scores
+
+
+def beste_kategorie(text: str) -> tuple[str | None, float]:
+    """Kategorie mit der höchsten Wahrscheinlichkeit; ``(None, 0.0)`` ohne Text."""
+    scores = bewerte_text(text)
+    if not scores:
+        return None, 0.0
+    return max(scores.items(), key=lambda x: x[1])
+
+
+def bewerte_block(texte: list[str]) -> list[tuple[str | None, float]]:
+    """
+    ``beste_kategorie`` für einen Block Texte (läuft ggf. im Worker-Prozess).
+
+    Wiederkehrende Texte (Miete, Abos, Kontoführung) werden nur einmal bewertet.
+    """
+    bewertet: dict[str, tuple[str | None, float]] = {}
+    ergebnis = []
+    for text in texte:
+        bewertung = bewertet.get(text)
+        if bewertung is None:
+            bewertung = bewertet[text] = beste_kategorie(text)
+        ergebnis.append(bewertung)
+    return ergebnis
@@ -0,0 +1 @@
+# Management Commands für Buchungen
@@ -0,0 +1 @@
+# Django Management Commands
@@ -0,0 +1,191 @@
+"""
+Management Command: Benchmark des CSV-Exports
+=============================================
+
+Vergleicht den bisherigen Export (Modellinstanzen mit ``select_related``
+in ein ``HttpResponse``) mit dem Streaming-Export aus ``buchungen.export``:
+Laufzeit, Zeit bis zum ersten Byte und Spitzenverbrauch an Speicher
+(``tracemalloc``). Beide Exporte müssen byteweise identisch sein.
+
+Alle Testdaten werden in einer Transaktion angelegt und am Ende wieder
+zurückgerollt - die Datenbank bleibt unverändert.
+
+Beispiel:
+    python manage.py benchmark_export --anzahl 1000000
+"""
+
+import csv
+import hashlib
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import HttpResponse
+
+from buchungen import export
+from buchungen.models import Buchungssatz, Geschaeftspartner
+from konten.models import Konto
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = "Benchmark: CSV-Export über Modellinstanzen vs. Streaming"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--anzahl",
+            type=int,
+            default=1_000_000,
+            help="Anzahl synthetischer Buchungssätze (Standard: 1000000)",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=5_000,
+            help="Batch-Größe für bulk_create",
+        )
+        parser.add_argument(
+            "--ohne-vergleich",
+            action="store_true",
+            help="Nur den Streaming-Export messen (der alte Weg braucht GBs)",
+        )
+
+    def handle(self, *args, **options):
+        anzahl = options["anzahl"]
+
+        with transaction.atomic():
+            self.stdout.write(f"🎯 Erzeuge {anzahl:,} synthetische Buchungssätze...")
+            start = time.perf_counter()
+            self._erzeuge_hauptbuch(anzahl, options["batch"])
+            self.stdout.write(f"  Testdaten in {time.perf_counter() - start:.1f}s")
+
+            queryset = Buchungssatz.objects.select_related(
+                "soll_konto", "haben_konto", "geschaeftspartner", "beleg"
+            ).order_by("-buchungsdatum", "-erstellt_am")
+
+            neu = self._messe_streaming(queryset)
+            alt = None if options["ohne_vergleich"] else self._messe_bisher(queryset)
+
+            # Testdaten verwerfen
+            transaction.set_rollback(True)
+
+        if alt and alt["sha256"] != neu["sha256"]:
+            raise CommandError(
+                "❌ Exporte weichen ab - Streaming-Export ist fehlerhaft!"
+            )
+
+        self.stdout.write(self.style.SUCCESS("=== CSV-Export-Benchmark ==="))
+        self.stdout.write(f"  Zeilen:             {anzahl:12,}")
+        self.stdout.write(f"  Exportgröße:        {neu['bytes'] / MB:12.1f} MB")
+        for titel, werte in (("Bisher", alt), ("Streaming", neu)):
+            if werte is None:
+                continue
+            self.stdout.write(
+                f"  {titel + ':':<11} {werte['zeit']:7.2f}s gesamt, "
+                f"erstes Byte nach {werte['erstes_byte'] * 1000:8.1f} ms, "
+                f"Speicher-Spitze {werte['spitze'] / MB:8.1f} MB"
+            )
+        if alt:
+            self.stdout.write("  Ergebnis identisch: ✓")
+
+    @staticmethod
+    def _messe_streaming(queryset) -> dict:
+        """Konsumiert die ``StreamingHttpResponse`` wie ein WSGI-Server."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = export.csv_response(queryset, "benchmark.csv")
+        pruefsumme = hashlib.sha256()
+        groesse = 0
+        erstes_byte = None
+        for block in response.streaming_content:
+            if erstes_byte is None:
+                erstes_byte = time.perf_counter() - start
+            pruefsumme.update(block)
+            groesse += len(block)
+        zeit = time.perf_counter() - start
+        _, spitze = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            "zeit": zeit,
+            "erstes_byte": erstes_byte,
+            "spitze": spitze,
+            "bytes": groesse,
+            "sha256": pruefsumme.hexdigest(),
+        }
+
+    @staticmethod
+    def _messe_bisher(queryset) -> dict:
+        """Der Export vor dem Streaming - das erste Byte kommt erst am Ende."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = HttpResponse(content_type="text/csv")
+        response.write("\ufeff")
+        writer = csv.writer(response, delimiter=";")
+        writer.writerow([titel for titel, _ in export.EXPORT_SPALTEN])
+        for buchung in queryset:
+            writer.writerow(
+                [
+                    buchung.buchungsdatum.strftime("%d.%m.%Y"),
+                    buchung.buchungstext,
+                    f"{buchung.betrag:.2f}".replace(".", ","),
+                    f"{buchung.soll_konto.nummer} - {buchung.soll_konto.name}",
+                    f"{buchung.haben_konto.nummer} - {buchung.haben_konto.name}",
+                    buchung.geschaeftspartner.name if buchung.geschaeftspartner else "",
+                    buchung.referenz,
+                    "Ja" if buchung.validiert else "Nein",
+                    buchung.erstellt_am.strftime("%d.%m.%Y %H:%M"),
+                ]
+            )
+        inhalt = response.content
+        zeit = time.perf_counter() - start
+        _, spitze = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            "zeit": zeit,
+            "erstes_byte": zeit,
+            "spitze": spitze,
+            "bytes": len(inhalt),
+            "sha256": hashlib.sha256(inhalt).hexdigest(),
+        }
+
+    @staticmethod
+    def _erzeuge_hauptbuch(anzahl: int, batch: int) -> None:
+        """Legt Konten, Partner und ``anzahl`` Buchungssätze per bulk_create an."""
+        konten = [
+            Konto.objects.get_or_create(
+                nummer=nummer,
+                defaults={"name": name, "kategorie": kategorie, "typ": "SONSTIGE"},
+            )[0]
+            for nummer, name, kategorie in [
+                ("1200", "Bank", "AKTIVKONTO"),
+                ("4980", "Sonstiger Betriebsbedarf", "AUFWAND"),
+                ("8400", "Erlöse 19 % USt", "ERLÖSE"),
+            ]
+        ]
+        partner = [
+            Geschaeftspartner.objects.create(name=f"Benchmark-Partner {i}")
+            for i in range(20)
+        ]
+
+        zufall = random.Random(42)  # noqa: S311 - nur Testdaten
+        start = date.today() - timedelta(days=5 * 365)
+        for offset in range(0, anzahl, batch):
+            Buchungssatz.objects.bulk_create(
+                [
+                    Buchungssatz(
+                        buchungsdatum=start + timedelta(days=zufall.randrange(5 * 365)),
+                        buchungstext=f'Buchung {offset + i}; Rechnung "{i}"',
+                        betrag=Decimal(zufall.randrange(100, 500_000)) / 100,
+                        soll_konto=konten[i % 2],
+                        haben_konto=konten[2 - i % 2],
+                        geschaeftspartner=partner[i % 20] if i % 3 else None,
+                        referenz=f"RE-{offset + i}",
+                    )
+                    for i in range(min(batch, anzahl - offset))
+                ]
+            )
@@ -0,0 +1,173 @@
+"""
+Management Command: Benchmark der Kontierungsvorschläge
+=======================================================
+
+Vergleicht ``suggest_kontierung`` je Zeile mit dem Batch-Modus
+``IntelligenterKontierungsVorschlag.vorschlaege`` (Konten einmal aufgelöst,
+RegEx-Vorfilter) - seriell und verteilt auf Worker-Prozesse.
+
+Benutzer, Konten und StandardKontierungen werden in einer Transaktion
+angelegt und am Ende wieder zurückgerollt - die Datenbank bleibt unverändert.
+
+Beispiel:
+    python manage.py benchmark_kontierung --anzahl 100000 --prozesse 4
+"""
+
+import os
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from buchungen.intelligent_kontierung import IntelligenterKontierungsVorschlag
+from einstellungen.models import Benutzerprofil, StandardKontierung
+from konten.models import Konto
+
+# Typische Verwendungszwecke aus Kontoauszügen - teils wiederkehrend
+# (Miete, Abos), teils mit wechselnden Nummern
+TEXTE = [
+    "SEPA-Lastschrift TELEKOM DEUTSCHLAND GMBH Kd-Nr {n}",
+    "AMAZON EU SARL Kartenzahlung {n}",
+    "Gutschrift Honorar Projekt {n} Rechnung Nr {n}",
+    "Überweisung Miete Atelier",
+    "PAYPAL EUROPE Subscription monthly fee",
+    "Privatentnahme Lebenshaltung",
+    "Einzahlung Privateinlage Eigenkapital",
+    "Stadtwerke Strom Abschlag {n}",
+    "Kontoführungsentgelt",
+    "Verkauf Druck Edition {n} Invoice {n}",
+    "Zinsen",
+]
+
+KONTEN = {
+    "1200": ("Bank", "AKTIVKONTO"),
+    "1800": ("Privatentnahmen", "EIGENKAPITAL"),
+    "1890": ("Privateinlagen", "EIGENKAPITAL"),
+    "4980": ("Sonstiger Betriebsbedarf", "AUFWAND"),
+    "8400": ("Erlöse 19 % USt", "ERLÖSE"),
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark: Kontierungsvorschläge zeilenweise vs. Batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--anzahl",
+            type=int,
+            default=100_000,
+            help="Anzahl synthetischer Bankzeilen (Standard: 100000)",
+        )
+        parser.add_argument(
+            "--prozesse",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker-Prozesse für den parallelen Batch (Standard: CPU-Kerne)",
+        )
+
+    def handle(self, *args, **options):
+        anzahl = options["anzahl"]
+        zufall = random.Random(42)  # noqa: S311 - nur Testdaten
+        zeilen = [
+            (
+                zufall.choice(TEXTE).format(n=zufall.randrange(100_000)),
+                zufall.choice((-1, 1)) * zufall.randrange(100, 500_000) / 100,
+            )
+            for _ in range(anzahl)
+        ]
+
+        with transaction.atomic():
+            user = self._erzeuge_stammdaten()
+
+            self.stdout.write(f"🎯 Bewerte {anzahl:,} Bankzeilen...")
+            start = time.perf_counter()
+            kontierung = IntelligenterKontierungsVorschlag(user)
+            zeilenweise = [
+                kontierung.suggest_kontierung(text, betrag) for text, betrag in zeilen
+            ]
+            zeilenweise_zeit = time.perf_counter() - start
+
+            start = time.perf_counter()
+            batch = IntelligenterKontierungsVorschlag(user).vorschlaege(
+                zeilen, prozesse=1
+            )
+            batch_zeit = time.perf_counter() - start
+
+            parallel_zeit = None
+            if options["prozesse"] > 1:
+                start = time.perf_counter()
+                # Pool unabhängig von KONTIERUNG_POOL_AB_ZEILEN erzwingen
+                with override_settings(KONTIERUNG_POOL_AB_ZEILEN=0):
+                    parallel = IntelligenterKontierungsVorschlag(user).vorschlaege(
+                        zeilen, prozesse=options["prozesse"]
+                    )
+                parallel_zeit = time.perf_counter() - start
+                if self._kern(parallel) != self._kern(batch):
+                    raise CommandError("❌ Paralleler Batch weicht ab!")
+
+            # Testdaten verwerfen
+            transaction.set_rollback(True)
+
+        if self._kern(zeilenweise) != self._kern(batch):
+            raise CommandError("❌ Ergebnisse weichen ab - Batch-Modus ist fehlerhaft!")
+
+        self.stdout.write(self.style.SUCCESS("=== Kontierungs-Benchmark ==="))
+        self.stdout.write(f"  Zeilenweise:      {zeilenweise_zeit:9.2f}s")
+        self.stdout.write(
+            f"  Batch:            {batch_zeit:9.2f}s "
+            f"({zeilenweise_zeit / batch_zeit:.1f}x)"
+        )
+        if parallel_zeit is not None:
+            self.stdout.write(
+                f"  Batch parallel:   {parallel_zeit:9.2f}s "
+                f"({zeilenweise_zeit / parallel_zeit:.1f}x, "
+                f"{options['prozesse']} Prozesse)"
+            )
+        self.stdout.write(
+            f"  Zeilen/Sekunde:   {anzahl / min(batch_zeit, parallel_zeit or batch_zeit):9,.0f}"
+        )
+        self.stdout.write("  Ergebnis identisch: ✓")
+
+    @staticmethod
+    def _kern(vorschlaege: list[dict]) -> list[tuple]:
+        """Vergleichbare Kernwerte der Vorschläge."""
+        return [
+            (
+                v["kategorie"],
+                v["confidence"],
+                v["method"],
+                v["soll_konto"] and v["soll_konto"].pk,
+                v["haben_konto"] and v["haben_konto"].pk,
+            )
+            for v in vorschlaege
+        ]
+
+    @staticmethod
+    def _erzeuge_stammdaten() -> User:
+        """Legt Benutzer, Konten und StandardKontierungen für den Lauf an."""
+        konten = {}
+        for nummer, (name, kategorie) in KONTEN.items():
+            konten[nummer], _ = Konto.objects.get_or_create(
+                nummer=nummer,
+                defaults={"name": name, "kategorie": kategorie, "typ": "SONSTIGE"},
+            )
+
+        user = User.objects.create_user(username="benchmark_kontierung")
+        profil, _ = Benutzerprofil.objects.get_or_create(user=user)
+        for buchungstyp, soll, haben in [
+            ("einnahme", "1200", "8400"),
+            ("ausgabe", "4980", "1200"),
+            ("privatentnahme", "1800", "1200"),
+            ("privateinlage", "1200", "1890"),
+        ]:
+            StandardKontierung.objects.create(
+                benutzerprofil=profil,
+                buchungstyp=buchungstyp,
+                soll_konto=konten[soll],
+                haben_konto=konten[haben],
+                ist_aktiv=True,
+            )
+        return user
@@ -0,0 +1,34 @@
+"""
+Management Command: Kontierungs-Historie neu aufbauen
+=====================================================
+
+Zählt die ``KontierungsHistorie`` komplett aus den Buchungssätzen neu -
+z.B. nach der Einführung, nach Massenänderungen per ``QuerySet.update``
+oder zur Kontrolle der inkrementell gepflegten Werte.
+
+Beispiel:
+    python manage.py rebuild_kontierung_historie
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from buchungen.services import KontierungsHistorieService
+
+
+class Command(BaseCommand):
+    help = "Baut die Kontierungs-Historie aus den Buchungssätzen neu auf"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Baue Kontierungs-Historie neu auf...")
+
+        start = time.perf_counter()
+        anzahl = KontierungsHistorieService.neu_aufbauen()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {anzahl} Historien-Einträge in "
+                f"{time.perf_counter() - start:.2f}s aufgebaut"
+            )
+        )
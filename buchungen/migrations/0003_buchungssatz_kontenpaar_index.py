@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Abdeckender Index für die gruppierte EÜR-Berechnung.
+
+    Die Summen je Soll-/Haben-Kontenpaar eines Zeitraums lassen sich damit
+    vollständig aus dem Index lesen, ohne die Tabelle selbst anzufassen.
+    """
+
+    dependencies = [
+        ("buchungen", "0002_auto_20250701_0222"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="buchungssatz",
+            index=models.Index(
+                fields=["buchungsdatum", "soll_konto", "haben_konto", "betrag"],
+                name="idx_buchung_kontenpaar_summe",
+            ),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:18
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("buchungen", "0003_buchungssatz_kontenpaar_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CSVImportJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "dateiname",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Dateiname"
+                    ),
+                ),
+                ("ablage", models.JSONField(default=dict, verbose_name="Ablage")),
+                (
+                    "mapping",
+                    models.JSONField(default=dict, verbose_name="Spaltenzuordnung"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("WARTEND", "Wartend"),
+                            ("LAEUFT", "Läuft"),
+                            ("ABGESCHLOSSEN", "Abgeschlossen"),
+                            ("ABGEBROCHEN", "Abgebrochen"),
+                            ("FEHLER", "Fehler"),
+                        ],
+                        default="WARTEND",
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "gesamt_zeilen",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Zeilen gesamt"
+                    ),
+                ),
+                (
+                    "verarbeitete_zeilen",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Zeilen bis einschließlich des letzten übernommenen Blocks",
+                        verbose_name="Verarbeitete Zeilen",
+                    ),
+                ),
+                (
+                    "erfolgreich",
+                    models.PositiveIntegerField(default=0, verbose_name="Erfolgreich"),
+                ),
+                (
+                    "fehler_anzahl",
+                    models.PositiveIntegerField(default=0, verbose_name="Fehler"),
+                ),
+                (
+                    "fehler",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="Fehlermeldungen"
+                    ),
+                ),
+                ("celery_task_id", models.CharField(blank=True, max_length=255)),
+                (
+                    "erstellt_am",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Erstellt am"),
+                ),
+                (
+                    "aktualisiert_am",
+                    models.DateTimeField(auto_now=True, verbose_name="Aktualisiert am"),
+                ),
+                (
+                    "benutzer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="csv_import_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Benutzer",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "CSV-Import",
+                "verbose_name_plural": "CSV-Importe",
+                "ordering": ["-erstellt_am"],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buchungen', '0004_csvimportjob'),
+        ('konten', '0003_alter_konto_kategorie_alter_konto_typ'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KontierungsHistorie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schluessel', models.CharField(max_length=64, verbose_name='Schlüssel')),
+                ('anzahl', models.PositiveIntegerField(default=0, verbose_name='Anzahl Buchungen')),
+                ('haben_konto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='konten.konto', verbose_name='Haben-Konto')),
+                ('soll_konto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='konten.konto', verbose_name='Soll-Konto')),
+            ],
+            options={
+                'verbose_name': 'Kontierungs-Historie',
+                'verbose_name_plural': 'Kontierungs-Historie',
+                'ordering': ['schluessel', '-anzahl'],
+                'unique_together': {('schluessel', 'soll_konto', 'haben_konto')},
+            },
+        ),
+    ]
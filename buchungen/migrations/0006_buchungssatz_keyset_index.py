@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Index für die Keyset-Pagination der Buchungsliste.
+
+    Die Liste blättert über (buchungsdatum, erstellt_am, id) absteigend;
+    jede Seite ist damit ein kurzer Bereich im Index statt eines OFFSET-Scans.
+    """
+
+    dependencies = [
+        ("buchungen", "0005_kontierungshistorie"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="buchungssatz",
+            index=models.Index(
+                fields=["-buchungsdatum", "-erstellt_am", "-id"],
+                name="idx_buchung_keyset",
+            ),
+        ),
+    ]
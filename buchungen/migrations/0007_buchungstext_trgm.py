@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from llkjj_knut.migrationen import NurPostgreSQL
+
+
+class Migration(migrations.Migration):
+    """
+    Trigramm-Index für die Ähnlichkeitssuche (siehe ``buchungen/aehnlichkeit.py``).
+
+    Nur PostgreSQL: Erweiterung ``pg_trgm`` und GIN-Index mit
+    ``gin_trgm_ops`` auf ``buchungstext``. Andere Datenbanken nutzen den
+    Index im Prozess und brauchen hier nichts.
+    """
+
+    dependencies = [
+        ("buchungen", "0006_buchungssatz_keyset_index"),
+    ]
+
+    operations = [
+        NurPostgreSQL(
+            sql="CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            reverse_sql="DROP EXTENSION IF EXISTS pg_trgm",
+        ),
+        NurPostgreSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS buchungen_buchungssatz_text_trgm "
+                "ON buchungen_buchungssatz USING GIN (buchungstext gin_trgm_ops)"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS buchungen_buchungssatz_text_trgm",
+        ),
+    ]
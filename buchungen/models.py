@@ -295,6 +295,16 @@ class Buchungssatz(models.Model):
             models.Index(fields=["geschaeftspartner"]),
             models.Index(fields=["betrag"]),
             models.Index(fields=["validiert"]),
+            # Abdeckender Index für gruppierte Summen je Kontenpaar (EÜR)
+            models.Index(
+                fields=["buchungsdatum", "soll_konto", "haben_konto", "betrag"],
+                name="idx_buchung_kontenpaar_summe",
+            ),
+            # Keyset-Pagination der Buchungsliste (llkjj_knut.keyset)
+            models.Index(
+                fields=["-buchungsdatum", "-erstellt_am", "-id"],
+                name="idx_buchung_keyset",
+            ),
         ]
 
     def __str__(self):
@@ -442,3 +452,139 @@ class Buchungssatz(models.Model):
             buchungsdatum__month=monat,
             soll_konto__kategorie="AUFWAND",
         )
+
+
+class CSVImportJob(models.Model):
+    """
+    Ein im Hintergrund laufender CSV-/Excel-Import.
+
+    Der Fortschritt wird nach jedem Block in derselben Transaktion wie die
+    Buchungen gespeichert. ``verarbeitete_zeilen`` zeigt damit immer auf die
+    letzte vollständig übernommene Zeile - nach Abbruch oder Absturz setzt
+    der Import genau dort wieder an.
+
+    Peter Zwegat: "Wer mittendrin aufhört, muss wissen, wo er weitermacht!"
+    """
+
+    STATUS_CHOICES = [
+        ("WARTEND", "Wartend"),
+        ("LAEUFT", "Läuft"),
+        ("ABGESCHLOSSEN", "Abgeschlossen"),
+        ("ABGEBROCHEN", "Abgebrochen"),
+        ("FEHLER", "Fehler"),
+    ]
+
+    # Höchstens so viele Fehlermeldungen werden gespeichert
+    MAX_FEHLERMELDUNGEN = 200
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    benutzer = models.ForeignKey(
+        "auth.User",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="csv_import_jobs",
+        verbose_name="Benutzer",
+    )
+
+    dateiname = models.CharField(max_length=255, blank=True, verbose_name="Dateiname")
+
+    # Beschreibung der abgelegten Datei (siehe CSVStaging) und Spaltenzuordnung
+    ablage = models.JSONField(default=dict, verbose_name="Ablage")
+    mapping = models.JSONField(default=dict, verbose_name="Spaltenzuordnung")
+
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="WARTEND", verbose_name="Status"
+    )
+
+    gesamt_zeilen = models.PositiveIntegerField(default=0, verbose_name="Zeilen gesamt")
+    verarbeitete_zeilen = models.PositiveIntegerField(
+        default=0,
+        help_text="Zeilen bis einschließlich des letzten übernommenen Blocks",
+        verbose_name="Verarbeitete Zeilen",
+    )
+    erfolgreich = models.PositiveIntegerField(default=0, verbose_name="Erfolgreich")
+    fehler_anzahl = models.PositiveIntegerField(default=0, verbose_name="Fehler")
+    fehler = models.JSONField(default=list, blank=True, verbose_name="Fehlermeldungen")
+
+    celery_task_id = models.CharField(max_length=255, blank=True)
+
+    erstellt_am = models.DateTimeField(auto_now_add=True, verbose_name="Erstellt am")
+    aktualisiert_am = models.DateTimeField(
+        auto_now=True, verbose_name="Aktualisiert am"
+    )
+
+    class Meta:
+        verbose_name = "CSV-Import"
+        verbose_name_plural = "CSV-Importe"
+        ordering = ["-erstellt_am"]
+
+    def __str__(self):
+        return f"{self.dateiname or 'CSV-Import'} ({self.get_status_display()})"
+
+    @property
+    def prozent(self) -> int:
+        """Fortschritt in Prozent."""
+        if not self.gesamt_zeilen:
+            return 100 if self.status == "ABGESCHLOSSEN" else 0
+        return min(100, round(self.verarbeitete_zeilen * 100 / self.gesamt_zeilen))
+
+    @property
+    def ist_aktiv(self) -> bool:
+        return self.status in ("WARTEND", "LAEUFT")
+
+    def fortschritt(self) -> dict:
+        """JSON-taugliche Zusammenfassung für den Fortschritts-Endpunkt."""
+        return {
+            "job_id": str(self.id),
+            "status": self.status,
+            "status_text": self.get_status_display(),
+            "gesamt_zeilen": self.gesamt_zeilen,
+            "verarbeitete_zeilen": self.verarbeitete_zeilen,
+            "erfolgreich": self.erfolgreich,
+            "fehler_anzahl": self.fehler_anzahl,
+            "fehler": self.fehler[-20:],
+            "prozent": self.prozent,
+        }
+
+
+class KontierungsHistorie(models.Model):
+    """
+    Häufigkeit eines Kontenpaars je Stichwort aus früheren Buchungen.
+
+    Ein Schlüssel ist ein normalisiertes Wort des Buchungstexts (``w:telekom``)
+    oder ein Geschäftspartner (``p:<uuid>``). Wird bei jedem Speichern/Löschen
+    eines Buchungssatzes inkrementell fortgeschrieben (siehe
+    ``buchungen.signals``) und kann mit ``manage.py rebuild_kontierung_historie``
+    komplett neu aufgebaut werden.
+
+    Peter Zwegat: "Wer weiß, wie er es letztes Mal gemacht hat, muss nicht raten!"
+    """
+
+    schluessel = models.CharField(max_length=64, verbose_name="Schlüssel")
+
+    soll_konto = models.ForeignKey(
+        "konten.Konto",
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Soll-Konto",
+    )
+
+    haben_konto = models.ForeignKey(
+        "konten.Konto",
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Haben-Konto",
+    )
+
+    anzahl = models.PositiveIntegerField(default=0, verbose_name="Anzahl Buchungen")
+
+    class Meta:
+        verbose_name = "Kontierungs-Historie"
+        verbose_name_plural = "Kontierungs-Historie"
+        ordering = ["schluessel", "-anzahl"]
+        unique_together = ["schluessel", "soll_konto", "haben_konto"]
+
+    def __str__(self):
+        return f"{self.schluessel}: {self.soll_konto_id} an {self.haben_konto_id} ({self.anzahl}x)"
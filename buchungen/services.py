@@ -4,20 +4,68 @@ Peter Zwegat: "Ordnung in der Logik ist der Schlüssel zum Erfolg!"
 """
 
 import logging
-from datetime import date
+import re
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from datetime import date, timedelta
 from decimal import Decimal
+from itertools import islice
 
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 
 from belege.models import Beleg
 from konten.models import Konto
+from llkjj_knut.cache_utils import konto_nach_nummer
 
-from .models import Buchungssatz, Geschaeftspartner
+from . import aehnlichkeit
+from .models import Buchungssatz, Geschaeftspartner, KontierungsHistorie
 
 logger = logging.getLogger(__name__)
 
+# Stichwörter aus mindestens drei Buchstaben - Kunden- und Rechnungsnummern
+# ändern sich bei jeder Buchung und taugen nicht für die Historie
+HISTORIE_WORT_RE = re.compile(r"[^\W\d_]{3,}")
+HISTORIE_STOPPWOERTER = frozenset(
+    ["und", "der", "die", "das", "den", "dem", "des", "für", "von", "vom", "mit"]
+    + ["bei", "zum", "zur", "auf", "the", "and", "for"]
+)
+HISTORIE_MAX_WOERTER = 12
+# Ein bekannter Geschäftspartner zählt so viel wie zwei Stichwörter
+HISTORIE_PARTNER_GEWICHT = 2.0
+HISTORIE_BATCH = 500
+
+# Gruppierungen für ``get_buchungs_statistiken``: Name -> (Schlüsselfelder, Sortierung)
+STATISTIK_GRUPPIERUNGEN = {
+    "soll_konto": (
+        {
+            "konto_id": F("soll_konto_id"),
+            "konto_nummer": F("soll_konto__nummer"),
+            "konto_name": F("soll_konto__name"),
+        },
+        ["konto_nummer"],
+    ),
+    "haben_konto": (
+        {
+            "konto_id": F("haben_konto_id"),
+            "konto_nummer": F("haben_konto__nummer"),
+            "konto_name": F("haben_konto__name"),
+        },
+        ["konto_nummer"],
+    ),
+    "geschaeftspartner": (
+        {
+            "partner_id": F("geschaeftspartner_id"),
+            "partner_name": F("geschaeftspartner__name"),
+        },
+        ["partner_name", "partner_id"],
+    ),
+    "monat": ({"monat": TruncMonth("buchungsdatum")}, ["monat"]),
+}
+
 
 class BuchungsService:
     """
@@ -130,8 +178,8 @@ class BuchungsService:
         kontierung = kontierungen[buchungstyp]
 
         try:
-            soll_konto = Konto.objects.get(nummer=kontierung["soll"])
-            haben_konto = Konto.objects.get(nummer=kontierung["haben"])
+            soll_konto = konto_nach_nummer(kontierung["soll"])
+            haben_konto = konto_nach_nummer(kontierung["haben"])
         except Konto.DoesNotExist as e:
             raise ValidationError(f"Standard-Konto nicht gefunden: {e}")
 
@@ -170,119 +218,42 @@ class BuchungsService:
         mapping: dict[int, str],
         default_soll_konto: str = "1200",
         default_haben_konto: str = "8400",
+        chunk_size: int | None = None,
+        duplikate_ueberspringen: bool | None = None,
     ) -> tuple[int, list[str]]:
         """
         Importiert Buchungen aus CSV-Daten.
+
+        Nutzt die ``BuchungsImportEngine``: Konten werden einmal aufgelöst,
+        Zeilen im Speicher geprüft und blockweise per ``bulk_create``
+        geschrieben.
         Peter Zwegat: "Automatisierung ist der Freund des Buchhalters!"
         """
-
-        erfolgreiche_importe = 0
-        fehler = []
-
-        # Standard-Konten laden
-        try:
-            std_soll = Konto.objects.get(nummer=default_soll_konto)
-            std_haben = Konto.objects.get(nummer=default_haben_konto)
-        except Konto.DoesNotExist:
-            raise ValidationError("Standard-Konten für CSV-Import nicht gefunden!")
-
-        with transaction.atomic():
-            for i, zeile in enumerate(csv_daten, 1):
-                try:
-                    # Daten aus Zeile extrahieren
-                    buchung_data = BuchungsService._extrahiere_buchung_aus_csv_zeile(
-                        zeile, mapping  # type: ignore[arg-type]
-                    )
-
-                    if not buchung_data:
-                        continue  # Leere Zeile überspringen
-
-                    # Intelligente Kontierung versuchen
-                    soll_konto, haben_konto = (
-                        BuchungsService._bestimme_konten_intelligent(
-                            buchung_data, std_soll, std_haben
-                        )
-                    )
-
-                    # Buchung erstellen
-                    BuchungsService.erstelle_buchung(
-                        buchungsdatum=buchung_data.get("datum", timezone.now().date()),
-                        buchungstext=buchung_data.get("text", "CSV-Import"),
-                        betrag=buchung_data["betrag"],
-                        soll_konto=soll_konto,
-                        haben_konto=haben_konto,
-                        referenz=buchung_data.get("referenz", ""),
-                        automatisch_erstellt=True,
-                    )
-
-                    erfolgreiche_importe += 1
-
-                except Exception as e:
-                    fehler.append(f"Zeile {i}: {str(e)}")
-                    logger.warning(f"CSV-Import Fehler in Zeile {i}: {e}")
-
-        logger.info(
-            f"CSV-Import abgeschlossen: {erfolgreiche_importe} erfolgreich, {len(fehler)} Fehler"
+        # Import hier um Circular Import zu vermeiden
+        from .import_engine import BuchungsImportEngine
+
+        engine = BuchungsImportEngine(
+            mapping,
+            default_soll_konto=default_soll_konto,
+            default_haben_konto=default_haben_konto,
+            chunk_size=chunk_size,
+            duplikate_ueberspringen=duplikate_ueberspringen,
         )
-        return erfolgreiche_importe, fehler
-
-    @staticmethod
-    def _extrahiere_buchung_aus_csv_zeile(
-        zeile: list[str], mapping: dict[int, str]
-    ) -> dict | None:
-        """
-        Extrahiert Buchungsdaten aus einer CSV-Zeile basierend auf Mapping.
-        """
-        if not zeile:
-            return None
-
-        buchung_data = {}
-
-        for spalte_index, feld_name in mapping.items():
-            if spalte_index < len(zeile):
-                wert = zeile[spalte_index].strip()
-
-                if feld_name == "betrag":
-                    try:
-                        # Betrag normalisieren (Komma zu Punkt, € entfernen)
-                        wert = wert.replace(",", ".").replace("€", "").replace(" ", "")
-                        buchung_data["betrag"] = abs(Decimal(wert))
-                    except (ValueError, TypeError):
-                        raise ValidationError(f"Ungültiger Betrag: {wert}")
-
-                elif feld_name == "buchungsdatum":
-                    # Intelligentes Datum-Parsing implementiert
-                    datum = BuchungsService._parse_datum_intelligent(wert)
-                    if datum:
-                        buchung_data["buchungsdatum"] = datum
-                    else:
-                        logger.warning(f"Konnte Datum nicht parsen: {wert}")
-                        # Fallback: heute verwenden
-                        from django.utils import timezone
-
-                        buchung_data["buchungsdatum"] = timezone.now().date()
-
-                else:
-                    if feld_name.replace("buchungs", "") == "betrag":
-                        buchung_data[feld_name.replace("buchungs", "")] = Decimal(
-                            str(wert)
-                        )
-                    else:
-                        buchung_data[feld_name.replace("buchungs", "")] = wert
-
-        # Betrag ist Pflicht
-        if "betrag" not in buchung_data:
-            return None
-
-        return buchung_data
+        return engine.importiere(csv_daten)
 
     @staticmethod
     def _bestimme_konten_intelligent(
-        buchung_data: dict, default_soll: Konto, default_haben: Konto
+        buchung_data: dict,
+        default_soll: Konto,
+        default_haben: Konto,
+        konten: dict[str, Konto] | None = None,
     ) -> tuple[Konto, Konto]:
         """
         Versucht intelligente Kontierung basierend auf Buchungsdaten.
 
+        Mit ``konten`` (Kontonummer -> Konto, z.B. vom Massenimport
+        vorgeladen) kommt die Regel ohne Datenbankabfrage aus.
+
         Aktuell verwendet diese Funktion regelbasierte Logik.
         Für zukünftige Versionen ist geplant:
         - Machine Learning basierte Kontovorhersage
@@ -290,20 +261,21 @@ class BuchungsService:
         - Lernfähigkeit aus historischen Buchungen
         """
 
-        buchung_data["betrag"]
+        def konto(nummer: str) -> Konto:
+            if konten is None:
+                return konto_nach_nummer(nummer)
+            if nummer not in konten:
+                raise Konto.DoesNotExist(nummer)
+            return konten[nummer]
+
         text = buchung_data.get("text", "").lower()
 
         # Einfache Regel-basierte Logik
         if any(keyword in text for keyword in ["einzahlung", "überweisung", "eingang"]):
             # Einnahme: Bank (Soll) an Erlöse (Haben)
             try:
-                bank = Konto.objects.get(nummer="1200")
-                erloes = Konto.objects.get(nummer="8400")
-                return bank, erloes
+                return konto("1200"), konto("8400")
             except Konto.DoesNotExist:
-                import logging
-
-                logger = logging.getLogger(__name__)
                 logger.warning(
                     "Standard-Konten für Einnahmen nicht gefunden (1200/8400)"
                 )
@@ -313,13 +285,8 @@ class BuchungsService:
         ):
             # Ausgabe: Aufwand (Soll) an Bank (Haben)
             try:
-                aufwand = Konto.objects.get(nummer="4980")
-                bank = Konto.objects.get(nummer="1200")
-                return aufwand, bank
+                return konto("4980"), konto("1200")
             except Konto.DoesNotExist:
-                import logging
-
-                logger = logging.getLogger(__name__)
                 logger.warning(
                     "Standard-Konten für Ausgaben nicht gefunden (4980/1200)"
                 )
@@ -350,13 +317,36 @@ class BuchungsService:
             return False
 
     @staticmethod
-    def get_buchungs_statistiken(zeitraum_start=None, zeitraum_ende=None) -> dict:
+    def get_buchungs_statistiken(
+        zeitraum_start=None,
+        zeitraum_ende=None,
+        gruppieren_nach: str | None = None,
+        queryset=None,
+    ) -> dict:
         """
         Erstellt Statistiken über Buchungen.
+
+        Alle Anzahlen und Summen kommen aus einer bedingten Aggregation in
+        der Datenbank - es werden keine Buchungssätze geladen.
+
+        Args:
+            gruppieren_nach: Zusätzlich eine Aufschlüsselung nach
+                ``soll_konto``, ``haben_konto``, ``geschaeftspartner`` oder
+                ``monat`` unter ``gruppen`` (gleiche Kennzahlen je Gruppe)
+            queryset: Vorgefilterte Buchungen (Standard: alle)
+
         Peter Zwegat: "Zahlen lügen nicht - wenn sie richtig sind!"
         """
+        if gruppieren_nach is not None and gruppieren_nach not in (
+            STATISTIK_GRUPPIERUNGEN
+        ):
+            raise ValueError(
+                f"Unbekannte Gruppierung '{gruppieren_nach}' "
+                f"(erlaubt: {', '.join(STATISTIK_GRUPPIERUNGEN)})"
+            )
 
-        queryset = Buchungssatz.objects.all()
+        if queryset is None:
+            queryset = Buchungssatz.objects.all()
 
         if zeitraum_start:
             queryset = queryset.filter(buchungsdatum__gte=zeitraum_start)
@@ -364,25 +354,60 @@ class BuchungsService:
         if zeitraum_ende:
             queryset = queryset.filter(buchungsdatum__lte=zeitraum_ende)
 
-        return {
-            "gesamt_buchungen": queryset.count(),
-            "gesamt_betrag": sum(b.betrag for b in queryset),
-            "validierte_buchungen": queryset.filter(validiert=True).count(),
-            "offene_buchungen": queryset.filter(validiert=False).count(),
-            "automatische_buchungen": queryset.filter(
-                automatisch_erstellt=True
-            ).count(),
-            "manuelle_buchungen": queryset.filter(automatisch_erstellt=False).count(),
+        kennzahlen = {
+            "gesamt_buchungen": Count("pk"),
+            "gesamt_betrag": Sum("betrag"),
+            "validierte_buchungen": Count("pk", filter=Q(validiert=True)),
+            "offene_buchungen": Count("pk", filter=Q(validiert=False)),
+            "automatische_buchungen": Count("pk", filter=Q(automatisch_erstellt=True)),
+            "manuelle_buchungen": Count("pk", filter=Q(automatisch_erstellt=False)),
         }
 
+        if gruppieren_nach is None:
+            statistiken = queryset.aggregate(**kennzahlen)
+            statistiken["gesamt_betrag"] = Decimal(statistiken["gesamt_betrag"] or 0)
+            return statistiken
+
+        # Gruppiert: die Gesamtwerte ergeben sich aus den Gruppen - also
+        # weiterhin nur eine Abfrage
+        schluessel, sortierung = STATISTIK_GRUPPIERUNGEN[gruppieren_nach]
+        gruppen = list(
+            queryset.values(**schluessel).annotate(**kennzahlen).order_by(*sortierung)
+        )
+        statistiken = dict.fromkeys(kennzahlen, 0)
+        statistiken["gesamt_betrag"] = Decimal("0")
+        for gruppe in gruppen:
+            gruppe["gesamt_betrag"] = Decimal(gruppe["gesamt_betrag"] or 0)
+            for name in kennzahlen:
+                statistiken[name] += gruppe[name]
+        statistiken["gruppen"] = gruppen
+        return statistiken
+
     @staticmethod
     def finde_aehnliche_buchungen(
-        buchung: Buchungssatz, limit: int = 5
+        buchung: Buchungssatz,
+        limit: int = 5,
+        nach_text: bool = False,
+        tage: int | None = None,
     ) -> list[Buchungssatz]:
         """
         Findet ähnliche Buchungen für Vorschläge und Duplikatserkennung.
+
+        Standardmäßig: gleiche Konten, gleicher Geschäftspartner, Betrag ±10%.
+        Mit ``nach_text`` wird stattdessen nach ähnlichem Buchungstext gesucht
+        (siehe ``suche_aehnliche_buchungen``), optional nur ±``tage`` um das
+        Buchungsdatum.
         Peter Zwegat: "Ähnlichkeiten erkennen spart Zeit!"
         """
+        if nach_text:
+            return BuchungsService.suche_aehnliche_buchungen(
+                buchung.buchungstext,
+                betrag=buchung.betrag,
+                datum=buchung.buchungsdatum if tage is not None else None,
+                tage=tage,
+                limit=limit,
+                queryset=Buchungssatz.objects.exclude(pk=buchung.pk),
+            )
 
         aehnliche = Buchungssatz.objects.filter(
             soll_konto=buchung.soll_konto, haben_konto=buchung.haben_konto
@@ -400,6 +425,52 @@ class BuchungsService:
 
         return list(aehnliche.order_by("-buchungsdatum")[:limit])
 
+    @staticmethod
+    def suche_aehnliche_buchungen(
+        text: str,
+        betrag: Decimal | None = None,
+        betrag_toleranz: Decimal = Decimal("0.1"),
+        datum: date | None = None,
+        tage: int | None = None,
+        limit: int | None = 10,
+        schwelle: float = aehnlichkeit.SCHWELLE,
+        queryset=None,
+    ) -> list[Buchungssatz]:
+        """
+        Buchungen mit ähnlichem Buchungstext (Trigramm-Ähnlichkeit).
+
+        Findet auch Tippfehler und Varianten wiederkehrender Zahlungsempfänger.
+
+        Args:
+            text: Gesuchter Buchungstext
+            betrag: Nur Beträge innerhalb ±``betrag_toleranz`` (Anteil)
+            datum: Nur Buchungen ±``tage`` um dieses Datum
+            schwelle: Mindest-Ähnlichkeit (0.0 - 1.0)
+            queryset: Suchraum (Standard: alle Buchungssätze)
+
+        Returns:
+            Buchungssätze, ähnlichste zuerst; jeder trägt ``aehnlichkeit``
+        """
+        if queryset is None:
+            queryset = Buchungssatz.objects.all()
+        if betrag:
+            abweichung = abs(betrag) * betrag_toleranz
+            queryset = queryset.filter(
+                betrag__gte=abs(betrag) - abweichung,
+                betrag__lte=abs(betrag) + abweichung,
+            )
+        if datum is not None and tage is not None:
+            queryset = queryset.filter(
+                buchungsdatum__gte=datum - timedelta(days=tage),
+                buchungsdatum__lte=datum + timedelta(days=tage),
+            )
+        return aehnlichkeit.suche(
+            queryset.select_related("soll_konto", "haben_konto", "geschaeftspartner"),
+            text,
+            schwelle=schwelle,
+            limit=limit,
+        )
+
     @staticmethod
     def _parse_datum_intelligent(datum_str: str) -> date | None:
         """
@@ -499,3 +570,266 @@ class BuchungsService:
         except (ValueError, TypeError) as e:
             logger.warning(f"Datum-Parsing fehlgeschlagen für '{datum_str}': {e}")
             return None
+
+
+class KontierungsHistorieService:
+    """
+    Pflegt und liest die Kontierungs-Historie (``KontierungsHistorie``).
+
+    Jede Buchung zählt ihr Kontenpaar für jedes Stichwort ihres Texts und
+    für ihren Geschäftspartner hoch. Ein Vorschlag braucht damit nur eine
+    indizierte Abfrage über die Stichwörter des neuen Texts - unabhängig
+    davon, wie groß das Hauptbuch ist.
+    Peter Zwegat: "Aus Erfahrung wird man klug - aus der eigenen am schnellsten!"
+    """
+
+    @staticmethod
+    def schluessel(buchungstext: str, geschaeftspartner_id=None) -> list[str]:
+        """Normalisierte Historien-Schlüssel eines Buchungstexts."""
+        woerter = dict.fromkeys(
+            wort
+            for wort in HISTORIE_WORT_RE.findall((buchungstext or "").lower())
+            if wort not in HISTORIE_STOPPWOERTER
+        )
+        schluessel = [
+            f"w:{wort[:60]}" for wort in islice(woerter, HISTORIE_MAX_WOERTER)
+        ]
+        if geschaeftspartner_id:
+            schluessel.append(f"p:{geschaeftspartner_id}")
+        return schluessel
+
+    @staticmethod
+    def verbuche(
+        buchungstext,
+        geschaeftspartner_id,
+        soll_konto_id,
+        haben_konto_id,
+        vorzeichen: int = 1,
+    ) -> None:
+        """
+        Schreibt eine Buchung in die Historie fort.
+
+        Args:
+            vorzeichen: ``1`` zum Verbuchen, ``-1`` zum Ausbuchen
+        """
+        KontierungsHistorieService._buche(
+            {
+                (schluessel, soll_konto_id, haben_konto_id): vorzeichen
+                for schluessel in KontierungsHistorieService.schluessel(
+                    buchungstext, geschaeftspartner_id
+                )
+            }
+        )
+
+    @staticmethod
+    def verbuche_buchungen(buchungen) -> None:
+        """
+        Schreibt viele Buchungen auf einmal fort.
+
+        Für ``bulk_create``, das keine Signals auslöst.
+        """
+        KontierungsHistorieService._buche(
+            KontierungsHistorieService._zaehle(
+                (
+                    b.buchungstext,
+                    b.geschaeftspartner_id,
+                    b.soll_konto_id,
+                    b.haben_konto_id,
+                )
+                for b in buchungen
+            )
+        )
+
+    @staticmethod
+    def _zaehle(zeilen) -> Counter:
+        """(Text, Partner, Soll, Haben) -> Anzahl je (Schlüssel, Soll, Haben)."""
+        zaehler: Counter = Counter()
+        for text, partner_id, soll_konto_id, haben_konto_id in zeilen:
+            for schluessel in KontierungsHistorieService.schluessel(text, partner_id):
+                zaehler[(schluessel, soll_konto_id, haben_konto_id)] += 1
+        return zaehler
+
+    @staticmethod
+    def _buche(aenderungen: dict[tuple, int]) -> None:
+        """Addiert Zähler je (Schlüssel, Soll, Haben); leere Zeilen entfallen."""
+        aenderungen = {
+            (schluessel, soll, haben): anzahl
+            for (schluessel, soll, haben), anzahl in aenderungen.items()
+            if anzahl and soll and haben
+        }
+        if not aenderungen:
+            return
+
+        with transaction.atomic():
+            vorhanden = {}
+            alle_schluessel = sorted({schluessel for schluessel, _, _ in aenderungen})
+            for block in _bloecke(alle_schluessel, HISTORIE_BATCH):
+                for zeile in KontierungsHistorie.objects.select_for_update().filter(
+                    schluessel__in=block
+                ):
+                    vorhanden[
+                        (zeile.schluessel, zeile.soll_konto_id, zeile.haben_konto_id)
+                    ] = zeile
+
+            geaendert, neu, leer = [], [], []
+            for (schluessel, soll, haben), anzahl in aenderungen.items():
+                zeile = vorhanden.get((schluessel, soll, haben))
+                if zeile is None:
+                    if anzahl > 0:
+                        neu.append(
+                            KontierungsHistorie(
+                                schluessel=schluessel,
+                                soll_konto_id=soll,
+                                haben_konto_id=haben,
+                                anzahl=anzahl,
+                            )
+                        )
+                elif zeile.anzahl + anzahl > 0:
+                    zeile.anzahl += anzahl
+                    geaendert.append(zeile)
+                else:
+                    leer.append(zeile.pk)
+
+            if geaendert:
+                KontierungsHistorie.objects.bulk_update(
+                    geaendert, ["anzahl"], batch_size=HISTORIE_BATCH
+                )
+            if neu:
+                try:
+                    with transaction.atomic():
+                        KontierungsHistorie.objects.bulk_create(
+                            neu, batch_size=HISTORIE_BATCH
+                        )
+                except IntegrityError:
+                    # select_for_update sperrt keine Zeilen, die es noch nicht
+                    # gibt - parallel angelegt, dann eben einzeln addieren
+                    for zeile in neu:
+                        KontierungsHistorieService._lege_an_oder_addiere(zeile)
+            if leer:
+                KontierungsHistorie.objects.filter(pk__in=leer).delete()
+
+    @staticmethod
+    def _lege_an_oder_addiere(zeile: KontierungsHistorie) -> None:
+        """Legt eine Historienzeile an oder addiert auf die vorhandene."""
+        vorhandene = KontierungsHistorie.objects.filter(
+            schluessel=zeile.schluessel,
+            soll_konto_id=zeile.soll_konto_id,
+            haben_konto_id=zeile.haben_konto_id,
+        )
+        if vorhandene.update(anzahl=F("anzahl") + zeile.anzahl):
+            return
+        try:
+            with transaction.atomic():
+                KontierungsHistorie.objects.create(
+                    schluessel=zeile.schluessel,
+                    soll_konto_id=zeile.soll_konto_id,
+                    haben_konto_id=zeile.haben_konto_id,
+                    anzahl=zeile.anzahl,
+                )
+        except IntegrityError:
+            vorhandene.update(anzahl=F("anzahl") + zeile.anzahl)
+
+    @staticmethod
+    def lade(schluessel: Iterable[str]) -> dict[str, list[tuple]]:
+        """
+        Liest die Historie der Schlüssel (eine Abfrage je 500 Schlüssel).
+
+        Returns:
+            Schlüssel -> Liste von (soll_konto_id, haben_konto_id, anzahl)
+        """
+        tabelle: dict[str, list[tuple]] = {s: [] for s in schluessel}
+        for block in _bloecke(list(tabelle), HISTORIE_BATCH):
+            for s, soll, haben, anzahl in (
+                KontierungsHistorie.objects.filter(schluessel__in=block)
+                .order_by("schluessel", "-anzahl", "soll_konto_id", "haben_konto_id")
+                .values_list("schluessel", "soll_konto_id", "haben_konto_id", "anzahl")
+            ):
+                tabelle[s].append((soll, haben, anzahl))
+        return tabelle
+
+    @staticmethod
+    def bewerte(
+        schluessel: list[str], tabelle: dict[str, list[tuple]]
+    ) -> tuple[tuple, float, int] | None:
+        """
+        Bestes Kontenpaar für die Schlüssel.
+
+        Jeder bekannte Schlüssel verteilt eine Stimme anteilig auf seine
+        Kontenpaare; die Confidence ist der Stimmenanteil des besten Paars.
+
+        Returns:
+            ((soll_konto_id, haben_konto_id), Confidence, Anzahl Buchungen)
+            oder ``None``, wenn keiner der Schlüssel bekannt ist
+        """
+        punkte: dict[tuple, float] = defaultdict(float)
+        buchungen: dict[tuple, int] = defaultdict(int)
+        stimmen = 0.0
+        for s in schluessel:
+            zeilen = tabelle.get(s)
+            if not zeilen:
+                continue
+            gewicht = HISTORIE_PARTNER_GEWICHT if s.startswith("p:") else 1.0
+            gesamt = sum(anzahl for _, _, anzahl in zeilen)
+            stimmen += gewicht
+            for soll, haben, anzahl in zeilen:
+                punkte[(soll, haben)] += gewicht * anzahl / gesamt
+                buchungen[(soll, haben)] = max(buchungen[(soll, haben)], anzahl)
+
+        if not punkte:
+            return None
+        paar, wert = max(punkte.items(), key=lambda x: x[1])
+        return paar, wert / stimmen, buchungen[paar]
+
+    @staticmethod
+    def vorschlag(
+        buchungstext: str, geschaeftspartner_id=None
+    ) -> tuple[tuple, float, int] | None:
+        """Vorschlag aus der Historie für einen Buchungstext (siehe ``bewerte``)."""
+        schluessel = KontierungsHistorieService.schluessel(
+            buchungstext, geschaeftspartner_id
+        )
+        if not schluessel:
+            return None
+        return KontierungsHistorieService.bewerte(
+            schluessel, KontierungsHistorieService.lade(schluessel)
+        )
+
+    @staticmethod
+    def neu_aufbauen() -> int:
+        """
+        Baut die Historie aus allen Buchungssätzen neu auf.
+
+        Returns:
+            Anzahl angelegter Zeilen
+        """
+        zaehler = KontierungsHistorieService._zaehle(
+            Buchungssatz.objects.order_by()
+            .values_list(
+                "buchungstext",
+                "geschaeftspartner_id",
+                "soll_konto_id",
+                "haben_konto_id",
+            )
+            .iterator(chunk_size=5000)
+        )
+        with transaction.atomic():
+            KontierungsHistorie.objects.all().delete()
+            KontierungsHistorie.objects.bulk_create(
+                (
+                    KontierungsHistorie(
+                        schluessel=schluessel,
+                        soll_konto_id=soll,
+                        haben_konto_id=haben,
+                        anzahl=anzahl,
+                    )
+                    for (schluessel, soll, haben), anzahl in zaehler.items()
+                ),
+                batch_size=HISTORIE_BATCH,
+            )
+        return len(zaehler)
+
+
+def _bloecke(werte: list, groesse: int):
+    """Teilt eine Liste in Blöcke (für IN-Abfragen mit begrenzter Länge)."""
+    for start in range(0, len(werte), groesse):
+        yield werte[start : start + groesse]
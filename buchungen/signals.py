@@ -0,0 +1,73 @@
+"""
+Django Signals für Buchungen.
+
+Hält die Kontierungs-Historie (``KontierungsHistorie``) und den
+Trigramm-Index der Ähnlichkeitssuche synchron zu den Buchungssätzen, damit
+Vorschläge und Duplikatsprüfung immer auf dem aktuellen Stand sind.
+Peter Zwegat: "Wer aus jeder Buchung lernt, bucht die nächste richtig!"
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import aehnlichkeit
+from .models import Buchungssatz
+from .services import KontierungsHistorieService
+
+HISTORIE_FELDER = (
+    "buchungstext",
+    "geschaeftspartner_id",
+    "soll_konto_id",
+    "haben_konto_id",
+)
+# Alter Stand einer geänderten Buchung - ein SELECT für die Historie (hier)
+# und die Monatssalden (auswertungen/signals.py)
+STAND_FELDER = (*HISTORIE_FELDER, "buchungsdatum", "betrag")
+
+
+def _historie_werte(buchung) -> tuple:
+    return tuple(getattr(buchung, feld) for feld in HISTORIE_FELDER)
+
+
+def _nach_commit(aenderung, objekte, alias: str) -> None:
+    """Ähnlichkeits-Index erst nach dem Commit fortschreiben (nie bei Rollback)."""
+    transaction.on_commit(lambda: aenderung(objekte, alias=alias), using=alias)
+
+
+def stand_vorher(buchung) -> dict | None:
+    """Gespeicherte Werte (``STAND_FELDER``) vor dem laufenden Speichern."""
+    return getattr(buchung, "_stand_vorher", None)
+
+
+@receiver(pre_save, sender=Buchungssatz)
+def merke_alten_stand(sender, instance, **kwargs):
+    """Liest den gespeicherten Stand einmal für alle post_save-Empfänger."""
+    instance._stand_vorher = None
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._stand_vorher = (
+        Buchungssatz.objects.filter(pk=instance.pk).values(*STAND_FELDER).first()
+    )
+
+
+@receiver(post_save, sender=Buchungssatz)
+def aktualisiere_kontierungs_historie(sender, instance, created, **kwargs):
+    """Bucht die alte Kontierung aus der Historie aus und die neue ein."""
+    stand = stand_vorher(instance)
+    vorher = tuple(stand[feld] for feld in HISTORIE_FELDER) if stand else None
+    nachher = _historie_werte(instance)
+    if not vorher or vorher[0] != instance.buchungstext:
+        _nach_commit(aehnlichkeit.indexiere, [instance], kwargs.get("using", "default"))
+    if vorher:
+        if vorher == nachher:
+            return
+        KontierungsHistorieService.verbuche(*vorher, vorzeichen=-1)
+    KontierungsHistorieService.verbuche(*nachher)
+
+
+@receiver(post_delete, sender=Buchungssatz)
+def entferne_aus_kontierungs_historie(sender, instance, **kwargs):
+    """Bucht einen gelöschten Buchungssatz aus der Historie aus."""
+    KontierungsHistorieService.verbuche(*_historie_werte(instance), vorzeichen=-1)
+    _nach_commit(aehnlichkeit.entferne, [instance.pk], kwargs.get("using", "default"))
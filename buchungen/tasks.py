@@ -0,0 +1,179 @@
+"""
+Asynchrone Celery Tasks für den Buchungsimport.
+
+Große CSV-/Excel-Dateien werden blockweise im Hintergrund importiert.
+Jeder Block wird zusammen mit dem Fortschritt des Jobs in einer Transaktion
+gespeichert - nach Abbruch oder Absturz geht es beim nächsten Block weiter.
+
+Peter Zwegat: "Der Computer bucht, du trinkst Kaffee - so muss das sein!"
+"""
+
+import logging
+from itertools import islice
+
+from celery import shared_task
+from django.core.cache import cache
+from django.db import OperationalError, transaction
+
+from .csv_staging import CSVStaging
+from .import_engine import BuchungsImportEngine
+from .models import CSVImportJob
+
+logger = logging.getLogger(__name__)
+
+FORTSCHRITT_CACHE_KEY = "csv_import_fortschritt:{}"
+FORTSCHRITT_CACHE_TIMEOUT = 24 * 3600
+
+
+def fortschritt_speichern(job: CSVImportJob, task=None) -> dict:
+    """Legt den Fortschritt im Cache und (falls vorhanden) im Result-Backend ab."""
+    fortschritt = job.fortschritt()
+    cache.set(
+        FORTSCHRITT_CACHE_KEY.format(job.id), fortschritt, FORTSCHRITT_CACHE_TIMEOUT
+    )
+    if task is not None and task.request.id and not task.request.is_eager:
+        task.update_state(state="PROGRESS", meta=fortschritt)
+    return fortschritt
+
+
+def fortschritt_laden(job_id) -> dict | None:
+    """Fortschritt aus dem Cache (``None``, wenn dort nichts liegt)."""
+    return cache.get(FORTSCHRITT_CACHE_KEY.format(job_id))
+
+
+def starte_import_job(job: CSVImportJob) -> None:
+    """
+    Reiht den Job in Celery ein.
+
+    Ist kein Broker erreichbar, läuft der Import direkt im aktuellen
+    Prozess - langsamer, aber es geht nichts verloren.
+    """
+    try:
+        ergebnis = importiere_csv_job.delay(str(job.id))
+    except Exception as e:
+        logger.warning("Celery nicht erreichbar, importiere synchron: %s", e)
+        importiere_csv_job.apply(args=[str(job.id)])
+        return
+    CSVImportJob.objects.filter(pk=job.pk).update(celery_task_id=ergebnis.id)
+
+
+@shared_task(bind=True, max_retries=3, acks_late=True, reject_on_worker_lost=True)
+def importiere_csv_job(self, job_id):
+    """
+    Importiert einen ``CSVImportJob`` ab der letzten übernommenen Zeile.
+
+    Zwischen den Blöcken wird geprüft, ob der Job abgebrochen wurde.
+    ``acks_late`` sorgt dafür, dass ein abgestürzter Worker den Job
+    erneut zugestellt bekommt.
+
+    Args:
+        job_id: ID des Import-Jobs
+
+    Returns:
+        dict: Status und Zähler des Jobs
+    """
+    try:
+        job = CSVImportJob.objects.select_related("benutzer").get(id=job_id)
+    except CSVImportJob.DoesNotExist:
+        logger.error("CSV-Import-Job %s nicht gefunden", job_id)
+        return {"status": "error", "message": "Job nicht gefunden"}
+
+    if job.status in ("ABGESCHLOSSEN", "ABGEBROCHEN"):
+        return {"status": "skipped", "job_status": job.status}
+
+    job.status = "LAEUFT"
+    job.save(update_fields=["status", "aktualisiert_am"])
+    fortschritt_speichern(job, self)
+
+    kontierung = None
+    if job.benutzer is not None:
+        from .intelligent_kontierung import IntelligenterKontierungsVorschlag
+
+        kontierung = IntelligenterKontierungsVorschlag(job.benutzer)
+
+    mapping = {int(spalte): feld for spalte, feld in job.mapping.items()}
+    engine = BuchungsImportEngine(mapping, kontierung=kontierung)
+    start = job.verarbeitete_zeilen
+
+    logger.info("CSV-Import %s startet bei Zeile %s", job.id, start + 1)
+
+    try:
+        zeilen = islice(CSVStaging.lese_zeilen(job.ablage), start, None)
+        for offset, block in engine.bloecke(zeilen, engine.chunk_size, start):
+            if not _blockweise_uebernehmen(job, engine, offset, block):
+                logger.info("CSV-Import %s bei Zeile %s angehalten", job.id, offset)
+                fortschritt_speichern(job, self)
+                return {"status": "stopped", "job_status": job.status}
+            fortschritt_speichern(job, self)
+
+    except OperationalError as e:
+        # Datenbank kurzzeitig gesperrt/weg - später am selben Block weitermachen
+        logger.warning("CSV-Import %s: Datenbankfehler, neuer Versuch: %s", job.id, e)
+        raise self.retry(exc=e, countdown=30) from e
+
+    except Exception as e:
+        # Datei abgelaufen, Standard-Konten fehlen, ... - Job bleibt fortsetzbar
+        logger.error("CSV-Import %s fehlgeschlagen: %s", job.id, e)
+        job.refresh_from_db()
+        job.status = "FEHLER"
+        job.fehler = (job.fehler + [f"Import abgebrochen: {e}"])[
+            -CSVImportJob.MAX_FEHLERMELDUNGEN :
+        ]
+        job.save(update_fields=["status", "fehler", "aktualisiert_am"])
+        fortschritt_speichern(job, self)
+        return {"status": "error", "message": str(e)}
+
+    job.status = "ABGESCHLOSSEN"
+    job.verarbeitete_zeilen = max(job.verarbeitete_zeilen, job.gesamt_zeilen)
+    job.save(update_fields=["status", "verarbeitete_zeilen", "aktualisiert_am"])
+    CSVStaging.entferne(job.ablage)
+    fortschritt_speichern(job, self)
+
+    logger.info(
+        "CSV-Import %s abgeschlossen: %s erfolgreich, %s Fehler",
+        job.id,
+        job.erfolgreich,
+        job.fehler_anzahl,
+    )
+    return {
+        "status": "success",
+        "erfolgreich": job.erfolgreich,
+        "fehler": job.fehler_anzahl,
+    }
+
+
+def _blockweise_uebernehmen(job, engine, offset, block) -> bool:
+    """
+    Schreibt einen Block und den Fortschritt in einer Transaktion.
+
+    Liefert ``False``, wenn der Job abgebrochen wurde oder ein anderer
+    Worker diesen Block bereits übernommen hat.
+    """
+    with transaction.atomic():
+        gesperrt = CSVImportJob.objects.select_for_update().get(pk=job.pk)
+        if gesperrt.status == "ABGEBROCHEN" or gesperrt.verarbeitete_zeilen != offset:
+            job.status = gesperrt.status
+            return False
+
+        erfolgreich, fehler = engine.importiere_block(block, offset)
+
+        gesperrt.verarbeitete_zeilen = offset + len(block)
+        gesperrt.erfolgreich += erfolgreich
+        gesperrt.fehler_anzahl += len(fehler)
+        if fehler:
+            gesperrt.fehler = (gesperrt.fehler + fehler)[
+                -CSVImportJob.MAX_FEHLERMELDUNGEN :
+            ]
+        gesperrt.save(
+            update_fields=[
+                "verarbeitete_zeilen",
+                "erfolgreich",
+                "fehler_anzahl",
+                "fehler",
+                "aktualisiert_am",
+            ]
+        )
+
+    for feld in ("verarbeitete_zeilen", "erfolgreich", "fehler_anzahl", "fehler"):
+        setattr(job, feld, getattr(gesperrt, feld))
+    return True
@@ -4,17 +4,29 @@ Peter Zwegat: "Ein gutes System wird getestet - ein sehr gutes System wird grün
 """
 
 import io
+import os
+import tempfile
+from datetime import date
 from decimal import Decimal
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from einstellungen.models import Benutzerprofil, StandardKontierung
 from konten.models import Konto
 
 from .intelligent_kontierung import IntelligenterKontierungsVorschlag
-from .models import Buchungssatz
+from .models import (
+    Buchungssatz,
+    CSVImportJob,
+    Geschaeftspartner,
+    KontierungsHistorie,
+)
 
 
 class IntelligentKontierungTest(TestCase):
@@ -160,6 +172,165 @@ class IntelligentKontierungTest(TestCase):
         self.assertIn("soll_konto", result)
         self.assertIn("haben_konto", result)
 
+    def test_batch_wie_zeilenweise(self):
+        """Test: Batch-Modus liefert dasselbe wie suggest_kontierung je Zeile."""
+        zeilen = [
+            ("Rechnung Nr. 2025-001 Webdesign", 1000.0),
+            ("AMAZON MARKETPLACE Lastschrift", -89.99),
+            ("Privatentnahme für Lebenshaltung", -500.0),
+            ("Einlage privat", 200.0),
+            ("XYZABCDEF keine bekannten Wörter", 100.0),
+            ("XYZABCDEF keine bekannten Wörter", -100.0),
+            ("", None),
+        ] * 50
+        zeilenweise = [
+            IntelligenterKontierungsVorschlag(self.user).suggest_kontierung(t, b)
+            for t, b in zeilen
+        ]
+
+        # StandardKontierungen samt Konten und Historie - je eine Abfrage; die
+        # Fallback-Konten kommen aus dem (oben schon geladenen) Konten-Index
+        with self.assertNumQueries(2):
+            kontierung = IntelligenterKontierungsVorschlag(self.user)
+            batch = kontierung.vorschlaege(zeilen)
+        self.assertEqual(batch, zeilenweise)
+
+        with override_settings(KONTIERUNG_POOL_AB_ZEILEN=0):
+            parallel = kontierung.vorschlaege(zeilen, prozesse=2)
+        self.assertEqual(parallel, zeilenweise)
+
+    def _buche(self, text, soll, haben, partner=None):
+        return Buchungssatz.objects.create(
+            buchungsdatum=date(2025, 3, 1),
+            buchungstext=text,
+            betrag=Decimal("49.90"),
+            soll_konto=soll,
+            haben_konto=haben,
+            geschaeftspartner=partner,
+        )
+
+    def _historie(self):
+        return set(
+            KontierungsHistorie.objects.values_list(
+                "schluessel", "soll_konto__nummer", "haben_konto__nummer", "anzahl"
+            )
+        )
+
+    def test_historie_folgt_speichern_und_loeschen(self):
+        """Test: Historie wird beim Speichern, Ändern und Löschen fortgeschrieben."""
+        partner = Geschaeftspartner.objects.create(name="Telekom")
+        buchung = self._buche(
+            "Telekom Mobilfunk 03/2025", self.aufwand_konto, self.bank_konto, partner
+        )
+        self._buche("Mobilfunk Vertrag", self.aufwand_konto, self.bank_konto)
+        self.assertEqual(
+            self._historie(),
+            {
+                ("w:telekom", "4980", "1200", 1),
+                ("w:mobilfunk", "4980", "1200", 2),
+                ("w:vertrag", "4980", "1200", 1),
+                (f"p:{partner.pk}", "4980", "1200", 1),
+            },
+        )
+
+        buchung.soll_konto = self.privatentnahme_konto
+        buchung.save()
+        self.assertIn(("w:mobilfunk", "1800", "1200", 1), self._historie())
+        self.assertIn(("w:mobilfunk", "4980", "1200", 1), self._historie())
+        self.assertNotIn(("w:telekom", "4980", "1200", 1), self._historie())
+
+        buchung.delete()
+        self.assertEqual(
+            self._historie(),
+            {
+                ("w:mobilfunk", "4980", "1200", 1),
+                ("w:vertrag", "4980", "1200", 1),
+            },
+        )
+
+        # Neuaufbau ergibt dasselbe wie die inkrementelle Pflege
+        vorher = self._historie()
+        ausgabe = io.StringIO()
+        call_command("rebuild_kontierung_historie", stdout=ausgabe)
+        self.assertEqual(self._historie(), vorher)
+        self.assertIn("2 Historien-Einträge", ausgabe.getvalue())
+
+    def test_alter_stand_nur_einmal_gelesen(self):
+        """Test: Historie und Monatssalden teilen sich ein SELECT vor dem Speichern."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from auswertungen.models import KontoMonatssaldo
+
+        buchung = self._buche("Telekom Mobilfunk", self.aufwand_konto, self.bank_konto)
+        buchung.soll_konto = self.privatentnahme_konto
+        buchung.buchungsdatum = date(2025, 4, 1)
+        with CaptureQueriesContext(connection) as abfragen:
+            buchung.save()
+
+        tabelle = Buchungssatz._meta.db_table
+        stand_abfragen = [
+            q["sql"]
+            for q in abfragen.captured_queries
+            if q["sql"].startswith("SELECT") and f'FROM "{tabelle}"' in q["sql"]
+        ]
+        self.assertEqual(len(stand_abfragen), 1, stand_abfragen)
+        self.assertIn(("w:mobilfunk", "1800", "1200", 1), self._historie())
+        self.assertNotIn(("w:mobilfunk", "4980", "1200", 1), self._historie())
+        self.assertFalse(
+            KontoMonatssaldo.objects.filter(
+                konto=self.aufwand_konto, monat=3, soll_summe__gt=0
+            ).exists()
+        )
+
+    def test_historie_parallel_angelegte_zeile(self):
+        """Test: Eine zwischen Lesen und Anlegen entstandene Zeile wird addiert."""
+        KontierungsHistorie.objects.create(
+            schluessel="w:hosting",
+            soll_konto=self.aufwand_konto,
+            haben_konto=self.bank_konto,
+            anzahl=2,
+        )
+        # Der andere Prozess war schneller: Beim Lesen gab es die Zeile noch nicht
+        with mock.patch.object(
+            KontierungsHistorie.objects,
+            "select_for_update",
+            return_value=KontierungsHistorie.objects.none(),
+        ):
+            self._buche("Hosting Webspace", self.aufwand_konto, self.bank_konto)
+
+        self.assertEqual(
+            self._historie(),
+            {("w:hosting", "4980", "1200", 3), ("w:webspace", "4980", "1200", 1)},
+        )
+
+    def test_vorschlag_aus_historie(self):
+        """Test: Bisherige Buchungen schlagen Textmuster und Fallback."""
+        for _ in range(3):
+            self._buche(
+                "Hetzner Online Serverkosten",
+                self.privatentnahme_konto,
+                self.bank_konto,
+            )
+        self._buche("Hetzner Online Domain", self.aufwand_konto, self.bank_konto)
+
+        kontierung = IntelligenterKontierungsVorschlag(self.user)
+        result = kontierung.suggest_kontierung("HETZNER ONLINE Rechnung 4711", -9.9)
+        self.assertEqual(result["method"], "historie")
+        self.assertEqual(result["soll_konto"], self.privatentnahme_konto)
+        self.assertEqual(result["haben_konto"], self.bank_konto)
+        self.assertAlmostEqual(result["confidence"], 0.75)
+
+        # Unbekannter Text bleibt bei Textmustern bzw. Fallback
+        result = kontierung.suggest_kontierung("AMAZON MARKETPLACE Lastschrift", -9.9)
+        self.assertEqual(result["method"], "user_standard_kontierung")
+
+        zeilen = [("HETZNER ONLINE Rechnung 4711", -9.9), ("Einlage privat", 50.0)]
+        self.assertEqual(
+            kontierung.vorschlaege(zeilen),
+            [kontierung.suggest_kontierung(t, b) for t, b in zeilen],
+        )
+
 
 class CSVImportIntelligentKontierungIntegrationTest(TestCase):
     """Tests für die Integration der intelligenten Kontierung in den CSV-Import."""
@@ -422,3 +593,274 @@ class CSVImportIntelligentKontierungIntegrationTest(TestCase):
         self.assertEqual(zweite_buchung.betrag, Decimal("89.99"))
         self.assertEqual(zweite_buchung.soll_konto, self.aufwand_konto)
         self.assertEqual(zweite_buchung.haben_konto, self.bank_konto)
+
+
+class CSVStagingImportTest(TestCase):
+    """Tests für den Upload mit Zwischenablage auf der Platte."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="staginguser",
+            password="test-pwd-123",  # noqa: S106
+        )
+        Konto.objects.create(
+            nummer="1200", name="Bank", typ="GIROKONTO", kategorie="AKTIVKONTO"
+        )
+        Konto.objects.create(
+            nummer="8400", name="Erlöse", typ="UMSATZERLÖSE", kategorie="ERTRAG"
+        )
+        Konto.objects.create(
+            nummer="4980", name="Betriebsbedarf", typ="SONSTIGE", kategorie="AUFWAND"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.staging_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.staging_dir.cleanup)
+        einstellungen = override_settings(CSV_IMPORT_STAGING_DIR=self.staging_dir.name)
+        einstellungen.enable()
+        self.addCleanup(einstellungen.disable)
+
+    def test_grosse_datei_nur_vorschau_in_session(self):
+        zeilen = ["Datum;Betrag;Verwendungszweck"]
+        zeilen += [
+            f"{tag % 28 + 1:02d}.03.2025;{tag + 1},50;Honorar {tag}"
+            for tag in range(60)
+        ]
+        upload = SimpleUploadedFile(
+            "bank.csv", "\n".join(zeilen).encode("utf-8"), content_type="text/csv"
+        )
+
+        response = self.client.post(
+            reverse("buchungen:csv_import"),
+            {
+                "csv_datei": upload,
+                "trennzeichen": ";",
+                "encoding": "utf-8",
+                "erste_zeile_ueberspringen": True,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+
+        session_data = self.client.session["csv_daten"]
+        self.assertEqual(
+            session_data["header"], ["Datum", "Betrag", "Verwendungszweck"]
+        )
+        self.assertEqual(len(session_data["daten"]), 20)
+        self.assertEqual(session_data["gesamt_zeilen"], 60)
+        self.assertIn("token", session_data)
+
+        self.assertEqual(len(os.listdir(self.staging_dir.name)), 1)
+
+        response = self.client.post(
+            reverse("buchungen:csv_mapping"),
+            {
+                "spalte_0": "buchungsdatum",
+                "spalte_1": "betrag",
+                "spalte_2": "buchungstext",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+
+        # Alle Zeilen aus der Datei, nicht nur die Vorschau
+        self.assertEqual(Buchungssatz.objects.count(), 60)
+        self.assertEqual(
+            Buchungssatz.objects.get(buchungstext="Honorar 59").betrag, Decimal("60.50")
+        )
+        self.assertEqual(os.listdir(self.staging_dir.name), [])
+        self.assertNotIn("csv_daten", self.client.session)
+
+    def test_ungueltiges_token_wird_abgelehnt(self):
+        from .csv_staging import CSVStaging
+
+        with self.assertRaises(ValueError):
+            CSVStaging.pfad("../../etc/passwd", "csv")
+
+
+class CSVImportJobTest(TestCase):
+    """Tests für den Hintergrund-Import mit Fortschritt und Wiederaufnahme."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="jobuser",
+            password="test-pwd-123",  # noqa: S106
+        )
+        Konto.objects.create(
+            nummer="1200", name="Bank", typ="GIROKONTO", kategorie="AKTIVKONTO"
+        )
+        Konto.objects.create(
+            nummer="8400", name="Erlöse", typ="UMSATZERLÖSE", kategorie="ERTRAG"
+        )
+        Konto.objects.create(
+            nummer="4980", name="Betriebsbedarf", typ="SONSTIGE", kategorie="AUFWAND"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.staging_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.staging_dir.cleanup)
+        einstellungen = override_settings(
+            CSV_IMPORT_STAGING_DIR=self.staging_dir.name,
+            CSV_IMPORT_ASYNC_AB_ZEILEN=10,
+            CSV_IMPORT_CHUNK_SIZE=25,
+        )
+        einstellungen.enable()
+        self.addCleanup(einstellungen.disable)
+        # Kein Broker im Test - der Job läuft über den synchronen Fallback
+        delay = mock.patch(
+            "buchungen.tasks.importiere_csv_job.delay",
+            side_effect=ConnectionError("kein Broker"),
+        )
+        delay.start()
+        self.addCleanup(delay.stop)
+
+    def _hochladen_und_zuordnen(self):
+        zeilen = ["Datum;Betrag;Verwendungszweck"]
+        zeilen += [
+            f"{tag % 28 + 1:02d}.04.2025;{tag + 1},00;Job {tag}" for tag in range(60)
+        ]
+        upload = SimpleUploadedFile(
+            "gross.csv", "\n".join(zeilen).encode("utf-8"), content_type="text/csv"
+        )
+        self.client.post(
+            reverse("buchungen:csv_import"),
+            {
+                "csv_datei": upload,
+                "trennzeichen": ";",
+                "encoding": "utf-8",
+                "erste_zeile_ueberspringen": True,
+            },
+        )
+        return self.client.post(
+            reverse("buchungen:csv_mapping"),
+            {"spalte_0": "buchungsdatum", "spalte_1": "betrag", "spalte_2": "text"},
+        )
+
+    def test_grosser_import_laeuft_als_job(self):
+        response = self._hochladen_und_zuordnen()
+
+        job = CSVImportJob.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("buchungen:csv_import_job", args=[job.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(job.status, "ABGESCHLOSSEN")
+        self.assertEqual(job.erfolgreich, 60)
+        self.assertEqual(job.verarbeitete_zeilen, 60)
+        self.assertEqual(Buchungssatz.objects.count(), 60)
+        self.assertEqual(os.listdir(self.staging_dir.name), [])
+
+        fortschritt = self.client.get(
+            reverse("buchungen:csv_import_fortschritt", args=[job.pk])
+        ).json()
+        self.assertEqual(fortschritt["status"], "ABGESCHLOSSEN")
+        self.assertEqual(fortschritt["prozent"], 100)
+
+        seite = self.client.get(reverse("buchungen:csv_import_job", args=[job.pk]))
+        self.assertEqual(seite.status_code, 200)
+
+    def test_fortsetzen_ab_letztem_block(self):
+        from .import_engine import BuchungsImportEngine
+
+        original = BuchungsImportEngine.importiere_block
+        aufrufe = []
+
+        def absturz_im_zweiten_block(engine, zeilen, zeilen_offset=0):
+            aufrufe.append(zeilen_offset)
+            if len(aufrufe) == 2:
+                raise RuntimeError("Worker weg")
+            return original(engine, zeilen, zeilen_offset)
+
+        with mock.patch.object(
+            BuchungsImportEngine, "importiere_block", absturz_im_zweiten_block
+        ):
+            self._hochladen_und_zuordnen()
+
+        job = CSVImportJob.objects.get()
+        self.assertEqual(job.status, "FEHLER")
+        self.assertEqual(job.verarbeitete_zeilen, 25)
+        self.assertEqual(Buchungssatz.objects.count(), 25)
+
+        self.client.post(reverse("buchungen:csv_import_fortsetzen", args=[job.pk]))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "ABGESCHLOSSEN")
+        self.assertEqual(job.erfolgreich, 60)
+        # Keine doppelten Buchungen aus dem ersten Block
+        self.assertEqual(Buchungssatz.objects.count(), 60)
+        self.assertEqual(Buchungssatz.objects.filter(buchungstext="Job 0").count(), 1)
+
+    def test_fremder_job_nicht_sichtbar(self):
+        fremder = User.objects.create_user(username="fremd")
+        job = CSVImportJob.objects.create(benutzer=fremder, gesamt_zeilen=1)
+
+        response = self.client.get(
+            reverse("buchungen:csv_import_fortschritt", args=[job.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_ohne_anmeldung_nicht_erreichbar(self):
+        """Test: Jobs ohne Benutzer sind für Anonyme nicht sichtbar."""
+        job = CSVImportJob.objects.create(benutzer=None, gesamt_zeilen=1)
+        self.client.logout()
+
+        for name, methode in [
+            ("csv_import_job", self.client.get),
+            ("csv_import_fortschritt", self.client.get),
+            ("csv_import_abbrechen", self.client.post),
+            ("csv_import_fortsetzen", self.client.post),
+        ]:
+            response = methode(reverse(f"buchungen:{name}", args=[job.pk]))
+            self.assertEqual(response.status_code, 302, name)
+            self.assertIn(settings.LOGIN_URL, response["Location"])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "WARTEND")
+
+
+class KeywordMatcherTest(TestCase):
+    """Der vorkompilierte Matcher zählt wie die bisherigen Einzelsuchen."""
+
+    TEXTE = [
+        "Rechnung Nr. 2025-001 Webdesign, Zahlung erhalten per Überweisung",
+        "Berufshaftpflicht Versicherung Prämie 2025 - Rechtsschutz inklusive",
+        "Privatentnahme Überweisung an selbst, Entnahme privat",
+        "Hotel Übernachtung, Bahn, Taxi, Tankstelle Benzin Benzin Diesel",
+        "Gutschrift Honorar Provision Gutschrift",
+        "",
+    ]
+
+    def test_analyze_text_keywords(self):
+        from .intelligent_kontierung import TEXT_MATCHER, TEXT_MUSTER
+
+        for text in self.TEXTE:
+            treffer = TEXT_MATCHER.treffer_je_kategorie(text, vorkommen_zaehlen=False)
+            for kategorie, config in TEXT_MUSTER.items():
+                erwartet = sum(
+                    1 for keyword in config["keywords"] if keyword in text.lower()
+                )
+                self.assertEqual(treffer[kategorie], erwartet, (text, kategorie))
+
+    def test_belegregeln_zaehlen_alle_vorkommen(self):
+        import re
+
+        from belege.ki_service import KATEGORIEN_REGELN, REGEL_MATCHER
+
+        for text in self.TEXTE:
+            treffer = REGEL_MATCHER.treffer_je_kategorie(text)
+            for kategorie, regeln in KATEGORIEN_REGELN.items():
+                erwartet = sum(len(re.findall(regel, text.lower())) for regel in regeln)
+                self.assertEqual(treffer[kategorie], erwartet, (text, kategorie))
+
+            gefunden = REGEL_MATCHER.gefundene_woerter(text)
+            self.assertEqual(
+                gefunden,
+                {
+                    regel
+                    for regeln in KATEGORIEN_REGELN.values()
+                    for regel in regeln
+                    if re.search(regel, text.lower())
+                },
+            )
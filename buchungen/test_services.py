@@ -101,3 +101,252 @@ def test_erstelle_schnellbuchung_ungueltiger_typ_wirft_fehler():
             betrag=Decimal("100.00"),
             buchungstext="Falscher Typ",
         )
+
+
+def test_importiere_csv_buchungen_massenimport(
+    aktiv_konto_bank, ertrag_konto_erloese, aufwand_konto_sonstige
+):
+    from auswertungen.models import KontoMonatssaldo
+    from buchungen.models import Buchungssatz
+
+    csv_daten = [
+        ["03.01.2025", "1.234,56", "Eingang Honorar", "RE-1"],
+        ["04.01.2025", "-19,99", "Lastschrift Telefon", "LS-2"],
+        [],
+        ["05.01.2025", "abc", "Kaputter Betrag", ""],
+        ["kein Datum", "10,00", "Sonstiges", ""],
+    ]
+    mapping = {0: "buchungsdatum", 1: "betrag", 2: "text", 3: "referenz"}
+
+    erfolgreich, fehler = BuchungsService.importiere_csv_buchungen(
+        csv_daten, mapping, chunk_size=2
+    )
+
+    assert erfolgreich == 3
+    assert fehler == ["Zeile 4: Ungültiger Betrag: abc"]
+
+    honorar = Buchungssatz.objects.get(referenz="RE-1")
+    assert honorar.betrag == Decimal("1234.56")
+    assert honorar.buchungsdatum.isoformat() == "2025-01-03"
+    assert honorar.soll_konto == aktiv_konto_bank
+    assert honorar.haben_konto == ertrag_konto_erloese
+
+    telefon = Buchungssatz.objects.get(referenz="LS-2")
+    assert telefon.betrag == Decimal("19.99")
+    assert telefon.soll_konto == aufwand_konto_sonstige
+
+    sonstiges = Buchungssatz.objects.get(buchungstext="Sonstiges")
+    assert sonstiges.buchungsdatum == timezone.now().date()
+    assert "Datum konnte nicht geparst werden" in sonstiges.notizen
+
+    # bulk_create umgeht die Signals - Monatssalden müssen trotzdem stimmen
+    saldo = KontoMonatssaldo.objects.get(konto=aktiv_konto_bank, jahr=2025, monat=1)
+    assert saldo.soll_summe == Decimal("1234.56")
+    assert saldo.haben_summe == Decimal("19.99")
+
+
+def test_importiere_csv_buchungen_konten_mit_einer_abfrage(
+    aktiv_konto_bank, ertrag_konto_erloese, aufwand_konto_sonstige
+):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    csv_daten = [["2025-02-01", "100.00", "Zeile", "4980", "1200"] for _ in range(50)]
+    mapping = {
+        0: "buchungsdatum",
+        1: "betrag",
+        2: "text",
+        3: "soll_konto",
+        4: "haben_konto",
+    }
+
+    with CaptureQueriesContext(connection) as kontext:
+        erfolgreich, fehler = BuchungsService.importiere_csv_buchungen(
+            csv_daten, mapping, chunk_size=25
+        )
+
+    assert (erfolgreich, fehler) == (50, [])
+    konto_abfragen = [
+        q for q in kontext.captured_queries if 'FROM "konten_konto"' in q["sql"]
+    ]
+    assert len(konto_abfragen) == 1
+
+
+def test_importiere_csv_buchungen_unbekanntes_konto(
+    aktiv_konto_bank, ertrag_konto_erloese
+):
+    csv_daten = [["2025-02-01", "5.00", "Zeile", "9999"]]
+    mapping = {0: "buchungsdatum", 1: "betrag", 2: "text", 3: "soll_konto"}
+
+    erfolgreich, fehler = BuchungsService.importiere_csv_buchungen(csv_daten, mapping)
+
+    assert erfolgreich == 0
+    assert fehler == ["Zeile 1: Konto 9999 nicht gefunden"]
+
+
+def test_importiere_csv_buchungen_erkennt_duplikate(
+    aktiv_konto_bank, ertrag_konto_erloese, aufwand_konto_sonstige
+):
+    from buchungen.models import Buchungssatz
+
+    BuchungsService.erstelle_buchung(
+        buchungsdatum=timezone.now().date().replace(year=2025, month=3, day=3),
+        soll_konto=aufwand_konto_sonstige,
+        haben_konto=aktiv_konto_bank,
+        betrag=Decimal("49.90"),
+        buchungstext="AMAZON EU S.A.R.L. 302-1234567",
+    )
+    csv_daten = [
+        ["04.03.2025", "-49,90", "Amazon EU SARL 302-1234567", "A"],
+        ["20.03.2025", "-49,90", "Amazon EU SARL 302-1234567", "B"],
+        ["04.03.2025", "-49,90", "Telefon Lastschrift", "C"],
+        ["04.03.2025", "-49,90", "Telefon Lastschrift", "D"],
+    ]
+    mapping = {0: "buchungsdatum", 1: "betrag", 2: "text", 3: "referenz"}
+
+    erfolgreich, fehler = BuchungsService.importiere_csv_buchungen(
+        csv_daten, mapping, chunk_size=2
+    )
+    assert (erfolgreich, fehler) == (4, [])
+    assert "Mögliches Duplikat der Buchung vom 03.03.2025" in (
+        Buchungssatz.objects.get(referenz="A").notizen
+    )
+    # Außerhalb des Zeitfensters und Zeilen desselben Imports sind keine Duplikate
+    for referenz in "BCD":
+        assert "Duplikat" not in Buchungssatz.objects.get(referenz=referenz).notizen
+
+    erfolgreich, fehler = BuchungsService.importiere_csv_buchungen(
+        csv_daten, mapping, duplikate_ueberspringen=True
+    )
+    assert erfolgreich == 0
+    assert len(fehler) == 4
+    assert fehler[0].startswith(
+        "Zeile 1: Mögliches Duplikat der Buchung vom 04.03.2025"
+    )
+
+
+def test_suche_aehnliche_buchungen(
+    aktiv_konto_bank, aufwand_konto_sonstige, django_capture_on_commit_callbacks
+):
+    from datetime import date, timedelta
+
+    from django.db import transaction
+
+    def buche(text, betrag, tag):
+        return BuchungsService.erstelle_buchung(
+            buchungsdatum=date(2025, 5, 1) + timedelta(days=tag),
+            soll_konto=aufwand_konto_sonstige,
+            haben_konto=aktiv_konto_bank,
+            betrag=Decimal(betrag),
+            buchungstext=text,
+        )
+
+    # Der Index wird erst nach dem Commit fortgeschrieben
+    with django_capture_on_commit_callbacks(execute=True):
+        vorlage = buche("Telekom Deutschland GmbH Mobilfunk", "39.95", 0)
+        tippfehler = buche("Telekom Deutchland GmbH Mobilfnk", "39.95", 30)
+        variante = buche("TELEKOM DEUTSCHLAND Festnetz", "29.95", 1)
+        buche("Stadtwerke Strom Abschlag", "39.95", 0)
+    # ... und bei einem Rollback gar nicht
+    with django_capture_on_commit_callbacks() as callbacks:
+        with pytest.raises(RuntimeError), transaction.atomic():
+            buche("Telekom Deutschland Mobilfunk", "39.95", 2)
+            raise RuntimeError
+    assert callbacks == []
+
+    treffer = BuchungsService.suche_aehnliche_buchungen(
+        "Telekom Deutschland Mobilfunk", limit=None
+    )
+    assert treffer[:3] == [vorlage, tippfehler, variante]
+    assert treffer[0].aehnlichkeit > treffer[1].aehnlichkeit >= 0.3
+
+    # Betragsnähe und Zeitfenster filtern, die Buchung selbst fehlt
+    assert BuchungsService.finde_aehnliche_buchungen(vorlage, nach_text=True) == [
+        tippfehler
+    ]
+    assert (
+        BuchungsService.finde_aehnliche_buchungen(vorlage, nach_text=True, tage=7) == []
+    )
+
+    # Geänderte und gelöschte Texte folgen per Signal (Wortreihenfolge egal)
+    with django_capture_on_commit_callbacks(execute=True):
+        variante.buchungstext = "Mobilfunk Telekom Deutschland"
+        variante.save()
+        tippfehler.delete()
+    treffer = BuchungsService.suche_aehnliche_buchungen(
+        "Telekom Deutschland Mobilfunk", limit=2
+    )
+    assert treffer == [variante, vorlage]
+    assert treffer[0].aehnlichkeit == 1.0
+
+
+def test_aehnlichkeit_anderer_prozess(
+    aktiv_konto_bank, aufwand_konto_sonstige, settings
+):
+    """Ein Index, der keine Signale sieht (anderer Worker), gleicht sich ab."""
+    from datetime import date
+    from unittest.mock import patch
+
+    from buchungen import aehnlichkeit
+    from buchungen.models import Buchungssatz
+
+    def buche(text):
+        # Die on_commit-Callbacks laufen im Test nie - wie in einem fremden Prozess
+        return BuchungsService.erstelle_buchung(
+            buchungsdatum=date(2025, 5, 1),
+            soll_konto=aufwand_konto_sonstige,
+            haben_konto=aktiv_konto_bank,
+            betrag=Decimal("39.95"),
+            buchungstext=text,
+        )
+
+    def suche(text):
+        return [
+            b.buchungstext
+            for b in anderer.suche(Buchungssatz.objects.all(), text, 0.3, None)
+        ]
+
+    anderer = aehnlichkeit.SpeicherBackend("default")
+    # Ohne gemeinsamen Cache bleibt die Namespace-Version dort unverändert
+    with patch.object(anderer, "_version", return_value=1):
+        buche("Telekom Deutschland Mobilfunk")
+        assert suche("Telekom Mobilfunk") == ["Telekom Deutschland Mobilfunk"]
+
+        import_buchung = buche("Telekom Festnetz Import")
+        assert suche("Telekom Festnetz") == []  # innerhalb der Prüffrist
+
+        settings.PROZESS_INDEX_PRUEF_SEKUNDEN = 0
+        assert suche("Telekom Festnetz") == ["Telekom Festnetz Import"]
+
+        import_buchung.buchungstext = "Stadtwerke Strom"
+        import_buchung.save()
+        assert suche("Telekom Festnetz") == []
+        assert suche("Stadtwerke Strom") == ["Stadtwerke Strom"]
+
+        import_buchung.delete()
+        assert suche("Stadtwerke Strom") == []
+        assert len(anderer.index) == 1
+
+
+def test_parse_spalten():
+    from datetime import date
+
+    from buchungen.import_engine import parse_betragsspalte, parse_datumsspalte
+
+    assert parse_datumsspalte(
+        ["31.12.24", "2025-01-02 00:00:00", "", "15. Januar 2025"]
+    ) == [
+        date(2024, 12, 31),
+        date(2025, 1, 2),
+        None,
+        date(2025, 1, 15),
+    ]
+    assert parse_betragsspalte(["1,234.50", "-7", ""]) == [
+        Decimal("1234.50"),
+        Decimal("-7"),
+        None,
+    ]
+    assert parse_betragsspalte(["1.234,50 €", "12,00-"]) == [
+        Decimal("1234.50"),
+        Decimal("-12.00"),
+    ]
@@ -236,6 +236,80 @@ class TestBuchungsServiceExtended:
         assert "manuelle_buchungen" in statistiken
         assert statistiken["gesamt_buchungen"] >= 1
 
+    def test_get_buchungs_statistiken_in_einer_abfrage(
+        self,
+        aktiv_konto_bank,
+        ertrag_konto_erloese,
+        aufwand_konto,
+        django_assert_num_queries,
+    ):
+        """Kennzahlen und Gruppen kommen ohne Modellinstanzen aus der Datenbank."""
+        partner = Geschaeftspartner.objects.create(name="Kunde A")
+        for datum, betrag, soll, haben, validiert, auto, kunde in [
+            ("2025-01-10", "500.00", aktiv_konto_bank, ertrag_konto_erloese, True, False, partner),
+            ("2025-01-20", "100.00", aufwand_konto, aktiv_konto_bank, False, True, None),
+            ("2025-02-05", "250.50", aktiv_konto_bank, ertrag_konto_erloese, True, True, partner),
+            ("2024-12-31", "999.00", aktiv_konto_bank, ertrag_konto_erloese, True, False, None),
+        ]:  # fmt: skip
+            Buchungssatz.objects.create(
+                buchungsdatum=datum,
+                buchungstext="Statistik",
+                betrag=Decimal(betrag),
+                soll_konto=soll,
+                haben_konto=haben,
+                validiert=validiert,
+                automatisch_erstellt=auto,
+                geschaeftspartner=kunde,
+            )
+
+        with django_assert_num_queries(1):
+            statistiken = BuchungsService.get_buchungs_statistiken(
+                zeitraum_start="2025-01-01"
+            )
+        assert statistiken == {
+            "gesamt_buchungen": 3,
+            "gesamt_betrag": Decimal("850.50"),
+            "validierte_buchungen": 2,
+            "offene_buchungen": 1,
+            "automatische_buchungen": 2,
+            "manuelle_buchungen": 1,
+        }
+
+        with django_assert_num_queries(1):
+            nach_monat = BuchungsService.get_buchungs_statistiken(
+                zeitraum_start="2025-01-01", gruppieren_nach="monat"
+            )
+        assert nach_monat["gesamt_betrag"] == Decimal("850.50")
+        assert nach_monat["validierte_buchungen"] == 2
+        assert [
+            (
+                str(gruppe["monat"])[:7],
+                gruppe["gesamt_buchungen"],
+                gruppe["gesamt_betrag"],
+            )
+            for gruppe in nach_monat["gruppen"]
+        ] == [("2025-01", 2, Decimal("600.00")), ("2025-02", 1, Decimal("250.50"))]
+
+        nach_konto = BuchungsService.get_buchungs_statistiken(
+            gruppieren_nach="soll_konto"
+        )
+        assert [
+            (gruppe["konto_nummer"], gruppe["gesamt_buchungen"])
+            for gruppe in nach_konto["gruppen"]
+        ] == [("1200", 3), ("4980", 1)]
+
+        nach_partner = BuchungsService.get_buchungs_statistiken(
+            gruppieren_nach="geschaeftspartner"
+        )
+        betraege = {
+            gruppe["partner_name"]: gruppe["gesamt_betrag"]
+            for gruppe in nach_partner["gruppen"]
+        }
+        assert betraege == {None: Decimal("1099.00"), "Kunde A": Decimal("750.50")}
+
+        with pytest.raises(ValueError):
+            BuchungsService.get_buchungs_statistiken(gruppieren_nach="beleg")
+
     def test_finde_aehnliche_buchungen(self, aktiv_konto_bank, ertrag_konto_erloese):
         """Test für das Finden ähnlicher Buchungen."""
         # Testbuchung erstellen
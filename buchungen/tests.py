@@ -319,8 +319,137 @@ class BuchungViewsTest(TestCase):
     def test_buchungen_export_csv_view(self):
         response = self.client.get(reverse("buchungen:export_csv"))
         self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
         self.assertEqual(response["Content-Type"], "text/csv")
         self.assertIn("attachment; filename=", response["Content-Disposition"])
-        content = response.content.decode("utf-8")
+        content = b"".join(response.streaming_content).decode("utf-8")
         self.assertIn("Eine Testbuchung", content)
         self.assertIn("99,99", content)
+
+    def test_export_csv_wie_bisher_blockweise(self):
+        """Test: Streaming-Export liefert dieselben Zeilen, egal wie groß die Blöcke."""
+        from . import export
+
+        for i in range(5):
+            Buchungssatz.objects.create(
+                buchungsdatum=date(2023, 11, i + 1),
+                buchungstext=f'Zeile {i}; mit "Sonderzeichen"',
+                betrag=Decimal("1234.5"),
+                soll_konto=self.soll_konto,
+                haben_konto=self.haben_konto,
+            )
+        queryset = Buchungssatz.objects.select_related(
+            "soll_konto", "haben_konto", "geschaeftspartner"
+        ).order_by("buchungsdatum")
+
+        bloecke = list(export.csv_bloecke(queryset, chunk_size=2))
+        # BOM + Kopfzeile, dann 6 Zeilen in Blöcken zu 2
+        self.assertEqual(len(bloecke), 4)
+        self.assertEqual(b"".join(bloecke), b"".join(export.csv_bloecke(queryset)))
+
+        zeilen = b"".join(bloecke).decode("utf-8").splitlines()
+        self.assertEqual(
+            zeilen[0],
+            "\ufeffDatum;Buchungstext;Betrag;Soll-Konto;"
+            "Haben-Konto;Partner;Referenz;Validiert;Erstellt am",
+        )
+        buchung = self.buchung
+        self.assertEqual(
+            zeilen[1],
+            f"26.10.2023;Eine Testbuchung;99,99;{self.soll_konto.nummer} - "
+            f"{self.soll_konto.name};{self.haben_konto.nummer} - "
+            f"{self.haben_konto.name};{self.partner.name};;Nein;"
+            f"{buchung.erstellt_am:%d.%m.%Y %H:%M}",
+        )
+        self.assertTrue(
+            zeilen[2].startswith('01.11.2023;"Zeile 0; mit ""Sonderzeichen""";1234,50;')
+        )
+        self.assertIn(";;;Nein;", zeilen[2])
+
+    def test_liste_blaettert_per_keyset(self):
+        """Test: Cursor-Links liefern jede Buchung genau einmal, vor und zurück."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        # Viele gleiche Daten und Zeitstempel - erst die ID macht es eindeutig
+        Buchungssatz.objects.bulk_create(
+            Buchungssatz(
+                buchungsdatum=date(2023, 11, i % 4 + 1),
+                buchungstext=f"Keyset {i}",
+                betrag=Decimal("10.00"),
+                soll_konto=self.soll_konto,
+                haben_konto=self.haben_konto,
+                validiert=i % 2 == 0,
+            )
+            for i in range(60)
+        )
+        erwartet = list(
+            Buchungssatz.objects.order_by("-buchungsdatum", "-erstellt_am", "-id")
+        )
+
+        seiten, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as abfragen:
+                response = self.client.get(
+                    reverse("buchungen:liste"), {"cursor": cursor} if cursor else {}
+                )
+            # Keine OFFSET-Scans, gezählt wird nur in der Statistik-Abfrage
+            sql = [abfrage["sql"] for abfrage in abfragen.captured_queries]
+            self.assertFalse([s for s in sql if "OFFSET" in s])
+            self.assertEqual(len([s for s in sql if "COUNT(" in s]), 1)
+
+            seite = response.context["page_obj"]
+            seiten.append(list(seite))
+            self.assertEqual(response.context["stats"]["gesamt_buchungen"], 61)
+            self.assertEqual(response.context["stats"]["offene_buchungen"], 31)
+            if not seite.has_next():
+                break
+            cursor = seite.naechster_cursor
+
+        self.assertEqual([len(s) for s in seiten], [25, 25, 11])
+        self.assertEqual([b for s in seiten for b in s], erwartet)
+
+        # Zurückblättern ergibt dieselben Seiten
+        response = self.client.get(
+            reverse("buchungen:liste"),
+            {"cursor": response.context["page_obj"].vorheriger_cursor},
+        )
+        self.assertEqual(list(response.context["page_obj"]), seiten[1])
+        self.assertTrue(response.context["page_obj"].has_next())
+
+        # Letzte Seite direkt: die letzten 25 Buchungen
+        ende = response.context["paginator"].letzte_seite_cursor
+        response = self.client.get(reverse("buchungen:liste"), {"cursor": ende})
+        self.assertEqual(list(response.context["page_obj"]), erwartet[-25:])
+        self.assertFalse(response.context["page_obj"].has_next())
+
+        # Kaputte Cursor führen zur ersten Seite
+        response = self.client.get(reverse("buchungen:liste"), {"cursor": "kaputt"})
+        self.assertEqual(list(response.context["page_obj"]), seiten[0])
+
+    def test_anzahl_schaetzen(self):
+        """Test: Geschätzte Anzahl hört an der Zählgrenze auf."""
+        from llkjj_knut.keyset import KeysetPaginator, schaetze_anzahl
+
+        self.assertEqual(schaetze_anzahl(Buchungssatz.objects.all(), 5), (1, True))
+        Buchungssatz.objects.bulk_create(
+            Buchungssatz(
+                buchungsdatum=date(2023, 11, 1),
+                buchungstext=f"Schätzung {i}",
+                betrag=Decimal("1.00"),
+                soll_konto=self.soll_konto,
+                haben_konto=self.haben_konto,
+            )
+            for i in range(9)
+        )
+        self.assertEqual(schaetze_anzahl(Buchungssatz.objects.all(), 5), (5, False))
+
+        with self.settings(LISTEN_ZAEHLGRENZE=5):
+            paginator = KeysetPaginator(
+                Buchungssatz.objects.order_by("-buchungsdatum"),
+                3,
+                anzahl_schaetzen=True,
+            )
+            self.assertTrue(paginator.anzahl_geschaetzt)
+            self.assertEqual(paginator.count, 5)
+        self.assertEqual(KeysetPaginator(Buchungssatz.objects.all(), 3).count, 10)
@@ -23,6 +23,22 @@ urlpatterns = [
     # CSV-Import
     path("import/", views.CSVImportView.as_view(), name="csv_import"),
     path("import/mapping/", views.csv_mapping_view, name="csv_mapping"),
+    path("import/job/<uuid:pk>/", views.csv_import_job_view, name="csv_import_job"),
+    path(
+        "import/job/<uuid:pk>/fortschritt/",
+        views.csv_import_fortschritt,
+        name="csv_import_fortschritt",
+    ),
+    path(
+        "import/job/<uuid:pk>/abbrechen/",
+        views.csv_import_abbrechen,
+        name="csv_import_abbrechen",
+    ),
+    path(
+        "import/job/<uuid:pk>/fortsetzen/",
+        views.csv_import_fortsetzen,
+        name="csv_import_fortsetzen",
+    ),
     # AJAX-Endpoints
     path(
         "ajax/<uuid:pk>/validieren/",
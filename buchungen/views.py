@@ -3,37 +3,46 @@ Views für Buchungen - Das Herzstück der Anwendung!
 Peter Zwegat: "Hier fließt das Geld - digital versteht sich!"
 """
 
-import csv
-import io
 from datetime import date, datetime
-from decimal import Decimal
 
+from django.conf import settings
 from django.contrib import messages
-from django.db import transaction
-from django.db.models import Q, Sum
-from django.http import HttpResponse, JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
-from django.utils import timezone
+from django.views.decorators.http import require_POST
 from django.views.generic import CreateView, DetailView, FormView, ListView, UpdateView
 
+from konten import kontenindex
 from konten.models import Konto
+from llkjj_knut.keyset import KeysetPaginationMixin
 
 from .forms import BuchungssatzForm, CSVImportForm, SchnellbuchungForm
 
 try:
-    import openpyxl
+    import openpyxl  # noqa: F401 - nur Verfügbarkeit prüfen
 
     EXCEL_SUPPORT = True
 except ImportError:
     EXCEL_SUPPORT = False
-from .intelligent_kontierung import IntelligenterKontierungsVorschlag
-from .models import Buchungssatz, Geschaeftspartner
+from . import export
+from .csv_staging import CSVStaging
+from .import_engine import BuchungsImportEngine
+from .intelligent_kontierung import get_kontierung_suggestions_for_user
+from .models import Buchungssatz, CSVImportJob, Geschaeftspartner
+from .services import BuchungsService
+from .tasks import fortschritt_laden, starte_import_job
 
 
-class BuchungssatzListView(ListView):
+class BuchungssatzListView(KeysetPaginationMixin, ListView):
     """
     Übersicht aller Buchungssätze mit Filter und Suche.
+
+    Geblättert wird per Keyset über (``buchungsdatum``, ``erstellt_am``,
+    ``id``); die Kennzahlen über alle Treffer kommen aus einer Abfrage und
+    liefern gleich die Gesamtzahl für die Pagination mit.
     Peter Zwegat: "Ordnung ist das halbe Leben!"
     """
 
@@ -89,18 +98,18 @@ class BuchungssatzListView(ListView):
 
         return queryset
 
+    def get_keyset_anzahl(self):
+        return self.stats["gesamt_buchungen"]
+
     def get_context_data(self, **kwargs):
         """Zusätzliche Kontextdaten"""
+        # Statistiken über alle Treffer - vor der Pagination, die die
+        # Gesamtzahl übernimmt
+        self.stats = BuchungsService.get_buchungs_statistiken(
+            queryset=self.object_list
+        )
         context = super().get_context_data(**kwargs)
-
-        # Statistiken
-        queryset = self.get_queryset()
-        context["stats"] = {
-            "gesamt_buchungen": queryset.count(),
-            "gesamt_betrag": queryset.aggregate(total=Sum("betrag"))["total"] or 0,
-            "validierte_buchungen": queryset.filter(validiert=True).count(),
-            "offene_buchungen": queryset.filter(validiert=False).count(),
-        }
+        context["stats"] = self.stats
 
         # Filter-Optionen
         context["konten"] = Konto.objects.filter(aktiv=True).order_by("nummer")
@@ -272,9 +281,14 @@ class CSVImportView(FormView):
     def form_valid(self, form):
         """CSV-Datei verarbeiten"""
         try:
-            # CSV-Daten analysieren
+            # Datei ablegen, nur Kopfzeile und Vorschau in die Session
             csv_daten = self._parse_csv(form.cleaned_data)
 
+            # Vorherigen, nicht abgeschlossenen Upload verwerfen
+            vorher = self.request.session.get("csv_daten")
+            if vorher:
+                CSVStaging.entferne(vorher)
+
             # Mapping-Interface anzeigen
             self.request.session["csv_daten"] = csv_daten
             return redirect("buchungen:csv_mapping")
@@ -287,78 +301,32 @@ class CSVImportView(FormView):
             return self.form_invalid(form)
 
     def _parse_csv(self, form_data):
-        """CSV- oder Excel-Datei einlesen und analysieren"""
-        csv_datei = form_data["csv_datei"]
-        trennzeichen = form_data["trennzeichen"]
-        encoding = form_data["encoding"]
-        erste_zeile_ueberspringen = form_data["erste_zeile_ueberspringen"]
-
-        # Excel-Datei verarbeiten
-        if csv_datei.name.endswith((".xlsx", ".xls")):
-            if not EXCEL_SUPPORT:
-                raise ValueError(
-                    "Excel-Import nicht verfügbar. Bitte openpyxl installieren."
-                )
-
-            return self._parse_excel_file(csv_datei, erste_zeile_ueberspringen)
-
-        # CSV-Datei verarbeiten
-        content = csv_datei.read().decode(encoding)
-        csv_reader = csv.reader(io.StringIO(content), delimiter=trennzeichen)
-
-        zeilen = list(csv_reader)
-
-        if erste_zeile_ueberspringen and zeilen:
-            header = zeilen[0]
-            daten = zeilen[1:]
-        else:
-            header = [f"Spalte_{i+1}" for i in range(len(zeilen[0]) if zeilen else 0)]
-            daten = zeilen
-
-        return {
-            "header": header,
-            "daten": daten[:50],  # Nur erste 50 Zeilen für Preview
-            "gesamt_zeilen": len(daten),
-        }
-
-    def _parse_excel_file(self, excel_datei, erste_zeile_ueberspringen):
         """
-        Excel-Datei verarbeiten mit openpyxl.
+        CSV- oder Excel-Datei auf die Platte spoolen und analysieren.
 
-        Peter Zwegat: "Excel ist auch nur eine Tabelle - wir kriegen das hin!"
+        Die Session bekommt nur Kopfzeile, Vorschau und Token - die
+        Datenzeilen liest der Import später erneut aus der Datei.
         """
-        try:
-            workbook = openpyxl.load_workbook(excel_datei, data_only=True)
-
-            # Erstes Arbeitsblatt verwenden
-            worksheet = workbook.active
-
-            # Alle Zeilen einlesen
-            zeilen = []
-            for row in worksheet.iter_rows(values_only=True):
-                # Leere Zeilen überspringen
-                if any(cell is not None for cell in row):
-                    # None-Werte zu leeren Strings konvertieren
-                    zeile = [str(cell) if cell is not None else "" for cell in row]
-                    zeilen.append(zeile)
-
-            if erste_zeile_ueberspringen and zeilen:
-                header = zeilen[0]
-                daten = zeilen[1:]
-            else:
-                header = [
-                    f"Spalte_{i+1}" for i in range(len(zeilen[0]) if zeilen else 0)
-                ]
-                daten = zeilen
-
-            return {
-                "header": header,
-                "daten": daten[:50],  # Nur erste 50 Zeilen für Preview
-                "gesamt_zeilen": len(daten),
-            }
+        csv_datei = form_data["csv_datei"]
 
+        if csv_datei.name.endswith((".xlsx", ".xls")) and not EXCEL_SUPPORT:
+            raise ValueError(
+                "Excel-Import nicht verfügbar. Bitte openpyxl installieren."
+            )
+
+        try:
+            return CSVStaging.speichere_upload(
+                csv_datei,
+                trennzeichen=form_data["trennzeichen"],
+                encoding=form_data["encoding"],
+                erste_zeile_ueberspringen=form_data["erste_zeile_ueberspringen"],
+            )
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Falsche Zeichenkodierung: {e.reason}") from e
         except Exception as e:
-            raise ValueError(f"Fehler beim Lesen der Excel-Datei: {str(e)}")
+            if csv_datei.name.endswith((".xlsx", ".xls")):
+                raise ValueError(f"Fehler beim Lesen der Excel-Datei: {str(e)}") from e
+            raise
 
     def get_context_data(self, **kwargs):
         """Zusätzliche Kontextdaten"""
@@ -394,6 +362,8 @@ def csv_mapping_view(request):
             ("buchungstext", "Buchungstext"),
             ("referenz", "Referenz/Verwendungszweck"),
             ("partner_name", "Partner-Name"),
+            ("soll_konto", "Soll-Konto (Nummer)"),
+            ("haben_konto", "Haben-Konto (Nummer)"),
         ],
     }
 
@@ -412,91 +382,31 @@ def _process_csv_mapping(request, csv_daten):
         messages.error(request, "❌ Bitte mindestens eine Spalte zuordnen!")
         return redirect("buchungen:csv_mapping")
 
+    # Große Dateien im Hintergrund importieren (Fortschritt per Polling)
+    if csv_daten.get("token") and csv_daten.get("gesamt_zeilen", 0) > getattr(
+        settings, "CSV_IMPORT_ASYNC_AB_ZEILEN", 5000
+    ):
+        return _starte_csv_import_job(request, csv_daten, mapping)
+
     # Intelligente Kontierung initialisieren
-    kontierung_ai = IntelligenterKontierungsVorschlag(request.user)
-
-    # Buchungen erstellen
-    erfolgreiche_importe = 0
-    fehler = []
-
-    with transaction.atomic():
-        for i, zeile in enumerate(csv_daten["daten"]):
-            try:
-                buchung_data = {}
-                for spalte_index, feld_name in mapping.items():
-                    if spalte_index < len(zeile):
-                        wert = zeile[spalte_index].strip()
-                        if feld_name == "betrag":
-                            # Betrag normalisieren
-                            wert = (
-                                wert.replace(",", ".").replace("€", "").replace(" ", "")
-                            )
-                            buchung_data[feld_name] = Decimal(wert)
-                        elif feld_name == "buchungsdatum":
-                            # Datum intelligent parsen
-                            parsed_date = _parse_date_intelligent(wert)
-                            if parsed_date:
-                                buchung_data[feld_name] = parsed_date
-                            else:
-                                # Fallback auf aktuelles Datum mit Hinweis
-                                buchung_data[feld_name] = timezone.now().date()
-                                buchung_data["_date_parsing_failed"] = True
-                        else:
-                            buchung_data[feld_name] = wert
-
-                # Intelligente Kontierung anwenden
-                if buchung_data.get("betrag"):
-                    buchungstext = buchung_data.get("buchungstext", "CSV-Import")
-                    betrag = buchung_data["betrag"]
-
-                    # Intelligenten Kontierungsvorschlag holen (mit originalem Vorzeichen!)
-                    kontierung_vorschlag = kontierung_ai.suggest_kontierung(
-                        buchungstext=buchungstext, betrag=float(betrag)
-                    )
-
-                    # Buchung erstellen
-                    buchung = Buchungssatz(
-                        buchungsdatum=buchung_data.get(
-                            "buchungsdatum", timezone.now().date()
-                        ),
-                        buchungstext=buchungstext,
-                        betrag=abs(betrag),
-                        referenz=buchung_data.get("referenz", ""),
-                        automatisch_erstellt=True,
-                        soll_konto=kontierung_vorschlag.get("soll_konto")
-                        or Konto.objects.filter(
-                            nummer="1200"
-                        ).first(),  # Fallback: Bank
-                        haben_konto=kontierung_vorschlag.get("haben_konto")
-                        or Konto.objects.filter(
-                            nummer="8400"
-                        ).first(),  # Fallback: Erlöse
-                    )
-
-                    # Zusätzliche Metadaten für Nachverfolgung
-                    notizen_teile = []
-                    if kontierung_vorschlag.get("confidence"):
-                        notizen_teile.append(
-                            f"KI-Kontierung: {kontierung_vorschlag.get('kategorie', 'unknown')} "
-                            f"(Confidence: {kontierung_vorschlag.get('confidence', 0):.2f}) "
-                            f"- {kontierung_vorschlag.get('reasoning', '')}"
-                        )
-
-                    # Warnung bei Datum-Parsing-Fehlern
-                    if buchung_data.get("_date_parsing_failed"):
-                        notizen_teile.append(
-                            "⚠️ Datum konnte nicht geparst werden - aktuelles Datum verwendet"
-                        )
-
-                    if notizen_teile:
-                        buchung.notizen = " | ".join(notizen_teile)
-
-                    buchung.full_clean()
-                    buchung.save()
-                    erfolgreiche_importe += 1
-
-            except Exception as e:
-                fehler.append(f"Zeile {i+1}: {str(e)}")
+    kontierung_ai = get_kontierung_suggestions_for_user(request.user)
+
+    # Zeilen aus der abgelegten Datei streamen (ältere Sessions: Vorschau)
+    if csv_daten.get("token"):
+        zeilen = CSVStaging.lese_zeilen(csv_daten)
+    else:
+        zeilen = csv_daten["daten"]
+
+    # Buchungen blockweise erstellen (Konten einmal auflösen, bulk_create)
+    engine = BuchungsImportEngine(mapping, kontierung=kontierung_ai)
+    try:
+        erfolgreiche_importe, fehler = engine.importiere(zeilen)
+    except FileNotFoundError:
+        del request.session["csv_daten"]
+        messages.error(
+            request, "❌ Die hochgeladene Datei ist abgelaufen. Bitte erneut hochladen."
+        )
+        return redirect("buchungen:csv_import")
 
     # Erfolgsmeldung
     if erfolgreiche_importe > 0:
@@ -512,13 +422,103 @@ def _process_csv_mapping(request, csv_daten):
             f"⚠️ {len(fehler)} Fehler beim Import. Details im Log.",
         )
 
-    # Session aufräumen
+    # Session und Ablage aufräumen
+    CSVStaging.entferne(csv_daten)
     if "csv_daten" in request.session:
         del request.session["csv_daten"]
 
     return redirect("buchungen:liste")
 
 
+def _starte_csv_import_job(request, csv_daten, mapping):
+    """Legt einen Hintergrund-Import an und leitet auf die Fortschrittsseite."""
+    job = CSVImportJob.objects.create(
+        benutzer=request.user if request.user.is_authenticated else None,
+        dateiname=csv_daten.get("dateiname", ""),
+        ablage={
+            schluessel: csv_daten.get(schluessel)
+            for schluessel in (
+                "token",
+                "format",
+                "trennzeichen",
+                "encoding",
+                "erste_zeile_ueberspringen",
+            )
+        },
+        mapping=mapping,
+        gesamt_zeilen=csv_daten.get("gesamt_zeilen", 0),
+    )
+    # Die Datei gehört jetzt dem Job - nur die Session freigeben
+    del request.session["csv_daten"]
+
+    starte_import_job(job)
+    messages.info(
+        request,
+        f"⏳ Import von {job.gesamt_zeilen} Zeilen läuft im Hintergrund.",
+    )
+    return redirect("buchungen:csv_import_job", pk=job.pk)
+
+
+def _get_import_job(request, pk):
+    """Import-Job des angemeldeten Benutzers (404 für fremde Jobs)."""
+    return get_object_or_404(CSVImportJob, pk=pk, benutzer_id=request.user.pk)
+
+
+@login_required
+def csv_import_job_view(request, pk):
+    """
+    Fortschrittsseite eines Hintergrund-Imports.
+    Peter Zwegat: "Geduld - jede Zeile kommt dran!"
+    """
+    job = _get_import_job(request, pk)
+    context = {
+        "job": job,
+        "page_title": "CSV-Import",
+        "page_subtitle": job.dateiname,
+    }
+    return render(request, "buchungen/csv_import_fortschritt.html", context)
+
+
+@login_required
+def csv_import_fortschritt(request, pk):
+    """AJAX: Fortschritt eines Hintergrund-Imports als JSON."""
+    job = _get_import_job(request, pk)
+    fortschritt = fortschritt_laden(job.pk)
+    if fortschritt is None or fortschritt["status"] != job.status:
+        # Cache leer oder veraltet (z.B. nach Abbruch) - Datenbank ist maßgeblich
+        fortschritt = job.fortschritt()
+    return JsonResponse(fortschritt)
+
+
+@login_required
+@require_POST
+def csv_import_abbrechen(request, pk):
+    """Hält einen laufenden Import nach dem aktuellen Block an."""
+    job = _get_import_job(request, pk)
+    if CSVImportJob.objects.filter(pk=job.pk, status__in=["WARTEND", "LAEUFT"]).update(
+        status="ABGEBROCHEN"
+    ):
+        messages.info(request, "⏸️ Import wird nach dem aktuellen Block angehalten.")
+    return redirect("buchungen:csv_import_job", pk=job.pk)
+
+
+@login_required
+@require_POST
+def csv_import_fortsetzen(request, pk):
+    """Setzt einen abgebrochenen oder fehlgeschlagenen Import fort."""
+    job = _get_import_job(request, pk)
+    if CSVImportJob.objects.filter(
+        pk=job.pk, status__in=["ABGEBROCHEN", "FEHLER"]
+    ).update(status="WARTEND"):
+        job.refresh_from_db()
+        starte_import_job(job)
+        messages.info(
+            request,
+            f"▶️ Import wird ab Zeile {job.verarbeitete_zeilen + 1} fortgesetzt.",
+        )
+    return redirect("buchungen:csv_import_job", pk=job.pk)
+
+
 def buchung_validieren_ajax(request, pk):
     """
     AJAX-Endpoint zum Validieren/Invalidieren von Buchungen.
@@ -552,84 +552,25 @@ def buchung_validieren_ajax(request, pk):
 
 def konten_autocomplete(request):
     """
-    Autocomplete für Konten-Auswahl.
+    Autocomplete für Konten-Auswahl (aus dem Konten-Index, ohne Datenbank).
     Peter Zwegat: "Suchen und finden - wie im Leben!"
     """
     query = request.GET.get("q", "")
     if len(query) < 2:
         return JsonResponse({"results": []})
 
-    konten = Konto.objects.filter(
-        Q(nummer__icontains=query) | Q(name__icontains=query), aktiv=True
-    ).order_by("nummer")[:20]
-
-    results = [
-        {
-            "id": konto.id,
-            "text": f"{konto.nummer} - {konto.name}",
-            "nummer": konto.nummer,
-            "name": konto.name,
-            "kategorie": konto.get_kategorie_display(),
-        }
-        for konto in konten
-    ]
-
-    return JsonResponse({"results": results})
+    return JsonResponse({"results": kontenindex.suche(query)})
 
 
 def buchungen_export_csv(request):
     """
-    CSV-Export aller gefilterten Buchungen.
+    CSV-Export aller gefilterten Buchungen (gestreamt, siehe ``export``).
     Peter Zwegat: "Daten raus ist genauso wichtig wie Daten rein!"
     """
     # Gleiche Filterlogik wie in ListView
     view = BuchungssatzListView()
     view.request = request
-    buchungen = view.get_queryset()
-
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="buchungen_export.csv"'
-    response.write("\ufeff")  # UTF-8 BOM für Excel
-
-    writer = csv.writer(response, delimiter=";")
-    writer.writerow(
-        [
-            "Datum",
-            "Buchungstext",
-            "Betrag",
-            "Soll-Konto",
-            "Haben-Konto",
-            "Partner",
-            "Referenz",
-            "Validiert",
-            "Erstellt am",
-        ]
-    )
-
-    for buchung in buchungen:
-        writer.writerow(
-            [
-                buchung.buchungsdatum.strftime("%d.%m.%Y"),
-                buchung.buchungstext,
-                f"{buchung.betrag:.2f}".replace(".", ","),
-                (
-                    f"{buchung.soll_konto.nummer} - {buchung.soll_konto.name}"
-                    if buchung.soll_konto
-                    else ""
-                ),
-                (
-                    f"{buchung.haben_konto.nummer} - {buchung.haben_konto.name}"
-                    if buchung.haben_konto
-                    else ""
-                ),
-                buchung.geschaeftspartner.name if buchung.geschaeftspartner else "",
-                buchung.referenz,
-                "Ja" if buchung.validiert else "Nein",
-                buchung.erstellt_am.strftime("%d.%m.%Y %H:%M"),
-            ]
-        )
-
-    return response
+    return export.csv_response(view.get_queryset(), "buchungen_export.csv")
 
 
 def _parse_date_intelligent(date_string: str) -> date | None:
@@ -1,8 +1,17 @@
 import os
 
 import django
+import pytest
 
 
 def pytest_configure():
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "llkjj_knut.settings")
     django.setup()
+
+
+@pytest.fixture(autouse=True)
+def konten_index_verwerfen():
+    """Der Konten-Index lebt im Prozess - die Testdaten werden zurückgerollt."""
+    from konten import kontenindex
+
+    kontenindex.verwerfen()
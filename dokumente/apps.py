@@ -5,3 +5,16 @@ class DokumenteConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dokumente"
     verbose_name = "📁 Dokumentenverwaltung"
+
+    def ready(self):
+        """Meldet Dokumente für die Volltextsuche an."""
+        from llkjj_knut.volltextsuche import registriere
+
+        registriere(
+            self.get_model("Dokument"),
+            {
+                "A": ["titel"],
+                "B": ["tags", "beschreibung"],
+                "C": ["notizen", "ocr_text"],
+            },
+        )
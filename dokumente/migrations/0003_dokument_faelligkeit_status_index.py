@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dokumente", "0002_alter_dokument_dateigröße"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="dokument",
+            name="dokumente_d_fälligk_bf54d4_idx",
+        ),
+        migrations.AddIndex(
+            model_name="dokument",
+            index=models.Index(
+                fields=["fälligkeitsdatum", "status"],
+                name="dokumente_d_fälligk_9c3536_idx",
+            ),
+        ),
+    ]
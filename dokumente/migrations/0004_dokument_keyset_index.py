@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index für die Keyset-Pagination der Dokumentliste (datum, erstellt_am, id)."""
+
+    dependencies = [
+        ("dokumente", "0003_dokument_faelligkeit_status_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dokument",
+            index=models.Index(
+                fields=["-datum", "-erstellt_am", "-id"], name="idx_dokument_keyset"
+            ),
+        ),
+    ]
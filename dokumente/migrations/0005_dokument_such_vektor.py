@@ -0,0 +1,47 @@
+from django.db import migrations
+
+from llkjj_knut.migrationen import NurPostgreSQL
+
+
+class Migration(migrations.Migration):
+    """
+    Volltextsuche unter PostgreSQL (siehe ``llkjj_knut/volltextsuche.py``).
+
+    Spalte ``such_vektor`` (``tsvector``) mit GIN-Index, gefüllt mit den
+    gewichteten Suchtexten aus ``DokumenteConfig.ready``. Danach pflegen die
+    Signals den Vektor. Unter SQLite legt ``post_migrate`` die FTS5-Tabelle
+    an, hier passiert nichts.
+    """
+
+    dependencies = [
+        ("dokumente", "0004_dokument_keyset_index"),
+    ]
+
+    operations = [
+        NurPostgreSQL(
+            sql=(
+                "ALTER TABLE dokumente_dokument "
+                "ADD COLUMN IF NOT EXISTS such_vektor tsvector"
+            ),
+            reverse_sql=(
+                "ALTER TABLE dokumente_dokument DROP COLUMN IF EXISTS such_vektor"
+            ),
+        ),
+        NurPostgreSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS dokumente_dokument_such_gin "
+                "ON dokumente_dokument USING GIN (such_vektor)"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS dokumente_dokument_such_gin",
+        ),
+        NurPostgreSQL(
+            sql="""
+                UPDATE dokumente_dokument SET such_vektor =
+                    setweight(to_tsvector('german', titel), 'A')
+                    || setweight(to_tsvector('german', concat_ws(' ', tags, beschreibung)), 'B')
+                    || setweight(to_tsvector('german', concat_ws(' ', notizen, ocr_text)), 'C')
+                WHERE such_vektor IS NULL
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
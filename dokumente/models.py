@@ -1,11 +1,12 @@
 import logging
 import re
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models import Count, F, Func, Q, Value
 from django.urls import reverse
 
 logger = logging.getLogger(__name__)
@@ -125,6 +126,113 @@ class DokumentKategorie(models.Model):
         return self.name
 
 
+class DatumMinusTage(Func):
+    """``datum - tage`` als Datum, in SQL gerechnet (je Datenbank eigene Syntax)."""
+
+    arity = 2
+    output_field = models.DateField()
+    # PostgreSQL: date - integer = date
+    template = "(%(expressions)s)"
+    arg_joiner = " - "
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="date(%(expressions)s || ' days')",
+            arg_joiner=", '-' || ",
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="DATE_SUB(%(expressions)s DAY)",
+            arg_joiner=", INTERVAL ",
+            **extra_context,
+        )
+
+
+class DokumentQuerySet(models.QuerySet):
+    """
+    Fälligkeiten direkt in der Datenbank.
+
+    Entspricht ``Dokument.ist_überfällig`` / ``Dokument.ist_fällig_bald``,
+    filtert aber über den Index auf ``fälligkeitsdatum`` statt jedes
+    Dokument in Python zu prüfen - alte, längst erledigte Fristen im Archiv
+    kosten so nichts.
+
+    Peter Zwegat: "Die Termine gehören auf den Tisch - nicht der ganze Keller!"
+    """
+
+    @staticmethod
+    def _q_überfällig(heute: date) -> Q:
+        return Q(fälligkeitsdatum__lt=heute)
+
+    @staticmethod
+    def _q_fällig_bald(heute: date) -> Q:
+        return Q(fälligkeitsdatum__gte=heute, erinnerungsdatum__lte=heute)
+
+    def mit_erinnerungsdatum(self):
+        """Annotiert ``erinnerungsdatum`` = Fälligkeit minus Vorlauf."""
+        return self.annotate(
+            erinnerungsdatum=DatumMinusTage(
+                F("fälligkeitsdatum"), F("erinnerung_tage_vorher")
+            )
+        )
+
+    def überfällig(self, heute: date | None = None):
+        return self.filter(self._q_überfällig(heute or date.today()))
+
+    def fällig_bald(self, heute: date | None = None):
+        return self.mit_erinnerungsdatum().filter(
+            self._q_fällig_bald(heute or date.today())
+        )
+
+    def fällig(self, heute: date | None = None):
+        """Überfällig oder bald fällig."""
+        heute = heute or date.today()
+        return self.mit_erinnerungsdatum().filter(
+            self._q_überfällig(heute) | self._q_fällig_bald(heute)
+        )
+
+    def mit_fälligkeit(self, heute: date | None = None):
+        """
+        Annotiert ``fälligkeit``: ``"überfällig"``, ``"bald"``, ``"später"``
+        oder ``None`` (ohne Fälligkeitsdatum).
+        """
+        heute = heute or date.today()
+        return self.mit_erinnerungsdatum().annotate(
+            fälligkeit=models.Case(
+                models.When(self._q_überfällig(heute), then=Value("überfällig")),
+                models.When(self._q_fällig_bald(heute), then=Value("bald")),
+                models.When(fälligkeitsdatum__isnull=False, then=Value("später")),
+                default=None,
+                output_field=models.CharField(),
+            )
+        )
+
+    def fälligkeits_statistik(self, heute: date | None = None) -> dict[str, int]:
+        """Anzahl bald fälliger und überfälliger Dokumente in einer Abfrage."""
+        heute = heute or date.today()
+        return self.fällig(heute).aggregate(
+            fällig_bald=Count("pk", filter=Q(fälligkeitsdatum__gte=heute)),
+            überfällig=Count("pk", filter=Q(fälligkeitsdatum__lt=heute)),
+        )
+
+    def listen_statistik(self, heute: date | None = None) -> dict[str, int]:
+        """Kennzahlen der Dokumentliste (inkl. Fälligkeiten) in einer Abfrage."""
+        heute = heute or date.today()
+        return self.mit_erinnerungsdatum().aggregate(
+            gesamt=Count("pk"),
+            neu=Count("pk", filter=Q(status="NEU")),
+            wichtig=Count("pk", filter=Q(status="WICHTIG")),
+            fällig_bald=Count("pk", filter=self._q_fällig_bald(heute)),
+            überfällig=Count("pk", filter=self._q_überfällig(heute)),
+        )
+
+
 class Dokument(models.Model):
     """
     Allgemeine Dokumentenverwaltung für nicht-finanzielle Dokumente.
@@ -306,6 +414,8 @@ class Dokument(models.Model):
 
     geändert_am = models.DateTimeField(auto_now=True, verbose_name="Geändert am")
 
+    objects = DokumentQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Dokument"
         verbose_name_plural = "Dokumente"
@@ -315,7 +425,12 @@ class Dokument(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["datum"]),
             models.Index(fields=["organisation"]),
-            models.Index(fields=["fälligkeitsdatum"]),
+            # Fälligkeits-Bereiche, Status ohne Tabellenzugriff
+            models.Index(fields=["fälligkeitsdatum", "status"]),
+            # Keyset-Pagination der Dokumentliste (llkjj_knut.keyset)
+            models.Index(
+                fields=["-datum", "-erstellt_am", "-id"], name="idx_dokument_keyset"
+            ),
         ]
 
     def __str__(self):
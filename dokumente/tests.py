@@ -75,6 +75,45 @@ class DokumentModelTest(TestCase):
         self.assertFalse(dokument_überfällig.ist_fällig_bald)
         self.assertTrue(dokument_überfällig.ist_überfällig)
 
+    def test_fälligkeiten_im_queryset_wie_properties(self):
+        """Test: QuerySet-Methoden liefern dasselbe wie die Properties."""
+        from datetime import date, timedelta
+
+        heute = date.today()
+        for tage, vorher in [
+            (-30, 7),
+            (-1, 0),
+            (0, 0),
+            (3, 7),
+            (3, 2),
+            (10, 14),
+            (40, 7),
+        ]:
+            Dokument.objects.create(
+                titel=f"Frist {tage}/{vorher}",
+                fälligkeitsdatum=heute + timedelta(days=tage),
+                erinnerung_tage_vorher=vorher,
+            )
+        Dokument.objects.create(titel="Ohne Frist")
+        alle = list(Dokument.objects.all())
+
+        self.assertEqual(
+            set(Dokument.objects.fällig_bald()), {d for d in alle if d.ist_fällig_bald}
+        )
+        self.assertEqual(
+            set(Dokument.objects.überfällig()), {d for d in alle if d.ist_überfällig}
+        )
+        self.assertEqual(
+            Dokument.objects.fälligkeits_statistik(),
+            {"fällig_bald": 3, "überfällig": 2},
+        )
+        fälligkeiten = dict(
+            Dokument.objects.mit_fälligkeit().values_list("titel", "fälligkeit")
+        )
+        self.assertEqual(fälligkeiten["Frist 3/2"], "später")
+        self.assertEqual(fälligkeiten["Frist 10/14"], "bald")
+        self.assertIsNone(fälligkeiten["Ohne Frist"])
+
 
 class DokumentViewsTest(TestCase):
     """
@@ -119,6 +158,74 @@ class DokumentViewsTest(TestCase):
             Dokument.objects.filter(organisation="Test-Organisation").exists()
         )
 
+    def test_dashboard_abfragen_unabhängig_vom_archiv(self):
+        """Test: Dashboard-Abfragen wachsen nicht mit der Anzahl Dokumente."""
+        from datetime import date, timedelta
+
+        Dokument.objects.create(
+            titel="Bald fällig", fälligkeitsdatum=date.today() + timedelta(days=2)
+        )
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse("dokumente:dashboard"))
+        self.assertEqual(response.context["statistiken"]["fällig_bald"], 1)
+
+        for i in range(20):
+            Dokument.objects.create(
+                titel=f"Archiv {i}",
+                fälligkeitsdatum=date.today() - timedelta(days=400 + i),
+            )
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse("dokumente:dashboard"))
+        self.assertEqual(response.context["statistiken"]["überfällig"], 20)
+        self.assertEqual(len(response.context["fällige_dokumente"]), 5)
+
+    def test_volltextsuche_liste_und_api(self):
+        """Test: Liste und Such-API nutzen den Suchindex, Titel vor OCR-Text."""
+        im_ocr = Dokument.objects.create(
+            titel="Schreiben", kategorie="FINANZAMT", ocr_text="Steuerbescheid 2024"
+        )
+        im_titel = Dokument.objects.create(
+            titel="Steuerbescheid Einkommensteuer", kategorie="FINANZAMT"
+        )
+        Dokument.objects.create(titel="Kontoauszug", kategorie="KSK")
+
+        response = self.client.get(reverse("dokumente:liste"), {"suche": "steuerbesch"})
+        self.assertEqual(list(response.context["dokumente"]), [im_titel, im_ocr])
+
+        response = self.client.get(reverse("dokumente:api-suche"), {"q": "steuer"})
+        self.assertEqual(
+            [d["id"] for d in response.json()["dokumente"]],
+            [str(im_titel.id), str(im_ocr.id)],
+        )
+
+    def test_liste_blaettert_per_keyset_auch_ohne_datum(self):
+        """Test: Dokumente ohne Datum kommen beim Blättern am Ende - genau einmal."""
+        from datetime import date
+
+        for i in range(45):
+            Dokument.objects.create(
+                titel=f"Dokument {i}", datum=date(2025, 1, i % 3 + 1) if i % 4 else None
+            )
+
+        gesehen, cursor = [], None
+        while True:
+            response = self.client.get(
+                reverse("dokumente:liste"), {"cursor": cursor} if cursor else {}
+            )
+            seite = response.context["page_obj"]
+            gesehen.extend(seite)
+            if not seite.has_next():
+                break
+            cursor = seite.naechster_cursor
+
+        self.assertEqual(len(gesehen), 45)
+        self.assertEqual(len(set(gesehen)), 45)
+        daten = [dokument.datum for dokument in gesehen]
+        self.assertEqual(daten[:33], sorted(daten[:33], reverse=True))
+        self.assertEqual(daten[33:], [None] * 12)
+        self.assertEqual(response.context["paginator"].count, 45)
+        self.assertEqual(response.context["statistiken"]["gesamt"], 45)
+
 
 class DokumentKategorieModelTest(TestCase):
     """Tests für DokumentKategorie-Model."""
@@ -2,7 +2,7 @@ import logging
 from datetime import date, timedelta
 
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
@@ -16,15 +16,21 @@ from django.views.generic import (
     View,
 )
 
+from llkjj_knut.keyset import KeysetPaginationMixin
+from llkjj_knut.volltextsuche import suche
+
 from .models import Dokument, DokumentAktion, DokumentKategorie
 
 logger = logging.getLogger(__name__)
 
 
-class DokumentListView(ListView):
+class DokumentListView(KeysetPaginationMixin, ListView):
     """
     Liste aller Dokumente mit Filter- und Suchfunktionen.
 
+    Geblättert wird per Keyset über (``datum``, ``erstellt_am``, ``id``),
+    bei einer Suche zuerst nach Relevanz.
+
     Peter Zwegat: "Eine gute Übersicht ist der erste Schritt zur Kontrolle!"
     """
 
@@ -32,6 +38,7 @@ class DokumentListView(ListView):
     template_name = "dokumente/liste.html"
     context_object_name = "dokumente"
     paginate_by = 20
+    FILTER = ("kategorie", "status", "organisation", "suche", "fällig")
 
     def get_queryset(self):
         queryset = Dokument.objects.select_related("kategorie_detail")
@@ -52,28 +59,31 @@ class DokumentListView(ListView):
             queryset = queryset.filter(organisation__icontains=organisation)
 
         # Suchfunktion
-        suche = self.request.GET.get("suche")
-        if suche:
-            queryset = queryset.filter(
-                Q(titel__icontains=suche)
-                | Q(beschreibung__icontains=suche)
-                | Q(notizen__icontains=suche)
-                | Q(tags__icontains=suche)
-                | Q(ocr_text__icontains=suche)
-            )
+        sortierung = ["-datum", "-erstellt_am"]
+        suchbegriff = self.request.GET.get("suche")
+        if suchbegriff:
+            queryset = suche(queryset, suchbegriff)
+            sortierung.insert(0, "-such_rang")
 
         # Filter nach Fälligkeit
         fällig = self.request.GET.get("fällig")
         if fällig == "bald":
-            heute = date.today()
-            in_einer_woche = heute + timedelta(days=7)
-            queryset = queryset.filter(fälligkeitsdatum__range=[heute, in_einer_woche])
+            queryset = queryset.fällig_bald()
         elif fällig == "überfällig":
-            queryset = queryset.filter(fälligkeitsdatum__lt=date.today())
+            queryset = queryset.überfällig()
 
-        return queryset.order_by("-datum", "-erstellt_am")
+        return queryset.order_by(*sortierung)
+
+    def get_keyset_anzahl(self):
+        # Ohne Filter ist die Gesamtzahl schon in den Statistiken
+        if any(self.request.GET.get(name) for name in self.FILTER):
+            return None
+        return self.statistiken["gesamt"]
 
     def get_context_data(self, **kwargs):
+        # Statistiken (eine Abfrage) - vor der Pagination, die die
+        # Gesamtzahl übernimmt
+        self.statistiken = Dokument.objects.listen_statistik()
         context = super().get_context_data(**kwargs)
 
         # Filter-Optionen
@@ -82,23 +92,10 @@ class DokumentListView(ListView):
 
         # Aktuelle Filter
         context["aktuelle_filter"] = {
-            "kategorie": self.request.GET.get("kategorie", ""),
-            "status": self.request.GET.get("status", ""),
-            "organisation": self.request.GET.get("organisation", ""),
-            "suche": self.request.GET.get("suche", ""),
-            "fällig": self.request.GET.get("fällig", ""),
+            name: self.request.GET.get(name, "") for name in self.FILTER
         }
 
-        # Statistiken
-        context["statistiken"] = {
-            "gesamt": Dokument.objects.count(),
-            "neu": Dokument.objects.filter(status="NEU").count(),
-            "wichtig": Dokument.objects.filter(status="WICHTIG").count(),
-            "fällig_bald": len(
-                [d for d in Dokument.objects.all() if d.ist_fällig_bald]
-            ),
-            "überfällig": len([d for d in Dokument.objects.all() if d.ist_überfällig]),
-        }
+        context["statistiken"] = self.statistiken
 
         return context
 
@@ -495,10 +492,8 @@ class DokumentSucheAPIView(View):
         if not query:
             return JsonResponse({"dokumente": []})
 
-        dokumente = Dokument.objects.filter(
-            Q(titel__icontains=query)
-            | Q(beschreibung__icontains=query)
-            | Q(tags__icontains=query)
+        dokumente = suche(Dokument.objects.all(), query).order_by(
+            "-such_rang", "-datum"
         )[:10]
 
         data = [
@@ -535,11 +530,8 @@ class DokumentDashboardView(TemplateView):
             "diese_woche": Dokument.objects.filter(
                 erstellt_am__gte=heute - timedelta(days=7)
             ).count(),
-            "fällig_bald": len(
-                [d for d in Dokument.objects.all() if d.ist_fällig_bald]
-            ),
-            "überfällig": len([d for d in Dokument.objects.all() if d.ist_überfällig]),
             "wichtig": Dokument.objects.filter(status="WICHTIG").count(),
+            **Dokument.objects.fälligkeits_statistik(heute),
         }
 
         # Kategorien-Verteilung
@@ -553,9 +545,7 @@ class DokumentDashboardView(TemplateView):
         context["neueste_dokumente"] = Dokument.objects.order_by("-erstellt_am")[:5]
 
         # Fällige Dokumente
-        context["fällige_dokumente"] = [
-            d for d in Dokument.objects.all() if d.ist_fällig_bald or d.ist_überfällig
-        ][:5]
+        context["fällige_dokumente"] = Dokument.objects.fällig(heute)[:5]
 
         # Neueste Aktionen
         context["neueste_aktionen"] = DokumentAktion.objects.select_related(
@@ -576,21 +566,23 @@ class FälligkeitenView(ListView):
     context_object_name = "dokumente"
 
     def get_queryset(self):
-        return Dokument.objects.filter(fälligkeitsdatum__isnull=False).order_by(
-            "fälligkeitsdatum"
+        return (
+            Dokument.objects.filter(fälligkeitsdatum__isnull=False)
+            .mit_fälligkeit()
+            .order_by("fälligkeitsdatum")
         )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Kategorisierung
-        alle_dokumente = self.get_queryset()
+        # Kategorisierung (einmal abgefragt, Fälligkeit kommt aus der DB)
+        gruppen = {"überfällig": [], "bald": [], "später": []}
+        for dokument in context["dokumente"]:
+            gruppen[dokument.fälligkeit].append(dokument)
 
-        context["überfällige"] = [d for d in alle_dokumente if d.ist_überfällig]
-        context["fällig_bald"] = [d for d in alle_dokumente if d.ist_fällig_bald]
-        context["zukünftige"] = [
-            d for d in alle_dokumente if not d.ist_überfällig and not d.ist_fällig_bald
-        ]
+        context["überfällige"] = gruppen["überfällig"]
+        context["fällig_bald"] = gruppen["bald"]
+        context["zukünftige"] = gruppen["später"]
 
         return context
 
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.db.models import Count
 from django.utils.html import format_html
 
+from llkjj_knut.cache_utils import invalidate_related_caches
+
 from .models import Konto
 
 
@@ -63,8 +65,8 @@ class KontoAdmin(admin.ModelAdmin):
             super()
             .get_queryset(request)
             .annotate(
-                buchungen_soll=Count("buchungssatz_soll", distinct=True),
-                buchungen_haben=Count("buchungssatz_haben", distinct=True),
+                buchungen_soll=Count("soll_buchungen", distinct=True),
+                buchungen_haben=Count("haben_buchungen", distinct=True),
             )
         )
 
@@ -96,6 +98,8 @@ class KontoAdmin(admin.ModelAdmin):
     def aktivieren(self, request, queryset):
         """Bulk-Aktion: Konten aktivieren"""
         updated = queryset.update(aktiv=True)
+        # update() löst keine Signals aus - Konten-Index & Co. selbst verwerfen
+        invalidate_related_caches("Konto")
         self.message_user(
             request, f"Peter Zwegat sagt: '{updated} Konten erfolgreich aktiviert!'"
         )
@@ -103,6 +107,8 @@ class KontoAdmin(admin.ModelAdmin):
     def deaktivieren(self, request, queryset):
         """Bulk-Aktion: Konten deaktivieren"""
         updated = queryset.update(aktiv=False)
+        # update() löst keine Signals aus - Konten-Index & Co. selbst verwerfen
+        invalidate_related_caches("Konto")
         self.message_user(
             request,
             f"Peter Zwegat sagt: '{updated} Konten deaktiviert - aber Vorsicht!'",
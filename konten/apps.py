@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KontenConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "konten"
+
+    def ready(self):
+        """Importiert Signals beim Start der App."""
+        import konten.signals  # noqa
@@ -0,0 +1,270 @@
+"""
+Konten-Index im Prozess
+=======================
+
+Der Kontenplan (SKR03, ``import_skr03``) hat wenige hundert Konten und
+ändert sich fast nie. Statt bei jedem Tastendruck im Autocomplete und für
+jede Kontonummer im CSV-Import oder in der Kontierung die Datenbank zu
+fragen, hält jeder Prozess alle Konten im Speicher:
+
+- Kontonummer -> Konto (``konto``, ``konten``)
+- sortierte Nummern für die Präfixsuche ("48" findet 4800, 4806, ...)
+- sortierte Namens-Wörter für die Wort-/Präfixsuche mit gefalteten
+  Umlauten ("büro" und "Buero" finden "Bürobedarf", "tel int" findet
+  "Telefon und Internet")
+
+Im Autocomplete kommen bei gleich guten Treffern die Konten zuerst, die in
+den eigenen Buchungen am häufigsten im Soll oder Haben stehen. Diese
+Zählung wird nach ``KONTEN_INDEX_NUTZUNG_SEKUNDEN`` erneuert.
+
+Wird ein Konto gespeichert oder gelöscht, erhöht ``konten/signals.py`` die
+Version des Cache-Namespace ``kontenindex``; der Index wird beim nächsten
+Zugriff neu geladen. Andere Prozesse erfahren davon nur mit gemeinsamem
+Cache - deshalb vergleicht jeder Index zusätzlich Anzahl, größte ID und
+Anzahl aktiver Konten mit der Datenbank (``Abgleich``: höchstens alle
+``PROZESS_INDEX_PRUEF_SEKUNDEN``, bei unbekannter Kontonummer sofort) und
+lädt nach ``PROZESS_INDEX_MAX_ALTER_SEKUNDEN`` neu.
+
+Peter Zwegat: "Wer seine Konten im Kopf hat, muss nicht im Ordner blättern!"
+"""
+
+import copy
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from llkjj_knut.cache_utils import Abgleich, namespace_versionen
+
+from .models import Konto
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "kontenindex"
+LIMIT = 20
+
+_WORT_RE = re.compile(r"[^\W_]+")
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# Rangstufen im Autocomplete (kleiner = besser)
+EXAKT, PRAEFIX, TEILSTRING = 0, 1, 2
+
+
+def falte(text: str) -> str:
+    """Kleinschreibung, Umlaute ausgeschrieben, übrige Akzente entfernt."""
+    text = unicodedata.normalize("NFC", text or "").lower().translate(_UMLAUTE)
+    return "".join(
+        zeichen
+        for zeichen in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(zeichen)
+    )
+
+
+def _mit_praefix(sortiert: list[str], praefix: str) -> range:
+    """Positionen der Einträge in ``sortiert``, die mit ``praefix`` beginnen."""
+    start = ende = bisect_left(sortiert, praefix)
+    while ende < len(sortiert) and sortiert[ende].startswith(praefix):
+        ende += 1
+    return range(start, ende)
+
+
+class KontenIndex:
+    """Schnappschuss des Kontenplans (wird nach dem Aufbau nicht verändert)."""
+
+    def __init__(self, konten):
+        self.konten = {konto.nummer: konto for konto in konten}
+        self.nummern = sorted(self.konten)
+        # Vergleichswert zu _stempel(): ändert sich mit jedem Konto, das
+        # angelegt, gelöscht, aktiviert oder deaktiviert wird
+        self.stempel = (
+            len(self.konten),
+            max((konto.pk for konto in self.konten.values()), default=None),
+            sum(konto.aktiv for konto in self.konten.values()),
+        )
+        self.namen = {nummer: falte(k.name) for nummer, k in self.konten.items()}
+
+        paare = sorted(
+            (wort, nummer)
+            for nummer, name in self.namen.items()
+            for wort in set(_WORT_RE.findall(name))
+        )
+        self.woerter = [wort for wort, _ in paare]
+        self.wort_nummern = [nummer for _, nummer in paare]
+
+        # Fertige Autocomplete-Einträge
+        self.eintraege = {
+            konto.nummer: {
+                "id": konto.id,
+                "text": f"{konto.nummer} - {konto.name}",
+                "nummer": konto.nummer,
+                "name": konto.name,
+                "kategorie": konto.get_kategorie_display(),
+            }
+            for konto in self.konten.values()
+        }
+
+    def __len__(self):
+        return len(self.konten)
+
+    def suche(
+        self, text: str, nutzung: dict | None = None, limit: int = LIMIT
+    ) -> list[dict]:
+        """
+        Aktive Konten zu Nummer oder Name, beste zuerst.
+
+        Reihenfolge: exakte Kontonummer, dann Präfix-Treffer (Nummer oder
+        jedes Suchwort als Wortanfang im Namen), dann Teilstrings; innerhalb
+        einer Stufe nach ``nutzung`` (Konto-ID -> Anzahl) und Nummer.
+        """
+        text = (text or "").strip()
+        gefaltet = falte(text)
+        suchwoerter = _WORT_RE.findall(gefaltet)
+        if not suchwoerter:
+            return []
+
+        rang: dict[str, int] = {}
+
+        def treffer(nummer: str, stufe: int) -> None:
+            if self.konten[nummer].aktiv and stufe < rang.get(nummer, TEILSTRING + 1):
+                rang[nummer] = stufe
+
+        for i in _mit_praefix(self.nummern, text):
+            nummer = self.nummern[i]
+            treffer(nummer, EXAKT if nummer == text else PRAEFIX)
+
+        kandidaten = None
+        for wort in suchwoerter:
+            passend = {self.wort_nummern[i] for i in _mit_praefix(self.woerter, wort)}
+            kandidaten = passend if kandidaten is None else kandidaten & passend
+        for nummer in kandidaten:
+            treffer(nummer, PRAEFIX)
+
+        # Teilstrings wie früher mit icontains ("bedarf" in "Bürobedarf") -
+        # nur nötig, wenn die besseren Stufen das Limit nicht füllen
+        if len(rang) < limit:
+            for nummer, name in self.namen.items():
+                if gefaltet in name or text in nummer:
+                    treffer(nummer, TEILSTRING)
+
+        nutzung = nutzung or {}
+        beste = sorted(
+            rang,
+            key=lambda nummer: (
+                rang[nummer],
+                -nutzung.get(self.konten[nummer].pk, 0),
+                nummer,
+            ),
+        )
+        return [dict(self.eintraege[nummer]) for nummer in beste[:limit]]
+
+
+def _stempel() -> tuple:
+    """Anzahl, größte ID und Anzahl aktiver Konten (eine Abfrage)."""
+    werte = Konto.objects.order_by().aggregate(
+        anzahl=Count("pk"), max_pk=Max("pk"), aktiv=Count("pk", filter=Q(aktiv=True))
+    )
+    return werte["anzahl"], werte["max_pk"], werte["aktiv"]
+
+
+def _zaehle_nutzung() -> dict:
+    """Konto-ID -> Anzahl Buchungen im Soll oder Haben (zwei Abfragen)."""
+    from buchungen.models import Buchungssatz
+
+    nutzung = Counter()
+    for feld in ("soll_konto_id", "haben_konto_id"):
+        nutzung.update(
+            dict(
+                Buchungssatz.objects.order_by()
+                .values_list(feld)
+                .annotate(anzahl=Count("pk"))
+            )
+        )
+    return dict(nutzung)
+
+
+class KontenSpeicher:
+    """Hält Index und Nutzungszählung eines Prozesses."""
+
+    def __init__(self):
+        self._index: KontenIndex | None = None
+        self._version = None
+        self._nutzung: dict = {}
+        self._nutzung_stand: float | None = None
+        self._abgleich = Abgleich()
+        # Index und Zählung werden von allen Threads des Prozesses geteilt
+        self.lock = threading.Lock()
+
+    def index(self, pruefen: bool = False) -> KontenIndex:
+        """
+        Aktueller Index; ``pruefen`` vergleicht den Datenbank-Stempel sofort
+        (z.B. weil eine Kontonummer fehlt, die ein anderer Prozess anlegte).
+        """
+        version = namespace_versionen([NAMESPACE])[NAMESPACE]
+        with self.lock:
+            if (
+                self._index is None
+                or version != self._version
+                or self._abgleich.abgelaufen()
+                or (
+                    (pruefen or self._abgleich.pruefen())
+                    and _stempel() != self._index.stempel
+                )
+            ):
+                self._index = KontenIndex(Konto.objects.order_by("nummer"))
+                self._version = version
+                self._abgleich.geladen()
+                logger.debug(f"Konten-Index aufgebaut ({len(self._index)} Konten)")
+            return self._index
+
+    def nutzung(self) -> dict:
+        max_alter = getattr(settings, "KONTEN_INDEX_NUTZUNG_SEKUNDEN", 300)
+        with self.lock:
+            jetzt = time.monotonic()
+            if self._nutzung_stand is None or jetzt - self._nutzung_stand > max_alter:
+                self._nutzung = _zaehle_nutzung()
+                self._nutzung_stand = jetzt
+            return self._nutzung
+
+    def verwerfen(self) -> None:
+        with self.lock:
+            self._index = None
+            self._nutzung_stand = None
+
+
+_speicher = KontenSpeicher()
+
+
+def suche(text: str, limit: int = LIMIT) -> list[dict]:
+    """Autocomplete-Einträge (``id``, ``text``, ``nummer``, ``name``, ``kategorie``)."""
+    return _speicher.index().suche(text, _speicher.nutzung(), limit)
+
+
+def konto(nummer: str) -> Konto:
+    """Konto zur Kontonummer (``Konto.DoesNotExist`` wie ``objects.get``)."""
+    gefunden = _speicher.index().konten.get(nummer)
+    if gefunden is None:
+        gefunden = _speicher.index(pruefen=True).konten.get(nummer)
+    if gefunden is None:
+        raise Konto.DoesNotExist(f"Konto {nummer} nicht gefunden")
+    # Kopie: Aufrufer dürfen ihr Konto verändern, ohne den Index zu verändern
+    return copy.copy(gefunden)
+
+
+def konten(nummern) -> dict[str, Konto]:
+    """Kontonummer -> Konto für alle vorhandenen ``nummern``."""
+    nummern = set(nummern)
+    index = _speicher.index().konten
+    if not nummern <= index.keys():
+        index = _speicher.index(pruefen=True).konten
+    return {nummer: copy.copy(index[nummer]) for nummer in nummern if nummer in index}
+
+
+def verwerfen() -> None:
+    """Verwirft Index und Zählung dieses Prozesses (z.B. zwischen Tests)."""
+    _speicher.verwerfen()
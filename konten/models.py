@@ -219,15 +219,19 @@ class Konto(models.Model):
     @classmethod
     def get_kasse_konto(cls):
         """Hilfsmethode: Holt das Standard-Kasse-Konto"""
+        from llkjj_knut.cache_utils import konto_nach_nummer
+
         try:
-            return cls.objects.get(nummer="1000")
+            return konto_nach_nummer("1000")
         except cls.DoesNotExist:
             return None
 
     @classmethod
     def get_bank_konto(cls):
         """Hilfsmethode: Holt das Standard-Bank-Konto"""
+        from llkjj_knut.cache_utils import konto_nach_nummer
+
         try:
-            return cls.objects.get(nummer="1200")
+            return konto_nach_nummer("1200")
         except cls.DoesNotExist:
             return None
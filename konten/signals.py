@@ -0,0 +1,28 @@
+"""
+Django Signals für Konten.
+
+Verwirft Kontenliste, Saldo-Caches und den Konten-Index (``kontenindex``),
+sobald ein Konto gespeichert oder gelöscht wird. Prozesse ohne gemeinsamen
+Cache gleichen ihren Index selbst mit der Datenbank ab.
+Peter Zwegat: "Ein neues Konto gehört sofort in jeden Ordner!"
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from llkjj_knut.cache_utils import invalidate_related_caches
+
+from .models import Konto
+
+
+@receiver(post_save, sender=Konto)
+@receiver(post_delete, sender=Konto)
+def invalidiere_konten_caches(sender, instance, using="default", **kwargs):
+    """Erhöht die Versionen der Konten-Namespaces - sofort und nach dem Commit."""
+    invalidate_related_caches("Konto", instance.pk)
+    if transaction.get_connection(using).in_atomic_block:
+        # Bis zum Commit könnte ein anderer Thread noch den alten Stand laden
+        transaction.on_commit(
+            lambda: invalidate_related_caches("Konto", instance.pk), using=using
+        )
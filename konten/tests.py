@@ -1,5 +1,12 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from buchungen.models import Buchungssatz
 
 from .models import Konto
 
@@ -97,3 +104,167 @@ class KontoModelTest(TestCase):
 
         self.assertEqual(Konto.get_kasse_konto(), kasse)
         self.assertEqual(Konto.get_bank_konto(), bank)
+
+
+class KontenIndexTest(TestCase):
+    """
+    Tests für den Konten-Index im Prozess (Autocomplete und Nummern-Lookups).
+    Peter Zwegat: "Wer seine Konten kennt, muss nicht lange suchen!"
+    """
+
+    def setUp(self):
+        self.bank = Konto.objects.create(
+            nummer="1200", name="Bank", kategorie="AKTIVKONTO", typ="GIROKONTO"
+        )
+        self.buero = Konto.objects.create(
+            nummer="4930", name="Bürobedarf", kategorie="AUFWAND", typ="SONSTIGE"
+        )
+        self.porto = Konto.objects.create(
+            nummer="4910", name="Porto", kategorie="AUFWAND", typ="SONSTIGE"
+        )
+        self.telefon = Konto.objects.create(
+            nummer="4920",
+            name="Telefon und Internet",
+            kategorie="AUFWAND",
+            typ="SONSTIGE",
+        )
+        Konto.objects.create(
+            nummer="4900",
+            name="Sonstige Kosten",
+            kategorie="AUFWAND",
+            typ="SONSTIGE",
+            aktiv=False,
+        )
+
+    def _suche(self, q):
+        response = self.client.get(reverse("buchungen:konten_autocomplete"), {"q": q})
+        return [eintrag["nummer"] for eintrag in response.json()["results"]]
+
+    def test_autocomplete_ohne_datenbank(self):
+        """Test: Nach dem ersten Aufbau fragt das Autocomplete keine Datenbank."""
+        self._suche("49")
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse("buchungen:konten_autocomplete"), {"q": "bank"}
+            )
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "id": str(self.bank.id),
+                    "text": "1200 - Bank",
+                    "nummer": "1200",
+                    "name": "Bank",
+                    "kategorie": self.bank.get_kategorie_display(),
+                }
+            ],
+        )
+
+    def test_nummer_name_und_umlaute(self):
+        """Test: Präfix auf Nummer, Wortanfang/Teilstring auf Namen, Umlaute gefaltet."""
+        self.assertEqual(self._suche("4930"), ["4930"])
+        self.assertEqual(self._suche("49"), ["4910", "4920", "4930"])
+        for q in ("büro", "Buero", "BÜRO", "bedarf"):
+            self.assertEqual(self._suche(q), ["4930"], q)
+        self.assertEqual(self._suche("tel int"), ["4920"])
+        self.assertEqual(self._suche("kosten"), [])  # inaktiv
+
+    def test_rangfolge_nach_nutzung(self):
+        """Test: Häufig bebuchte Konten stehen bei gleich guten Treffern vorne."""
+        for _ in range(2):
+            Buchungssatz.objects.create(
+                buchungsdatum=date(2025, 3, 1),
+                buchungstext="Telefonrechnung",
+                betrag=Decimal("30.00"),
+                soll_konto=self.telefon,
+                haben_konto=self.bank,
+            )
+        Buchungssatz.objects.create(
+            buchungsdatum=date(2025, 3, 2),
+            buchungstext="Briefmarken",
+            betrag=Decimal("5.00"),
+            soll_konto=self.porto,
+            haben_konto=self.bank,
+        )
+        self.assertEqual(self._suche("49"), ["4920", "4910", "4930"])
+        # Exakte Nummer schlägt Nutzung
+        self.assertEqual(self._suche("4930")[0], "4930")
+
+    def test_invalidierung_beim_speichern(self):
+        """Test: Gespeicherte und gelöschte Konten sind sofort im Index."""
+        self.assertEqual(self._suche("porto"), ["4910"])
+        self.porto.name = "Porto und Versand"
+        self.porto.save()
+        self.assertEqual(self._suche("versand"), ["4910"])
+
+        from llkjj_knut.cache_utils import konto_nach_nummer
+
+        self.assertEqual(konto_nach_nummer("4910").name, "Porto und Versand")
+        self.porto.delete()
+        self.assertEqual(self._suche("porto"), [])
+        with self.assertRaises(Konto.DoesNotExist):
+            konto_nach_nummer("4910")
+
+    def test_admin_aktionen_verwerfen_den_index(self):
+        """Test: (De-)Aktivieren per Admin-Aktion (update()) erreicht den Index."""
+        from django.contrib.auth.models import User
+
+        User.objects.create_superuser("admin", "admin@example.com", "password123")  # noqa: S106
+        self.client.login(username="admin", password="password123")  # noqa: S106
+        url = reverse("admin:konten_konto_changelist")
+
+        self.assertEqual(self._suche("porto"), ["4910"])
+        self.client.post(
+            url, {"action": "deaktivieren", "_selected_action": [self.porto.pk]}
+        )
+        self.assertEqual(self._suche("porto"), [])
+
+        self.assertEqual(self._suche("sonst"), [])
+        inaktiv = Konto.objects.get(nummer="4900")
+        self.client.post(
+            url, {"action": "aktivieren", "_selected_action": [inaktiv.pk]}
+        )
+        self.assertEqual(self._suche("sonst"), ["4900"])
+
+    def test_anderer_prozess_gleicht_mit_datenbank_ab(self):
+        """Test: Ein Index, der kein Signal sieht (anderer Worker), bleibt nicht alt."""
+        from . import kontenindex
+
+        anderer = kontenindex.KontenSpeicher()
+        # Ohne gemeinsamen Cache bleibt die Namespace-Version dort unverändert
+        version = patch.object(
+            kontenindex, "namespace_versionen", return_value={"kontenindex": 1}
+        )
+        with version, patch.object(kontenindex, "_speicher", anderer):
+            self.assertIn("4910", anderer.index().konten)
+            Konto.objects.create(
+                nummer="4950",
+                name="Rechtsberatung",
+                kategorie="AUFWAND",
+                typ="SONSTIGE",
+            )
+            Konto.objects.filter(nummer="4910").update(aktiv=False)
+
+            # Unbekannte Nummer: sofortiger Abgleich statt DoesNotExist
+            from llkjj_knut.cache_utils import konto_nach_nummer
+
+            self.assertEqual(konto_nach_nummer("4950").name, "Rechtsberatung")
+            self.assertIn("4950", kontenindex.konten(["4950", "4930"]))
+            self.assertFalse(anderer.index().konten["4910"].aktiv)
+
+            # Deaktivieren ohne Signal: spätestens nach der Prüffrist
+            Konto.objects.filter(nummer="4910").update(aktiv=True)
+            self.assertEqual(anderer.index().suche("porto"), [])
+            with override_settings(PROZESS_INDEX_PRUEF_SEKUNDEN=0):
+                self.assertEqual(
+                    [e["nummer"] for e in anderer.index().suche("porto")], ["4910"]
+                )
+
+            # Umbenennen ändert den Stempel nicht - die Höchstdauer greift
+            Konto.objects.filter(nummer="4910").update(name="Versandkosten")
+            with override_settings(PROZESS_INDEX_PRUEF_SEKUNDEN=0):
+                self.assertEqual(anderer.index().suche("versand"), [])
+            with override_settings(PROZESS_INDEX_MAX_ALTER_SEKUNDEN=0):
+                self.assertEqual(
+                    [e["nummer"] for e in anderer.index().suche("versand")], ["4910"]
+                )
@@ -8,8 +8,12 @@ Zentrale Cache-Funktionen und Decorators für das gesamte Projekt.
 import functools
 import hashlib
 import logging
+import time
+from collections.abc import Iterable
+from contextvars import ContextVar
 from typing import Any
 
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
 from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
@@ -27,13 +31,111 @@ CACHE_TIMEOUTS = {
 }
 
 
-def make_cache_key(prefix: str, *args, **kwargs) -> str:
+# Generationszähler je Namespace. Statt Keys zu suchen und zu löschen wird
+# beim Invalidieren nur der Zähler erhöht - alle Keys mit der alten Version
+# werden nie wieder gelesen und laufen über ihr Timeout aus.
+NAMESPACE_KEY_PREFIX = "llkjj_art:ns:"
+
+
+def namespace_benutzer(user_id: int | str | None) -> str:
+    """Namespace für benutzerspezifische Caches."""
+    return f"benutzer:{user_id if user_id is not None else 'anonymous'}"
+
+
+def namespace_jahr(jahr: int) -> str:
+    """Namespace für Caches eines Geschäftsjahres."""
+    return f"jahr:{jahr}"
+
+
+def _startversion() -> int:
+    # Zeitbasiert statt 1: Wird ein Zähler verdrängt, darf die neue Version
+    # nicht mit einer früheren kollidieren, zu der noch Einträge existieren.
+    return time.time_ns() // 1000
+
+
+def namespace_versionen(namespaces: Iterable[str]) -> dict[str, int]:
+    """
+    Liefert die aktuellen Versionen der Namespaces (ein ``get_many``).
+
+    Fehlende Zähler werden angelegt; sie laufen nie ab.
+    """
+    keys = {ns: f"{NAMESPACE_KEY_PREFIX}{ns}" for ns in dict.fromkeys(namespaces)}
+    vorhanden = cache.get_many(keys.values())
+
+    versionen = {}
+    for ns, key in keys.items():
+        version = vorhanden.get(key)
+        if version is None:
+            cache.add(key, _startversion(), None)
+            version = cache.get(key, 0)
+        versionen[ns] = version
+    return versionen
+
+
+def bump_namespace(*namespaces: str) -> None:
+    """
+    Invalidiert alle Cache-Keys der Namespaces in O(1) je Namespace.
+
+    Args:
+        *namespaces: z.B. ``"dashboard"``, ``namespace_jahr(2024)``
+    """
+    for ns in dict.fromkeys(namespaces):
+        key = f"{NAMESPACE_KEY_PREFIX}{ns}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Zähler existiert (noch) nicht - eine frische Version genügt
+            cache.add(key, _startversion(), None)
+
+
+class Abgleich:
+    """
+    Frist für Indizes im Prozess (Konten, Buchungstexte, ML-Trainingsdaten).
+
+    Die Namespace-Versionen erreichen andere Prozesse (gunicorn-Worker,
+    Celery) nur über einen gemeinsamen Cache - mit dem ``LocMemCache`` nie.
+    Deshalb vergleicht jeder Index höchstens alle
+    ``PROZESS_INDEX_PRUEF_SEKUNDEN`` einen Stempel aus der Datenbank
+    (Anzahl, größte ID) mit seinem Inhalt und wird spätestens nach
+    ``PROZESS_INDEX_MAX_ALTER_SEKUNDEN`` komplett neu geladen - das erfasst
+    auch Änderungen, die Anzahl und IDs gleich lassen.
+    """
+
+    def __init__(self):
+        self.geladen_um: float | None = None
+        self.geprueft_um: float | None = None
+
+    def geladen(self) -> None:
+        """Nach dem (Neu-)Aufbau des Index aufrufen."""
+        self.geladen_um = self.geprueft_um = time.monotonic()
+
+    def abgelaufen(self) -> bool:
+        max_alter = getattr(settings, "PROZESS_INDEX_MAX_ALTER_SEKUNDEN", 300)
+        return (
+            self.geladen_um is None or time.monotonic() - self.geladen_um >= max_alter
+        )
+
+    def pruefen(self) -> bool:
+        """True, wenn der Datenbank-Stempel (wieder) verglichen werden soll."""
+        jetzt = time.monotonic()
+        intervall = getattr(settings, "PROZESS_INDEX_PRUEF_SEKUNDEN", 30)
+        if self.geprueft_um is not None and jetzt - self.geprueft_um < intervall:
+            return False
+        self.geprueft_um = jetzt
+        return True
+
+
+def make_cache_key(prefix: str, *args, namespaces: Iterable[str] = (), **kwargs) -> str:
     """
     Erstellt einen standardisierten Cache-Key.
 
+    Der Key enthält die Version des Präfix-Namespace sowie aller weiteren
+    ``namespaces``; ``bump_namespace`` macht ihn dadurch ungültig.
+
     Args:
-        prefix: Cache-Key Präfix
+        prefix: Cache-Key Präfix (zugleich Namespace)
         *args: Zusätzliche Argumente für den Key
+        namespaces: Weitere Namespaces, z.B. Benutzer oder Jahr
         **kwargs: Zusätzliche Named Arguments
 
     Returns:
@@ -54,6 +156,10 @@ def make_cache_key(prefix: str, *args, **kwargs) -> str:
     for k, v in sorted(kwargs.items()):
         key_parts.append(f"{k}_{v}")
 
+    # Namespace-Versionen hinzufügen
+    for ns, version in namespace_versionen([prefix, *namespaces]).items():
+        key_parts.append(f"{ns}@{version}")
+
     cache_key = ":".join(key_parts)
 
     # Key-Länge begrenzen (Redis hat 512MB Limit)
@@ -136,31 +242,88 @@ def cached_function(timeout: int = 300, key_prefix: str = "func"):
     return decorator
 
 
+# Request-Cache: lebt nur für die Dauer eines Requests (gesetzt von
+# RequestCacheMiddleware), ohne Pickle und ohne Invalidierung.
+_request_cache: ContextVar[dict | None] = ContextVar("request_cache", default=None)
+
+
+def request_cache_starten():
+    """Aktiviert einen leeren Request-Cache; liefert das Reset-Token."""
+    return _request_cache.set({})
+
+
+def request_cache_beenden(token) -> None:
+    """Verwirft den Request-Cache (Token aus ``request_cache_starten``)."""
+    _request_cache.reset(token)
+
+
+def request_cached(func):
+    """
+    Decorator: merkt sich Ergebnisse für die Dauer des aktuellen Requests.
+
+    Außerhalb eines Requests (Celery, Management Commands, Tests ohne
+    Client) wird die Funktion jedes Mal aufgerufen. Exceptions werden nicht
+    gemerkt.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        speicher = _request_cache.get()
+        if speicher is None:
+            return func(*args, **kwargs)
+
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            return speicher[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Nicht hashbare Argumente
+            return func(*args, **kwargs)
+
+        ergebnis = speicher[key] = func(*args, **kwargs)
+        return ergebnis
+
+    return wrapper
+
+
+def konto_nach_nummer(nummer: str):
+    """
+    Konto zur Kontonummer (``Konto.DoesNotExist`` wie ``objects.get``).
+
+    Kommt aus dem Konten-Index des Prozesses (``konten.kontenindex``) - ohne
+    Datenbankabfrage, solange sich keine Konten geändert haben.
+    """
+    from konten import kontenindex
+
+    return kontenindex.konto(nummer)
+
+
+@request_cached
+def benutzerprofil(user_id: int):
+    """Profil des Benutzers (``Benutzerprofil.DoesNotExist`` wie ``objects.get``)."""
+    from einstellungen.models import Benutzerprofil
+
+    return Benutzerprofil.objects.get(user_id=user_id)
+
+
+@request_cached
+def aktive_eur_mappings(kategorien: tuple[str, ...] = ("EINNAHMEN", "AUSGABEN")):
+    """Aktive EÜR-Mappings der Kategorien in ``EURMapping.Meta.ordering``."""
+    from auswertungen.models import EURMapping
+
+    return list(EURMapping.objects.filter(ist_aktiv=True, kategorie__in=kategorien))
+
+
 def invalidate_cache_pattern(pattern: str):
     """
-    Invalidiert Cache-Keys die einem Pattern entsprechen.
+    Invalidiert alle Cache-Keys eines Präfixes.
 
     Args:
-        pattern: Pattern für Cache-Keys (z.B. "dashboard:*")
+        pattern: Präfix der Cache-Keys (z.B. "dashboard" oder "dashboard:*")
     """
-    # Einfache Implementation für LocMemCache
-    # Für Redis würde man KEYS verwenden (mit Vorsicht!)
     try:
-        # Versuche über Cache-Backend
-        if hasattr(cache, "delete_pattern"):
-            cache.delete_pattern(f"llkjj_art:{pattern}")
-        else:
-            # Fallback: Bekannte Keys invalidieren
-            keys_to_delete = []
-            if "dashboard" in pattern:
-                keys_to_delete.extend(
-                    [
-                        make_cache_key("dashboard_stats", user_id)
-                        for user_id in ["anonymous", 1, 2, 3, 4, 5]  # Beispiel-User-IDs
-                    ]
-                )
-
-            cache.delete_many(keys_to_delete)
+        bump_namespace(pattern.split("*")[0].rstrip(":_"))
     except Exception as e:
         # Cache-Invalidierung ist nicht kritisch für Funktionalität
         logging.debug("Cache invalidation failed: %s", e)
@@ -221,9 +384,15 @@ def cache_template_fragment(
 class CacheKeys:
     """Zentrale Cache-Key Definitionen."""
 
+    @staticmethod
+    def dashboard(bereich: str, user_id: int | None) -> str:
+        return make_cache_key(
+            "dashboard", bereich, namespaces=[namespace_benutzer(user_id)]
+        )
+
     @staticmethod
     def dashboard_stats(user_id: int) -> str:
-        return make_cache_key("dashboard_stats", user_id)
+        return CacheKeys.dashboard("stats", user_id)
 
     @staticmethod
     def konten_liste() -> str:
@@ -231,7 +400,7 @@ class CacheKeys:
 
     @staticmethod
     def eur_auswertung(jahr: int) -> str:
-        return make_cache_key("eur_auswertung", jahr)
+        return make_cache_key("eur_auswertung", jahr, namespaces=[namespace_jahr(jahr)])
 
     @staticmethod
     def partner_autocomplete(query: str) -> str:
@@ -247,22 +416,39 @@ class CacheKeys:
 
 
 # Cache-Invalidierung bei Model-Changes
-def invalidate_related_caches(model_name: str, instance_id: int | None = None):
+def invalidate_related_caches(
+    model_name: str,
+    instance_id: int | None = None,
+    jahre: Iterable[int] | None = None,
+):
     """
     Invalidiert verwandte Caches bei Modell-Änderungen.
 
+    Jahresbezogene Caches (EÜR) werden nur für die betroffenen ``jahre``
+    verworfen; ohne Jahresangabe für alle Jahre.
+
     Args:
         model_name: Name des geänderten Modells
         instance_id: ID der Instanz (optional)
+        jahre: Betroffene Geschäftsjahre (optional)
     """
     invalidation_map = {
-        "Buchungssatz": ["dashboard_stats", "eur_auswertung", "konto_saldo"],
-        "Beleg": ["dashboard_stats", "beleg_statistiken"],
-        "Konto": ["konten_liste", "konto_saldo"],
+        "Buchungssatz": ["dashboard", "konto_saldo"],
+        "Beleg": ["dashboard", "beleg_statistiken"],
+        "Konto": ["konten_liste", "konto_saldo", "kontenindex"],
         "Geschaeftspartner": ["partner_autocomplete"],
         "Dokument": ["dokument_stats"],
     }
+    jahres_caches = {"Buchungssatz": ["eur_auswertung"]}
+
+    namespaces = list(invalidation_map.get(model_name, []))
+    if jahre is not None:
+        namespaces.extend(namespace_jahr(jahr) for jahr in jahre)
+    else:
+        namespaces.extend(jahres_caches.get(model_name, []))
 
-    patterns = invalidation_map.get(model_name, [])
-    for pattern in patterns:
-        invalidate_cache_pattern(pattern)
+    try:
+        bump_namespace(*namespaces)
+    except Exception as e:
+        # Cache-Invalidierung ist nicht kritisch für Funktionalität
+        logging.debug("Cache invalidation failed: %s", e)
@@ -5,8 +5,10 @@ Peter Zwegat würde sagen: "Ordnung auch bei den asynchronen Aufgaben!"
 """
 
 import os
+import threading
 
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Django Settings für Celery
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "llkjj_knut.settings")
@@ -20,6 +22,27 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+@worker_process_init.connect
+def ki_modelle_aufwaermen(**kwargs):
+    """
+    Lädt die Modelle aus ``KI_MODELLE_AUFWAERMEN`` in jedem Worker-Prozess vor.
+
+    Läuft im Hintergrund: der Worker meldet sich sofort bereit (Celery bricht
+    langsam startende Prozesse sonst ab), ein Task, der das Modell vorher
+    braucht, wartet in der Registry auf denselben Ladevorgang.
+    """
+    from django.conf import settings
+
+    if not getattr(settings, "KI_MODELLE_AUFWAERMEN", []):
+        return
+
+    from belege.modell_registry import modelle
+
+    threading.Thread(
+        target=modelle.aufwaermen, name="ki-modelle-aufwaermen", daemon=True
+    ).start()
+
+
 @app.task(bind=True)
 def debug_task(self):
     """Debug Task für Celery-Tests."""
@@ -0,0 +1,153 @@
+"""
+Datei-Auslieferung mit Range-Requests und bedingten GETs
+========================================================
+
+Liefert Dateien aus ``MEDIA_ROOT``, ohne sie in den Speicher zu laden:
+
+- vollständige Datei als ``FileResponse`` (der WSGI-Server kann ``sendfile``
+  nutzen)
+- ``Range: bytes=...`` als ``206 Partial Content`` - PDF.js lädt damit nur
+  die Seiten, die gerade angezeigt werden
+- ``ETag``/``Last-Modified`` mit ``304 Not Modified``; ``If-Range`` wird
+  beachtet
+
+Ist ``X_ACCEL_REDIRECT_PREFIX`` gesetzt (siehe ``nginx.conf``), prüft Django
+nur noch, ob die Datei ausgeliefert werden darf, und überlässt das Senden
+der Bytes - inklusive Range und bedingter Anfragen - nginx.
+
+Peter Zwegat: "Man muss nicht den ganzen Ordner schleppen, um ein Blatt zu zeigen!"
+"""
+
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+    quote_etag,
+)
+
+BLOCKGROESSE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, groesse: int) -> tuple[int, int] | None | bool:
+    """
+    Liefert (start, ende) inklusive, ``None`` ohne gültigen Einzelbereich
+    (dann wird die ganze Datei gesendet) oder ``False`` für nicht erfüllbar.
+
+    Mehrere Bereiche (``bytes=0-1,5-6``) werden bewusst ignoriert - das ist
+    laut RFC 9110 erlaubt und PDF.js fragt immer nur einen an.
+    """
+    treffer = _RANGE_RE.match(header.strip())
+    if not treffer:
+        return None
+    start, ende = treffer.groups()
+    if not start and not ende:
+        return None
+    if not start:
+        # Suffix: die letzten n Bytes
+        laenge = int(ende)
+        if laenge == 0:
+            return False
+        return max(0, groesse - laenge), groesse - 1
+    start = int(start)
+    ende = min(int(ende), groesse - 1) if ende else groesse - 1
+    if start >= groesse or start > ende:
+        return False
+    return start, ende
+
+
+def _if_range_passt(request, etag: str, last_modified: int) -> bool:
+    """``If-Range``: Bereich nur liefern, wenn die Datei unverändert ist."""
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    datum = parse_http_date_safe(if_range)
+    return datum is not None and datum >= last_modified
+
+
+def _lese_bereich(pfad: str, start: int, laenge: int):
+    with open(pfad, "rb") as datei:
+        datei.seek(start)
+        while laenge > 0:
+            block = datei.read(min(BLOCKGROESSE, laenge))
+            if not block:
+                break
+            laenge -= len(block)
+            yield block
+
+
+def datei_ausliefern(
+    request,
+    datei,
+    content_type: str,
+    dateiname: str,
+    etag: str | None = None,
+    als_anhang: bool = False,
+) -> HttpResponse:
+    """
+    Liefert ein gespeichertes ``FieldFile`` aus.
+
+    Args:
+        datei: ``FieldFile`` im ``MEDIA_ROOT``
+        content_type: MIME-Typ der Antwort
+        dateiname: Name für ``Content-Disposition``
+        etag: Stabiler Inhaltsschlüssel (ohne Anführungszeichen); sonst
+            aus Größe und Änderungszeit gebildet
+
+    Raises:
+        FileNotFoundError: Datei fehlt auf der Platte
+    """
+    pfad = datei.path
+    stat = os.stat(pfad)
+    groesse = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = quote_etag(etag or f"{stat.st_mtime_ns:x}-{groesse:x}")
+    disposition = content_disposition_header(als_anhang, dateiname)
+
+    prefix = getattr(settings, "X_ACCEL_REDIRECT_PREFIX", "")
+    if prefix:
+        # nginx liefert aus (internal location) - inkl. Range und 304
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{quote(datei.name)}"
+        response["Content-Disposition"] = disposition
+        return response
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        bereich = None
+        if request.method in ("GET", "HEAD") and _if_range_passt(
+            request, etag, last_modified
+        ):
+            bereich = _parse_range(request.META.get("HTTP_RANGE", ""), groesse)
+
+        if bereich is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{groesse}"
+        elif bereich:
+            start, ende = bereich
+            laenge = ende - start + 1
+            response = StreamingHttpResponse(
+                _lese_bereich(pfad, start, laenge),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = str(laenge)
+            response["Content-Range"] = f"bytes {start}-{ende}/{groesse}"
+        else:
+            response = FileResponse(open(pfad, "rb"), content_type=content_type)
+        response["Content-Disposition"] = disposition
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
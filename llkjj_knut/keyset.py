@@ -0,0 +1,321 @@
+"""
+Keyset-Pagination für lange Listen
+==================================
+
+Ersetzt ``Paginator``/``?page=`` (``LIMIT ... OFFSET ...`` plus
+``COUNT(*)`` je Seite) in den Listen für Buchungen, Belege und Dokumente.
+Eine Seite wird über die Sortierschlüssel der letzten (bzw. ersten) Zeile
+der vorigen Seite adressiert - z. B. (``buchungsdatum``, ``erstellt_am``,
+``id``)::
+
+    WHERE (buchungsdatum, erstellt_am, id) < (:datum, :erstellt, :id)
+    ORDER BY buchungsdatum DESC, erstellt_am DESC, id DESC
+    LIMIT 26
+
+Mit passendem Index liest die Datenbank so nur die Zeilen der Seite - Seite
+5000 kostet so viel wie Seite 1. Die Schlüsselwerte stecken signiert in
+einem undurchsichtigen ``cursor``-Parameter; manipulierte oder veraltete
+Cursor führen einfach zur ersten Seite.
+
+Die Sortierung kommt aus dem QuerySet (``order_by``), der Primärschlüssel
+wird als letzter Schlüssel angehängt, damit sie eindeutig ist. ``NULL``
+gilt als kleinster Wert (aufsteigend zuerst, absteigend zuletzt) - auf
+jeder Datenbank gleich.
+
+Die Gesamtzahl wird nur gezählt, wenn ein Template sie anzeigt. Mit
+``anzahl_schaetzen`` kommt sie unter PostgreSQL aus dem Planer
+(``EXPLAIN``), sonst aus einem auf ``LISTEN_ZAEHLGRENZE`` begrenzten
+``COUNT``.
+
+Peter Zwegat: "Man blättert nicht jedes Mal vom ersten Blatt an - man
+merkt sich, wo man war!"
+"""
+
+import json
+import logging
+from functools import cached_property
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+SALT = "llkjj_knut.keyset"
+VORWAERTS = "n"
+RUECKWAERTS = "v"
+
+
+def _als_text(wert):
+    """Schlüsselwert für den Cursor (JSON-tauglich)."""
+    if wert is None or isinstance(wert, (bool, int, str)):
+        return wert
+    if hasattr(wert, "isoformat"):
+        return wert.isoformat()
+    return str(wert)
+
+
+def schaetze_anzahl(queryset, grenze: int | None = None) -> tuple[int, bool]:
+    """
+    Ungefähre Anzahl Zeilen eines QuerySets.
+
+    Unter PostgreSQL die Zeilenschätzung des Planers, sonst ein ``COUNT``,
+    das nach ``grenze`` Zeilen aufhört.
+
+    Returns:
+        (Anzahl, genau?)
+    """
+    grenze = grenze or getattr(settings, "LISTEN_ZAEHLGRENZE", 10_000)
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), False
+
+    anzahl = queryset[:grenze].count()
+    return anzahl, anzahl < grenze
+
+
+class KeysetSeite:
+    """
+    Eine Seite der Keyset-Pagination.
+
+    Bietet die Teile der ``Page``-API, die ohne Seitenzahl Sinn ergeben
+    (``object_list``, ``has_next``, ``has_previous``, ...), dazu
+    ``naechster_cursor`` und ``vorheriger_cursor`` für die Links.
+    """
+
+    def __init__(self, object_list, paginator, has_next: bool, has_previous: bool):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<KeysetSeite mit {len(self.object_list)} Einträgen>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def naechster_cursor(self) -> str | None:
+        if not self._has_next:
+            return None
+        return self.paginator.cursor(self.object_list[-1], VORWAERTS)
+
+    @cached_property
+    def vorheriger_cursor(self) -> str | None:
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor(self.object_list[0], RUECKWAERTS)
+
+
+class KeysetPaginator:
+    """
+    Blättert per Sortierschlüssel statt per ``OFFSET``.
+
+    Args:
+        queryset: Sortiertes QuerySet (nur Feld- oder Annotationsnamen in
+            ``order_by``)
+        per_page: Einträge je Seite
+        anzahl: Bereits bekannte Gesamtzahl (spart das Zählen)
+        anzahl_schaetzen: Gesamtzahl nur schätzen (siehe ``schaetze_anzahl``;
+            Standard: ``LISTEN_ANZAHL_SCHAETZEN``)
+    """
+
+    def __init__(
+        self,
+        queryset,
+        per_page: int,
+        anzahl: int | None = None,
+        anzahl_schaetzen: bool | None = None,
+    ):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        if anzahl_schaetzen is None:
+            anzahl_schaetzen = getattr(settings, "LISTEN_ANZAHL_SCHAETZEN", False)
+        self.anzahl_schaetzen = anzahl_schaetzen
+        self._anzahl_genau = True
+        if anzahl is not None:
+            self.__dict__["count"] = anzahl
+
+        self.schluessel = []
+        for eintrag in queryset.query.order_by or queryset.model._meta.ordering:
+            if not isinstance(eintrag, str) or eintrag.lstrip("-") == "?":
+                raise ValueError(
+                    f"Keyset-Pagination braucht Feldnamen in order_by, nicht {eintrag!r}"
+                )
+            self.schluessel.append((eintrag.lstrip("-"), eintrag.startswith("-")))
+        namen = {name for name, _ in self.schluessel}
+        if not namen & {"pk", queryset.model._meta.pk.name}:
+            absteigend = self.schluessel[-1][1] if self.schluessel else False
+            self.schluessel.append(("pk", absteigend))
+
+    @cached_property
+    def count(self) -> int:
+        """Gesamtzahl der Einträge (erst beim ersten Zugriff ermittelt)."""
+        if self.anzahl_schaetzen:
+            anzahl, self._anzahl_genau = schaetze_anzahl(self.queryset)
+            return anzahl
+        return self.queryset.order_by().count()
+
+    @property
+    def anzahl_geschaetzt(self) -> bool:
+        """Ist ``count`` nur eine Schätzung bzw. Untergrenze?"""
+        self.count  # noqa: B018 - erst zählen, dann weiß man es
+        return not self._anzahl_genau
+
+    def _feld(self, name: str):
+        annotationen = self.queryset.query.annotations
+        if name in annotationen:
+            return annotationen[name].output_field
+        if name == "pk":
+            return self.queryset.model._meta.pk
+        return self.queryset.model._meta.get_field(name)
+
+    def cursor(self, objekt, richtung: str) -> str:
+        werte = [_als_text(getattr(objekt, name)) for name, _ in self.schluessel]
+        return signing.dumps({"r": richtung, "w": werte}, salt=SALT, compress=True)
+
+    @cached_property
+    def letzte_seite_cursor(self) -> str:
+        """Cursor auf die letzte Seite (rückwärts vom Ende)."""
+        return signing.dumps({"r": RUECKWAERTS, "w": None}, salt=SALT)
+
+    def _lies_cursor(self, cursor: str | None):
+        """(Richtung, Schlüsselwerte) oder ``None`` für die erste Seite."""
+        if not cursor:
+            return None
+        try:
+            daten = signing.loads(cursor, salt=SALT)
+            richtung, werte = daten["r"], daten["w"]
+            if richtung not in (VORWAERTS, RUECKWAERTS):
+                raise ValueError(richtung)
+            if werte is None:
+                return richtung, None
+            if len(werte) != len(self.schluessel):
+                raise ValueError("Schlüssel passen nicht zur Sortierung")
+            return richtung, [
+                None if wert is None else self._feld(name).to_python(wert)
+                for (name, _), wert in zip(self.schluessel, werte, strict=True)
+            ]
+        except (signing.BadSignature, KeyError, TypeError, ValueError, ValidationError):
+            logger.debug("Ungültiger Keyset-Cursor - zeige erste Seite")
+            return None
+
+    def _nullbar(self, name: str) -> bool:
+        return getattr(self._feld(name), "null", False)
+
+    def _nach(self, name: str, wert, absteigend: bool) -> Q:
+        """Zeilen, die in Sortierrichtung echt nach ``wert`` kommen."""
+        if absteigend:
+            if wert is None:
+                return Q(pk__in=[])
+            bedingung = Q(**{f"{name}__lt": wert})
+            if self._nullbar(name):
+                bedingung |= Q(**{f"{name}__isnull": True})
+            return bedingung
+        if wert is None:
+            return Q(**{f"{name}__isnull": False})
+        return Q(**{f"{name}__gt": wert})
+
+    @staticmethod
+    def _gleich(name: str, wert) -> Q:
+        if wert is None:
+            return Q(**{f"{name}__isnull": True})
+        return Q(**{name: wert})
+
+    def _filter(self, werte, rueckwaerts: bool) -> Q:
+        """(a, b, c) > (x, y, z) als ``a > x OR (a = x AND b > y) OR ...``."""
+        bedingung = Q(pk__in=[])
+        gleich = Q()
+        for (name, absteigend), wert in zip(self.schluessel, werte, strict=True):
+            bedingung |= gleich & self._nach(name, wert, absteigend != rueckwaerts)
+            gleich &= self._gleich(name, wert)
+
+        # Redundante Bereichsgrenze auf dem ersten Schlüssel, damit die
+        # Datenbank den Index als Bereich lesen kann
+        name, absteigend = self.schluessel[0]
+        if werte[0] is not None and not self._nullbar(name):
+            vergleich = "lte" if absteigend != rueckwaerts else "gte"
+            bedingung &= Q(**{f"{name}__{vergleich}": werte[0]})
+        return bedingung
+
+    def _sortierung(self, rueckwaerts: bool) -> list:
+        sortierung = []
+        for name, absteigend in self.schluessel:
+            if absteigend != rueckwaerts:
+                sortierung.append(F(name).desc(nulls_last=True))
+            else:
+                sortierung.append(F(name).asc(nulls_first=True))
+        return sortierung
+
+    def seite(self, cursor: str | None = None) -> KeysetSeite:
+        """Die Seite zum Cursor (ohne oder mit ungültigem Cursor: die erste)."""
+        gelesen = self._lies_cursor(cursor)
+        richtung, werte = gelesen or (VORWAERTS, None)
+        rueckwaerts = richtung == RUECKWAERTS
+
+        queryset = self.queryset
+        if werte is not None:
+            queryset = queryset.filter(self._filter(werte, rueckwaerts))
+        zeilen = list(
+            queryset.order_by(*self._sortierung(rueckwaerts))[: self.per_page + 1]
+        )
+        weitere = len(zeilen) > self.per_page
+        zeilen = zeilen[: self.per_page]
+
+        if rueckwaerts:
+            zeilen.reverse()
+            return KeysetSeite(
+                zeilen, self, has_next=werte is not None, has_previous=weitere
+            )
+        return KeysetSeite(
+            zeilen, self, has_next=weitere, has_previous=werte is not None
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset-Pagination für ``ListView`` (``paginate_by`` wie gewohnt).
+
+    Der Cursor kommt aus ``?cursor=``; ``get_keyset_anzahl`` kann eine schon
+    bekannte Gesamtzahl liefern, dann wird nicht extra gezählt.
+    """
+
+    anzahl_schaetzen = None
+
+    def get_keyset_anzahl(self) -> int | None:
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            anzahl=self.get_keyset_anzahl(),
+            anzahl_schaetzen=self.anzahl_schaetzen,
+        )
+        seite = paginator.seite(self.request.GET.get("cursor"))
+        return paginator, seite, seite.object_list, seite.has_other_pages()
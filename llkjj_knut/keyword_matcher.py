@@ -0,0 +1,138 @@
+"""
+Schlüsselwort-Matcher für die Kategorisierung
+=============================================
+
+Findet alle Schlüsselwörter mehrerer Kategorien in einem einzigen Durchlauf
+über den Text. Die Wörter werden beim Erzeugen einmal zu einem Präfixbaum
+zusammengefasst und als ein regulärer Ausdruck kompiliert; statt eines
+``re.search`` pro Schlüsselwort gibt es nur noch einen Scan.
+
+Nach jedem Treffer sucht der Matcher ab der nächsten Position weiter, damit
+auch überlappende Treffer gezählt werden ("berufshaftpflicht" enthält
+"haftpflicht"). An jeder Position liefert der Ausdruck das längste passende
+Wort; kürzere Wörter, die an derselben Position beginnen, sind genau dessen
+Präfixe und werden über eine vorberechnete Tabelle mitgezählt.
+
+Verwendet von ``belege.ki_service`` (Belegkategorien) und
+``buchungen.intelligent_kontierung`` (Buchungstexte).
+"""
+
+import re
+from collections import Counter
+
+
+def _baum_muster(woerter: list[str]) -> str:
+    """Baut aus den Wörtern einen Ausdruck mit gemeinsamen Präfixen."""
+    baum: dict = {}
+    for wort in woerter:
+        knoten = baum
+        for zeichen in wort:
+            knoten = knoten.setdefault(zeichen, {})
+        knoten[""] = True
+
+    def muster(knoten: dict) -> str:
+        zweige = [
+            re.escape(zeichen) + muster(kind)
+            for zeichen, kind in sorted(knoten.items())
+            if zeichen
+        ]
+        if not zweige:
+            return ""
+        # Wortende als letzte Alternative - so gewinnt immer das längste Wort
+        if "" in knoten:
+            zweige.append("")
+        if len(zweige) == 1:
+            return zweige[0]
+        return "(?:" + "|".join(zweige) + ")"
+
+    return muster(baum)
+
+
+class KeywordMatcher:
+    """
+    Vorkompilierter Matcher für Schlüsselwörter je Kategorie.
+
+    Args:
+        kategorien: Kategorie -> Liste von Schlüsselwörtern (Klartext,
+            Kleinschreibung). Ein Wort darf in mehreren Kategorien und auch
+            mehrfach in einer Liste stehen; es zählt dann entsprechend oft.
+    """
+
+    def __init__(self, kategorien: dict[str, list[str]]):
+        self.kategorien = kategorien
+        self.gewichte: dict[str, Counter] = {}
+        for kategorie, woerter in kategorien.items():
+            for wort in woerter:
+                self.gewichte.setdefault(wort, Counter())[kategorie] += 1
+
+        alle = sorted(self.gewichte)
+        # Wort -> alle Schlüsselwörter, die Präfix davon sind (inkl. selbst)
+        self.praefixe = {
+            wort: frozenset(kurz for kurz in alle if wort.startswith(kurz))
+            for wort in alle
+        }
+        # Wort -> (Kategorie, Punkte) für einen Treffer samt seiner Präfixe
+        self.punkte: dict[str, list[tuple[str, int]]] = {}
+        for wort, praefixe in self.praefixe.items():
+            punkte: Counter = Counter()
+            for praefix in praefixe:
+                punkte.update(self.gewichte[praefix])
+            self.punkte[wort] = list(punkte.items())
+
+        self.regex = re.compile(_baum_muster(alle)) if alle else None
+
+    def _laengste_treffer(self, text: str) -> list[str]:
+        """Längstes Schlüsselwort an jeder Position, an der eines beginnt."""
+        if not text or self.regex is None:
+            return []
+        text = text.lower()
+        suche = self.regex.search
+        treffer = []
+        match = suche(text)
+        while match:
+            treffer.append(match.group())
+            # Eine Position weiter - so werden auch überlappende Wörter gefunden
+            match = suche(text, match.start() + 1)
+        return treffer
+
+    def vorkommen(self, text: str) -> Counter:
+        """Anzahl Vorkommen je Schlüsselwort (auch überlappend)."""
+        vorkommen: Counter = Counter()
+        for wort, anzahl in Counter(self._laengste_treffer(text)).items():
+            for praefix in self.praefixe[wort]:
+                vorkommen[praefix] += anzahl
+        return vorkommen
+
+    def gefundene_woerter(self, text: str) -> set[str]:
+        """Menge der im Text enthaltenen Schlüsselwörter."""
+        return set().union(
+            *(self.praefixe[wort] for wort in set(self._laengste_treffer(text)))
+        )
+
+    def treffer_je_kategorie(
+        self, text: str, vorkommen_zaehlen: bool = True
+    ) -> Counter:
+        """
+        Treffer je Kategorie.
+
+        Args:
+            vorkommen_zaehlen: ``True`` zählt jedes Vorkommen eines Worts,
+                ``False`` nur, ob das Wort überhaupt vorkommt
+        """
+        laengste = self._laengste_treffer(text)
+        ergebnis: dict[str, int] = {}
+        if vorkommen_zaehlen:
+            paare = (paar for wort in laengste for paar in self.punkte[wort])
+        else:
+            woerter = set(laengste)
+            if len(woerter) == 1:
+                paare = self.punkte[woerter.pop()]
+            else:
+                paare = (
+                    paar
+                    for wort in set().union(*(self.praefixe[w] for w in woerter))
+                    for paar in self.gewichte[wort].items()
+                )
+        for kategorie, punkte in paare:
+            ergebnis[kategorie] = ergebnis.get(kategorie, 0) + punkte
+        return Counter(ergebnis)
@@ -0,0 +1,98 @@
+"""
+Middleware für Performance-Messung und Request-Cache
+====================================================
+
+- ``RequestCacheMiddleware`` stellt pro Request einen frischen Speicher für
+  ``cache_utils.request_cached`` bereit (Konten, Profil, EÜR-Mappings).
+- ``QueryBudgetMiddleware`` zählt Datenbankabfragen und DB-Zeit je View,
+  protokolliert Überschreitungen des Budgets und liefert die Zahlen im
+  DEBUG-Modus als Response-Header.
+
+Peter Zwegat: "Wer nicht zählt, was rausgeht, wundert sich am Monatsende!"
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .cache_utils import request_cache_beenden, request_cache_starten
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCacheMiddleware:
+    """Aktiviert den Request-Cache und verwirft ihn nach der Antwort."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request_cache_starten()
+        try:
+            return self.get_response(request)
+        finally:
+            request_cache_beenden(token)
+
+
+class QueryZaehler:
+    """``execute_wrapper``, der Anzahl und Dauer der Abfragen summiert."""
+
+    def __init__(self):
+        self.anzahl = 0
+        self.dauer = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.dauer += time.perf_counter() - start
+            self.anzahl += 1
+
+
+class QueryBudgetMiddleware:
+    """
+    Misst Abfragen je View und warnt bei Überschreitung des Budgets.
+
+    Budgets stehen in ``QUERY_BUDGETS`` (URL-Name, ggf. mit Namespace, z.B.
+    ``"auswertungen:dashboard"``), sonst gilt ``QUERY_BUDGET_STANDARD``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        zaehler = QueryZaehler()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(zaehler))
+            response = self.get_response(request)
+
+        view_name = self._view_name(request)
+        budget = self._budget(view_name)
+        if budget is not None and zaehler.anzahl > budget:
+            logger.warning(
+                f"Query-Budget überschritten: {view_name or request.path} "
+                f"mit {zaehler.anzahl} Abfragen (Budget {budget}), "
+                f"{zaehler.dauer * 1000:.1f} ms DB-Zeit"
+            )
+
+        if settings.DEBUG:
+            response["X-DB-Queries"] = str(zaehler.anzahl)
+            response["X-DB-Time-Ms"] = f"{zaehler.dauer * 1000:.1f}"
+        return response
+
+    @staticmethod
+    def _view_name(request) -> str | None:
+        match = getattr(request, "resolver_match", None)
+        return match.view_name if match else None
+
+    @staticmethod
+    def _budget(view_name: str | None) -> int | None:
+        budgets = getattr(settings, "QUERY_BUDGETS", {})
+        if view_name in budgets:
+            return budgets[view_name]
+        return getattr(settings, "QUERY_BUDGET_STANDARD", None)
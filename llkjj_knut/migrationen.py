@@ -0,0 +1,28 @@
+"""
+Hilfen für Migrationen
+======================
+
+Produktion läuft auf PostgreSQL, Entwicklung und Tests auf SQLite. Manche
+Schemateile (Erweiterungen, GIN-Indizes, ``tsvector``-Spalten) gibt es nur
+unter PostgreSQL - sie stehen trotzdem in den Migrationen, damit
+``migrate``, ``sqlmigrate`` und das Zurückrollen sie kennen.
+
+Peter Zwegat: "Was nicht im Plan steht, gibt es auch nicht!"
+"""
+
+from django.db import migrations
+
+
+class NurPostgreSQL(migrations.RunSQL):
+    """``RunSQL``, das auf anderen Datenbanken nichts tut."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return "Raw SQL operation (nur PostgreSQL)"
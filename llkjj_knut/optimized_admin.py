@@ -12,9 +12,10 @@ import logging
 
 from django.contrib import admin
 from django.core.cache import cache
-from django.db.models import Count, Max, Sum
+from django.db.models import Count, DecimalField, Max, OuterRef, Subquery, Sum
 from django.utils.html import format_html
 
+from auswertungen.models import KontoMonatssaldo
 from belege.models import Beleg
 from buchungen.models import Buchungssatz, Geschaeftspartner
 from konten.models import Konto
@@ -142,18 +143,30 @@ class OptimizedKontoAdmin(admin.ModelAdmin):
     list_per_page = 100
 
     def get_queryset(self, request):
-        """Optimierte Query mit Buchungsanzahl."""
+        """Optimierte Query mit Buchungsanzahl und Salden aus den Monatssalden."""
         return (
             super()
             .get_queryset(request)
             .annotate(
                 buchungen_soll=Count("soll_buchungen", distinct=True),
                 buchungen_haben=Count("haben_buchungen", distinct=True),
-                saldo_soll=Sum("soll_buchungen__betrag"),
-                saldo_haben=Sum("haben_buchungen__betrag"),
+                saldo_soll=self._monatssalden_summe("soll_summe"),
+                saldo_haben=self._monatssalden_summe("haben_summe"),
             )
         )
 
+    @staticmethod
+    def _monatssalden_summe(feld):
+        """Subquery: Summe eines Monatssaldo-Felds über alle Monate des Kontos."""
+        return Subquery(
+            KontoMonatssaldo.objects.filter(konto=OuterRef("pk"))
+            .order_by()
+            .values("konto")
+            .annotate(summe=Sum(feld))
+            .values("summe"),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+
     @admin.display(description="Status")
     def aktiv_status(self, obj):
         """Farbige Aktiv-Status Anzeige."""
@@ -179,21 +192,20 @@ class OptimizedKontoAdmin(admin.ModelAdmin):
 
     @admin.display(description="Saldo")
     def saldo_cache(self, obj):
-        """Gecachter Konten-Saldo."""
-        cache_key = f"konto_saldo_{obj.id}"
-        saldo = cache.get(cache_key)
-
-        if saldo is None:
-            saldo_soll = getattr(obj, "saldo_soll", None) or 0
-            saldo_haben = getattr(obj, "saldo_haben", None) or 0
-
-            # Saldo je nach Kontotyp berechnen
-            if obj.kategorie in ["AKTIVKONTO", "AUFWAND"]:
-                saldo = saldo_soll - saldo_haben
-            else:
-                saldo = saldo_haben - saldo_soll
-
-            cache.set(cache_key, saldo, 300)  # 5 Minuten Cache
+        """
+        Konten-Saldo aus den materialisierten Monatssalden.
+
+        Die Summen kommen bereits per Subquery aus ``get_queryset`` und sind
+        durch die Signals immer aktuell - ein zusätzlicher Cache entfällt.
+        """
+        saldo_soll = getattr(obj, "saldo_soll", None) or 0
+        saldo_haben = getattr(obj, "saldo_haben", None) or 0
+
+        # Saldo je nach Kontotyp berechnen
+        if obj.kategorie in ["AKTIVKONTO", "AUFWAND"]:
+            saldo = saldo_soll - saldo_haben
+        else:
+            saldo = saldo_haben - saldo_soll
 
         color = "green" if saldo >= 0 else "red"
         return format_html(
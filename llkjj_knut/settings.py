@@ -93,6 +93,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "llkjj_knut.middleware.QueryBudgetMiddleware",
+    "llkjj_knut.middleware.RequestCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -251,6 +253,75 @@ FISCAL_YEAR_START = int(os.getenv("FISCAL_YEAR_START", "1"))  # 1. Januar
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "10485760"))  # 10MB
 ALLOWED_UPLOAD_EXTENSIONS = [".pdf", ".jpg", ".jpeg", ".png", ".gif"]
 
+# Beleg-Thumbnails (Breite, Höhe) - die erste Größe ist der Standard;
+# abgelegt unter MEDIA_ROOT/thumbnails, benannt nach dem Inhalts-Hash
+BELEG_THUMBNAIL_GROESSEN = [(200, 300)]
+
+# Beleg-PDFs über nginx ausliefern (X-Accel-Redirect); leer = Django streamt
+# selbst. Muss zur "internal"-Location in nginx.conf passen.
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "")
+
+# Vorberechnete Referenz-Embeddings der semantischen Belegkategorisierung
+KI_EMBEDDING_CACHE_DIR = BASE_DIR / "ki_cache" / "embeddings"
+
+# KI-Modelle (spaCy, EasyOCR, Sentence Transformer) - siehe belege/modell_registry.py
+# Obergrenze für geladene Modelle pro Prozess in MB (0 = unbegrenzt)
+KI_MODELL_SPEICHER_MB = int(os.getenv("KI_MODELL_SPEICHER_MB", "0"))
+# Modelle nach so vielen Sekunden ohne Zugriff entladen (0 = nie)
+KI_MODELL_LEERLAUF_SEKUNDEN = int(os.getenv("KI_MODELL_LEERLAUF_SEKUNDEN", "0"))
+# Beim Start jedes Celery-Worker-Prozesses vorladen, z.B. "spacy,easyocr"
+KI_MODELLE_AUFWAERMEN = [
+    name.strip()
+    for name in os.getenv("KI_MODELLE_AUFWAERMEN", "").split(",")
+    if name.strip()
+]
+
+# Parallele OCR-Prozesse für gescannte PDF-Seiten (1 = nacheinander)
+OCR_PROZESSE = int(os.getenv("OCR_PROZESSE", str(os.cpu_count() or 1)))
+
+# CSV-/Excel-Import: Buchungen pro bulk_create-Block
+CSV_IMPORT_CHUNK_SIZE = int(os.getenv("CSV_IMPORT_CHUNK_SIZE", "2000"))
+# Hochgeladene Importdateien liegen bis zum Mapping hier (nginx sperrt den Pfad)
+CSV_IMPORT_STAGING_DIR = MEDIA_ROOT / "csv_import"
+CSV_IMPORT_STAGING_MAX_AGE = 24 * 3600  # Sekunden
+CSV_IMPORT_VORSCHAU_ZEILEN = 20
+# Ab dieser Zeilenzahl läuft der Import als Celery-Job mit Fortschrittsanzeige
+CSV_IMPORT_ASYNC_AB_ZEILEN = int(os.getenv("CSV_IMPORT_ASYNC_AB_ZEILEN", "5000"))
+# Duplikatsprüfung: gleicher Betrag, Datum ±Tage, Buchungstext ab dieser Ähnlichkeit
+CSV_IMPORT_DUPLIKAT_TAGE = 3
+CSV_IMPORT_DUPLIKAT_SCHWELLE = 0.6
+CSV_IMPORT_DUPLIKATE_UEBERSPRINGEN = (
+    os.getenv("CSV_IMPORT_DUPLIKATE_UEBERSPRINGEN", "False").lower() == "true"
+)
+# CSV-Export: Zeilen pro Datenbank-Abruf und gesendetem Block
+CSV_EXPORT_CHUNK_SIZE = int(os.getenv("CSV_EXPORT_CHUNK_SIZE", "2000"))
+# Listen (Keyset-Pagination): Gesamtzahl nur schätzen statt COUNT(*) -
+# unter PostgreSQL aus dem Planer, sonst bis zur Zählgrenze
+LISTEN_ANZAHL_SCHAETZEN = (
+    os.getenv("LISTEN_ANZAHL_SCHAETZEN", "False").lower() == "true"
+)
+LISTEN_ZAEHLGRENZE = int(os.getenv("LISTEN_ZAEHLGRENZE", "10000"))
+# Konten-Autocomplete: Nutzung der Konten (Rangfolge) nach so vielen Sekunden neu zählen
+KONTEN_INDEX_NUTZUNG_SEKUNDEN = int(os.getenv("KONTEN_INDEX_NUTZUNG_SEKUNDEN", "300"))
+# Indizes im Prozess (Konten, Buchungstexte, ML-Trainingsdaten): Der LocMemCache
+# meldet Änderungen nur im eigenen Prozess - andere Worker vergleichen höchstens
+# alle N Sekunden Anzahl/größte ID mit der Datenbank und laden nach M Sekunden neu
+PROZESS_INDEX_PRUEF_SEKUNDEN = int(os.getenv("PROZESS_INDEX_PRUEF_SEKUNDEN", "30"))
+PROZESS_INDEX_MAX_ALTER_SEKUNDEN = int(
+    os.getenv("PROZESS_INDEX_MAX_ALTER_SEKUNDEN", "300")
+)
+# Kontierungsvorschläge für große Batches parallel bewerten (1 = nacheinander)
+KONTIERUNG_PROZESSE = int(os.getenv("KONTIERUNG_PROZESSE", "1"))
+KONTIERUNG_POOL_AB_ZEILEN = int(os.getenv("KONTIERUNG_POOL_AB_ZEILEN", "50000"))
+
+# Query-Budget je View (siehe llkjj_knut/middleware.py): Überschreitungen
+# werden geloggt, im DEBUG-Modus stehen die Zahlen in X-DB-Queries/-Time-Ms
+QUERY_BUDGET_STANDARD = int(os.getenv("QUERY_BUDGET_STANDARD", "50"))
+QUERY_BUDGETS = {
+    "auswertungen:dashboard": 15,
+    "dokumente:dashboard": 10,
+}
+
 # =============================================================================
 # CELERY KONFIGURATION (für asynchrone Tasks)
 # =============================================================================